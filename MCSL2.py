@@ -15,11 +15,35 @@ Main entry.
 """
 
 import sys
-from PyQt5.QtCore import Qt, QLocale, QObject, QEvent
-from PyQt5.QtWidgets import QApplication
+
+# Headless daemon / detached host of a single server:
+# branch off before any widget module (and qfluentwidgets) is imported
+if __name__ == "__main__" and ("--daemon" in sys.argv or "--host" in sys.argv):
+    from multiprocessing import freeze_support
+
+    freeze_support()
+
+    import MCSL2Lib
+
+    MCSL2Lib.HEADLESS = True
+    from MCSL2Lib.ProgramControllers.settingsController import cfg
+
+    cfg.load(r"./MCSL2/MCSL2_Config.json")
+
+    if "--daemon" in sys.argv:
+        from MCSL2Lib.ProgramControllers.daemonController import runDaemon
+
+        sys.exit(runDaemon(sys.argv))
+
+    from MCSL2Lib.ServerControllers.serverHost import runServerHost
+
+    sys.exit(runServerHost(sys.argv))
+
+from PyQt5.QtCore import Qt, QLocale, QObject, QEvent  # noqa: E402
+from PyQt5.QtWidgets import QApplication  # noqa: E402
 
 # from viztracer import VizTracer
-from MCSL2Lib.utils import MCSL2Logger
+from MCSL2Lib.utils import MCSL2Logger  # noqa: E402
 
 
 class MCSL2Application(QApplication):
@@ -36,6 +60,11 @@ class MCSL2Application(QApplication):
 
 
 if __name__ == "__main__":
+    # 日志分析等功能使用的子进程在打包后需要
+    from multiprocessing import freeze_support
+
+    freeze_support()
+
     # Debug
     # tracer = VizTracer()
     # tracer.enable_thread_tracing()
@@ -10,13 +10,16 @@
 #        https://github.com/MCSLTeam/MCSL2/raw/master/LICENSE
 #
 ################################################################################
+from typing import List
+
 from PyQt5.QtCore import QRect, Qt, pyqtSlot
 from PyQt5.QtWidgets import QGridLayout, QSizePolicy, QWidget, QSpacerItem, QFrame
 
-from qfluentwidgets import StrongBodyLabel, TitleLabel, FlowLayout
+from qfluentwidgets import StrongBodyLabel, TitleLabel, FlowLayout, PushButton, FluentIcon as FIF
 
 from MCSL2Lib.ProgramControllers.interfaceController import MySmoothScrollArea
 from MCSL2Lib.Widgets.singleRunningServerWidget import RunningServerHeaderCardWidget
+from MCSL2Lib.Widgets.consoleArchiveWidget import ConsoleArchiveSearchBox
 
 
 class ConsoleCenterPage(QWidget):
@@ -44,6 +47,13 @@ class ConsoleCenterPage(QWidget):
         sizePolicy.setHeightForWidth(self.titleLabel.sizePolicy().hasHeightForWidth())
         self.titleLabel.setSizePolicy(sizePolicy)
         self.titleLayout.addWidget(self.titleLabel, 0, 0, 1, 1)
+        self.searchArchiveBtn = PushButton(
+            icon=FIF.SEARCH, text="检索历史日志", parent=self.titleLimitWidget
+        )
+        self.searchArchiveBtn.clicked.connect(
+            lambda: ConsoleArchiveSearchBox(parent=self.window()).exec_()
+        )
+        self.titleLayout.addWidget(self.searchArchiveBtn, 0, 1, 2, 1, Qt.AlignRight)
         self.gridLayout.addWidget(self.titleLimitWidget, 1, 2, 2, 2)
         spacerItem = QSpacerItem(10, 20, QSizePolicy.Fixed, QSizePolicy.Minimum)
         self.gridLayout.addItem(spacerItem, 1, 0, 1, 1)
@@ -69,5 +79,18 @@ class ConsoleCenterPage(QWidget):
         card.setParent(self.runningServersScrollAreaWidgetContents)
         self.flowLayout.addWidget(card)
 
+    def runningCards(self) -> List[RunningServerHeaderCardWidget]:
+        return [self.flowLayout.itemAt(i).widget() for i in range(self.flowLayout.count())]
+
     def isAnyServerRunning(self) -> bool:
-        return bool(self.flowLayout.count() > 0)
+        """是否有会随 MCSL2 退出而停止的服务器"""
+        return any(
+            card.console.serverBridge is None or not card.console.serverBridge.detachable
+            for card in self.runningCards()
+        )
+
+    def detachServers(self):
+        """关闭可断开的服务器的窗口，服务器继续运行"""
+        for card in self.runningCards():
+            self.flowLayout.removeWidget(card)
+            card.console.close()
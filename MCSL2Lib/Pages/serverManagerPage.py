@@ -60,8 +60,15 @@ from MCSL2Lib.ProgramControllers.serverValidator import ServerValidator
 from MCSL2Lib.ProgramControllers.settingsController import cfg
 from MCSL2Lib.Resources.icons import *  # noqa: F401 F403
 from MCSL2Lib.ProgramControllers.interfaceController import MySmoothScrollArea
+from MCSL2Lib.ProgramControllers.playerSessionController import PlayerSessionIndex
 from MCSL2Lib.ServerControllers.windowCreator import ServerWindow
-from MCSL2Lib.ServerControllers.processCreator import ServerLauncher
+from MCSL2Lib.ServerControllers.remoteBridge import (
+    DaemonClient,
+    RemoteServerLauncher,
+    attachRunningHost,
+    createServerLauncher,
+)
+from MCSL2Lib.ServerControllers.serverHost import discoverHosts
 from MCSL2Lib.ServerControllers.serverUtils import backupServer, backupSaves
 from MCSL2Lib.Widgets.noServerTip import NoServerWidget
 from MCSL2Lib.Widgets.serverManagerWidget import SingleServerManager
@@ -1401,14 +1408,15 @@ class ServerManagerPage(QWidget):
             and editServerVariables.oldIcon == editServerVariables.icon
         )
 
-    def startServer(self, index):
+    def startServer(self, index, manageBtn=None, attach=None):
         v = ServerConfigConstructor.loadServerConfig(index=index)
+        manageBtn = manageBtn or self.sender()
         (
             w := ServerWindow(
                 v,
-                ServerLauncher(v),
-                manageBtn=self.sender(),
-                manageBackupBtn=self.sender().parent().parent().backupBtn,
+                createServerLauncher(v) if attach is None else RemoteServerLauncher(attach, v),
+                manageBtn=manageBtn,
+                manageBackupBtn=manageBtn.parent().parent().backupBtn,
             )
         ).show()
         w.monitorWidget = RunningServerHeaderCardWidget(
@@ -1416,6 +1424,34 @@ class ServerManagerPage(QWidget):
         ).itSelf
         self.runningServerCardGenerated.emit(w.monitorWidget)
 
+    def reattachServers(self):
+        """重新连接上次关闭或更新 MCSL2 后仍在宿主进程中运行的服务器，补齐终端输出"""
+        hosts = {metadata.server: metadata for metadata in discoverHosts()}
+        # 上次异常退出时遗留的会话；守护进程与宿主进程中的服务器由它们自己记录
+        if DaemonClient.instance() is None:
+            PlayerSessionIndex.closeInterrupted(keep=hosts)
+        if not hosts:
+            return
+        self.refreshServers()
+        for index, config in enumerate(readGlobalServerConfig()):
+            if (metadata := hosts.get(config["name"])) is None:
+                continue
+            attachRunningHost(
+                metadata,
+                lambda client, index=index, metadata=metadata: self.reattachServer(
+                    index, metadata, client
+                ),
+                self,
+            )
+
+    def reattachServer(self, index, metadata, client):
+        MCSL2Logger.info(f"reattaching to server {metadata.server} (pid {metadata.pid})")
+        self.startServer(
+            index,
+            manageBtn=self.findChild(PrimaryPushButton, f"runBtn{index}"),
+            attach=client,
+        )
+
     def backup(self, index):
         w = MessageBox("备份服务器", "请选择你需要备份的文件：", self)
         w.yesButton.setText("服务器")
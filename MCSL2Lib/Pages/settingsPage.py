@@ -16,8 +16,9 @@ Settings page.
 
 from datetime import datetime
 
-from PyQt5.QtCore import QSize, Qt, QRect, pyqtSignal, pyqtSlot
+from PyQt5.QtCore import QSize, Qt, QRect, QTimer, pyqtSignal, pyqtSlot
 from PyQt5.QtWidgets import (
+    QFileDialog,
     QWidget,
     QGridLayout,
     QSizePolicy,
@@ -41,6 +42,7 @@ from qfluentwidgets import (
     SettingCardGroup,
     ComboBoxSettingCard,
     PrimaryPushSettingCard,
+    PushSettingCard,
     RangeSettingCard,
     MessageBox,
     InfoBarPosition,
@@ -51,6 +53,7 @@ from qfluentwidgets import (
 
 from MCSL2Lib import MCSL2VERSION
 from MCSL2Lib.ProgramControllers.aria2ClientController import Aria2BootThread, Aria2Controller
+from MCSL2Lib.ProgramControllers.metricsController import MetricsExporter
 from MCSL2Lib.ProgramControllers.settingsController import cfg
 from MCSL2Lib.ProgramControllers.updateController import (
     CheckUpdateThread,
@@ -168,16 +171,28 @@ class SettingsPage(QWidget):
         self.restartServerWhenCrashed = SwitchSettingCard(
             icon=FIF.HISTORY,
             title=self.tr("崩溃自动重启"),
-            content=self.tr("自动重启非正常关闭的服务器。"),
+            content=self.tr(
+                "自动重启非正常关闭的服务器，间隔逐次加长；重启过于频繁时停止重启，次数上限可在服务器窗口中单独设置。"  # noqa: E501
+            ),
             configItem=cfg.restartServerWhenCrashed,
             parent=self.serverSettingsGroup,
         )
+        self.detachServers = SwitchSettingCard(
+            icon=FIF.LINK,
+            title=self.tr("服务器独立运行"),
+            content=self.tr(
+                "服务器在单独的后台进程中运行，关闭服务器窗口或关闭、更新 MCSL2 时不会停止，再次打开时自动重新连接。"  # noqa: E501
+            ),
+            configItem=cfg.detachServers,
+            parent=self.serverSettingsGroup,
+        )
         self.autoRunLastServer.setEnabled(False)
         self.sendStopInsteadOfKill.setEnabled(False)
         self.serverSettingsGroup.addSettingCard(self.autoRunLastServer)
         self.serverSettingsGroup.addSettingCard(self.acceptAllMojangEula)
         self.serverSettingsGroup.addSettingCard(self.sendStopInsteadOfKill)
         self.serverSettingsGroup.addSettingCard(self.restartServerWhenCrashed)
+        self.serverSettingsGroup.addSettingCard(self.detachServers)
         self.settingsLayout.addWidget(self.serverSettingsGroup)
 
         # Configure server
@@ -298,12 +313,124 @@ class SettingsPage(QWidget):
             configItem=cfg.clearConsoleWhenStopServer,
             parent=self.consoleSettingsGroup,
         )
+        self.consoleBatchOutput = SwitchSettingCard(
+            icon=FIF.SPEED_HIGH,
+            title=self.tr("终端批量刷新"),
+            content=self.tr("按帧合并服务器输出，刷屏时不再卡住界面。重启服务器后生效。"),
+            configItem=cfg.consoleBatchOutput,
+            parent=self.consoleSettingsGroup,
+        )
+        self.consoleRefreshRate = RangeSettingCard(
+            configItem=cfg.consoleRefreshRate,
+            icon=FIF.SYNC,
+            title=self.tr("终端每秒刷新次数"),
+            content=self.tr("批量刷新模式下，每秒最多刷新终端的次数。"),
+            parent=self.consoleSettingsGroup,
+        )
+        self.consoleMaxLinesPerSecond = RangeSettingCard(
+            configItem=cfg.consoleMaxLinesPerSecond,
+            icon=FIF.ALIGNMENT,
+            title=self.tr("终端每秒最多显示行数"),
+            content=self.tr("超出部分将被合并省略，并在终端中提示。"),
+            parent=self.consoleSettingsGroup,
+        )
+        self.consoleCapacity = RangeSettingCard(
+            configItem=cfg.consoleCapacity,
+            icon=FIF.HISTORY,
+            title=self.tr("终端保留行数"),
+            content=self.tr("超出的旧日志将压缩保存到磁盘，可在“历史输出”中翻阅。可在服务器窗口中单独设置。"),
+            parent=self.consoleSettingsGroup,
+        )
+        self.consoleArchive = SwitchSettingCard(
+            icon=FIF.SAVE,
+            title=self.tr("归档终端输出"),
+            content=self.tr("将所有服务器的终端输出保存到本地并建立索引，可跨会话检索。"),
+            configItem=cfg.consoleArchive,
+            parent=self.consoleSettingsGroup,
+        )
+        self.consoleArchiveMaxSize = RangeSettingCard(
+            configItem=cfg.consoleArchiveMaxSize,
+            icon=FIF.FOLDER,
+            title=self.tr("终端归档最大占用(MB)"),
+            content=self.tr("超出后将删除最早的归档。"),
+            parent=self.consoleSettingsGroup,
+        )
         self.consoleSettingsGroup.addSettingCard(self.outputDeEncoding)
         self.consoleSettingsGroup.addSettingCard(self.inputDeEncoding)
         self.consoleSettingsGroup.addSettingCard(self.quickMenu)
         self.consoleSettingsGroup.addSettingCard(self.clearConsoleWhenStopServer)
+        self.consoleSettingsGroup.addSettingCard(self.consoleBatchOutput)
+        self.consoleSettingsGroup.addSettingCard(self.consoleRefreshRate)
+        self.consoleSettingsGroup.addSettingCard(self.consoleMaxLinesPerSecond)
+        self.consoleSettingsGroup.addSettingCard(self.consoleCapacity)
+        self.consoleSettingsGroup.addSettingCard(self.consoleArchive)
+        self.consoleSettingsGroup.addSettingCard(self.consoleArchiveMaxSize)
         self.settingsLayout.addWidget(self.consoleSettingsGroup)
 
+        # Metrics
+        self.metricsSettingsGroup = SettingCardGroup(self.tr("监控导出"), self.settingsWidget)
+        self.metricsExporter = OptionsSettingCard(
+            configItem=cfg.metricsExporter,
+            icon=FIF.SPEED_HIGH,
+            title=self.tr("导出监控指标"),
+            content=self.tr("以 Prometheus / OpenMetrics 格式导出服务器与 MCSL2 的运行指标。"),
+            texts=[
+                self.tr("关闭"),
+                self.tr("HTTP 端点 (/metrics)"),
+                self.tr("写入文件 (node_exporter textfile collector)"),
+            ],
+            parent=self.metricsSettingsGroup,
+        )
+        self.metricsExporterPort = RangeSettingCard(
+            configItem=cfg.metricsExporterPort,
+            icon=FIF.CONNECT,
+            title=self.tr("HTTP 端点端口"),
+            content=self.tr("Prometheus 的抓取地址为 http://<本机地址>:<端口>/metrics。"),
+            parent=self.metricsSettingsGroup,
+        )
+        self.metricsExporterPublic = SwitchSettingCard(
+            icon=FIF.GLOBE,
+            title=self.tr("允许其他设备访问 HTTP 端点"),
+            content=self.tr("关闭时只监听 127.0.0.1。"),
+            configItem=cfg.metricsExporterPublic,
+            parent=self.metricsSettingsGroup,
+        )
+        self.metricsTextfileDir = PushSettingCard(
+            text=self.tr("选择目录"),
+            icon=FIF.FOLDER,
+            title=self.tr("指标文件目录"),
+            content=cfg.get(cfg.metricsTextfileDir),
+            parent=self.metricsSettingsGroup,
+        )
+        self.metricsSettingsGroup.addSettingCard(self.metricsExporter)
+        self.metricsSettingsGroup.addSettingCard(self.metricsExporterPort)
+        self.metricsSettingsGroup.addSettingCard(self.metricsExporterPublic)
+        self.metricsSettingsGroup.addSettingCard(self.metricsTextfileDir)
+        self.settingsLayout.addWidget(self.metricsSettingsGroup)
+        # 拖动端口滑块时不必每一步都重新监听
+        self.metricsApplyTimer = QTimer(self)
+        self.metricsApplyTimer.setSingleShot(True)
+        self.metricsApplyTimer.setInterval(500)
+        self.metricsApplyTimer.timeout.connect(MetricsExporter.applySettings)
+        self.metricsExporter.optionChanged.connect(self.metricsApplyTimer.start)
+        self.metricsExporterPort.valueChanged.connect(self.metricsApplyTimer.start)
+        self.metricsExporterPublic.checkedChanged.connect(self.metricsApplyTimer.start)
+        self.metricsTextfileDir.clicked.connect(self.selectMetricsTextfileDir)
+
+        # JVM diagnostics
+        self.jvmSettingsGroup = SettingCardGroup(self.tr("JVM 诊断"), self.settingsWidget)
+        self.jdkToolCpuBudget = RangeSettingCard(
+            configItem=cfg.jdkToolCpuBudget,
+            icon=FIF.SPEED_OFF,
+            title=self.tr("JDK 工具 CPU 预算(%)"),
+            content=self.tr(
+                "jstat、jcmd 等工具每次都会启动一个 JVM。周期性采样占用的 CPU 不超过单核的该比例。"
+            ),
+            parent=self.jvmSettingsGroup,
+        )
+        self.jvmSettingsGroup.addSettingCard(self.jdkToolCpuBudget)
+        self.settingsLayout.addWidget(self.jvmSettingsGroup)
+
         # Software
         self.programSettingsGroup = SettingCardGroup("程序设置", self.settingsWidget)
         self.themeMode = OptionsSettingCard(
@@ -545,6 +672,16 @@ class SettingsPage(QWidget):
             parent=self,
         )
 
+    def selectMetricsTextfileDir(self):
+        directory = QFileDialog.getExistingDirectory(
+            self, self.tr("选择指标文件目录"), cfg.get(cfg.metricsTextfileDir)
+        )
+        if not directory or directory == cfg.get(cfg.metricsTextfileDir):
+            return
+        cfg.set(cfg.metricsTextfileDir, directory)
+        self.metricsTextfileDir.setContent(directory)
+        self.metricsApplyTimer.start()
+
     def restartAria2(self):
         Aria2Controller.shutDown()
         bootThread = Aria2BootThread(self)
@@ -23,11 +23,17 @@ from os import path as osp
 from platform import system
 from shutil import which
 from subprocess import PIPE, STDOUT, CalledProcessError, check_output, Popen
-from typing import Optional, Callable, Dict
-
-from PyQt5.QtCore import QThread, pyqtSignal, QObject, QProcess, QTimer, QMutex
+from threading import Condition
+from time import monotonic
+from typing import Optional, Callable, Dict, List, NamedTuple, Set
+
+from PyQt5.QtCore import QEvent, QThread, pyqtSignal, QObject, QProcess, QMutex, QTimer, QUrl
+from PyQt5.QtNetwork import QAbstractSocket
+from PyQt5.QtWebSockets import QWebSocket
+from PyQt5.QtWidgets import QWidget
 from aria2p import Client, API, Download
 
+from MCSL2Lib.ProgramControllers.metricsController import MetricFamily, MetricsRegistry
 from MCSL2Lib.ProgramControllers.settingsController import cfg
 from MCSL2Lib.ProgramControllers.networkController import MCSLNetworkSession
 from MCSL2Lib.utils import workingThreads
@@ -53,6 +59,10 @@ class Aria2Controller:
 
     _downloadWatcher = {}
 
+    _poller: Optional["Aria2StatusPoller"] = None
+
+    _listener: Optional["Aria2NotificationListener"] = None
+
     systemType = ""
 
     aria2cStatus = False
@@ -202,6 +212,7 @@ class Aria2Controller:
         """
         gid = cls.addUri(uri)
         if watch:
+            cls.listener().open()
             cls._downloadWatcher[gid] = DownloadWatcher(
                 gid,
                 info_get=info_get,
@@ -211,6 +222,30 @@ class Aria2Controller:
             )
         return gid
 
+    @classmethod
+    def poller(cls) -> "Aria2StatusPoller":
+        """所有 DownloadWatcher 共用的状态轮询线程，首次使用时启动"""
+        if cls._poller is None:
+            cls._poller = Aria2StatusPoller()
+            cls._poller.start()
+        return cls._poller
+
+    @classmethod
+    def listener(cls) -> "Aria2NotificationListener":
+        """到 Aria2 的 WebSocket 连接，下载状态变化时立即通知 DownloadWatcher"""
+        if cls._listener is None:
+            cls._listener = Aria2NotificationListener(cls._port)
+            cls._listener.notified.connect(cls.onNotified)
+        return cls._listener
+
+    @classmethod
+    def onNotified(cls, gid: str, status: str):
+        if status in ("active", "paused"):
+            if cls._poller is not None:
+                cls._poller.setActive(gid, status == "active")
+        elif (watcher := cls._downloadWatcher.get(gid)) is not None:
+            watcher.finish(status)
+
     @classmethod
     def getWatcher(cls, gid) -> "DownloadWatcher":
         """
@@ -275,7 +310,7 @@ class Aria2Controller:
     def getDownloadsStatus(cls, gid: str) -> dict:
         """
         Get the state of a download task by gid
-        * normally, this function is only used by Class:DownloadWatcher
+        * a one-shot query, DownloadWatcher receives its updates from Aria2StatusPoller
         """
         try:
             download = cls._aria2.get_download(gid)
@@ -426,8 +461,27 @@ class Aria2Controller:
         else:
             subprocess.run("killall aria2c", text=True, shell=True)
 
+    @classmethod
+    def collectMetrics(cls):
+        """导出时向 Aria2 查询一次全局下载状态"""
+        speed = MetricFamily(
+            "mcsl2_aria2_download_speed_bytes", "gauge", "Overall aria2 download speed per second."
+        )
+        active = MetricFamily("mcsl2_aria2_active_downloads", "gauge", "Active aria2 downloads.")
+        if cls._aria2 is not None:
+            stats = cls._aria2.get_stats()
+            speed.labels().set(stats.download_speed)
+            active.labels().set(stats.num_active)
+        return speed, active
+
     @classmethod
     def shutDown(cls):
+        if cls._listener is not None:
+            cls._listener.close()
+            cls._listener = None
+        if cls._poller is not None:
+            cls._poller.stop()
+            cls._poller = None
         try:
             if cls._aria2 is not None:
                 cls._aria2: API
@@ -445,6 +499,9 @@ class Aria2Controller:
             return True
 
 
+MetricsRegistry.addCollector(Aria2Controller.collectMetrics)
+
+
 class Aria2BootThread(QThread):
     """
     Aria2启动线程
@@ -492,13 +549,294 @@ class Aria2ProcessThread(QThread):
         process.wait()
 
 
+class DownloadProgress(NamedTuple):
+    """一个下载任务的进度，只含数值，由 Aria2StatusPoller 产生"""
+
+    gid: str
+    status: str
+    totalLength: int
+    completedLength: int
+    downloadSpeed: int
+    connections: int
+
+    @classmethod
+    def fromStatus(cls, struct: dict) -> "DownloadProgress":
+        return cls(
+            struct["gid"],
+            struct["status"],
+            int(struct.get("totalLength", 0)),
+            int(struct.get("completedLength", 0)),
+            int(struct.get("downloadSpeed", 0)),
+            int(struct.get("connections", 0)),
+        )
+
+    @classmethod
+    def fromDownload(cls, download: Download) -> "DownloadProgress":
+        return cls(
+            download.gid,
+            download.status,
+            download.total_length,
+            download.completed_length,
+            download.download_speed,
+            download.connections,
+        )
+
+    @classmethod
+    def removed(cls, gid: str) -> "DownloadProgress":
+        return cls(gid, "removed", 0, 0, 0, 0)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("complete", "error", "removed")
+
+    def format(self) -> dict:
+        """转换为界面显示的字符串，格式与 getDownloadsStatus 相同(不含文件列表)"""
+        download = Download(
+            Aria2Controller._aria2,
+            {
+                "gid": self.gid,
+                "status": self.status,
+                "totalLength": str(self.totalLength),
+                "completedLength": str(self.completedLength),
+                "downloadSpeed": str(self.downloadSpeed),
+                "connections": str(self.connections),
+            },
+        )
+        return {
+            "connections": self.connections,
+            "speed": download.download_speed_string() if self.status == "active" else self.status,
+            "progress": download.progress_string(),
+            "status": self.status,
+            "totalLength": download.total_length_string(),
+            "completedLength": download.completed_length_string(),
+            "files": [],
+            "bar": int(download.progress),
+            "eta": download.eta_string(),
+        }
+
+
+class Aria2StatusPoller(QThread):
+    """
+    所有下载任务共用的状态轮询线程。每个周期用一次 system.multicall 查询关注的任务，
+    结果以 {gid: DownloadProgress} 通过 polled 信号推送，字符串由可见的界面自行格式化。
+    有正在下载且进度可见的任务时按其要求的间隔轮询。
+    WebSocket 通知可用时，完成、出错与移除由通知得知，只有进度不可见的任务仍以 IDLE_INTERVAL
+    低频轮询，以便发现其重新可见；通知不可用时以 IDLE_INTERVAL 低频轮询全部任务。
+    Aria2 无响应时逐次加长间隔，没有任务时休眠。
+    """
+
+    polled = pyqtSignal(object)
+
+    KEYS = ["gid", "status", "totalLength", "completedLength", "downloadSpeed", "connections"]
+    IDLE_INTERVAL = 1.0
+    MAX_INTERVAL = 5.0
+    # 连续失败该次数后视为 Aria2 已退出，所有任务按已移除处理
+    MAX_FAILURES = 10
+
+    def __init__(self):
+        super().__init__()
+        self.setObjectName("Aria2StatusPollerThread")
+        # gid -> 要求的轮询间隔
+        self.intervals: Dict[str, float] = {}
+        self.hidden: Set[str] = set()
+        self.active: Set[str] = set()
+        self.failures = 0
+        # Aria2NotificationListener 已连接
+        self.notified = False
+        self.condition = Condition()
+        self.running = True
+
+    def watch(self, gid: str, interval: float):
+        with self.condition:
+            self.intervals[gid] = interval
+            self.active.add(gid)
+            self.condition.notify()
+
+    def unwatch(self, gid: str):
+        with self.condition:
+            self.intervals.pop(gid, None)
+            self.hidden.discard(gid)
+            self.active.discard(gid)
+
+    def setVisible(self, gid: str, visible: bool):
+        with self.condition:
+            if visible:
+                if gid in self.hidden:
+                    self.hidden.discard(gid)
+                    # 进度重新显示时立即刷新
+                    self.condition.notify()
+            elif gid in self.intervals:
+                self.hidden.add(gid)
+
+    def setActive(self, gid: str, active: bool):
+        """下载开始或暂停的通知，不必等下一次轮询"""
+        with self.condition:
+            if gid not in self.intervals:
+                return
+            if active:
+                self.active.add(gid)
+                self.condition.notify()
+            else:
+                self.active.discard(gid)
+
+    def setNotified(self, notified: bool):
+        with self.condition:
+            self.notified = notified
+            self.condition.notify()
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        self.wait()
+
+    def nextInterval(self) -> Optional[float]:
+        """到下一次轮询的间隔，None 表示不需要轮询；调用时需持有 condition"""
+        if not self.intervals:
+            return None
+        fast = [
+            interval
+            for gid, interval in self.intervals.items()
+            if gid in self.active and gid not in self.hidden
+        ]
+        if fast:
+            interval = min(fast)
+        elif self.notified and not self.hidden:
+            return None
+        else:
+            interval = self.IDLE_INTERVAL
+        if self.failures:
+            backoff = self.IDLE_INTERVAL * 2 ** (self.failures - 1)
+            interval = max(interval, min(self.MAX_INTERVAL, backoff))
+        return interval
+
+    def run(self):
+        lastPoll = monotonic()
+        while True:
+            with self.condition:
+                # 新任务、进度重新可见或通知连接变化时会被唤醒，按新的间隔重新计算等待时间
+                while self.running:
+                    if (interval := self.nextInterval()) is None:
+                        self.condition.wait()
+                    elif (remaining := lastPoll + interval - monotonic()) > 0:
+                        self.condition.wait(remaining)
+                    else:
+                        break
+                if not self.running:
+                    return
+                gids = list(self.intervals)
+            lastPoll = monotonic()
+            if not gids:
+                continue
+            progress = self.poll(gids)
+            if progress is None:
+                continue
+            with self.condition:
+                for gid, status in progress.items():
+                    if status.status == "active":
+                        self.active.add(gid)
+                    else:
+                        self.active.discard(gid)
+            self.polled.emit(progress)
+
+    def poll(self, gids: List[str]) -> Optional[Dict[str, DownloadProgress]]:
+        try:
+            results = Aria2Controller._aria2.client.multicall([
+                {"methodName": "aria2.tellStatus", "params": [gid, self.KEYS]} for gid in gids
+            ])
+        except Exception as e:
+            self.failures += 1
+            if self.failures < self.MAX_FAILURES:
+                return None
+            MCSL2Logger.warning(f"Aria2 did not answer status polls: {e}")
+            self.failures = 0
+            return {gid: DownloadProgress.removed(gid) for gid in gids}
+        self.failures = 0
+        progress = {}
+        for gid, result in zip(gids, results):
+            # 每项为只含一个返回值的数组，或者出错时(任务已不存在)的错误对象
+            if isinstance(result, list) and result:
+                progress[gid] = DownloadProgress.fromStatus(result[0])
+            else:
+                progress[gid] = DownloadProgress.removed(gid)
+        return progress
+
+
+class Aria2NotificationListener(QObject):
+    """
+    与 Aria2 保持 WebSocket RPC 连接，下载开始、暂停、完成、出错与被移除时立即通过 notified 通知。
+    连接期间 Aria2StatusPoller 不再为检测完成而轮询；连接断开后退回低频轮询，
+    仍有关注的下载任务时按逐次加长的间隔重连。
+    """
+
+    # gid, 对应的下载状态
+    notified = pyqtSignal(str, str)
+
+    EVENTS = {
+        "aria2.onDownloadStart": "active",
+        "aria2.onDownloadPause": "paused",
+        "aria2.onDownloadComplete": "complete",
+        "aria2.onDownloadError": "error",
+        "aria2.onDownloadStop": "removed",
+    }
+    RECONNECT_MIN = 2
+    RECONNECT_MAX = 60
+
+    def __init__(self, port: int, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self.url = QUrl(f"ws://localhost:{port}/jsonrpc")
+        self.socket = QWebSocket()
+        self.socket.setParent(self)
+        self.socket.connected.connect(self.onConnected)
+        self.socket.disconnected.connect(self.onDisconnected)
+        self.socket.textMessageReceived.connect(self.onMessage)
+        self.reconnectDelay = self.RECONNECT_MIN
+        self.reconnectTimer = QTimer(self)
+        self.reconnectTimer.setSingleShot(True)
+        self.reconnectTimer.timeout.connect(self.open)
+
+    def open(self):
+        if self.socket.state() == QAbstractSocket.UnconnectedState:
+            self.socket.open(self.url)
+
+    def close(self):
+        self.reconnectTimer.stop()
+        self.socket.disconnected.disconnect(self.onDisconnected)
+        self.socket.abort()
+
+    def onConnected(self):
+        MCSL2Logger.info(f"Aria2 notifications connected: {self.url.toString()}")
+        self.reconnectDelay = self.RECONNECT_MIN
+        Aria2Controller.poller().setNotified(True)
+
+    def onDisconnected(self):
+        if Aria2Controller._poller is not None:
+            Aria2Controller._poller.setNotified(False)
+        # 没有下载任务时不必重连，下次下载时再连接
+        if Aria2Controller._downloadWatcher:
+            self.reconnectTimer.start(self.reconnectDelay * 1000)
+            self.reconnectDelay = min(self.reconnectDelay * 2, self.RECONNECT_MAX)
+
+    def onMessage(self, message: str):
+        try:
+            notification = json.loads(message)
+            status = self.EVENTS.get(notification.get("method"))
+            gid = notification["params"][0]["gid"] if status is not None else None
+        except (ValueError, KeyError, IndexError, TypeError, AttributeError):
+            return
+        if gid is not None:
+            self.notified.emit(gid, status)
+
+
 class DownloadWatcher(QObject):
     """
-    DownloadWatcher is a QThread that watches the download progress of a download task.
-    download task started and download information emitted every interval.
+    DownloadWatcher watches the download progress of a download task.
+    Progress is pushed by the shared Aria2StatusPoller, and formatted into
+    onDownloadInfoGet(dict) only while the receiving widget is visible.
+    Completion, errors and removal arrive as aria2 notifications when the
+    WebSocket is connected, and from polling otherwise.
     """
 
-    # 每隔一段时间获取一次下载信息(self.Interval)，并发射下载信息OnDownloadInfoGet(dict)
     onDownloadInfoGet = pyqtSignal(dict)
     downloadStop = pyqtSignal(list)
 
@@ -520,43 +858,66 @@ class DownloadWatcher(QObject):
         self._interval = interval
         self._files = None
         self._extraData = extraData
+        self._finished = False
+        # info_get 通常是进度控件的方法，控件不可见时不必生成显示用的字符串
+        receiver = getattr(info_get, "__self__", None)
+        self._widget = receiver if isinstance(receiver, QWidget) else None
+        if self._widget is not None:
+            # 切换页面、最小化等不会触发轮询，由控件的显示与隐藏事件告知
+            self._widget.installEventFilter(self)
 
         if info_get is not None:
             self.onDownloadInfoGet.connect(info_get)
         if stopped is not None:
             self.downloadStop.connect(stopped)
 
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.updateDownloadInfo)
-        self.timer.singleShot(
-            int(1000 * self._interval),
-            lambda: self.timer.start(int(self._interval * 1000)),
-        )
+        self.poller = Aria2Controller.poller()
+        self.poller.polled.connect(self.updateDownloadInfo)
+        self.poller.watch(self._gid, self._interval)
+
+    def visible(self) -> bool:
+        if self._widget is None:
+            return True
+        try:
+            return self._widget.isVisible() and not self._widget.visibleRegion().isEmpty()
+        except RuntimeError:
+            # 控件已被删除
+            return False
 
-    def updateDownloadInfo(self):
-        if (status := Aria2Controller.getDownloadsStatus(self._gid))["status"] not in [
-            "complete",
-            "error",
-            "removed",
-        ]:
-            self.onDownloadInfoGet.emit(status)
-        elif status["status"] == "complete":
-            self.timer.stop()
-            self.onDownloadInfoGet.emit(status)
-            dl = Aria2Controller.downloadCompletedHandler(self._gid, False)
-            self.downloadStop.emit([dl, self._extraData])
+    def eventFilter(self, a0: QObject, a1: QEvent) -> bool:
+        if not self._finished and a1.type() in (QEvent.Show, QEvent.Hide):
+            # 最小化时控件的 isVisible() 仍为真，因此隐藏事件直接视为不可见
+            self.poller.setVisible(self._gid, a1.type() == QEvent.Show and self.visible())
+        return super().eventFilter(a0, a1)
+
+    def updateDownloadInfo(self, progress: Dict[str, DownloadProgress]):
+        if (status := progress.get(self._gid)) is None or self._finished:
+            return
+        if status.finished:
+            self.finish(status.status)
+            return
+        visible = self.visible()
+        self.poller.setVisible(self._gid, visible)
+        if visible and self.receivers(self.onDownloadInfoGet):
+            self.onDownloadInfoGet.emit(status.format())
+
+    def finish(self, status: str):
+        """下载结束，由 Aria2 的通知或轮询触发，只处理一次"""
+        if self._finished:
+            return
+        self._finished = True
+        self.kill()
+        dl = Aria2Controller.downloadCompletedHandler(self._gid, status != "complete")
+        if dl is not None:
+            self.onDownloadInfoGet.emit(DownloadProgress.fromDownload(dl).format())
+        else:
+            self.onDownloadInfoGet.emit(DownloadProgress.removed(self._gid).format())
+        self.downloadStop.emit([dl, self._extraData])
+        if status == "complete":
             MCSL2Logger.success("下载完成")
-        elif status["status"] == "error":
-            self.timer.stop()
-            self.onDownloadInfoGet.emit(status)
-            dl = Aria2Controller.downloadCompletedHandler(self._gid, True)
-            self.downloadStop.emit([dl, self._extraData])
+        elif status == "error":
             MCSL2Logger.warning("下载失败")
-        elif status["status"] == "removed":
-            self.timer.stop()
-            self.onDownloadInfoGet.emit(status)
-            dl = Aria2Controller.downloadCompletedHandler(self._gid, True)
-            self.downloadStop.emit([dl, self._extraData])
+        else:
             MCSL2Logger.info("下载被取消")
 
     def stopDownload(self):
@@ -570,7 +931,16 @@ class DownloadWatcher(QObject):
         Aria2Controller.pauseDownloadTask(self._gid)
 
     def kill(self):
-        self.timer.stop()
+        self.poller.unwatch(self._gid)
+        if self._widget is not None:
+            try:
+                self._widget.removeEventFilter(self)
+            except RuntimeError:
+                pass
+        try:
+            self.poller.polled.disconnect(self.updateDownloadInfo)
+        except TypeError:
+            pass
 
     @property
     def gid(self):
@@ -0,0 +1,319 @@
+#     Copyright 2024, MCSL Team, mailto:services@mcsl.com.cn
+#
+#     Part of "MCSL2", a simple and multifunctional Minecraft server launcher.
+#
+#     Licensed under the GNU General Public License, Version 3.0, with our
+#     additional agreements. (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#        https://github.com/MCSLTeam/MCSL2/raw/master/LICENSE
+#
+################################################################################
+"""
+Persistent console archive, segment-rotated SQLite databases with an FTS5 index.
+"""
+
+import re
+import sqlite3
+from glob import glob
+from os import makedirs, path as osp, remove
+from queue import Empty, Queue
+from threading import Lock
+from time import monotonic
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+from PyQt5.QtCore import QThread
+
+from MCSL2Lib.ProgramControllers.settingsController import cfg
+from MCSL2Lib.utils import MCSL2Logger
+
+ARCHIVE_DIR = "MCSL2/ConsoleArchive"
+
+# (时间戳, 级别, 文本)
+ArchiveRecord = Tuple[float, int, str]
+
+_PLAYER_PATTERN = re.compile(
+    r"UUID of player (\w{2,16}) is"
+    r"|\]: (?:\[[^\]]*\] )?<?(\w{2,16})"
+    r"(?:> |\[/| joined the game| left the game| lost connection| issued server command)"
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS lines (
+    id INTEGER PRIMARY KEY,
+    server TEXT NOT NULL,
+    session TEXT NOT NULL,
+    time REAL NOT NULL,
+    level INTEGER NOT NULL,
+    player TEXT,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS lines_server_time ON lines(server, time);
+CREATE INDEX IF NOT EXISTS lines_time ON lines(time);
+CREATE INDEX IF NOT EXISTS lines_player ON lines(player COLLATE NOCASE) WHERE player IS NOT NULL;
+CREATE TRIGGER IF NOT EXISTS lines_ai AFTER INSERT ON lines BEGIN
+    INSERT INTO lines_fts(rowid, text) VALUES (new.id, new.text);
+END;
+"""
+
+
+def extractPlayer(text: str) -> Optional[str]:
+    """从日志行中提取相关的玩家名(加入、离开、聊天、执行指令等)"""
+    if (match := _PLAYER_PATTERN.search(text)) is None:
+        return None
+    return match.group(1) or match.group(2)
+
+
+class ArchivedLine(NamedTuple):
+    server: str
+    session: str
+    time: float
+    level: int
+    player: Optional[str]
+    text: str
+
+
+def _segmentPaths() -> List[str]:
+    """按编号从旧到新排列的所有分段"""
+    return sorted(glob(osp.join(ARCHIVE_DIR, "console-*.db")))
+
+
+def _openSegment(filePath: str) -> sqlite3.Connection:
+    connection = sqlite3.connect(filePath)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    try:
+        # trigram 分词支持中文与任意子串检索(SQLite >= 3.34)
+        connection.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS lines_fts USING fts5("
+            "text, content='lines', content_rowid='id', tokenize='trigram')"
+        )
+    except sqlite3.OperationalError:
+        connection.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS lines_fts USING fts5("
+            "text, content='lines', content_rowid='id')"
+        )
+    connection.executescript(_SCHEMA)
+    return connection
+
+
+def _hasTrigram(connection: sqlite3.Connection) -> bool:
+    row = connection.execute("SELECT sql FROM sqlite_master WHERE name = 'lines_fts'").fetchone()
+    return row is not None and "trigram" in row[0]
+
+
+class _ConsoleArchiveWriter(QThread):
+    """
+    归档写入线程。
+    界面线程只把整批日志放进队列，解析玩家、写库与分段轮换都在这里完成，
+    每批最多等待 FLUSH_INTERVAL 秒或攒够 FLUSH_LINES 行后在一个事务中写入。
+    """
+
+    FLUSH_INTERVAL = 1.0
+    FLUSH_LINES = 2000
+    SEGMENT_BYTES = 32 * 1024 * 1024
+
+    def __init__(self, queue: Queue):
+        super().__init__()
+        self.setObjectName("ConsoleArchiveWriterThread")
+        self.queue = queue
+        self.connection: Optional[sqlite3.Connection] = None
+        self.segmentPath = ""
+
+    def run(self):
+        makedirs(ARCHIVE_DIR, exist_ok=True)
+        pending = []
+        deadline = None
+        running = True
+        while running:
+            timeout = None if deadline is None else max(0.0, deadline - monotonic())
+            try:
+                item = self.queue.get(timeout=timeout)
+                if item is None:
+                    running = False
+                else:
+                    server, session, records = item
+                    pending.extend(
+                        (server, session, t, level, extractPlayer(text), text)
+                        for t, level, text in records
+                    )
+                    if deadline is None:
+                        deadline = monotonic() + self.FLUSH_INTERVAL
+                    if len(pending) < self.FLUSH_LINES:
+                        continue
+            except Empty:
+                pass
+            if pending:
+                self.write(pending)
+                pending = []
+            deadline = None
+        if self.connection is not None:
+            self.connection.close()
+
+    def write(self, rows: list):
+        try:
+            if self.connection is None:
+                self.openCurrentSegment()
+            with self.connection:
+                self.connection.executemany(
+                    "INSERT INTO lines(server, session, time, level, player, text)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+            if osp.getsize(self.segmentPath) >= self.SEGMENT_BYTES:
+                self.rotate()
+        except Exception as e:
+            MCSL2Logger.error(msg="write console archive failed", exc=e)
+
+    def openCurrentSegment(self):
+        segments = _segmentPaths()
+        if segments and osp.getsize(segments[-1]) < self.SEGMENT_BYTES:
+            self.segmentPath = segments[-1]
+        else:
+            self.segmentPath = self.nextSegmentPath(segments)
+        self.connection = _openSegment(self.segmentPath)
+
+    @staticmethod
+    def nextSegmentPath(segments: List[str]) -> str:
+        number = int(osp.basename(segments[-1])[8:-3]) + 1 if segments else 1
+        return osp.join(ARCHIVE_DIR, f"console-{number:06d}.db")
+
+    def rotate(self):
+        self.connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self.connection.close()
+        self.connection = None
+        segments = _segmentPaths()
+        # 超出总大小限制时删除最旧的分段，当前分段总是保留
+        budget = cfg.get(cfg.consoleArchiveMaxSize) * 1024 * 1024
+        total = sum(osp.getsize(segment) for segment in segments)
+        for segment in segments[:-1]:
+            if total <= budget:
+                break
+            total -= osp.getsize(segment)
+            for filePath in (segment, segment + "-wal", segment + "-shm"):
+                try:
+                    remove(filePath)
+                except OSError:
+                    pass
+        self.segmentPath = self.nextSegmentPath(segments)
+        self.connection = _openSegment(self.segmentPath)
+
+
+class ConsoleArchive:
+    """
+    所有服务器终端输出的持久化归档。
+    写入经由后台线程批量完成；检索可在任意线程调用，每次使用独立的只读连接。
+    """
+
+    _queue: Queue = Queue()
+    _writer: Optional[_ConsoleArchiveWriter] = None
+    _lock = Lock()
+
+    @classmethod
+    def append(cls, server: str, session: str, records: List[ArchiveRecord]):
+        """追加一批日志，只做入队，不阻塞调用线程；可在任意线程调用"""
+        if not records or not cfg.get(cfg.consoleArchive):
+            return
+        with cls._lock:
+            if cls._writer is None:
+                cls._writer = _ConsoleArchiveWriter(cls._queue)
+                cls._writer.start()
+            cls._queue.put((server, session, records))
+
+    @classmethod
+    def shutDown(cls):
+        """写完队列中剩余的日志后停止写入线程"""
+        with cls._lock:
+            writer, cls._writer = cls._writer, None
+            if writer is None:
+                return
+            cls._queue.put(None)
+        writer.wait()
+
+    @staticmethod
+    def search(
+        text: str = "",
+        server: Optional[str] = None,
+        player: Optional[str] = None,
+        levels: Optional[Iterable[int]] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        limit: int = 500,
+    ) -> List[ArchivedLine]:
+        """
+        按文本、服务器、玩家、级别和时间范围检索，结果按时间从新到旧排列。
+        从最新的分段开始查找，凑够 limit 条即停止。
+        """
+        conditions, params = [], []
+        if server:
+            conditions.append("lines.server = ?")
+            params.append(server)
+        if player:
+            conditions.append("lines.player = ? COLLATE NOCASE")
+            params.append(player)
+        if levels is not None:
+            levels = list(levels)
+            conditions.append(f"lines.level IN ({', '.join('?' * len(levels))})")
+            params.extend(levels)
+        if since is not None:
+            conditions.append("lines.time >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("lines.time <= ?")
+            params.append(until)
+
+        def query(fullText: bool) -> Tuple[str, list]:
+            source, textConditions, textParams = "lines", [], []
+            if fullText:
+                # CROSS JOIN 固定由全文索引驱动，避免规划器改走时间索引逐行匹配
+                source = "lines_fts CROSS JOIN lines ON lines.id = lines_fts.rowid"
+                textConditions.append("lines_fts MATCH ?")
+                textParams.append('"' + text.replace('"', '""') + '"')
+            elif text:
+                textConditions.append("lines.text LIKE ? ESCAPE '\\'")
+                escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+                textParams.append(f"%{escaped}%")
+            where = textConditions + conditions
+            sql = (
+                "SELECT lines.server, lines.session, lines.time, lines.level, lines.player,"
+                f" lines.text FROM {source}"
+                + (f" WHERE {' AND '.join(where)}" if where else "")
+                + " ORDER BY lines.time DESC LIMIT ?"
+            )
+            return sql, textParams + params
+
+        results: List[ArchivedLine] = []
+        for segment in reversed(_segmentPaths()):
+            if len(results) >= limit:
+                break
+            try:
+                connection = sqlite3.connect(f"file:{segment}?mode=ro", uri=True)
+                try:
+                    # 只有 trigram 分词的全文索引能做子串检索，且不支持少于三个字符的查询；
+                    # SQLite < 3.34 时建立的分段使用默认分词，全部改用 LIKE
+                    sql, queryParams = query(len(text) >= 3 and _hasTrigram(connection))
+                    rows = connection.execute(sql, (*queryParams, limit - len(results))).fetchall()
+                finally:
+                    connection.close()
+            except sqlite3.Error as e:
+                MCSL2Logger.warning(f"search console archive {segment} failed: {e}")
+                continue
+            results.extend(ArchivedLine(*row) for row in rows)
+        return results
+
+    @staticmethod
+    def servers() -> List[str]:
+        """归档中出现过的服务器"""
+        names = set()
+        for segment in _segmentPaths():
+            try:
+                connection = sqlite3.connect(f"file:{segment}?mode=ro", uri=True)
+                try:
+                    rows = connection.execute("SELECT DISTINCT server FROM lines")
+                    names.update(row[0] for row in rows)
+                finally:
+                    connection.close()
+            except sqlite3.Error:
+                continue
+        return sorted(names)
@@ -0,0 +1,512 @@
+#     Copyright 2024, MCSL Team, mailto:services@mcsl.com.cn
+#
+#     Part of "MCSL2", a simple and multifunctional Minecraft server launcher.
+#
+#     Licensed under the GNU General Public License, Version 3.0, with our
+#     additional agreements. (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#        https://github.com/MCSLTeam/MCSL2/raw/master/LICENSE
+#
+################################################################################
+"""
+Headless daemon: runs servers without the GUI and serves JSON-RPC over a local socket.
+"""
+
+import signal
+import sys
+from datetime import datetime
+from hashlib import md5
+from inspect import signature
+from json import dumps, loads
+from os import getpid, path as osp
+from time import time
+from typing import Callable, Dict, List, Optional, Set
+
+from psutil import WINDOWS
+from PyQt5.QtCore import QCoreApplication, QObject, QTimer
+from PyQt5.QtNetwork import QLocalServer, QLocalSocket
+
+from MCSL2Lib import MCSL2VERSION
+from MCSL2Lib.ProgramControllers.consoleArchiveController import ConsoleArchive
+from MCSL2Lib.ProgramControllers.metricsController import MetricsExporter
+from MCSL2Lib.ProgramControllers.playerSessionController import (
+    PlayerSessionIndex,
+    parsePlayerEvent,
+)
+from MCSL2Lib.ServerControllers.consoleProcessor import ConsoleLineProcessor
+from MCSL2Lib.ServerControllers.lineFramer import LineFramer
+from MCSL2Lib.ServerControllers.processCreator import ServerLauncher, _MinecraftEULA
+from MCSL2Lib.ServerControllers.serverLifecycle import LifecycleEvent, ServerLifecycle, ServerState
+from MCSL2Lib.ServerControllers.serverSupervisor import ServerSupervisor, SupervisionStatus
+from MCSL2Lib.utils import MCSL2Logger, readGlobalServerConfig
+from MCSL2Lib.variables import ServerVariables
+
+# JSON-RPC 2.0 的错误码，-32000 起为本程序定义
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+UNKNOWN_SERVER = -32001
+EULA_NOT_ACCEPTED = -32002
+ARIA2_UNAVAILABLE = -32003
+
+# 客户端未读取的数据超过该字节数时丢弃终端输出通知，避免守护进程内存无限增长
+MAX_PENDING_BYTES = 4 << 20
+# 单条消息的长度上限，超出的部分被强制断行，解析失败后丢弃
+MAX_MESSAGE_BYTES = 4 << 20
+
+
+class DaemonError(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+def daemonSocketName() -> str:
+    """
+    守护进程的本地套接字：Unix 上为 MCSL2 目录中的套接字文件；
+    Windows 上 QLocalServer 使用命名管道，以程序目录区分不同的安装。
+    """
+    if WINDOWS:
+        return f"MCSL2Daemon-{md5(osp.abspath('.').encode('utf-8')).hexdigest()[:12]}"
+    return osp.abspath("MCSL2/daemon.sock")
+
+
+def encodeMessage(message: dict) -> bytes:
+    """每条消息为一行 JSON"""
+    return dumps(message, ensure_ascii=False).encode("utf-8") + b"\n"
+
+
+def eventToDict(event: LifecycleEvent) -> dict:
+    return {
+        "server": event.serverName,
+        "previous": event.previous.value,
+        "state": event.state.value,
+        "reason": event.reason,
+        "exitCode": event.exitCode,
+        "time": event.time,
+        "detail": event.detail,
+    }
+
+
+def supervisionToDict(status: SupervisionStatus) -> dict:
+    return {
+        "server": status.serverName,
+        "state": status.state.value,
+        "lastExit": status.lastExit.value if status.lastExit is not None else None,
+        "attempt": status.attempt,
+        "restarts": status.restarts,
+        "budget": status.budget,
+        "restartAt": status.restartAt,
+        "detail": status.detail,
+    }
+
+
+def loadServerConfig(serverName: str) -> ServerVariables:
+    for index, config in enumerate(readGlobalServerConfig()):
+        if config["name"] == serverName:
+            return ServerVariables().initialize(index=index)
+    raise DaemonError(UNKNOWN_SERVER, f"unknown server {serverName!r}")
+
+
+class _DaemonConnection(QObject):
+    """一个客户端连接：按行读取请求，订阅的服务器的状态与终端输出以通知推送"""
+
+    def __init__(self, socket: QLocalSocket, daemon: "DaemonServer"):
+        super().__init__(daemon)
+        self.socket = socket
+        self.daemon = daemon
+        self.framer = LineFramer("utf-8", MAX_MESSAGE_BYTES)
+        # None 表示订阅全部服务器
+        self.subscriptions: Optional[Set[str]] = set()
+        self.dropped = 0
+        socket.readyRead.connect(self.onReadyRead)
+        socket.disconnected.connect(self.onDisconnected)
+
+    def onReadyRead(self):
+        for line in self.framer.feed(self.socket.readAll().data()):
+            if line.strip():
+                self.handle(line)
+
+    def handle(self, line: str):
+        try:
+            request = loads(line)
+        except ValueError as e:
+            self.send({"jsonrpc": "2.0", "id": None, "error": self.error(PARSE_ERROR, str(e))})
+            return
+        requestId = request.get("id") if isinstance(request, dict) else None
+        try:
+            if not isinstance(request, dict) or not isinstance(request.get("method"), str):
+                raise DaemonError(INVALID_REQUEST, "invalid request")
+            params = request.get("params") or {}
+            if not isinstance(params, dict):
+                raise DaemonError(INVALID_PARAMS, "params must be an object")
+            result = self.daemon.dispatch(self, request["method"], params)
+        except DaemonError as e:
+            response = {"jsonrpc": "2.0", "id": requestId, "error": self.error(e.code, e.message)}
+        except Exception as e:
+            MCSL2Logger.error(msg=f"daemon request {request.get('method')} failed", exc=e)
+            response = {"jsonrpc": "2.0", "id": requestId, "error": self.error(-32000, str(e))}
+        else:
+            response = {"jsonrpc": "2.0", "id": requestId, "result": result}
+        # 没有 id 的请求是通知，不回复
+        if requestId is not None:
+            self.send(response)
+
+    @staticmethod
+    def error(code: int, message: str) -> dict:
+        return {"code": code, "message": message}
+
+    def subscribed(self, serverName: str) -> bool:
+        return self.subscriptions is None or serverName in self.subscriptions
+
+    def notify(self, method: str, params: dict, droppable: bool = False):
+        if droppable and self.socket.bytesToWrite() > MAX_PENDING_BYTES:
+            self.dropped += 1
+            return
+        if self.dropped and method == "console":
+            params = dict(params, dropped=self.dropped)
+            self.dropped = 0
+        self.send({"jsonrpc": "2.0", "method": method, "params": params})
+
+    def send(self, message: dict):
+        if self.socket.state() == QLocalSocket.ConnectedState:
+            self.socket.write(encodeMessage(message))
+
+    def onDisconnected(self):
+        self.daemon.connections.remove(self)
+        self.socket.deleteLater()
+        self.deleteLater()
+
+
+class DaemonServer(QObject):
+    """
+    不创建任何窗口的后台服务。服务器仍由 ServerLauncher 启动、由 ServerSupervisor 持有，
+    客户端(命令行工具或连接到守护进程的图形界面)通过本地套接字上的 JSON-RPC 2.0 控制它们。
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.server = QLocalServer(self)
+        self.server.setSocketOptions(QLocalServer.UserAccessOption)
+        self.server.newConnection.connect(self.onNewConnection)
+        self.connections: List[_DaemonConnection] = []
+        self.shuttingDown = False
+        self.methods: Dict[str, Callable] = {
+            "ping": self.ping,
+            "list": self.listServers,
+            "status": self.status,
+            "start": self.start,
+            "stop": self.stop,
+            "halt": self.halt,
+            "restart": self.restart,
+            "cancelRestart": self.cancelRestart,
+            "command": self.command,
+            "console": self.console,
+            "subscribe": self.subscribe,
+            "unsubscribe": self.unsubscribe,
+            "download": self.download,
+            "downloadStatus": self.downloadStatus,
+            "shutdown": self.shutdown,
+        }
+        # 在本进程中运行的服务器由这里归档终端输出并记录玩家会话，连接的窗口只负责显示
+        self.consoleProcessor = ConsoleLineProcessor()
+        self.consoleSessions: Dict[str, str] = {}
+        self.onlinePlayers: Dict[str, Set[str]] = {}
+        ServerLifecycle.events().stateChanged.connect(self.onStateChanged)
+        ServerSupervisor.signals().statusChanged.connect(self.onSupervisionChanged)
+
+    def socketName(self) -> str:
+        return daemonSocketName()
+
+    def listen(self) -> bool:
+        name = self.socketName()
+        probe = QLocalSocket()
+        probe.connectToServer(name)
+        if probe.waitForConnected(300):
+            probe.abort()
+            MCSL2Logger.warning(f"another MCSL2 daemon is listening on {name}")
+            return False
+        # 上次异常退出时残留的套接字文件
+        QLocalServer.removeServer(name)
+        if not self.server.listen(name):
+            MCSL2Logger.warning(f"daemon listen on {name} failed: {self.server.errorString()}")
+            return False
+        MCSL2Logger.info(f"MCSL2 daemon listening on {name}")
+        return True
+
+    def onNewConnection(self):
+        while (socket := self.server.nextPendingConnection()) is not None:
+            self.connections.append(_DaemonConnection(socket, self))
+
+    def dispatch(self, connection: _DaemonConnection, method: str, params: dict):
+        if (handler := self.methods.get(method)) is None:
+            raise DaemonError(METHOD_NOT_FOUND, f"method {method!r} not found")
+        try:
+            signature(handler).bind(connection, **params)
+        except TypeError as e:
+            raise DaemonError(INVALID_PARAMS, str(e))
+        return handler(connection, **params)
+
+    @staticmethod
+    def bridge(serverName: str):
+        if (bridge := ServerSupervisor.bridge(serverName)) is None:
+            loadServerConfig(serverName)
+        return bridge
+
+    def serverStatus(self, serverName: str) -> dict:
+        bridge = ServerSupervisor.bridge(serverName)
+        state = ServerLifecycle.state(serverName)
+        supervision = ServerSupervisor.status(serverName)
+        pid = None
+        if bridge is not None and state.alive:
+            pid = bridge.serverProcess.process.processId() or None
+        return {
+            "server": serverName,
+            "state": state.value,
+            "pid": pid,
+            "supervision": supervision.state.value if supervision is not None else "idle",
+            "restartAt": supervision.restartAt if supervision is not None else None,
+            "detail": supervision.detail if supervision is not None else "",
+            "players": sorted(self.onlinePlayers.get(serverName, ())),
+        }
+
+    def ping(self, connection):
+        return {"version": MCSL2VERSION, "pid": getpid()}
+
+    def listServers(self, connection):
+        return [self.serverStatus(config["name"]) for config in readGlobalServerConfig()]
+
+    def status(self, connection, server: str):
+        self.bridge(server)
+        return self.serverStatus(server)
+
+    def start(self, connection, server: str):
+        if self.shuttingDown:
+            raise DaemonError(-32000, "daemon is shutting down")
+        bridge = self.bridge(server)
+        if bridge is not None and bridge.state.alive:
+            return self.serverStatus(server)
+        # 每次都重新生成启动参数，以便使用修改后的配置
+        result = ServerLauncher(loadServerConfig(server)).start()
+        if isinstance(result, _MinecraftEULA):
+            raise DaemonError(EULA_NOT_ACCEPTED, f"EULA of {server!r} is not accepted")
+        if bridge is not None:
+            # 新进程已替换旧进程在 ServerSupervisor 中的记录，释放旧进程及其输出连接
+            bridge.deleteLater()
+        self.consoleSessions[server] = datetime.now().strftime("%Y%m%d-%H%M%S")
+        result.serverLogOutput.connect(lambda line: self.onOutput(server, [line]))
+        result.serverLogOutputBatch.connect(lambda lines: self.onOutput(server, lines))
+        return self.serverStatus(server)
+
+    def stop(self, connection, server: str):
+        if (bridge := self.bridge(server)) is not None:
+            bridge.stopServer()
+        return self.serverStatus(server)
+
+    def halt(self, connection, server: str):
+        if (bridge := self.bridge(server)) is not None:
+            bridge.haltServer()
+        return self.serverStatus(server)
+
+    def restart(self, connection, server: str):
+        if (bridge := self.bridge(server)) is None:
+            return self.start(connection, server)
+        bridge.restartServer()
+        return self.serverStatus(server)
+
+    def cancelRestart(self, connection, server: str):
+        """取消崩溃后计划中的自动重启，或解除隔离(不启动服务器)"""
+        self.bridge(server)
+        ServerSupervisor.cancel(server)
+        return self.serverStatus(server)
+
+    def command(self, connection, server: str, command: str):
+        if (bridge := self.bridge(server)) is None or not bridge.state.alive:
+            raise DaemonError(-32000, f"server {server!r} is not running")
+        bridge.sendCommand(command)
+        return True
+
+    def console(self, connection, server: str, lines: int = 100):
+        """最近的终端输出，供刚连接的客户端补齐"""
+        if (bridge := self.bridge(server)) is None or lines <= 0:
+            return []
+        return list(bridge.outputTail)[-lines:]
+
+    def subscribe(self, connection, servers: Optional[List[str]] = None):
+        """订阅服务器的状态变化与终端输出，不指定则订阅全部"""
+        if servers is None:
+            connection.subscriptions = None
+        elif connection.subscriptions is not None:
+            connection.subscriptions.update(servers)
+        return True
+
+    def unsubscribe(self, connection, servers: Optional[List[str]] = None):
+        if servers is None or connection.subscriptions is None:
+            connection.subscriptions = set()
+        else:
+            connection.subscriptions.difference_update(servers)
+        return True
+
+    def download(self, connection, uri: str):
+        from MCSL2Lib.ProgramControllers.aria2ClientController import Aria2Controller
+
+        # 首次使用时才启动 Aria2，守护进程本身的启动不受影响
+        if not Aria2Controller.testAria2Service() and not Aria2Controller.startAria2():
+            raise DaemonError(ARIA2_UNAVAILABLE, "aria2 is not available")
+        return Aria2Controller.addUri(uri)
+
+    def downloadStatus(self, connection, gid: str):
+        from MCSL2Lib.ProgramControllers.aria2ClientController import Aria2Controller
+
+        if not Aria2Controller.testAria2Service():
+            raise DaemonError(ARIA2_UNAVAILABLE, "aria2 is not available")
+        return Aria2Controller.getDownloadsStatus(gid)
+
+    def shutdown(self, connection=None, stopServers: bool = True):
+        """
+        退出守护进程；stopServers 为 False 且仍有服务器运行时拒绝退出。
+        关闭服务器时沿用各自的关闭超时，全部退出后再结束。
+        """
+        running = [
+            name for name in ServerSupervisor.serverNames() if ServerLifecycle.state(name).alive
+        ]
+        if running and not stopServers:
+            raise DaemonError(-32000, f"servers still running: {', '.join(running)}")
+        self.shuttingDown = True
+        for name in ServerSupervisor.serverNames():
+            ServerSupervisor.cancel(name)
+        for name in running:
+            ServerSupervisor.bridge(name).stopServer()
+        QTimer.singleShot(0, self.quitIfIdle)
+        return running
+
+    def quitIfIdle(self):
+        if not self.shuttingDown:
+            return
+        if any(ServerLifecycle.state(name).alive for name in ServerSupervisor.serverNames()):
+            return
+        for name in ServerSupervisor.serverNames():
+            ServerSupervisor.unregister(name)
+        for connection in list(self.connections):
+            connection.socket.flush()
+        self.server.close()
+        MetricsExporter.shutDown()
+        ConsoleArchive.shutDown()
+        PlayerSessionIndex.shutDown()
+        if "MCSL2Lib.ProgramControllers.aria2ClientController" in sys.modules:
+            from MCSL2Lib.ProgramControllers.aria2ClientController import Aria2Controller
+
+            if Aria2Controller.testAria2Service():
+                Aria2Controller.shutDown()
+        MCSL2Logger.info("MCSL2 daemon stopped")
+        QCoreApplication.quit()
+
+    def onStateChanged(self, event: LifecycleEvent):
+        params = eventToDict(event)
+        if event.state.alive and (bridge := ServerSupervisor.bridge(event.serverName)):
+            # STARTING 时进程尚未启动，启动后另行通知进程 ID
+            params["pid"] = bridge.serverProcess.process.processId() or None
+            if not params["pid"]:
+                process = bridge.serverProcess.process
+                process.started.connect(
+                    lambda: self.broadcast(
+                        event.serverName,
+                        "started",
+                        {"server": event.serverName, "pid": process.processId()},
+                    )
+                )
+        if event.state == ServerState.STARTING or not event.state.alive:
+            self.resetPlayers(event.serverName)
+        self.broadcast(event.serverName, "state", params)
+        if self.shuttingDown and not event.state.alive:
+            self.quitIfIdle()
+
+    def onSupervisionChanged(self, status: Optional[SupervisionStatus]):
+        # 监管者先于状态变化的通知处理同一个退出事件，客户端处理退出时已知道是否会自动重启
+        if status is not None:
+            self.broadcast(status.serverName, "supervision", supervisionToDict(status))
+
+    def onOutput(self, serverName: str, lines: list):
+        self.recordOutput(serverName, lines)
+        self.broadcast(serverName, "console", {"server": serverName, "lines": lines}, True)
+
+    def recordOutput(self, serverName: str, lines: list):
+        """
+        与窗口中的分析线程一样去除颜色并判定级别后归档，同时记录玩家加入与离开；
+        后台服务中没有界面语言，不做翻译
+        """
+        now = time()
+        records = []
+        players = self.onlinePlayers.setdefault(serverName, set())
+        for line in lines:
+            if (processed := self.consoleProcessor.process(line)) is None:
+                continue
+            text = processed.text
+            records.append((now, int(processed.level), text))
+            if "Loading libraries, please wait..." in text:
+                self.resetPlayers(serverName)
+            elif (event := parsePlayerEvent(text)) is None:
+                continue
+            elif event.isJoin:
+                players.add(event.name)
+                PlayerSessionIndex.join(
+                    serverName, event.name, event.ip, event.entityId, now, len(players)
+                )
+            elif event.name in players:
+                players.discard(event.name)
+                PlayerSessionIndex.leave(serverName, event.name, now)
+        ConsoleArchive.append(serverName, self.consoleSessions[serverName], records)
+
+    def resetPlayers(self, serverName: str):
+        """服务器启动或退出时结束其所有会话"""
+        if (players := self.onlinePlayers.get(serverName)) is not None:
+            players.clear()
+            PlayerSessionIndex.closeAll(serverName, time())
+
+    def broadcast(self, serverName: str, method: str, params: dict, droppable: bool = False):
+        for connection in self.connections:
+            if connection.subscribed(serverName):
+                connection.notify(method, params, droppable)
+
+
+def installShutdownSignals(daemon: DaemonServer):
+    """收到 SIGINT / SIGTERM 时正常关闭全部服务器后退出"""
+
+    def requestShutdown(*_):
+        QTimer.singleShot(0, daemon.shutdown)
+
+    signal.signal(signal.SIGINT, requestShutdown)
+    signal.signal(signal.SIGTERM, requestShutdown)
+    # 让 Python 解释器定期运行，以便及时处理信号
+    signalTimer = QTimer(daemon)
+    signalTimer.timeout.connect(lambda: None)
+    signalTimer.start(500)
+
+
+def runDaemon(argv: List[str]) -> int:
+    """
+    守护进程入口：MCSL2.py --daemon [--start 服务器名 ...]
+    收到 SIGINT / SIGTERM 时正常关闭全部服务器后退出。
+    """
+    app = QCoreApplication(argv)
+    daemon = DaemonServer()
+    if not daemon.listen():
+        return 1
+    from MCSL2Lib.ServerControllers.serverHost import discoverHosts
+
+    # 宿主进程中的服务器由其自己记录会话
+    PlayerSessionIndex.closeInterrupted(keep=[metadata.server for metadata in discoverHosts()])
+    MetricsExporter.applySettings()
+    installShutdownSignals(daemon)
+
+    for index, arg in enumerate(argv):
+        if arg == "--start" and index + 1 < len(argv):
+            try:
+                daemon.start(None, argv[index + 1])
+            except DaemonError as e:
+                MCSL2Logger.warning(f"daemon autostart {argv[index + 1]} failed: {e.message}")
+    return app.exec_()
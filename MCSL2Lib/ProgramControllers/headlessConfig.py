@@ -0,0 +1,149 @@
+#     Copyright 2024, MCSL Team, mailto:services@mcsl.com.cn
+#
+#     Part of "MCSL2", a simple and multifunctional Minecraft server launcher.
+#
+#     Licensed under the GNU General Public License, Version 3.0, with our
+#     additional agreements. (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#        https://github.com/MCSLTeam/MCSL2/raw/master/LICENSE
+#
+################################################################################
+"""
+Config classes for the headless daemon and server hosts, compatible with qfluentwidgets' ones.
+"""
+
+import json
+from copy import deepcopy
+from pathlib import Path
+
+
+class ConfigValidator:
+    def validate(self, value):
+        return True
+
+    def correct(self, value):
+        return value
+
+
+class RangeValidator(ConfigValidator):
+    def __init__(self, min, max):
+        self.min = min
+        self.max = max
+        self.range = (min, max)
+
+    def validate(self, value):
+        return self.min <= value <= self.max
+
+    def correct(self, value):
+        return min(max(self.min, value), self.max)
+
+
+class OptionsValidator(ConfigValidator):
+    def __init__(self, options):
+        if not options:
+            raise ValueError("The `options` can't be empty.")
+        self.options = list(options)
+
+    def validate(self, value):
+        return value in self.options
+
+    def correct(self, value):
+        return value if self.validate(value) else self.options[0]
+
+
+class BoolValidator(OptionsValidator):
+    def __init__(self):
+        super().__init__([True, False])
+
+
+class ConfigItem:
+    """与 qfluentwidgets 的 ConfigItem 相同的读写与校验，没有 valueChanged 信号"""
+
+    def __init__(self, group, name, default, validator=None, serializer=None, restart=False):
+        self.group = group
+        self.name = name
+        self.validator = validator or ConfigValidator()
+        self.restart = restart
+        self.value = default
+        self.defaultValue = self.value
+
+    @property
+    def value(self):
+        return self._value
+
+    @value.setter
+    def value(self, v):
+        self._value = self.validator.correct(v)
+
+    @property
+    def key(self):
+        return self.group + "." + self.name if self.name else self.group
+
+
+class RangeConfigItem(ConfigItem):
+    @property
+    def range(self):
+        return self.validator.range
+
+
+class OptionsConfigItem(ConfigItem):
+    @property
+    def options(self):
+        return self.validator.options
+
+
+class QConfig:
+    """
+    后台进程使用的配置，读取与保存和图形界面使用同一个文件。
+    保存时只更新本类中的配置项，文件中的其他内容(如界面主题)保持不变。
+    """
+
+    def __init__(self):
+        self.file = Path("config/config.json")
+
+    def items(self):
+        for name in dir(self.__class__):
+            if isinstance(item := getattr(self.__class__, name), ConfigItem):
+                yield item
+
+    def get(self, item):
+        return item.value
+
+    def set(self, item, value, save=True, copy=True):
+        if item.value == value:
+            return
+        item.value = deepcopy(value) if copy else value
+        if save:
+            self.save()
+
+    def readFile(self) -> dict:
+        try:
+            with open(self.file, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self):
+        content = self.readFile()
+        for item in self.items():
+            if item.name:
+                content.setdefault(item.group, {})[item.name] = item.value
+            else:
+                content[item.group] = item.value
+        self.file.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.file, "w", encoding="utf-8") as f:
+            json.dump(content, f, ensure_ascii=False, indent=4)
+
+    def load(self, file=None, config=None):
+        if file is not None:
+            self.file = Path(file)
+        content = self.readFile()
+        for item in self.items():
+            group = content.get(item.group)
+            if not item.name:
+                if group is not None:
+                    item.value = group
+            elif isinstance(group, dict) and item.name in group:
+                item.value = group[item.name]
@@ -19,8 +19,10 @@ from os import listdir, remove
 from os import path as osp
 from platform import system
 from re import search
+from time import perf_counter
 
 from PyQt5.QtCore import QThread, pyqtSignal, QProcess
+from MCSL2Lib.ProgramControllers.metricsController import Metrics
 from MCSL2Lib.utils import MCSL2Logger
 
 
@@ -265,7 +267,10 @@ class JavaFindWorkThread(QThread):
         self._sequenceNumber = value
 
     def run(self):
-        self.foundJavaSignal.emit(detectJava(self._f))
+        start = perf_counter()
+        javaList = detectJava(self._f)
+        Metrics.javaDetectionSeconds.labels().set(perf_counter() - start)
+        self.foundJavaSignal.emit(javaList)
         self.finishSignal.emit(self._sequenceNumber)
 
 
@@ -21,7 +21,6 @@ from os import path as osp, getpid
 from typing import Optional
 from traceback import format_exception
 from datetime import datetime  # noqa: F811
-from qfluentwidgets import __version__ as pfwVer
 from psutil import Process
 from platform import (
     system as systemType,
@@ -32,7 +31,12 @@ from platform import (
     processor as systemProcessor,
 )
 from PyQt5.QtCore import qVersion
-from .. import DEV_VERSION, MCSL2VERSION
+from .. import DEV_VERSION, HEADLESS, MCSL2VERSION
+
+if HEADLESS:
+    pfwVer = "未加载"
+else:
+    from qfluentwidgets import __version__ as pfwVer
 
 
 class _MCSL2Logger:
@@ -0,0 +1,260 @@
+#     Copyright 2024, MCSL Team, mailto:services@mcsl.com.cn
+#
+#     Part of "MCSL2", a simple and multifunctional Minecraft server launcher.
+#
+#     Licensed under the GNU General Public License, Version 3.0, with our
+#     additional agreements. (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#        https://github.com/MCSLTeam/MCSL2/raw/master/LICENSE
+#
+################################################################################
+"""
+Prometheus / OpenMetrics exporter for launcher and server metrics.
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from math import isnan
+from os import makedirs, path as osp, replace
+from threading import Event, Lock, Thread
+from time import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from MCSL2Lib.ProgramControllers.settingsController import cfg
+from MCSL2Lib.utils import MCSL2Logger
+
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class MetricValue:
+    """
+    单个(带一组标签的)指标值。
+    每个值约定只由一个线程写入(例如某服务器的分析线程或界面线程)，因此热路径上的 inc/set
+    只是一次属性赋值，无需加锁；导出线程读取时最多读到上一次的值。
+    """
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class MetricFamily:
+    def __init__(self, name: str, kind: str, documentation: str, labelNames=()):
+        self.name = name
+        self.kind = kind
+        self.documentation = documentation
+        self.labelNames: Tuple[str, ...] = tuple(labelNames)
+        self.values: Dict[Tuple[str, ...], MetricValue] = {}
+        self.lock = Lock()
+
+    def labels(self, *labelValues: str) -> MetricValue:
+        """取得某组标签对应的值；调用方应缓存返回值，之后的更新不再经过字典"""
+        if (value := self.values.get(labelValues)) is None:
+            with self.lock:
+                value = self.values.setdefault(labelValues, MetricValue())
+        return value
+
+    def remove(self, *labelValues: str):
+        with self.lock:
+            self.values.pop(labelValues, None)
+
+    def render(self, openMetrics: bool) -> List[str]:
+        # Prometheus 文本格式中计数器的名字本身带 _total，OpenMetrics 中只有样本带 _total
+        sampleName = self.name + "_total" if self.kind == "counter" else self.name
+        familyName = self.name if openMetrics else sampleName
+        lines = [
+            f"# HELP {familyName} {self.documentation}",
+            f"# TYPE {familyName} {self.kind}",
+        ]
+        with self.lock:
+            items = list(self.values.items())
+        for labelValues, value in items:
+            if isnan(value.value):
+                continue
+            labels = ",".join(
+                f'{name}="{_escapeLabel(label)}"'
+                for name, label in zip(self.labelNames, labelValues)
+            )
+            lines.append(f"{sampleName}{{{labels}}} {value.value!r}")
+        return lines
+
+
+def _escapeLabel(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    """
+    指标注册表。
+    常驻的计数器与仪表在导入时注册；CPU、内存等本就由其他服务持有的数据通过收集函数在导出时读取，
+    没有抓取时不产生任何开销。
+    """
+
+    _families: Dict[str, MetricFamily] = {}
+    _collectors: List[Callable[[], Iterable[MetricFamily]]] = []
+
+    @classmethod
+    def counter(cls, name: str, documentation: str, labelNames=()) -> MetricFamily:
+        return cls._register(MetricFamily(name, "counter", documentation, labelNames))
+
+    @classmethod
+    def gauge(cls, name: str, documentation: str, labelNames=()) -> MetricFamily:
+        return cls._register(MetricFamily(name, "gauge", documentation, labelNames))
+
+    @classmethod
+    def _register(cls, family: MetricFamily) -> MetricFamily:
+        return cls._families.setdefault(family.name, family)
+
+    @classmethod
+    def addCollector(cls, collector: Callable[[], Iterable[MetricFamily]]):
+        cls._collectors.append(collector)
+
+    @classmethod
+    def render(cls, openMetrics: bool = True) -> str:
+        lines = []
+        for family in list(cls._families.values()):
+            lines.extend(family.render(openMetrics))
+        for collector in cls._collectors:
+            try:
+                for family in collector():
+                    lines.extend(family.render(openMetrics))
+            except Exception as e:
+                MCSL2Logger.warning(f"collect metrics from {collector.__qualname__} failed: {e}")
+        if openMetrics:
+            lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+
+class Metrics:
+    """MCSL2 常驻的指标"""
+
+    serverUp = MetricsRegistry.gauge(
+        "mcsl2_server_up", "Whether the server process is running.", ("server",)
+    )
+    serverStartTime = MetricsRegistry.gauge(
+        "mcsl2_server_start_time_seconds", "Unix time the server was last started.", ("server",)
+    )
+    onlinePlayers = MetricsRegistry.gauge(
+        "mcsl2_server_online_players", "Players currently online.", ("server",)
+    )
+    restarts = MetricsRegistry.counter(
+        "mcsl2_server_restarts", "Automatic restarts after a crash.", ("server",)
+    )
+    crashes = MetricsRegistry.counter(
+        "mcsl2_server_crashes", "Server exits with a non-zero exit code.", ("server",)
+    )
+    consoleLines = MetricsRegistry.counter(
+        "mcsl2_console_lines", "Console lines read from the server.", ("server",)
+    )
+    javaDetectionSeconds = MetricsRegistry.gauge(
+        "mcsl2_java_detection_duration_seconds", "Duration of the last Java detection."
+    )
+
+
+def _collectUptime() -> Iterable[MetricFamily]:
+    uptime = MetricFamily(
+        "mcsl2_server_uptime_seconds", "gauge", "Seconds since the server was started.", ("server",)
+    )
+    now = time()
+    for labelValues, up in list(Metrics.serverUp.values.items()):
+        if up.value:
+            startTime = Metrics.serverStartTime.labels(*labelValues).value
+            uptime.labels(*labelValues).set(now - startTime)
+    yield uptime
+
+
+MetricsRegistry.addCollector(_collectUptime)
+
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        openMetrics = "application/openmetrics-text" in self.headers.get("Accept", "")
+        body = MetricsRegistry.render(openMetrics).encode("utf-8")
+        self.send_response(200)
+        self.send_header(
+            "Content-Type", OPENMETRICS_CONTENT_TYPE if openMetrics else PROMETHEUS_CONTENT_TYPE
+        )
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MetricsExporter:
+    """
+    按设置启动 HTTP 端点(默认只监听本机)，或定期写出供 node_exporter textfile collector
+    读取的 .prom 文件；关闭时不占用任何线程。
+    """
+
+    TEXTFILE_INTERVAL = 15.0
+    TEXTFILE_NAME = "mcsl2.prom"
+
+    _server: Optional[ThreadingHTTPServer] = None
+    _textfileThread: Optional[Thread] = None
+    _textfileStop = Event()
+
+    @classmethod
+    def applySettings(cls, *_):
+        cls.shutDown()
+        mode = cfg.get(cfg.metricsExporter)
+        if mode == "http":
+            port = cfg.get(cfg.metricsExporterPort)
+            try:
+                host = "0.0.0.0" if cfg.get(cfg.metricsExporterPublic) else "127.0.0.1"
+                cls._server = ThreadingHTTPServer((host, port), _MetricsRequestHandler)
+            except OSError as e:
+                MCSL2Logger.error(msg=f"start metrics exporter on port {port} failed", exc=e)
+                return
+            cls._server.daemon_threads = True
+            Thread(
+                target=cls._server.serve_forever, name="MetricsExporterThread", daemon=True
+            ).start()
+        elif mode == "textfile":
+            cls._textfileStop = Event()
+            cls._textfileThread = Thread(
+                target=cls._writeTextfiles,
+                args=(cls._textfileStop, cfg.get(cfg.metricsTextfileDir)),
+                name="MetricsTextfileThread",
+                daemon=True,
+            )
+            cls._textfileThread.start()
+
+    @classmethod
+    def _writeTextfiles(cls, stop: Event, directory: str):
+        filePath = osp.join(directory, cls.TEXTFILE_NAME)
+        while True:
+            try:
+                makedirs(directory, exist_ok=True)
+                # 先写临时文件再替换，避免 collector 读到写了一半的文件
+                with open(filePath + ".tmp", "w", encoding="utf-8") as textfile:
+                    textfile.write(MetricsRegistry.render(openMetrics=False))
+                replace(filePath + ".tmp", filePath)
+            except OSError as e:
+                MCSL2Logger.warning(f"write metrics textfile {filePath} failed: {e}")
+            if stop.wait(cls.TEXTFILE_INTERVAL):
+                return
+
+    @classmethod
+    def shutDown(cls):
+        if cls._server is not None:
+            cls._server.shutdown()
+            cls._server.server_close()
+            cls._server = None
+        if cls._textfileThread is not None:
+            cls._textfileStop.set()
+            cls._textfileThread.join()
+            cls._textfileThread = None
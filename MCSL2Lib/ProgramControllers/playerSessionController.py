@@ -0,0 +1,317 @@
+#     Copyright 2024, MCSL Team, mailto:services@mcsl.com.cn
+#
+#     Part of "MCSL2", a simple and multifunctional Minecraft server launcher.
+#
+#     Licensed under the GNU General Public License, Version 3.0, with our
+#     additional agreements. (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#        https://github.com/MCSLTeam/MCSL2/raw/master/LICENSE
+#
+################################################################################
+"""
+Persistent player-session index: join/leave history, last seen, peak concurrency and playtime.
+"""
+
+import re
+import sqlite3
+from os import makedirs, path as osp
+from queue import Queue
+from threading import Lock
+from time import time
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+from PyQt5.QtCore import QThread
+
+from MCSL2Lib.utils import MCSL2Logger
+
+SESSION_DB_PATH = "MCSL2/PlayerSessions.db"
+
+# [11:49:05] [Server thread/INFO] [minecraft/PlayerList]: Ares_Connor[/127.0.0.1:63854] logged in with entity id 229 at (7.25, 65.0, 11.09)  # noqa: E501
+_JOIN_PATTERN = re.compile(r"\]: ([^\s\[\]]+)\[/?([^\]]*)\] logged in with entity id (\d+)")
+# [11:53:52] [Server thread/INFO] [minecraft/DedicatedServer]: Ares_Connor left the game
+_LEAVE_PATTERN = re.compile(r"\]: ([^\s\[\]]+) left the game")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    server TEXT NOT NULL,
+    player TEXT NOT NULL,
+    ip TEXT,
+    entity_id INTEGER,
+    join_time REAL NOT NULL,
+    leave_time REAL,
+    -- 加入后服务器的在线人数，峰值直接取最大值，无需回放整段历史
+    online INTEGER NOT NULL,
+    -- 启动器异常退出时未记录离开的会话，离开时间按加入时间计
+    interrupted INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS sessions_server_player ON sessions(server, player COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS sessions_server_join ON sessions(server, join_time);
+CREATE INDEX IF NOT EXISTS sessions_server_online ON sessions(server, online);
+CREATE INDEX IF NOT EXISTS sessions_open ON sessions(server, player) WHERE leave_time IS NULL;
+"""
+
+
+class PlayerEvent(NamedTuple):
+    isJoin: bool
+    name: str
+    # 仅加入事件带有地址与实体 ID
+    ip: Optional[str] = None
+    entityId: Optional[int] = None
+
+
+def parsePlayerEvent(serverOutput: str) -> Optional[PlayerEvent]:
+    """解析玩家加入/离开；聊天内容中出现的相同字样不会匹配"""
+    if "logged in with entity id" in serverOutput:
+        if (match := _JOIN_PATTERN.search(serverOutput)) is not None:
+            return PlayerEvent(True, match.group(1), match.group(2) or None, int(match.group(3)))
+    elif " left the game" in serverOutput:
+        if (match := _LEAVE_PATTERN.search(serverOutput)) is not None:
+            return PlayerEvent(False, match.group(1))
+    return None
+
+
+class PlayerSession(NamedTuple):
+    server: str
+    player: str
+    ip: Optional[str]
+    entityId: Optional[int]
+    joinTime: float
+    # 仍在线时为 None
+    leaveTime: Optional[float]
+
+
+class PlayerStats(NamedTuple):
+    player: str
+    sessions: int
+    playtime: float
+    firstSeen: float
+    lastSeen: float
+    lastIP: Optional[str]
+    online: bool
+
+
+def _connect(readOnly: bool) -> Optional[sqlite3.Connection]:
+    if readOnly:
+        if not osp.exists(SESSION_DB_PATH):
+            return None
+        return sqlite3.connect(f"file:{SESSION_DB_PATH}?mode=ro", uri=True)
+    makedirs(osp.dirname(SESSION_DB_PATH), exist_ok=True)
+    connection = sqlite3.connect(SESSION_DB_PATH)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.executescript(_SCHEMA)
+    return connection
+
+
+class _PlayerSessionWriter(QThread):
+    """
+    会话写入线程，按入队顺序执行各服务器分析线程或后台服务提交的加入、离开与清空操作。
+    每次取空队列后在一个事务中提交。
+    """
+
+    def __init__(self, queue: Queue):
+        super().__init__()
+        self.setObjectName("PlayerSessionWriterThread")
+        self.queue = queue
+
+    def run(self):
+        try:
+            connection = _connect(readOnly=False)
+        except sqlite3.Error as e:
+            MCSL2Logger.error(msg="open player session index failed", exc=e)
+            connection = None
+        running = True
+        while running:
+            operations = [self.queue.get()]
+            while not self.queue.empty():
+                operations.append(self.queue.get())
+            if None in operations:
+                running = False
+                operations = operations[: operations.index(None)]
+            if connection is None:
+                continue
+            try:
+                with connection:
+                    for operation, *args in operations:
+                        getattr(self, operation)(connection, *args)
+            except sqlite3.Error as e:
+                MCSL2Logger.error(msg="write player sessions failed", exc=e)
+        if connection is not None:
+            connection.close()
+
+    @staticmethod
+    def join(connection, server, player, ip, entityId, joinTime, online):
+        # 漏记了离开(例如日志被屏蔽)时，以新的加入时间结束旧会话
+        connection.execute(
+            "UPDATE sessions SET leave_time = ?"
+            " WHERE server = ? AND player = ? AND leave_time IS NULL",
+            (joinTime, server, player),
+        )
+        connection.execute(
+            "INSERT INTO sessions(server, player, ip, entity_id, join_time, online)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (server, player, ip, entityId, joinTime, online),
+        )
+
+    @staticmethod
+    def leave(connection, server, player, leaveTime):
+        connection.execute(
+            "UPDATE sessions SET leave_time = ?"
+            " WHERE server = ? AND player = ? AND leave_time IS NULL",
+            (leaveTime, server, player),
+        )
+
+    @staticmethod
+    def closeInterrupted(connection, servers, keep):
+        condition, params = "", list(keep)
+        if keep:
+            condition += f" AND server NOT IN ({', '.join('?' * len(keep))})"
+        if servers is not None:
+            condition += f" AND server IN ({', '.join('?' * len(servers))})"
+            params.extend(servers)
+        connection.execute(
+            "UPDATE sessions SET leave_time = join_time, interrupted = 1"
+            f" WHERE leave_time IS NULL{condition}",
+            tuple(params),
+        )
+
+    @staticmethod
+    def closeAll(connection, server, leaveTime):
+        connection.execute(
+            "UPDATE sessions SET leave_time = ? WHERE server = ? AND leave_time IS NULL",
+            (leaveTime, server),
+        )
+
+
+class PlayerSessionIndex:
+    """
+    各服务器玩家会话的持久化索引。
+    写入由分析线程入队、后台线程完成；查询可在任意线程调用，每次使用独立的只读连接，
+    最后在线、峰值与游戏时长均由索引直接得出，不需要回看日志。
+    """
+
+    _queue: Queue = Queue()
+    _writer: Optional[_PlayerSessionWriter] = None
+    _lock = Lock()
+
+    @classmethod
+    def _put(cls, *operation):
+        with cls._lock:
+            if cls._writer is None:
+                cls._writer = _PlayerSessionWriter(cls._queue)
+                cls._writer.start()
+            cls._queue.put(operation)
+
+    @classmethod
+    def join(
+        cls,
+        server: str,
+        player: str,
+        ip: Optional[str],
+        entityId: Optional[int],
+        joinTime: float,
+        online: int,
+    ):
+        cls._put("join", server, player, ip, entityId, joinTime, online)
+
+    @classmethod
+    def leave(cls, server: str, player: str, leaveTime: float):
+        cls._put("leave", server, player, leaveTime)
+
+    @classmethod
+    def closeAll(cls, server: str, leaveTime: float):
+        """服务器启动或关闭时结束其所有未结束的会话"""
+        cls._put("closeAll", server, leaveTime)
+
+    @classmethod
+    def closeInterrupted(cls, servers: Optional[Iterable[str]] = None, keep: Iterable[str] = ()):
+        """
+        结束上次未正常关闭时遗留的会话，离开时间按加入时间计。
+        servers 为 None 时处理全部服务器；keep 中的服务器仍在宿主进程中运行，其会话由宿主进程记录。
+        """
+        cls._put("closeInterrupted", None if servers is None else list(servers), list(keep))
+
+    @classmethod
+    def shutDown(cls):
+        with cls._lock:
+            writer, cls._writer = cls._writer, None
+            if writer is None:
+                return
+            cls._queue.put(None)
+        writer.wait()
+
+    @staticmethod
+    def _query(sql: str, params: tuple) -> list:
+        try:
+            connection = _connect(readOnly=True)
+            if connection is None:
+                return []
+            try:
+                return connection.execute(sql, params).fetchall()
+            finally:
+                connection.close()
+        except sqlite3.Error as e:
+            MCSL2Logger.warning(f"query player sessions failed: {e}")
+            return []
+
+    @classmethod
+    def lastSeen(cls, server: str, player: str) -> Optional[float]:
+        """最后在线时间；仍在线时为当前时间"""
+        now = time()
+        rows = cls._query(
+            "SELECT MAX(COALESCE(leave_time, ?)) FROM sessions"
+            " WHERE server = ? AND player = ? COLLATE NOCASE",
+            (now, server, player),
+        )
+        return rows[0][0] if rows else None
+
+    @classmethod
+    def peakConcurrency(
+        cls, server: str, since: Optional[float] = None, until: Optional[float] = None
+    ) -> Optional[Tuple[int, float]]:
+        """时间范围内的在线人数峰值，返回 (人数, 达到峰值的时间)；没有记录时返回 None"""
+        rows = cls._query(
+            "SELECT online, join_time FROM sessions WHERE server = ?"
+            " AND join_time >= ? AND join_time <= ?"
+            " ORDER BY online DESC, join_time DESC LIMIT 1",
+            (server, since or 0.0, until or time()),
+        )
+        return tuple(rows[0]) if rows else None
+
+    @classmethod
+    def playerStats(cls, server: str, player: str = "", limit: int = 1000) -> List[PlayerStats]:
+        """各玩家的会话数、累计游戏时长与最后在线时间，按最后在线时间从新到旧排列"""
+        now = time()
+        params = [now, now, server]
+        condition = ""
+        if player:
+            condition = " AND player LIKE ? ESCAPE '\\'"
+            escaped = player.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            params.append(f"%{escaped}%")
+        params.append(limit)
+        rows = cls._query(
+            "SELECT player, COUNT(*), SUM(COALESCE(leave_time, ?) - join_time),"
+            " MIN(join_time), MAX(COALESCE(leave_time, ?)),"
+            " (SELECT ip FROM sessions AS latest WHERE latest.server = sessions.server"
+            "  AND latest.player = sessions.player COLLATE NOCASE"
+            "  ORDER BY latest.join_time DESC LIMIT 1),"
+            " MAX(leave_time IS NULL)"
+            f" FROM sessions WHERE server = ?{condition}"
+            " GROUP BY player ORDER BY 5 DESC LIMIT ?",
+            tuple(params),
+        )
+        return [PlayerStats(*row[:6], bool(row[6])) for row in rows]
+
+    @classmethod
+    def sessions(cls, server: str, player: str, limit: int = 200) -> List[PlayerSession]:
+        """某玩家最近的会话，按加入时间从新到旧排列"""
+        rows = cls._query(
+            "SELECT server, player, ip, entity_id, join_time, leave_time FROM sessions"
+            " WHERE server = ? AND player = ? COLLATE NOCASE"
+            " ORDER BY join_time DESC LIMIT ?",
+            (server, player, limit),
+        )
+        return [PlayerSession(*row) for row in rows]
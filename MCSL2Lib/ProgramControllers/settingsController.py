@@ -14,15 +14,28 @@
 Settings controller, for editing MCSL2's configurations.
 """
 
-from qfluentwidgets import (
-    QConfig,
-    ConfigItem,
-    OptionsConfigItem,
-    OptionsValidator,
-    RangeConfigItem,
-    RangeValidator,
-    BoolValidator,
-)
+from MCSL2Lib import HEADLESS
+
+if HEADLESS:
+    from MCSL2Lib.ProgramControllers.headlessConfig import (
+        QConfig,
+        ConfigItem,
+        OptionsConfigItem,
+        OptionsValidator,
+        RangeConfigItem,
+        RangeValidator,
+        BoolValidator,
+    )
+else:
+    from qfluentwidgets import (
+        QConfig,
+        ConfigItem,
+        OptionsConfigItem,
+        OptionsValidator,
+        RangeConfigItem,
+        RangeValidator,
+        BoolValidator,
+    )
 
 
 class Aria2Range(RangeConfigItem):
@@ -42,6 +55,7 @@ class Config(QConfig):
     restartServerWhenCrashed = ConfigItem(
         "Server", "restartServerWhenCrashed", False, BoolValidator()
     )
+    detachServers = ConfigItem("Server", "detachServers", False, BoolValidator())
     # Configure server
 
     newServerType = OptionsConfigItem(
@@ -97,6 +111,31 @@ class Config(QConfig):
     clearConsoleWhenStopServer = ConfigItem(
         "Console", "clearConsoleWhenStopServer", False, BoolValidator()
     )
+    consoleBatchOutput = ConfigItem("Console", "consoleBatchOutput", True, BoolValidator())
+    consoleRefreshRate = RangeConfigItem(
+        "Console", "consoleRefreshRate", 30, RangeValidator(min=10, max=60)
+    )
+    consoleMaxLinesPerSecond = RangeConfigItem(
+        "Console", "consoleMaxLinesPerSecond", 3000, RangeValidator(min=100, max=20000)
+    )
+    consoleCapacity = RangeConfigItem(
+        "Console", "consoleCapacity", 10000, RangeValidator(min=1000, max=200000)
+    )
+    consoleArchive = ConfigItem("Console", "consoleArchive", True, BoolValidator())
+    consoleArchiveMaxSize = RangeConfigItem(
+        "Console", "consoleArchiveMaxSize", 1024, RangeValidator(min=64, max=10240)
+    )
+    # Metrics
+    metricsExporter = OptionsConfigItem(
+        "Metrics", "metricsExporter", "off", OptionsValidator(["off", "http", "textfile"])
+    )
+    metricsExporterPort = RangeConfigItem(
+        "Metrics", "metricsExporterPort", 9225, RangeValidator(min=1024, max=65535)
+    )
+    metricsExporterPublic = ConfigItem("Metrics", "metricsExporterPublic", False, BoolValidator())
+    metricsTextfileDir = ConfigItem("Metrics", "metricsTextfileDir", "MCSL2/Metrics")
+    # JVM diagnostics
+    jdkToolCpuBudget = RangeConfigItem("JVM", "jdkToolCpuBudget", 2, RangeValidator(min=1, max=20))
     # Software
     # themeMode = OptionsConfigItem(
     # "QFluentWidgets", "ThemeMode", Theme.LIGHT, OptionsValidator(Theme), EnumSerializer(Theme))
@@ -0,0 +1,214 @@
+#     Copyright 2024, MCSL Team, mailto:services@mcsl.com.cn
+#
+#     Part of "MCSL2", a simple and multifunctional Minecraft server launcher.
+#
+#     Licensed under the GNU General Public License, Version 3.0, with our
+#     additional agreements. (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#        https://github.com/MCSLTeam/MCSL2/raw/master/LICENSE
+#
+################################################################################
+"""
+Bounded console line buffer with compressed on-disk spill.
+"""
+
+import zlib
+from collections import deque
+from itertools import islice
+from json import dumps, loads
+from os import getpid, listdir, makedirs, path as osp, remove
+from shutil import rmtree
+from typing import Deque, List, NamedTuple, Optional, Tuple
+
+from psutil import pid_exists
+
+from MCSL2Lib.ServerControllers.consoleProcessor import ConsoleLevel, ConsoleStyle, DEFAULT_STYLE
+
+# 溢出文件按进程分目录，多个窗口、宿主进程与守护进程同时运行时互不影响
+SPILL_DIR = "MCSL2/ConsoleSpill"
+
+
+def spillPath(serverName: str, session: str) -> str:
+    return f"{SPILL_DIR}/{getpid()}/{serverName}/{session}.spill"
+
+
+def removeStaleSpills():
+    """清理已退出(包括异常退出)的进程留下的溢出文件，仍在运行的进程的目录保持不动"""
+    if not osp.isdir(SPILL_DIR):
+        return
+    for name in listdir(SPILL_DIR):
+        if name.isdigit() and pid_exists(int(name)):
+            continue
+        rmtree(osp.join(SPILL_DIR, name), ignore_errors=True)
+
+
+class ConsoleLine(NamedTuple):
+    """终端中的一行：时间戳、级别与带样式的片段"""
+
+    time: float
+    level: ConsoleLevel
+    runs: List[Tuple[str, ConsoleStyle]]
+
+    @property
+    def text(self) -> str:
+        if len(self.runs) == 1:
+            return self.runs[0][0]
+        return "".join(text for text, _ in self.runs)
+
+
+class _SpillChunk(NamedTuple):
+    offset: int
+    size: int
+    first: int
+    count: int
+
+
+class ConsoleSpillFile:
+    """
+    被挤出内存的终端行按块压缩后追加写入本次会话的溢出文件。
+    内存中只保留块索引和一个未写满的块，翻阅时按需解压。
+    溢出的行只保留文本和级别，不再保留 ANSI 样式。
+    """
+
+    CHUNK_LINES = 1000
+
+    def __init__(self, filePath: str):
+        self.filePath = filePath
+        self._chunks: List[_SpillChunk] = []
+        self._pending: List[Tuple[float, int, str]] = []
+        self._size = 0
+        self._spilled = 0
+        # 最近一次解压的块，翻页时通常连续读取同一块
+        self._cachedIndex = -1
+        self._cachedLines: List[Tuple[float, int, str]] = []
+
+    def __len__(self) -> int:
+        return self._spilled + len(self._pending)
+
+    def append(self, line: ConsoleLine):
+        self._pending.append((line.time, int(line.level), line.text))
+        if len(self._pending) >= self.CHUNK_LINES:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        data = zlib.compress(dumps(self._pending, ensure_ascii=False).encode("utf-8"))
+        makedirs(osp.dirname(self.filePath), exist_ok=True)
+        with open(self.filePath, "ab") as spillFile:
+            spillFile.write(data)
+        self._chunks.append(_SpillChunk(self._size, len(data), self._spilled, len(self._pending)))
+        self._size += len(data)
+        self._spilled += len(self._pending)
+        self._pending = []
+
+    def _readChunk(self, index: int) -> List[Tuple[float, int, str]]:
+        if index != self._cachedIndex:
+            chunk = self._chunks[index]
+            with open(self.filePath, "rb") as spillFile:
+                spillFile.seek(chunk.offset)
+                self._cachedLines = loads(zlib.decompress(spillFile.read(chunk.size)))
+            self._cachedIndex = index
+        return self._cachedLines
+
+    def read(self, start: int, count: int) -> List[ConsoleLine]:
+        """读取第 start 行起的至多 count 行"""
+        end = min(start + count, len(self))
+        result = []
+        for index, chunk in enumerate(self._chunks):
+            if chunk.first + chunk.count <= start:
+                continue
+            if chunk.first >= end:
+                break
+            lines = self._readChunk(index)
+            result.extend(
+                lines[max(start - chunk.first, 0) : min(end - chunk.first, chunk.count)]
+            )
+        if end > self._spilled:
+            result.extend(self._pending[max(start - self._spilled, 0) : end - self._spilled])
+        return [
+            ConsoleLine(time, ConsoleLevel(level), [(text, DEFAULT_STYLE)])
+            for time, level, text in result
+        ]
+
+    def close(self):
+        """会话结束，删除溢出文件"""
+        self._chunks.clear()
+        self._pending.clear()
+        self._cachedIndex = -1
+        self._cachedLines = []
+        self._size = self._spilled = 0
+        try:
+            remove(self.filePath)
+        except OSError:
+            pass
+
+
+class ConsoleRingBuffer:
+    """
+    固定容量的终端行环形缓冲区。
+    超出容量时最旧的行写入溢出文件，行号在整个会话内保持不变，
+    [0, spilled) 在磁盘上，[spilled, totalLines) 在内存中。
+    """
+
+    def __init__(self, capacity: int, spillPath: Optional[str] = None):
+        self._lines: Deque[ConsoleLine] = deque(maxlen=capacity)
+        self.spill = ConsoleSpillFile(spillPath) if spillPath else None
+        self._dropped = 0
+
+    @property
+    def capacity(self) -> int:
+        return self._lines.maxlen
+
+    def setCapacity(self, capacity: int):
+        if capacity == self.capacity:
+            return
+        while len(self._lines) > capacity:
+            self._evict(self._lines.popleft())
+        self._lines = deque(self._lines, maxlen=capacity)
+
+    def _evict(self, line: ConsoleLine):
+        if self.spill is not None:
+            self.spill.append(line)
+        else:
+            self._dropped += 1
+
+    @property
+    def spilled(self) -> int:
+        return len(self.spill) if self.spill is not None else self._dropped
+
+    @property
+    def totalLines(self) -> int:
+        return self.spilled + len(self._lines)
+
+    def __len__(self) -> int:
+        return len(self._lines)
+
+    def append(self, line: ConsoleLine):
+        if len(self._lines) == self._lines.maxlen:
+            self._evict(self._lines[0])
+        self._lines.append(line)
+
+    def extend(self, lines: List[ConsoleLine]):
+        for line in lines:
+            self.append(line)
+
+    def read(self, start: int, count: int) -> List[ConsoleLine]:
+        """按会话行号读取，跨越磁盘与内存两部分"""
+        start = max(start, 0)
+        spilled = self.spilled
+        result = []
+        if start < spilled and self.spill is not None:
+            result = self.spill.read(start, count)
+        memoryStart = max(start - spilled, 0)
+        memoryEnd = min(start + count - spilled, len(self._lines))
+        if memoryEnd > memoryStart:
+            result.extend(islice(self._lines, memoryStart, memoryEnd))
+        return result
+
+    def close(self):
+        self._lines.clear()
+        if self.spill is not None:
+            self.spill.close()
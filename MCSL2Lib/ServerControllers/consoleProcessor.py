@@ -0,0 +1,276 @@
+#     Copyright 2024, MCSL Team, mailto:services@mcsl.com.cn
+#
+#     Part of "MCSL2", a simple and multifunctional Minecraft server launcher.
+#
+#     Licensed under the GNU General Public License, Version 3.0, with our
+#     additional agreements. (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#        https://github.com/MCSLTeam/MCSL2/raw/master/LICENSE
+#
+################################################################################
+"""
+Precompiled console line processor.
+"""
+
+import enum
+import re
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+
+class ConsoleLevel(enum.IntEnum):
+    """日志行级别，数值越大优先级越高(与旧版关键字着色的覆盖顺序一致)"""
+
+    NONE = 0
+    INFO = 1
+    WARN = 2
+    ERROR = 3
+    DEBUG = 4
+
+
+_LEVELS = {level.value: level for level in ConsoleLevel}
+
+LEVEL_COLORS: Dict[ConsoleLevel, Tuple[int, int, int]] = {
+    ConsoleLevel.INFO: (52, 185, 96),
+    ConsoleLevel.WARN: (196, 139, 33),
+    ConsoleLevel.ERROR: (214, 39, 21),
+    ConsoleLevel.DEBUG: (22, 122, 232),
+}
+
+# fmt: off
+LEVEL_KEYWORDS: Dict[ConsoleLevel, List[str]] = {
+    ConsoleLevel.INFO: ["INFO", "Info", "info", "tip", "tips", "hint", "HINT", "提示"],
+    ConsoleLevel.WARN: ["WARN", "Warning", "warn", "alert", "ALERT", "Alert", "CAUTION", "Caution", "警告"],  # noqa: E501
+    ConsoleLevel.ERROR: ["ERR", "Err", "Fatal", "FATAL", "Critical", "Danger", "DANGER", "错", "at java", "at net", "at oolloo", "Caused by", "at sun"],  # noqa: E501
+    ConsoleLevel.DEBUG: ["DEBUG", "Debug", "debug", "调试", "TEST", "Test", "Unknown command", "MCSL2"],  # noqa: E501
+}
+# fmt: on
+
+SUPPRESSED_LINES: List[str] = [
+    "Disabling terminal, you're running in an unsupported environment.",
+    "Advanced terminal features are not available in this environment",
+    "Unable to instantiate org.fusesource.jansi.WindowsAnsiOutputStream",
+]
+
+# 需要翻译的原文，译文由界面在语言切换时通过 tr() 提供
+TRANSLATABLE_PHRASES: List[str] = [
+    "Preparing spawn area",
+    "main/INFO",
+    "main/WARN",
+    "main/ERROR",
+    "main/FATAL",
+    "main/DEBUG",
+    "INFO",
+    "WARN",
+    "ERROR",
+    "FATAL",
+    "DEBUG",
+    "Server thread",
+    "Server-Worker",
+    "Forge Version Check",
+    "ModLauncher running: args",
+    "All chunks are saved",
+    "Saving the game (this may take a moment!)",
+    "Saved the game",
+]
+
+# 标准16色
+_ANSI_COLORS: List[Tuple[int, int, int]] = [
+    (0, 0, 0),
+    (170, 0, 0),
+    (0, 170, 0),
+    (170, 85, 0),
+    (0, 0, 170),
+    (170, 0, 170),
+    (0, 170, 170),
+    (170, 170, 170),
+    (85, 85, 85),
+    (255, 85, 85),
+    (85, 255, 85),
+    (255, 255, 85),
+    (85, 85, 255),
+    (255, 85, 255),
+    (85, 255, 255),
+    (255, 255, 255),
+]
+
+# SGR 序列
+_SGR_PATTERN = re.compile(r"\x1b\[((?:\d{1,3};)*\d{0,3})m")
+# 部分服务端在 Windows 下会丢掉 ESC，只留下 "[..m"；这样的行总带有复位序列 "[0m"，
+# 没有 ESC 也没有复位序列的行里的 "[5m" 之类是普通文本(聊天、插件输出)，不能当作颜色
+_BARE_SGR_PATTERN = re.compile(r"\[((?:\d{1,3};)*\d{1,3})m")
+_BARE_RESET = "[0m"
+# 其他 CSI 控制序列(清行、光标移动等)以及残留的 ESC
+_OTHER_ESCAPE_PATTERN = re.compile(r"\x1b\[[0-9;?]*[A-Za-z]|\x1b")
+
+
+class ConsoleStyle(NamedTuple):
+    """一段文本的显示样式，foreground 为 None 时使用级别颜色"""
+
+    foreground: Optional[Tuple[int, int, int]] = None
+    bold: bool = False
+    italic: bool = False
+    underline: bool = False
+
+
+DEFAULT_STYLE = ConsoleStyle()
+
+
+class ProcessedLine(NamedTuple):
+    level: ConsoleLevel
+    text: str
+    runs: List[Tuple[str, ConsoleStyle]]
+
+
+def _isAchromatic(rgb: Tuple[int, int, int]) -> bool:
+    """
+    黑、白、灰只是终端为了与背景区分而输出的颜色，
+    在 MCSL2 的亮/暗主题下反而看不清，交给级别颜色处理。
+    """
+    return max(rgb) - min(rgb) < 16
+
+
+def _xterm256(n: int) -> Tuple[int, int, int]:
+    if n < 16:
+        return _ANSI_COLORS[n]
+    if n < 232:
+        n -= 16
+        steps = (0, 95, 135, 175, 215, 255)
+        return steps[n // 36], steps[(n // 6) % 6], steps[n % 6]
+    level = 8 + (n - 232) * 10
+    return level, level, level
+
+
+def applySGR(style: ConsoleStyle, params: str) -> ConsoleStyle:
+    """根据一条 SGR 序列的参数更新样式"""
+    codes = [int(c) if c else 0 for c in params.split(";")] if params else [0]
+    foreground, bold, italic, underline = style
+    i = 0
+    while i < len(codes):
+        code = codes[i]
+        if code == 0:
+            foreground, bold, italic, underline = DEFAULT_STYLE
+        elif code == 1:
+            bold = True
+        elif code == 3:
+            italic = True
+        elif code == 4:
+            underline = True
+        elif code == 22:
+            bold = False
+        elif code == 23:
+            italic = False
+        elif code == 24:
+            underline = False
+        elif 30 <= code <= 37:
+            foreground = _ANSI_COLORS[code - 30]
+        elif 90 <= code <= 97:
+            foreground = _ANSI_COLORS[code - 90 + 8]
+        elif code == 39:
+            foreground = None
+        elif code == 38 and i + 1 < len(codes):
+            if codes[i + 1] == 2 and i + 4 < len(codes):
+                foreground = (codes[i + 2] & 255, codes[i + 3] & 255, codes[i + 4] & 255)
+                i += 4
+            elif codes[i + 1] == 5 and i + 2 < len(codes):
+                foreground = _xterm256(codes[i + 2] & 255)
+                i += 2
+        elif code == 48 and i + 1 < len(codes):
+            # 不处理背景色，只跳过其参数
+            i += 4 if codes[i + 1] == 2 else 2
+        i += 1
+    if foreground is not None and _isAchromatic(foreground):
+        foreground = None
+    return ConsoleStyle(foreground, bold, italic, underline)
+
+
+def _alternation(words) -> str:
+    # 长的在前，保证 "main/INFO" 优先于 "INFO"
+    return "|".join(re.escape(w) for w in sorted(set(words), key=len, reverse=True))
+
+
+class ConsoleLineProcessor:
+    """
+    预编译的终端行处理器。
+    级别判定与屏蔽规则共用一条交替正则，只扫描一遍；
+    翻译替换为一条交替正则加字典查表，译文只在语言切换时生成一次。
+    """
+
+    def __init__(self, translations: Optional[Dict[str, str]] = None):
+        # 关键字 -> 级别；被屏蔽的行用 -1 标记
+        self._keywordLevels: Dict[str, int] = {}
+        for level, keywords in LEVEL_KEYWORDS.items():
+            for keyword in keywords:
+                self._keywordLevels[keyword] = max(self._keywordLevels.get(keyword, 0), level)
+        # 交替匹配会吞掉被包含的短关键字，因此长关键字继承其包含的关键字中最高的级别
+        for keyword in list(self._keywordLevels):
+            self._keywordLevels[keyword] = max(
+                level for other, level in self._keywordLevels.items() if other in keyword
+            )
+        for line in SUPPRESSED_LINES:
+            self._keywordLevels[line] = -1
+        self._classifier = re.compile(_alternation(self._keywordLevels))
+        self._translator = re.compile(_alternation(TRANSLATABLE_PHRASES))
+        self._translations: Dict[str, str] = {}
+        self.setTranslations(translations or {})
+
+    def setTranslations(self, translations: Dict[str, str]):
+        """设置译文(原文 -> 译文)，未提供的原文保持不变"""
+        self._translations = {k: translations.get(k, k) for k in TRANSLATABLE_PHRASES}
+        table = self._translations
+        self._translateMatch = lambda m: table[m.group()]
+
+    def classify(self, text: str) -> Optional[ConsoleLevel]:
+        """返回行级别；若该行应被屏蔽则返回 None"""
+        found = self._classifier.findall(text)
+        if not found:
+            return ConsoleLevel.NONE
+        levels = [self._keywordLevels[keyword] for keyword in found]
+        if -1 in levels:
+            return None
+        return _LEVELS[max(levels)]
+
+    def translate(self, text: str) -> str:
+        return self._translator.sub(self._translateMatch, text)
+
+    def splitANSI(self, line: str) -> List[Tuple[str, ConsoleStyle]]:
+        """按 SGR 序列把一行拆成若干带样式的片段"""
+        if "\x1b" in line:
+            pattern = _SGR_PATTERN
+        elif _BARE_RESET in line:
+            pattern = _BARE_SGR_PATTERN
+        else:
+            return [(line, DEFAULT_STYLE)] if line else []
+        if (match := pattern.search(line)) is None:
+            line = _OTHER_ESCAPE_PATTERN.sub("", line)
+            return [(line, DEFAULT_STYLE)] if line else []
+        runs = []
+        style = DEFAULT_STYLE
+        pos = 0
+        while match is not None:
+            if match.start() > pos:
+                runs.append((line[pos : match.start()], style))
+            style = applySGR(style, match.group(1))
+            pos = match.end()
+            match = pattern.search(line, pos)
+        if pos < len(line):
+            runs.append((line[pos:], style))
+        return [
+            (cleaned, s) for text, s in runs if (cleaned := _OTHER_ESCAPE_PATTERN.sub("", text))
+        ]
+
+    def process(self, line: str) -> Optional[ProcessedLine]:
+        """处理一行输出，被屏蔽的行返回 None"""
+        runs = self.splitANSI(line)
+        if len(runs) == 1:
+            # 绝大多数行没有 ANSI 着色，省去拆分与拼接
+            text, style = runs[0]
+            if (level := self.classify(text)) is None:
+                return None
+            text = self.translate(text)
+            return ProcessedLine(level, text, [(text, style)])
+        if (level := self.classify("".join(text for text, _ in runs))) is None:
+            return None
+        runs = [(self.translate(text), style) for text, style in runs]
+        return ProcessedLine(level, "".join(text for text, _ in runs), runs)
@@ -0,0 +1,234 @@
+#     Copyright 2024, MCSL Team, mailto:services@mcsl.com.cn
+#
+#     Part of "MCSL2", a simple and multifunctional Minecraft server launcher.
+#
+#     Licensed under the GNU General Public License, Version 3.0, with our
+#     additional agreements. (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#        https://github.com/MCSLTeam/MCSL2/raw/master/LICENSE
+#
+################################################################################
+"""
+Per-server console analysis worker, runs off the GUI thread.
+"""
+
+import enum
+from time import time
+from typing import Dict, List, NamedTuple, Optional, Set
+
+from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot
+
+from MCSL2Lib.ProgramControllers.consoleArchiveController import ConsoleArchive
+from MCSL2Lib.ProgramControllers.metricsController import Metrics
+from MCSL2Lib.ProgramControllers.playerSessionController import (
+    PlayerEvent,
+    PlayerSessionIndex,
+    parsePlayerEvent,
+)
+from MCSL2Lib.ServerControllers.consoleBuffer import ConsoleLine
+from MCSL2Lib.ServerControllers.consoleProcessor import (
+    ConsoleLevel,
+    ConsoleLineProcessor,
+    DEFAULT_STYLE,
+)
+from MCSL2Lib.ServerControllers.errorRuleEngine import ErrorRuleEngine
+from MCSL2Lib.ServerControllers.serverLifecycle import DONE_PATTERN
+from MCSL2Lib.ServerControllers.serverTelemetry import TelemetryParser
+from MCSL2Lib.ServerControllers.serverUtils import ServerPropertiesCache
+
+
+class ConsoleEvent(enum.Enum):
+    LOADING_LIBRARIES = "loadingLibraries"
+    DONE = "done"
+    ENCODING_ERROR = "encodingError"
+    # 新的 TPS/MSPT 采样或卡顿记录
+    TELEMETRY = "telemetry"
+
+
+class ConsoleAnalysis(NamedTuple):
+    """一批日志的分析结果，界面线程据此绘制与更新状态"""
+
+    lines: List[ConsoleLine]
+    # 按发生顺序排列的在线玩家增减
+    playerChanges: List[PlayerEvent]
+    playersReset: bool
+    errors: str
+    events: List[ConsoleEvent]
+
+
+class ConsoleAnalysisWorker(QObject):
+    """
+    在独立线程中处理某个服务器的原始输出：
+    着色与翻译、启动完毕与编码检测、玩家记录、报错分析以及归档入队。
+    结果以 ConsoleAnalysis 的形式一次性发回界面线程。
+    """
+
+    resultReady = pyqtSignal(object)
+    # 服务器不支持的查询指令，界面据此停止查询
+    telemetryUnsupported = pyqtSignal(list)
+
+    def __init__(self, serverName: str, session: str, translations: Dict[str, str]):
+        super().__init__()
+        self.serverName = serverName
+        self.session = session
+        self.processor = ConsoleLineProcessor(translations)
+        self.detectErrors = False
+        # 服务器正在启动，尚未输出启动完毕；之后的同类文字(聊天、插件输出)不再当作启动完毕
+        self.awaitingDone = False
+        # 服务器在后台服务中运行时由后台服务归档并记录玩家会话，这里只更新界面
+        self.persist = True
+        self.errorEngine = ErrorRuleEngine()
+        self.players: Set[str] = set()
+        self.linesMetric = Metrics.consoleLines.labels(serverName)
+        self.telemetry = TelemetryParser(serverName)
+        # 查询回显解析暂时隐藏的行，确定不是回显后补回终端
+        self.heldLine: Optional[ConsoleLine] = None
+
+    def setTranslations(self, translations: Dict[str, str]):
+        self.processor.setTranslations(translations)
+
+    @pyqtSlot()
+    def resetPlayers(self):
+        self.players.clear()
+        if self.persist:
+            PlayerSessionIndex.closeAll(self.serverName, time())
+
+    @pyqtSlot(list)
+    def seedPlayers(self, names: list):
+        """重新连接到后台服务时，以其记录的在线玩家为准"""
+        self.players = set(names)
+        playerChanges = [PlayerEvent(True, name) for name in names]
+        self.resultReady.emit(ConsoleAnalysis([], playerChanges, True, "", []))
+
+    @pyqtSlot()
+    def resetErrorAnalysis(self):
+        self.errorEngine.reset()
+
+    @pyqtSlot()
+    def finishErrorAnalysis(self):
+        """服务器退出后结束仍在收集的堆栈，发出剩余的分析结果"""
+        if self.errorEngine.finish():
+            self.resultReady.emit(ConsoleAnalysis([], [], False, self.takeErrors(), []))
+
+    def takeErrors(self) -> str:
+        return "".join(finding.describe() + "\n" for finding in self.errorEngine.takeNew())
+
+    @pyqtSlot(list)
+    def expectTelemetry(self, probes: list):
+        """查询指令即将发出，之后的回显不显示在终端中"""
+        self.telemetry.expect(probes)
+
+    @pyqtSlot(object)
+    def forwardNotice(self, line: ConsoleLine):
+        """MCSL2 自身的提示已是完整的终端行，原样发回"""
+        self.resultReady.emit(ConsoleAnalysis([line], [], False, "", []))
+
+    @pyqtSlot(list)
+    def replayLines(self, serverOutputs: list):
+        """重新连接后补齐的历史输出：只着色与翻译，不计数、不归档，也不参与各项分析"""
+        lines = [
+            ConsoleLine(time(), processed.level, processed.runs)
+            for serverOutput in serverOutputs
+            if (processed := self.processor.process(serverOutput)) is not None
+        ]
+        if lines:
+            self.resultReady.emit(ConsoleAnalysis(lines, [], False, "", []))
+
+    @pyqtSlot(str)
+    def processLine(self, serverOutput: str):
+        self.processLines([serverOutput])
+
+    @pyqtSlot(list)
+    def processLines(self, serverOutputs: list):
+        lines: List[ConsoleLine] = []
+        playerChanges: List[PlayerEvent] = []
+        events: List[ConsoleEvent] = []
+        playersReset = False
+        errors = ""
+        self.linesMetric.inc(len(serverOutputs))
+        for serverOutput in serverOutputs:
+            if (processed := self.processor.process(serverOutput)) is None:
+                continue
+            text = processed.text
+            hidden, telemetryChanged = self.telemetry.feed(text)
+            if telemetryChanged and ConsoleEvent.TELEMETRY not in events:
+                events.append(ConsoleEvent.TELEMETRY)
+            if self.telemetry.released:
+                self.telemetry.released = False
+                lines.append(self.heldLine)
+            if hidden:
+                if self.telemetry.holding:
+                    self.heldLine = ConsoleLine(time(), processed.level, processed.runs)
+                continue
+            lines.append(ConsoleLine(time(), processed.level, processed.runs))
+            if "Loading libraries, please wait..." in text:
+                self.resetPlayers()
+                playerChanges.clear()
+                playersReset = True
+                events.append(ConsoleEvent.LOADING_LIBRARIES)
+            if self.awaitingDone and DONE_PATTERN.search(text):
+                self.awaitingDone = False
+                lines.append(self.doneNotice())
+                events.append(ConsoleEvent.DONE)
+            if "�" in text:
+                lines.append(
+                    ConsoleLine(
+                        time(),
+                        ConsoleLevel.WARN,
+                        [(
+                            self.tr("[MCSL2 | 警告]：服务器疑似输出非法字符，也有可能是无法被当前编码解析的字符。请尝试更换编码。"),  # noqa: E501
+                            DEFAULT_STYLE,
+                        )],
+                    )
+                )
+                events.append(ConsoleEvent.ENCODING_ERROR)
+            if self.detectErrors and self.errorEngine.feed(text):
+                errors += self.takeErrors()
+            if (playerEvent := parsePlayerEvent(text)) is not None:
+                name = playerEvent.name
+                if playerEvent.isJoin:
+                    if name not in self.players:
+                        self.players.add(name)
+                        playerChanges.append(playerEvent)
+                    # 重复的加入(漏记了离开)也开始新的会话
+                    if self.persist:
+                        PlayerSessionIndex.join(
+                            self.serverName,
+                            name,
+                            playerEvent.ip,
+                            playerEvent.entityId,
+                            time(),
+                            len(self.players),
+                        )
+                elif name in self.players:
+                    self.players.discard(name)
+                    playerChanges.append(playerEvent)
+                    if self.persist:
+                        PlayerSessionIndex.leave(self.serverName, name, time())
+        if self.telemetry.unsupported:
+            self.telemetryUnsupported.emit(self.telemetry.unsupported)
+            self.telemetry.unsupported = []
+        if not lines and not errors and not events:
+            return
+        if self.persist:
+            ConsoleArchive.append(
+                self.serverName,
+                self.session,
+                [(line.time, int(line.level), line.text) for line in lines],
+            )
+        self.resultReady.emit(ConsoleAnalysis(lines, playerChanges, playersReset, errors, events))
+
+    def doneNotice(self) -> ConsoleLine:
+        properties = ServerPropertiesCache.get(self.serverName)
+        ip = properties.get("server-ip") or "127.0.0.1"
+        port = properties.get("server-port", 25565)
+        return ConsoleLine(
+            time(),
+            ConsoleLevel.DEBUG,
+            [(
+                self.tr(f"[MCSL2 | 提示]：服务器启动完毕！\n[MCSL2 | 提示]：如果本机开服，IP 地址为{ip}，端口为{port}。\n[MCSL2 | 提示]：如果外网开服,或使用了内网穿透等服务，连接地址为你的相关服务地址。"),  # noqa: E501
+                DEFAULT_STYLE,
+            )],
+        )
@@ -0,0 +1,325 @@
+#     Copyright 2024, MCSL Team, mailto:services@mcsl.com.cn
+#
+#     Part of "MCSL2", a simple and multifunctional Minecraft server launcher.
+#
+#     Licensed under the GNU General Public License, Version 3.0, with our
+#     additional agreements. (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#        https://github.com/MCSLTeam/MCSL2/raw/master/LICENSE
+#
+#     The built-in rules in errorRules.json were ported from the error handler of
+#     Minecraft-Server-Launcher, by Waheal, modified by LxHTT.
+#     URL: https://github.com/Waheal/Minecraft-Server-Launcher
+#
+################################################################################
+"""
+Streaming, data-driven error detection for live server output and imported logs.
+"""
+
+import enum
+import gzip
+import re
+import zlib
+from json import loads
+from os import path as osp
+from threading import Lock
+from typing import Dict, Iterable, List, NamedTuple, Optional, Pattern, Tuple
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+BUILTIN_RULES_PATH = osp.join(osp.dirname(osp.abspath(__file__)), "errorRules.json")
+# 版本号高于内置规则时优先使用，便于不发版更新规则
+USER_RULES_PATH = "MCSL2/ErrorRules.json"
+RULES_SCHEMA = 1
+# 分析日志文件时每次读取的字符数
+_BLOCK_SIZE = 1 << 18
+
+_EXCEPTION = r"[\w$]+(?:\.[\w$]+)+(?:Exception|Error|Throwable)\b"
+# 堆栈中可以归入上一条报错的行：at ...、Caused by: ...、... 12 more、空行，以及异常本身
+_CONTINUATION_PATTERN = re.compile(
+    rf"(?:^|\]: )\s*(?:at |Caused by: |Suppressed: |\.\.\. \d+ more|$|{_EXCEPTION})"
+)
+_EXCEPTION_PATTERN = re.compile(rf"(?:^|\]: )\s*{_EXCEPTION}")
+_CAUSED_BY_PATTERN = re.compile(r"Caused by: (.+)")
+_FORMATTING_PATTERN = re.compile(r"[§&][0-9a-fk-or]")
+_PLACEHOLDER_PATTERN = re.compile(r"\{(\w+)(?:\|(\w+))?\}")
+
+
+class ErrorSeverity(enum.IntEnum):
+    INFO = 0
+    WARNING = 1
+    ERROR = 2
+    FATAL = 3
+
+
+SEVERITY_NAMES = {
+    ErrorSeverity.INFO: "提示",
+    ErrorSeverity.WARNING: "警告",
+    ErrorSeverity.ERROR: "错误",
+    ErrorSeverity.FATAL: "致命",
+}
+
+
+class ErrorRule(NamedTuple):
+    id: str
+    severity: ErrorSeverity
+    keywords: Tuple[str, ...]
+    pattern: Pattern
+    message: str
+    # 匹配后继续收集的堆栈行数上限，0 表示不收集
+    context: int
+    stripFormatting: bool
+    # 为 False 表示重启也无法恢复(如 Java 版本、启动参数错误)，崩溃后不再自动重启
+    restartable: bool
+
+
+class ErrorFinding:
+    """一条分析结果；相同规则、相同内容的结果合并计数"""
+
+    __slots__ = ("rule", "message", "count", "firstLine", "context")
+
+    def __init__(self, rule: ErrorRule, message: str, firstLine: int, context: List[str]):
+        self.rule = rule
+        self.message = message
+        self.count = 1
+        self.firstLine = firstLine
+        self.context = context
+
+    def describe(self) -> str:
+        count = f" (共 {self.count} 次)" if self.count > 1 else ""
+        return f"[{SEVERITY_NAMES[self.rule.severity]}] {self.message}{count}"
+
+
+class ErrorRuleSet:
+    """
+    编译后的规则集，不含任何分析状态，可被所有服务器的引擎共享。
+    所有规则的关键字合并为一个交替正则，没有命中关键字的行只经过这一次查找。
+    """
+
+    _default: Optional["ErrorRuleSet"] = None
+    _lock = Lock()
+
+    def __init__(self, data: dict):
+        if data.get("schema") != RULES_SCHEMA:
+            raise ValueError(f"unsupported error rule schema {data.get('schema')}")
+        self.version: int = data["version"]
+        self.tables: Dict[str, Dict[str, str]] = data.get("tables", {})
+        self.rules: List[ErrorRule] = [
+            ErrorRule(
+                rule["id"],
+                ErrorSeverity[rule.get("severity", "error").upper()],
+                tuple(rule["keywords"]),
+                re.compile(rule["pattern"]),
+                rule["message"],
+                rule.get("context", 0),
+                rule.get("stripFormatting", False),
+                rule.get("restartable", True),
+            )
+            for rule in data["rules"]
+        ]
+        self.keywords: Tuple[str, ...] = tuple(
+            sorted({k for rule in self.rules for k in rule.keywords}, key=len, reverse=True)
+        )
+        self.trigger = re.compile("|".join(map(re.escape, self.keywords)))
+
+    def render(self, rule: ErrorRule, match: "re.Match", causes: List[str]) -> str:
+        groups = match.groupdict()
+
+        def substitute(placeholder: "re.Match") -> str:
+            name, table = placeholder.groups()
+            if name == "causes":
+                return f"\n根本原因：{causes[-1]}" if causes else ""
+            value = groups.get(name) or ""
+            if table is not None:
+                return self.tables.get(table, {}).get(value, value)
+            return value
+
+        return _PLACEHOLDER_PATTERN.sub(substitute, rule.message)
+
+    @classmethod
+    def default(cls) -> "ErrorRuleSet":
+        """内置规则与用户规则中版本较高者，首次调用时加载"""
+        with cls._lock:
+            if cls._default is None:
+                with open(BUILTIN_RULES_PATH, "r", encoding="utf-8") as f:
+                    ruleSet = cls(loads(f.read()))
+                if osp.exists(USER_RULES_PATH):
+                    try:
+                        with open(USER_RULES_PATH, "r", encoding="utf-8") as f:
+                            userRuleSet = cls(loads(f.read()))
+                        if userRuleSet.version > ruleSet.version:
+                            ruleSet = userRuleSet
+                    except Exception as e:
+                        # 本模块也会在日志分析子进程中导入，日志模块仅在需要时导入
+                        from MCSL2Lib.utils import MCSL2Logger
+
+                        MCSL2Logger.error(msg=f"load error rules {USER_RULES_PATH} failed", exc=e)
+                cls._default = ruleSet
+            return cls._default
+
+
+class ErrorRuleEngine:
+    """
+    逐行的报错分析引擎，每个服务器(或每次导入日志)一个实例。
+    规则匹配后若需要上下文，则继续吸收随后的堆栈行，收集 Caused by 链后再生成结果。
+    """
+
+    def __init__(self, ruleSet: Optional[ErrorRuleSet] = None):
+        self.ruleSet = ruleSet or ErrorRuleSet.default()
+        self.reset()
+
+    def reset(self):
+        self.findings: Dict[Tuple[str, str], ErrorFinding] = {}
+        self.newFindings: List[ErrorFinding] = []
+        self.lineCount = 0
+        # 正在收集上下文的 (规则, 匹配结果, 起始行, 已收集的行, Caused by 列表)
+        self.pending: List[tuple] = []
+
+    def feed(self, line: str) -> bool:
+        """分析一行，返回是否产生了新的结果(可通过 takeNew() 取出)"""
+        self.lineCount += 1
+        changed = False
+        if self.pending:
+            if _CONTINUATION_PATTERN.search(line) is not None:
+                changed = self.collect(line)
+            else:
+                changed = self.finish()
+        if self.ruleSet.trigger.search(line) is None:
+            return changed
+        for rule in self.ruleSet.rules:
+            if not any(keyword in line for keyword in rule.keywords):
+                continue
+            text = _FORMATTING_PATTERN.sub("", line) if rule.stripFormatting else line
+            if (match := rule.pattern.search(text)) is None:
+                continue
+            if rule.context:
+                self.pending.append((rule, match, self.lineCount, [line], []))
+            else:
+                changed = self.record(rule, match, self.lineCount, [line], []) or changed
+        return changed
+
+    def collect(self, line: str) -> bool:
+        changed = False
+        cause = _CAUSED_BY_PATTERN.search(line)
+        for item in list(self.pending):
+            rule, _, _, context, causes = item
+            context.append(line)
+            if cause is not None:
+                causes.append(cause.group(1).strip())
+            elif not causes and _EXCEPTION_PATTERN.search(line) is not None:
+                # 报错后出现的异常本身
+                causes.append(line.split("]: ", 1)[-1].strip())
+            if len(context) > rule.context:
+                self.pending.remove(item)
+                changed = self.record(*item) or changed
+        return changed
+
+    def feedBlock(self, block: str) -> bool:
+        """
+        分析由若干完整行组成的文本块，结果与逐行 feed() 相同。
+        不含任何关键字、也不在收集上下文的行只计数而不逐行处理，用于快速扫描大量历史日志。
+        """
+        changed = False
+        position, end = 0, len(block)
+        candidates = [keyword for keyword in self.ruleSet.keywords if keyword in block]
+        while position < end:
+            if not self.pending:
+                start = -1
+                for keyword in list(candidates):
+                    if (index := block.find(keyword, position)) == -1:
+                        candidates.remove(keyword)
+                    elif start == -1 or index < start:
+                        start = index
+                if start == -1:
+                    self.lineCount += block.count("\n", position) + (block[-1] != "\n")
+                    break
+                lineStart = block.rfind("\n", position, start) + 1 or position
+                self.lineCount += block.count("\n", position, lineStart)
+                position = lineStart
+            if (lineEnd := block.find("\n", position)) == -1:
+                lineEnd = end
+            changed = self.feed(block[position:lineEnd].rstrip("\r")) or changed
+            position = lineEnd + 1
+        return changed
+
+    def finish(self) -> bool:
+        """结束所有正在收集的上下文，例如服务器退出或日志读完时"""
+        changed = False
+        pending, self.pending = self.pending, []
+        for item in pending:
+            changed = self.record(*item) or changed
+        return changed
+
+    def record(self, rule, match, firstLine, context, causes) -> bool:
+        message = self.ruleSet.render(rule, match, causes)
+        key = (rule.id, message)
+        if (finding := self.findings.get(key)) is not None:
+            finding.count += 1
+            return False
+        finding = self.findings[key] = ErrorFinding(rule, message, firstLine, context)
+        self.newFindings.append(finding)
+        return True
+
+    def takeNew(self) -> List[ErrorFinding]:
+        newFindings, self.newFindings = self.newFindings, []
+        return newFindings
+
+    def results(self) -> List[ErrorFinding]:
+        """按严重程度从高到低、同级按出现先后排列"""
+        return sorted(self.findings.values(), key=lambda f: (-f.rule.severity, f.firstLine))
+
+    def report(self) -> str:
+        return "\n".join(finding.describe() for finding in self.results())
+
+    @classmethod
+    def analyzeLines(cls, lines: Iterable[str]) -> "ErrorRuleEngine":
+        engine = cls()
+        for line in lines:
+            engine.feed(line.rstrip("\r\n"))
+        engine.finish()
+        return engine
+
+    @classmethod
+    def analyzeFile(cls, filePath: str, encoding: str = "utf-8") -> "ErrorRuleEngine":
+        """分析导入的日志文件，支持 .gz 压缩的日志，按块流式读取而不整体载入内存"""
+        engine = cls()
+        opener = gzip.open if filePath.endswith(".gz") else open
+        with opener(filePath, "rt", encoding=encoding, errors="replace") as f:
+            remainder = ""
+            while block := f.read(_BLOCK_SIZE):
+                block = remainder + block
+                cut = block.rfind("\n") + 1
+                remainder = block[cut:]
+                if cut:
+                    engine.feedBlock(block[:cut])
+            if remainder:
+                engine.feedBlock(remainder)
+        engine.finish()
+        return engine
+
+
+class ErrorAnalyzeThread(QThread):
+    """在后台分析粘贴的日志或导入的日志文件"""
+
+    resultReady = pyqtSignal(str)
+
+    def __init__(self, text: str = "", filePath: str = "", parent=None):
+        super().__init__(parent)
+        self.text = text
+        self.filePath = filePath
+
+    def run(self):
+        try:
+            if self.filePath:
+                engine = ErrorRuleEngine.analyzeFile(self.filePath)
+            else:
+                engine = ErrorRuleEngine.analyzeLines(self.text.splitlines())
+        except (OSError, EOFError, zlib.error) as e:
+            from MCSL2Lib.utils import MCSL2Logger
+
+            MCSL2Logger.error(msg=f"analyze log {self.filePath} failed", exc=e)
+            self.resultReady.emit(f"读取日志失败：{e}")
+            return
+        self.resultReady.emit(engine.report() or "没有检测到任何 MCSL2 内置错误分析可用解决方案。")
@@ -0,0 +1,643 @@
+#     Copyright 2024, MCSL Team, mailto:services@mcsl.com.cn
+#
+#     Part of "MCSL2", a simple and multifunctional Minecraft server launcher.
+#
+#     Licensed under the GNU General Public License, Version 3.0, with our
+#     additional agreements. (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#        https://github.com/MCSLTeam/MCSL2/raw/master/LICENSE
+#
+################################################################################
+"""
+GC logging arguments, a tail over the rotating GC log and streaming pause statistics.
+"""
+
+import re
+from bisect import bisect_left
+from collections import deque
+from datetime import datetime
+from glob import escape, glob
+from math import isnan, nan
+from os import makedirs, path as osp, remove, stat
+from threading import Condition, Lock
+from time import strftime, time
+from typing import Deque, Dict, List, NamedTuple, Optional, Tuple
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from MCSL2Lib.ProgramControllers.metricsController import MetricFamily, MetricsRegistry
+from MCSL2Lib.ServerControllers.jdkTools import javaMajorVersion
+from MCSL2Lib.ServerControllers.serverTelemetry import ServerTelemetry
+from MCSL2Lib.utils import MCSL2Logger
+
+# 相对服务器目录
+GC_LOG_DIR = "gclogs"
+GC_LOG_FILES = 5
+GC_LOG_FILE_SIZE = "20M"
+# 保留最近几次启动的 GC 日志
+GC_LOG_RUNS = 5
+_RUN_PATTERN = re.compile(r"^(gc-\d{8}-\d{6}\.log)")
+
+_SIZE = r"(\d+(?:\.\d+)?)([BKMGT])"
+_SIZE_UNITS = {"B": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+
+# Java 9+ 统一日志，装饰为 [time][uptime]
+_UNIFIED_LINE = re.compile(r"^\[([^\]]+)\]\[([\d.,]+)s\] ?(.*)$")
+_UNIFIED_PAUSE = re.compile(
+    rf"GC\((\d+)\) (Pause .*?)\s*(?:{_SIZE}->{_SIZE}\({_SIZE}\) )?([\d.]+)ms$"
+)
+_UNIFIED_OLD = re.compile(
+    r"GC\((\d+)\) (?:Old regions|ParOldGen|PSOldGen|Tenured|CMS): "
+    r"(\d+(?:\.\d+)?)([BKMGT])?(?:\([^)]*\))?->(\d+(?:\.\d+)?)([BKMGT])?"
+)
+_UNIFIED_REGION_SIZE = re.compile(rf"Heap [Rr]egion [Ss]ize: {_SIZE}")
+
+# Java 8 -XX:+PrintGCDetails -XX:+PrintGCDateStamps -XX:+PrintGCTimeStamps
+_LEGACY_LINE = re.compile(
+    r"^(?:(\d{4}-\d\d-\d\dT[\d:.]+[+-]\d{4}): )?([\d.,]+): \[(Full GC|GC)(.*)$"
+)
+_LEGACY_GENERATION = re.compile(
+    rf"\[(\w[\w ]*?): {_SIZE}(?:\([^)]*\))?->{_SIZE}\({_SIZE}\)[^\]]*\]"
+)
+_LEGACY_HEAP = re.compile(rf"{_SIZE}(?:\([^)]*\))?->{_SIZE}\({_SIZE}\)")
+_LEGACY_DURATION = re.compile(r"([\d.]+) secs\]")
+_LEGACY_NAME_END = re.compile(r",|\s+[\d\[]")
+_LEGACY_G1_HEAP = re.compile(
+    rf"\[Eden: {_SIZE}\({_SIZE}\)->{_SIZE}\({_SIZE}\) Survivors: {_SIZE}->{_SIZE} "
+    rf"Heap: {_SIZE}\({_SIZE}\)->{_SIZE}\({_SIZE}\)\]"
+)
+_YOUNG_GENERATIONS = {"PSYoungGen", "ParNew", "DefNew", "ASParNew"}
+
+
+def _size(value: str, unit: Optional[str]) -> float:
+    return float(value) * _SIZE_UNITS[unit] if unit else float(value)
+
+
+def _wallTime(stamp: str) -> float:
+    try:
+        return datetime.strptime(stamp, "%Y-%m-%dT%H:%M:%S.%f%z").timestamp()
+    except ValueError:
+        return nan
+
+
+def gcLogDirectory(serverName: str) -> str:
+    return osp.abspath(osp.join("Servers", serverName, GC_LOG_DIR))
+
+
+def prepareGcLog(serverName: str, javaPath: str) -> Optional[str]:
+    """
+    启动前清理较早的日志，并为本次启动确定新的日志文件名。
+    无法识别 Java 版本时返回 None，不开启 GC 日志，以免不认识的选项导致 JVM 无法启动。
+    """
+    if javaMajorVersion(javaPath) is None:
+        MCSL2Logger.warning(f"unknown Java version of {javaPath}, GC logging disabled")
+        return None
+    directory = gcLogDirectory(serverName)
+    makedirs(directory, exist_ok=True)
+    pruneGcLogs(directory, GC_LOG_RUNS - 1)
+    name = strftime("gc-%Y%m%d-%H%M%S.log")
+    GcLogMonitor.setLogPath(serverName, osp.join(directory, name))
+    return name
+
+
+def gcLogJVMArgs(javaPath: str, name: str) -> List[str]:
+    """按 Java 版本生成写入 gclogs/name 的 GC 日志参数，文件名由 prepareGcLog 确定"""
+    if (version := javaMajorVersion(javaPath)) is None:
+        return []
+    # 相对于工作目录(服务器目录)，避免 Windows 盘符中的冒号被 -Xlog 当作分隔符
+    logFile = f"{GC_LOG_DIR}/{name}"
+    if version >= 9:
+        return [
+            f"-Xlog:gc*:file={logFile}:time,uptime"
+            f":filecount={GC_LOG_FILES},filesize={GC_LOG_FILE_SIZE}"
+        ]
+    return [
+        "-XX:+PrintGCDetails",
+        "-XX:+PrintGCDateStamps",
+        "-XX:+PrintGCTimeStamps",
+        f"-Xloggc:{logFile}",
+        "-XX:+UseGCLogFileRotation",
+        f"-XX:NumberOfGCLogFiles={GC_LOG_FILES}",
+        f"-XX:GCLogFileSize={GC_LOG_FILE_SIZE}",
+    ]
+
+
+def pruneGcLogs(directory: str, keep: int) -> List[str]:
+    """只保留最近 keep 次启动的日志(含轮转出的文件)，返回被删除的文件"""
+    runs: Dict[str, List[str]] = {}
+    for filePath in glob(osp.join(directory, "gc-*.log*")):
+        if (match := _RUN_PATTERN.match(osp.basename(filePath))) is not None:
+            runs.setdefault(match.group(1), []).append(filePath)
+    removed = []
+    for run in sorted(runs, reverse=True)[keep:]:
+        for filePath in runs[run]:
+            try:
+                remove(filePath)
+                removed.append(filePath)
+            except OSError:
+                continue
+    return removed
+
+
+class GcEvent(NamedTuple):
+    time: float
+    uptime: float
+    name: str
+    # young / full / other (G1 Remark、CMS Initial Mark、ZGC 与 Shenandoah 的各个停顿等)
+    kind: str
+    pauseMs: float
+    heapBefore: float
+    heapAfter: float
+    heapCapacity: float
+    # 距上一次 GC 之后新分配的字节数
+    allocated: float
+    # 本次 Young GC 晋升到老年代的字节数
+    promoted: float
+
+
+class GcLogParser:
+    """
+    逐行解析一次启动的 GC 日志，同时支持 Java 9+ 的统一日志与 Java 8 的 -XX:+PrintGCDetails 格式。
+    停顿行之前的各代占用按 GC 编号暂存，停顿行到达时合并为一个 GcEvent。
+    """
+
+    def __init__(self, startTime: float):
+        # 日志中没有日期时以 启动时间 + uptime 估算
+        self.startTime = startTime
+        self.regionSize = nan
+        self.lastHeapAfter = nan
+        # GC 编号 -> 老年代 (回收前, 回收后)
+        self.oldGeneration: Dict[str, Tuple[float, float]] = {}
+        self.pending: Optional[dict] = None
+
+    def feed(self, line: str) -> List[GcEvent]:
+        if line.startswith("[") and (match := _UNIFIED_LINE.match(line)) is not None:
+            return self.feedUnified(*match.groups())
+        if (match := _LEGACY_LINE.match(line)) is not None:
+            return self.feedLegacy(*match.groups())
+        if self.pending is not None and (match := _LEGACY_G1_HEAP.search(line)) is not None:
+            return self.completeG1(match)
+        return []
+
+    def flush(self) -> List[GcEvent]:
+        """输出还在等待 G1 堆占用行的事件"""
+        if (pending := self.pending) is None:
+            return []
+        self.pending = None
+        return [self.event(**pending)]
+
+    def event(
+        self,
+        time: float,
+        uptime: float,
+        name: str,
+        kind: str,
+        pauseMs: float,
+        heap: Tuple[float, float, float] = (nan, nan, nan),
+        promoted: float = nan,
+    ) -> GcEvent:
+        if isnan(time):
+            time = self.startTime + uptime
+        heapBefore, heapAfter, heapCapacity = heap
+        allocated = nan
+        if not isnan(heapBefore):
+            if not isnan(self.lastHeapAfter):
+                allocated = max(0.0, heapBefore - self.lastHeapAfter)
+            self.lastHeapAfter = heapAfter
+        if kind != "young":
+            promoted = nan
+        elif not isnan(promoted):
+            promoted = max(0.0, promoted)
+        return GcEvent(
+            time,
+            uptime,
+            name,
+            kind,
+            pauseMs,
+            heapBefore,
+            heapAfter,
+            heapCapacity,
+            allocated,
+            promoted,
+        )
+
+    def feedUnified(self, stamp: str, uptime: str, message: str) -> List[GcEvent]:
+        if (match := _UNIFIED_OLD.search(message)) is not None:
+            gcId, before, beforeUnit, after, afterUnit = match.groups()
+            # G1 以区域数记录，按启动时输出的区域大小换算
+            scale = 1 if beforeUnit else self.regionSize
+            self.oldGeneration[gcId] = (
+                _size(before, beforeUnit) * scale,
+                _size(after, afterUnit) * scale,
+            )
+            return []
+        if (match := _UNIFIED_PAUSE.search(message)) is not None:
+            gcId, name, pauseMs = match.group(1), match.group(2), float(match.group(9))
+            heap = (nan, nan, nan)
+            if match.group(3) is not None:
+                heap = tuple(_size(*match.group(i, i + 1)) for i in (3, 5, 7))
+            old = self.oldGeneration.pop(gcId, None)
+            if len(self.oldGeneration) > 64:
+                # 没有对应停顿行的记录(例如并发周期)
+                self.oldGeneration.clear()
+            if name.startswith("Pause Young"):
+                kind = "young"
+            elif name.startswith("Pause Full"):
+                kind = "full"
+            else:
+                kind = "other"
+            return [
+                self.event(
+                    _wallTime(stamp),
+                    float(uptime.replace(",", ".")),
+                    name,
+                    kind,
+                    pauseMs,
+                    heap,
+                    nan if old is None else old[1] - old[0],
+                )
+            ]
+        if isnan(self.regionSize) and (match := _UNIFIED_REGION_SIZE.search(message)) is not None:
+            self.regionSize = _size(*match.groups())
+        return []
+
+    def feedLegacy(
+        self, stamp: Optional[str], uptime: str, gcType: str, rest: str
+    ) -> List[GcEvent]:
+        rest = rest.split(" [Times:", 1)[0]
+        generations = {
+            match.group(1): tuple(_size(*match.group(i, i + 1)) for i in (2, 4, 6))
+            for match in _LEGACY_GENERATION.finditer(rest)
+        }
+        remaining = _LEGACY_GENERATION.sub("", rest)
+        # 没有耗时的是并发阶段的开始与结束，不是停顿
+        if not (durations := _LEGACY_DURATION.findall(remaining)):
+            return []
+        events = self.flush()
+        name = gcType + _LEGACY_NAME_END.split(remaining, 1)[0].rstrip()
+        young = next((generations[g] for g in generations if g in _YOUNG_GENERATIONS), None)
+        if gcType == "Full GC":
+            kind = "full"
+        elif young is not None or "(young)" in name or "(mixed)" in name:
+            kind = "young"
+        else:
+            kind = "other"
+        values = dict(
+            time=nan if stamp is None else _wallTime(stamp),
+            uptime=float(uptime.replace(",", ".")),
+            name=name,
+            kind=kind,
+            pauseMs=float(durations[-1]) * 1000,
+        )
+        if (match := _LEGACY_HEAP.search(remaining)) is None:
+            if kind != "other":
+                # G1 的堆占用在随后的 [Eden: ... Heap: ...] 行中
+                self.pending = values
+            else:
+                events.append(self.event(**values))
+            return events
+        heap = tuple(_size(*match.group(i, i + 1)) for i in (1, 3, 5))
+        promoted = nan
+        if young is not None:
+            promoted = (young[0] - young[1]) - (heap[0] - heap[1])
+        events.append(self.event(heap=heap, promoted=promoted, **values))
+        return events
+
+    def completeG1(self, match: "re.Match") -> List[GcEvent]:
+        values = [_size(*match.group(i, i + 1)) for i in range(1, 21, 2)]
+        edenBefore, _, edenAfter, _, survivorBefore, survivorAfter = values[:6]
+        heapBefore, _, heapAfter, heapCapacity = values[6:]
+        pending, self.pending = self.pending, None
+        promoted = (edenBefore + survivorBefore - edenAfter - survivorAfter) - (
+            heapBefore - heapAfter
+        )
+        return [
+            self.event(heap=(heapBefore, heapAfter, heapCapacity), promoted=promoted, **pending)
+        ]
+
+
+class GcLogTail:
+    """
+    跟踪一次启动的 GC 日志及其轮转出的文件(Java 9+ 为 gc.log.N，Java 8 为 gc.log.N.current)。
+    读取位置按文件标识(设备号与 inode / 文件索引)记录，文件被重命名后从原位置继续；
+    每次读取都重新打开文件，不会妨碍 JVM 在 Windows 上重命名它。
+    """
+
+    def __init__(self, basePath: str):
+        self.basePath = basePath
+        self.offsets: Dict[Tuple[int, int], int] = {}
+        self.remainders: Dict[Tuple[int, int], bytes] = {}
+
+    def read(self) -> List[str]:
+        pattern = escape(self.basePath)
+        entries = []
+        for filePath in glob(pattern) + glob(f"{pattern}.*"):
+            try:
+                info = stat(filePath)
+            except OSError:
+                continue
+            entries.append((info.st_mtime, filePath, (info.st_dev, info.st_ino), info.st_size))
+        # 轮转出的旧文件先于当前文件读取
+        entries.sort()
+        lines = []
+        for _, filePath, identity, size in entries:
+            offset = self.offsets.get(identity, 0)
+            if size < offset:
+                # 被截断(Java 8 重新启动时覆盖)或 inode 被复用
+                offset = 0
+                self.remainders.pop(identity, None)
+            if size == offset:
+                self.offsets[identity] = offset
+                continue
+            try:
+                with open(filePath, "rb") as f:
+                    f.seek(offset)
+                    data = f.read(size - offset)
+            except OSError:
+                continue
+            self.offsets[identity] = offset + len(data)
+            data = self.remainders.pop(identity, b"") + data
+            cut = data.rfind(b"\n") + 1
+            if cut < len(data):
+                self.remainders[identity] = data[cut:]
+            lines.extend(data[:cut].decode("utf-8", errors="replace").splitlines())
+        present = {entry[2] for entry in entries}
+        for identity in list(self.offsets):
+            if identity not in present:
+                del self.offsets[identity]
+                self.remainders.pop(identity, None)
+        return lines
+
+
+class GcLagMatch(NamedTuple):
+    """一次卡顿警告及其之前发生的 GC 停顿"""
+
+    time: float
+    behindMs: float
+    pauses: List[GcEvent]
+
+
+class GcStats:
+    """
+    一次启动的 GC 停顿分布与分配、晋升速率。
+    只由 GC 日志线程写入；界面与导出线程只读取。
+    """
+
+    BUCKETS = (5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+    RECENT_SIZE = 4096
+    # 计算速率的时间窗口(JVM 运行时间，秒)
+    RATE_WINDOW = 300
+    # 不短于此的停顿视为尖峰
+    SPIKE_MS = 100
+    # 卡顿警告之后等待 GC 日志写入的时间，以及向前查找停顿时额外放宽的时间
+    LAG_SETTLE = 10.0
+    LAG_SLACK = 5.0
+
+    def __init__(self, startTime: float):
+        self.counts = [0] * (len(self.BUCKETS) + 1)
+        self.total = 0
+        self.kinds = {"young": 0, "full": 0, "other": 0}
+        self.sumMs = 0.0
+        self.maxMs = 0.0
+        self.spikes = 0
+        self.alignedSpikes = 0
+        self.recent: Deque[GcEvent] = deque(maxlen=self.RECENT_SIZE)
+        self.lagChecked = startTime
+
+    def observe(self, event: GcEvent):
+        self.counts[bisect_left(self.BUCKETS, event.pauseMs)] += 1
+        self.total += 1
+        self.kinds[event.kind] += 1
+        self.sumMs += event.pauseMs
+        self.maxMs = max(self.maxMs, event.pauseMs)
+        self.spikes += event.pauseMs >= self.SPIKE_MS
+        self.recent.append(event)
+
+    def labels(self) -> List[str]:
+        return [f"≤{b}ms" for b in self.BUCKETS] + [f">{self.BUCKETS[-1]}ms"]
+
+    def percentile(self, q: float) -> float:
+        """按分桶估算的停顿时长百分位数(所在桶的上界)"""
+        if not self.total:
+            return nan
+        seen = 0
+        for bound, hits in zip(self.BUCKETS, self.counts):
+            seen += hits
+            if seen >= q * self.total:
+                return min(float(bound), self.maxMs)
+        return self.maxMs
+
+    def rates(self) -> Tuple[float, float]:
+        """最近 RATE_WINDOW 秒内的 (分配速率, 晋升速率)，单位为字节/秒"""
+        events = list(self.recent)
+        if len(events) < 2:
+            return nan, nan
+        start = bisect_left([e.uptime for e in events], events[-1].uptime - self.RATE_WINDOW)
+        window = events[max(0, start - 1) :]
+        span = window[-1].uptime - window[0].uptime
+        if span <= 0:
+            return nan, nan
+        allocated = [e.allocated for e in window[1:] if not isnan(e.allocated)]
+        promoted = [e.promoted for e in window[1:] if not isnan(e.promoted)]
+        return (
+            sum(allocated) / span if allocated else nan,
+            sum(promoted) / span if promoted else nan,
+        )
+
+    def matchLag(self, lagEvents: List[Tuple[float, float]], now: float) -> List[GcLagMatch]:
+        """
+        找出之前有 GC 停顿尖峰的卡顿警告。
+        每条警告在 LAG_SETTLE 秒后检查一次，查找它落后的时长(再放宽 LAG_SLACK 秒)内的停顿。
+        """
+        matches = []
+        events = list(self.recent)
+        times = [e.time for e in events]
+        for lagTime, behindMs in lagEvents:
+            if lagTime <= self.lagChecked or lagTime > now - self.LAG_SETTLE:
+                continue
+            self.lagChecked = lagTime
+            start = bisect_left(times, lagTime - behindMs / 1000 - self.LAG_SLACK)
+            end = bisect_left(times, lagTime + 1)
+            pauses = [e for e in events[start:end] if e.pauseMs >= self.SPIKE_MS]
+            if pauses:
+                self.alignedSpikes += len(pauses)
+                matches.append(GcLagMatch(lagTime, behindMs, pauses))
+        return matches
+
+
+class _GcLogTarget:
+    def __init__(self, tail: GcLogTail, startTime: float):
+        self.tail = tail
+        self.parser = GcLogParser(startTime)
+        self.stats = GcStats(startTime)
+        self.closing = False
+
+
+class _GcLogMonitorThread(QThread):
+    """
+    GC 日志线程，所有服务器共用，每 POLL_INTERVAL 秒读取一次新增的日志。
+    注销时再读取一次，以免遗漏服务器退出前写入的内容。
+    """
+
+    # 服务器名
+    updated = pyqtSignal(str)
+    # 服务器名，GcLagMatch
+    lagAligned = pyqtSignal(str, object)
+
+    POLL_INTERVAL = 2.0
+
+    def __init__(self):
+        super().__init__()
+        self.setObjectName("GcLogMonitorThread")
+        self.targets: Dict[str, _GcLogTarget] = {}
+        self.condition = Condition()
+        self.running = True
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.running and not self.targets:
+                    self.condition.wait()
+                if not self.running:
+                    return
+                if not any(target.closing for target in self.targets.values()):
+                    self.condition.wait(self.POLL_INTERVAL)
+                targets = list(self.targets.items())
+            for name, target in targets:
+                self.poll(name, target)
+                if target.closing:
+                    with self.condition:
+                        if self.targets.get(name) is target:
+                            del self.targets[name]
+
+    def poll(self, name: str, target: _GcLogTarget):
+        events = []
+        for line in target.tail.read():
+            events.extend(target.parser.feed(line))
+        if target.closing:
+            events.extend(target.parser.flush())
+        for event in events:
+            target.stats.observe(event)
+        lagEvents = list(ServerTelemetry.lagHistogram(name).recent)
+        # 服务器退出时不再等待，直接检查剩余的卡顿警告
+        now = time() + (target.stats.LAG_SETTLE if target.closing else 0)
+        for match in target.stats.matchLag(lagEvents, now):
+            self.lagAligned.emit(name, match)
+        if events:
+            self.updated.emit(name)
+
+
+class GcLogMonitor:
+    """
+    跟踪开启了 GC 日志的服务器的日志文件，统计停顿分布、分配与晋升速率，
+    并标出与 "Can't keep up" 卡顿警告同时发生的停顿尖峰。统计按服务器名保留到下一次启动。
+    """
+
+    _thread: Optional[_GcLogMonitorThread] = None
+    _logPaths: Dict[str, str] = {}
+    _tails: Dict[str, GcLogTail] = {}
+    _stats: Dict[str, GcStats] = {}
+    _lock = Lock()
+
+    @classmethod
+    def monitor(cls) -> _GcLogMonitorThread:
+        with cls._lock:
+            if cls._thread is None:
+                cls._thread = _GcLogMonitorThread()
+                cls._thread.start()
+            return cls._thread
+
+    @classmethod
+    def setLogPath(cls, serverName: str, logPath: str):
+        """由启动参数生成时调用；同一启动参数重新启动服务器时沿用同一日志"""
+        with cls._lock:
+            cls._logPaths[serverName] = logPath
+
+    @classmethod
+    def stats(cls, serverName: str) -> Optional[GcStats]:
+        with cls._lock:
+            return cls._stats.get(serverName)
+
+    @classmethod
+    def register(cls, serverName: str) -> str:
+        """开始跟踪本次启动的 GC 日志；成功时返回空字符串，否则返回原因"""
+        with cls._lock:
+            if (logPath := cls._logPaths.get(serverName)) is None:
+                return "无法识别 Java 版本，启动时没有开启 GC 日志。"
+            # 沿用同一日志时保留读取位置，上一次启动的内容不会被重复统计
+            if (tail := cls._tails.get(logPath)) is None:
+                tail = cls._tails[logPath] = GcLogTail(logPath)
+            target = _GcLogTarget(tail, time())
+            cls._stats[serverName] = target.stats
+        thread = cls.monitor()
+        with thread.condition:
+            thread.targets[serverName] = target
+            thread.condition.notify()
+        return ""
+
+    @classmethod
+    def unregister(cls, serverName: str):
+        with cls._lock:
+            thread = cls._thread
+        if thread is None:
+            return
+        with thread.condition:
+            if (target := thread.targets.get(serverName)) is not None:
+                target.closing = True
+                thread.condition.notify()
+
+    @classmethod
+    def collectMetrics(cls):
+        pauses = MetricFamily("mcsl2_gc_pauses", "counter", "GC pauses.", ("server", "kind"))
+        pauseSeconds = MetricFamily(
+            "mcsl2_gc_pause_seconds", "counter", "Total GC pause time.", ("server",)
+        )
+        maxPause = MetricFamily(
+            "mcsl2_gc_pause_max_seconds", "gauge", "Longest GC pause.", ("server",)
+        )
+        allocationRate = MetricFamily(
+            "mcsl2_gc_allocation_rate_bytes",
+            "gauge",
+            "Recent allocation rate per second.",
+            ("server",),
+        )
+        promotionRate = MetricFamily(
+            "mcsl2_gc_promotion_rate_bytes",
+            "gauge",
+            "Recent promotion rate per second.",
+            ("server",),
+        )
+        alignedSpikes = MetricFamily(
+            "mcsl2_gc_lag_aligned_pauses",
+            "counter",
+            "GC pause spikes preceding Can't keep up warnings.",
+            ("server",),
+        )
+        with cls._lock:
+            allStats = list(cls._stats.items())
+        for serverName, stats in allStats:
+            for kind, count in stats.kinds.items():
+                pauses.labels(serverName, kind).set(count)
+            pauseSeconds.labels(serverName).set(stats.sumMs / 1000)
+            maxPause.labels(serverName).set(stats.maxMs / 1000)
+            allocation, promotion = stats.rates()
+            allocationRate.labels(serverName).set(allocation)
+            promotionRate.labels(serverName).set(promotion)
+            alignedSpikes.labels(serverName).set(stats.alignedSpikes)
+        return pauses, pauseSeconds, maxPause, allocationRate, promotionRate, alignedSpikes
+
+    @classmethod
+    def shutDown(cls):
+        with cls._lock:
+            thread, cls._thread = cls._thread, None
+        if thread is None:
+            return
+        with thread.condition:
+            thread.running = False
+            thread.condition.notify()
+        thread.wait()
+
+
+MetricsRegistry.addCollector(GcLogMonitor.collectMetrics)
@@ -0,0 +1,318 @@
+#     Copyright 2024, MCSL Team, mailto:services@mcsl.com.cn
+#
+#     Part of "MCSL2", a simple and multifunctional Minecraft server launcher.
+#
+#     Licensed under the GNU General Public License, Version 3.0, with our
+#     additional agreements. (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#        https://github.com/MCSLTeam/MCSL2/raw/master/LICENSE
+#
+################################################################################
+"""
+Heap dumps on OutOfMemoryError: JVM arguments, rotation and a streaming HPROF class histogram.
+"""
+
+import mmap
+import multiprocessing
+import struct
+from glob import glob
+from os import makedirs, path as osp, remove
+from typing import Dict, List, Tuple
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+# 相对服务器目录
+HEAP_DUMP_DIR = "heapdumps"
+SUMMARY_SUFFIX = ".txt"
+
+_HPROF_MAGIC = b"JAVA PROFILE "
+_TAG_UTF8 = 0x01
+_TAG_LOAD_CLASS = 0x02
+_TAG_HEAP_DUMP = 0x0C
+_TAG_HEAP_DUMP_SEGMENT = 0x1C
+
+_CLASS_DUMP = 0x20
+_INSTANCE_DUMP = 0x21
+_OBJ_ARRAY_DUMP = 0x22
+_PRIM_ARRAY_DUMP = 0x23
+
+# 基本类型的大小，2 (对象引用) 的大小取决于转储的 ID 长度
+_TYPE_SIZES = {4: 1, 5: 2, 6: 4, 7: 8, 8: 1, 9: 2, 10: 4, 11: 8}
+_PRIM_ARRAY_NAMES = {
+    4: "boolean[]",
+    5: "char[]",
+    6: "float[]",
+    7: "double[]",
+    8: "byte[]",
+    9: "short[]",
+    10: "int[]",
+    11: "long[]",
+}
+_PRIM_NAMES = {"Z": "boolean", "C": "char", "F": "float", "D": "double"}
+_PRIM_NAMES.update({"B": "byte", "S": "short", "I": "int", "J": "long"})
+
+
+def heapDumpDirectory(serverName: str) -> str:
+    return osp.abspath(osp.join("Servers", serverName, HEAP_DUMP_DIR))
+
+
+def heapDumpJVMArgs(serverName: str) -> List[str]:
+    """JVM 只会在已存在的目录中生成 java_pid<pid>.hprof，启动前须先调用 prepareHeapDumps"""
+    return ["-XX:+HeapDumpOnOutOfMemoryError", f"-XX:HeapDumpPath={heapDumpDirectory(serverName)}"]
+
+
+def prepareHeapDumps(serverName: str, budget: int):
+    """启动前建立转储目录，并按预算清理旧转储，为新的转储腾出空间"""
+    directory = heapDumpDirectory(serverName)
+    makedirs(directory, exist_ok=True)
+    pruneHeapDumps(directory, budget)
+
+
+def listHeapDumps(directory: str) -> List[str]:
+    """按修改时间从新到旧排列"""
+    return sorted(glob(osp.join(directory, "*.hprof")), key=osp.getmtime, reverse=True)
+
+
+def pruneHeapDumps(directory: str, budget: int) -> List[str]:
+    """
+    删除旧的转储及其摘要，使总大小不超过 budget 字节。
+    最新的转储始终保留，即使它本身已超出预算。返回被删除的文件。
+    """
+    removed = []
+    total = 0
+    for index, dumpPath in enumerate(listHeapDumps(directory)):
+        try:
+            total += osp.getsize(dumpPath)
+            if index == 0 or total <= budget:
+                continue
+            remove(dumpPath)
+            removed.append(dumpPath)
+            if osp.exists(summary := dumpPath + SUMMARY_SUFFIX):
+                remove(summary)
+        except OSError:
+            continue
+    return removed
+
+
+def _formatSize(size: float) -> str:
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.2f} GB"
+
+
+def _javaClassName(name: str) -> str:
+    """java/lang/String -> java.lang.String，[Ljava/lang/Object; -> java.lang.Object[]"""
+    dimensions = len(name) - len(name.lstrip("["))
+    if dimensions:
+        element = name[dimensions:]
+        if element.startswith("L") and element.endswith(";"):
+            element = element[1:-1]
+        else:
+            element = _PRIM_NAMES.get(element, element)
+        name = element + "[]" * dimensions
+    return name.replace("/", ".")
+
+
+def _packageOf(className: str, depth: int = 3) -> str:
+    className = className.rstrip("[]")
+    if "." not in className:
+        return "(基本类型)" if className in _PRIM_NAMES.values() else "(默认包)"
+    return ".".join(className.split(".")[:-1][:depth])
+
+
+class HprofHistogram:
+    """
+    顺序扫描 HPROF 文件，统计每个类的实例数与实例数据大小(不含对象头)。
+    文件通过内存映射按需分页读取，不会整体载入内存；只保留类名与计数。
+    """
+
+    def __init__(self, filePath: str):
+        self.filePath = filePath
+        self.idSize = 4
+        self.idFormat = ">I"
+        # 类对象 ID -> [实例数, 字节数]；基本类型数组以类型名为键
+        self.counts: Dict[object, List[int]] = {}
+        self.classNameIds: Dict[int, int] = {}
+        self.stringOffsets: Dict[int, Tuple[int, int]] = {}
+        self.objects = 0
+        self.truncated = False
+
+    def parse(self) -> "HprofHistogram":
+        with open(self.filePath, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            if m[: len(_HPROF_MAGIC)] != _HPROF_MAGIC:
+                raise ValueError("not a HPROF heap dump")
+            position = m.find(b"\0") + 1
+            self.idSize = struct.unpack_from(">I", m, position)[0]
+            self.idFormat = ">I" if self.idSize == 4 else ">Q"
+            position += 12
+            size = len(m)
+            while position + 9 <= size:
+                tag, _, length = struct.unpack_from(">BII", m, position)
+                position += 9
+                end = position + length
+                if end > size:
+                    self.truncated = True
+                    end = size
+                if tag == _TAG_UTF8:
+                    stringId = struct.unpack_from(self.idFormat, m, position)[0]
+                    self.stringOffsets[stringId] = (position + self.idSize, end)
+                elif tag == _TAG_LOAD_CLASS:
+                    classId, _, nameId = struct.unpack_from(
+                        f">{self.idFormat[1]}I{self.idFormat[1]}", m, position + 4
+                    )
+                    self.classNameIds[classId] = nameId
+                elif tag in (_TAG_HEAP_DUMP, _TAG_HEAP_DUMP_SEGMENT):
+                    self.parseHeapDump(m, position, end)
+                position = end
+            self.classNames = {
+                classId: _javaClassName(self.string(m, nameId))
+                for classId, nameId in self.classNameIds.items()
+            }
+        return self
+
+    def string(self, m, stringId: int) -> str:
+        if (offsets := self.stringOffsets.get(stringId)) is None:
+            return f"<unknown 0x{stringId:x}>"
+        return m[offsets[0] : offsets[1]].decode("utf-8", errors="replace")
+
+    def parseHeapDump(self, m, position: int, end: int):
+        idSize = self.idSize
+        idChar = self.idFormat[1]
+        instance = struct.Struct(f">{idChar}I{idChar}I")
+        array = struct.Struct(f">{idChar}II{idChar}")
+        primArray = struct.Struct(f">{idChar}IIB")
+        # GC 根记录：标签 -> 长度
+        roots = {0xFF: idSize, 0x01: idSize * 2, 0x02: idSize + 8, 0x03: idSize + 8}
+        roots.update({0x04: idSize + 4, 0x05: idSize, 0x06: idSize + 4, 0x07: idSize})
+        roots[0x08] = idSize + 8
+        counts = self.counts
+        objects = 0
+        try:
+            while position < end:
+                tag = m[position]
+                position += 1
+                if tag == _INSTANCE_DUMP:
+                    _, _, classId, length = instance.unpack_from(m, position)
+                    position += instance.size + length
+                    key, size = classId, length
+                elif tag == _OBJ_ARRAY_DUMP:
+                    _, _, elements, classId = array.unpack_from(m, position)
+                    position += array.size + elements * idSize
+                    key, size = classId, elements * idSize
+                elif tag == _PRIM_ARRAY_DUMP:
+                    _, _, elements, elementType = primArray.unpack_from(m, position)
+                    size = elements * _TYPE_SIZES[elementType]
+                    position += primArray.size + size
+                    key = _PRIM_ARRAY_NAMES[elementType]
+                elif tag == _CLASS_DUMP:
+                    position = self.skipClassDump(m, position)
+                    continue
+                elif tag in roots:
+                    position += roots[tag]
+                    continue
+                else:
+                    # 无法识别的子记录，无法得知其长度，跳过本段剩余部分
+                    self.truncated = True
+                    break
+                objects += 1
+                if (entry := counts.get(key)) is None:
+                    counts[key] = [1, size]
+                else:
+                    entry[0] += 1
+                    entry[1] += size
+        except (struct.error, IndexError, KeyError):
+            # 转储写入过程中进程被结束等情况
+            self.truncated = True
+        self.objects += objects
+
+    def skipClassDump(self, m, position: int) -> int:
+        """类定义只需跳过：常量池、静态字段(均带值)与实例字段声明"""
+        idSize = self.idSize
+        position += idSize * 7 + 8
+        count = struct.unpack_from(">H", m, position)[0]
+        position += 2
+        for _ in range(count):
+            valueType = m[position + 2]
+            position += 3 + (idSize if valueType == 2 else _TYPE_SIZES[valueType])
+        count = struct.unpack_from(">H", m, position)[0]
+        position += 2
+        for _ in range(count):
+            valueType = m[position + idSize]
+            position += idSize + 1 + (idSize if valueType == 2 else _TYPE_SIZES[valueType])
+        count = struct.unpack_from(">H", m, position)[0]
+        return position + 2 + count * (idSize + 1)
+
+    def histogram(self) -> List[Tuple[str, int, int]]:
+        """[(类名, 实例数, 字节数), ...]，按字节数从大到小排列"""
+        rows = [
+            (key if isinstance(key, str) else self.classNames.get(key, f"<class 0x{key:x}>"), *v)
+            for key, v in self.counts.items()
+        ]
+        rows.sort(key=lambda row: row[2], reverse=True)
+        return rows
+
+
+def summarizeHeapDump(filePath: str, top: int = 30) -> str:
+    """在子进程中运行，返回可直接显示的摘要"""
+    histogram = HprofHistogram(filePath).parse()
+    rows = histogram.histogram()
+    totalSize = sum(row[2] for row in rows)
+    packages: Dict[str, List[int]] = {}
+    for className, count, size in rows:
+        entry = packages.setdefault(_packageOf(className), [0, 0])
+        entry[0] += count
+        entry[1] += size
+    lines = [
+        f"堆转储：{osp.basename(filePath)} ({_formatSize(osp.getsize(filePath))})",
+        f"共 {histogram.objects} 个对象，实例数据 {_formatSize(totalSize)} (不含对象头)",
+    ]
+    if histogram.truncated:
+        lines.append("转储文件不完整或含有无法识别的记录，以下结果仅包含已解析的部分。")
+    lines.append(f"\n占用最多的类 (前 {top} 个)：")
+    for className, count, size in rows[:top]:
+        lines.append(f"  {_formatSize(size):>10}  {count:>10} 个  {className}")
+    lines.append(f"\n按包汇总 (前 {top} 个，可据此判断泄漏来自哪个模组或插件)：")
+    for package, (count, size) in sorted(packages.items(), key=lambda p: p[1][1], reverse=True)[
+        :top
+    ]:
+        lines.append(f"  {_formatSize(size):>10}  {count:>10} 个  {package}")
+    return "\n".join(lines)
+
+
+class HeapDumpAnalyzeThread(QThread):
+    """在单独的进程中生成转储摘要并保存在转储旁边，随后按预算清理旧转储"""
+
+    resultReady = pyqtSignal(str, str)
+
+    def __init__(self, dumpPath: str, budget: int, parent=None):
+        super().__init__(parent)
+        self.dumpPath = dumpPath
+        self.budget = budget
+        self.cancelled = False
+
+    def cancel(self):
+        """终止分析进程，例如窗口关闭时"""
+        self.cancelled = True
+
+    def run(self):
+        try:
+            with multiprocessing.get_context("spawn").Pool(1) as pool:
+                result = pool.apply_async(summarizeHeapDump, (self.dumpPath,))
+                while not result.ready():
+                    if self.cancelled:
+                        return
+                    result.wait(0.2)
+                summary = result.get()
+            with open(self.dumpPath + SUMMARY_SUFFIX, "w", encoding="utf-8") as f:
+                f.write(summary)
+        except Exception as e:
+            from MCSL2Lib.utils import MCSL2Logger
+
+            MCSL2Logger.error(msg=f"summarize heap dump {self.dumpPath} failed", exc=e)
+            summary = f"分析堆转储失败：{e}"
+        pruneHeapDumps(osp.dirname(self.dumpPath), self.budget)
+        self.resultReady.emit(self.dumpPath, summary)
@@ -0,0 +1,186 @@
+#     Copyright 2024, MCSL Team, mailto:services@mcsl.com.cn
+#
+#     Part of "MCSL2", a simple and multifunctional Minecraft server launcher.
+#
+#     Licensed under the GNU General Public License, Version 3.0, with our
+#     additional agreements. (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#        https://github.com/MCSLTeam/MCSL2/raw/master/LICENSE
+#
+################################################################################
+"""
+Finding the Java threads that burn CPU, from per-thread OS CPU times and jcmd Thread.print.
+"""
+
+import re
+from time import monotonic, strftime
+from typing import Dict, List, NamedTuple, Optional
+
+from psutil import AccessDenied, NoSuchProcess, Process, ZombieProcess
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from MCSL2Lib.ServerControllers.jdkTools import JdkToolBudget, jdkToolPath, runJdkTool
+
+# "Server thread" #30 prio=5 os_prio=0 cpu=1234.56ms elapsed=100.00s tid=0x... nid=0x1a2b runnable
+# JDK 19 起 nid 以十进制输出
+_THREAD_HEADER = re.compile(r'^"(?P<name>.*)" .*?\bnid=(?P<nid>0x[0-9a-fA-F]+|\d+)\b')
+_THREAD_STATE = re.compile(r"^\s+java\.lang\.Thread\.State: (\S+)")
+
+
+class JavaThread(NamedTuple):
+    name: str
+    state: str
+    # 栈帧与锁信息，已去掉缩进
+    stack: List[str]
+
+
+class HotThread(NamedTuple):
+    nid: int
+    name: str
+    # 采样窗口内占一个核心的百分比
+    cpu: float
+    state: str
+    stack: List[str]
+
+
+def parseThreadDump(output: str) -> Dict[int, JavaThread]:
+    """按本地线程 ID (nid) 解析 jcmd Thread.print 的输出，包括 GC、JIT 等没有调用栈的 VM 线程"""
+    threads: Dict[int, JavaThread] = {}
+    current: Optional[int] = None
+    for line in output.splitlines():
+        if (match := _THREAD_HEADER.match(line)) is not None:
+            current = int(match.group("nid"), 0)
+            threads[current] = JavaThread(match.group("name"), "", [])
+            if " runnable" in line:
+                threads[current] = threads[current]._replace(state="RUNNABLE")
+            continue
+        if current is None:
+            continue
+        if not line.strip():
+            current = None
+        elif (match := _THREAD_STATE.match(line)) is not None:
+            threads[current] = threads[current]._replace(state=match.group(1))
+        else:
+            threads[current].stack.append(line.strip())
+    return threads
+
+
+def threadCpuTimes(process: Process) -> Dict[int, float]:
+    """进程内各线程的累计 CPU 时间(秒)，以操作系统线程 ID 为键"""
+    return {thread.id: thread.user_time + thread.system_time for thread in process.threads()}
+
+
+def hottestThreads(
+    before: Dict[int, float], after: Dict[int, float], elapsed: float, count: int
+) -> List[tuple]:
+    """采样窗口内 CPU 占用最高的线程 (线程 ID, 百分比)；窗口内新建的线程的全部 CPU 时间都在窗口内"""
+    if elapsed <= 0:
+        return []
+    usage = [(tid, (cpu - before.get(tid, 0.0)) / elapsed * 100) for tid, cpu in after.items()]
+    usage.sort(key=lambda item: -item[1])
+    return usage[:count]
+
+
+def formatHotThreads(
+    threads: List[HotThread], elapsed: float, totalCpu: float, stale: bool = False
+) -> str:
+    lines = [
+        f"{strftime('%H:%M:%S')} 采样 {elapsed:.1f} 秒，进程共占 {totalCpu:.0f}% (一个核心为 100%)"
+    ]
+    if not threads:
+        lines.append(f"没有线程超过 {HotThreadsThread.THRESHOLD:.0f}%。")
+    elif stale:
+        lines.append("JDK 工具预算冷却中，线程名与调用栈来自上一次的线程转储。")
+    for thread in threads:
+        lines.append(
+            f'\n{thread.cpu:>5.1f}%  "{thread.name}"  nid={thread.nid} (0x{thread.nid:x})'
+            f"  {thread.state}"
+        )
+        lines.extend(f"    {frame}" for frame in thread.stack[: HotThreadsThread.STACK_DEPTH])
+        if len(thread.stack) > HotThreadsThread.STACK_DEPTH:
+            lines.append(f"    ... 另有 {len(thread.stack) - HotThreadsThread.STACK_DEPTH} 行")
+    return "\n".join(lines)
+
+
+class HotThreadsThread(QThread):
+    """
+    每隔 interval 秒读取一次服务器进程各线程的 CPU 时间，与上一次相减得到窗口内的占用；
+    有线程超过 THRESHOLD 时才运行 jcmd Thread.print，按 nid 对应到 Java 线程名与当前调用栈。
+    psutil 读取线程时间的开销很小，jcmd 的 CPU 时间计入 JdkToolBudget，
+    预算冷却期间沿用上一次的线程转储。
+    """
+
+    # 报告文本，最高的线程名与占用
+    sampled = pyqtSignal(str, str, float)
+    # 无法继续采样的原因
+    failed = pyqtSignal(str)
+
+    TOP = 5
+    STACK_DEPTH = 12
+    # 占一个核心的百分比
+    THRESHOLD = 5.0
+
+    def __init__(self, pid: int, javaPath: str, interval: float, parent=None):
+        super().__init__(parent)
+        self.pid = pid
+        self.javaPath = javaPath
+        self.interval = interval
+        self.running = True
+        # 没有线程名时(预算冷却、jcmd 失败)沿用上一次的线程名
+        self.names: Dict[int, JavaThread] = {}
+
+    def stop(self):
+        self.running = False
+
+    def sleep(self, seconds: float) -> bool:
+        """分段睡眠以便及时响应 stop()；被停止时返回 False"""
+        deadline = monotonic() + seconds
+        while self.running and (remaining := deadline - monotonic()) > 0:
+            self.msleep(int(min(remaining, 0.2) * 1000) + 1)
+        return self.running
+
+    def run(self):
+        if (jcmd := jdkToolPath(self.javaPath, "jcmd")) is None:
+            self.failed.emit(f"{self.javaPath} 所在目录中没有 jcmd，请使用 JDK 而不是 JRE。")
+            return
+        try:
+            process = Process(self.pid)
+            before, beforeTime = threadCpuTimes(process), monotonic()
+            processBefore = sum(process.cpu_times()[:2])
+        except (NoSuchProcess, ZombieProcess, AccessDenied) as e:
+            self.failed.emit(f"无法读取服务器进程的线程：{e}")
+            return
+        while self.sleep(self.interval):
+            try:
+                after, afterTime = threadCpuTimes(process), monotonic()
+                processAfter = sum(process.cpu_times()[:2])
+            except (NoSuchProcess, ZombieProcess, AccessDenied) as e:
+                self.failed.emit(f"无法读取服务器进程的线程：{e}")
+                return
+            elapsed = afterTime - beforeTime
+            # 窗口内退出的线程不在 after 中，进程总占用改用进程的 CPU 时间
+            totalCpu = processAfter - processBefore
+            usage = hottestThreads(before, after, elapsed, self.TOP)
+            before, beforeTime, processBefore = after, afterTime, processAfter
+            hot = [(tid, cpu) for tid, cpu in usage if cpu >= self.THRESHOLD]
+            stale = bool(hot)
+            if hot and JdkToolBudget.delay() == 0:
+                result = runJdkTool(jcmd, [str(self.pid), "Thread.print"], timeout=15)
+                if result.returnCode == 0:
+                    self.names = parseThreadDump(result.output)
+                    stale = False
+            threads = [
+                HotThread(tid, javaThread.name, cpu, javaThread.state, javaThread.stack)
+                if (javaThread := self.names.get(tid)) is not None
+                else HotThread(tid, "(未知线程)", cpu, "", [])
+                for tid, cpu in hot
+            ]
+            self.sampled.emit(
+                formatHotThreads(
+                    threads, elapsed, totalCpu / elapsed * 100 if elapsed else 0, stale
+                ),
+                threads[0].name if threads else "",
+                threads[0].cpu if threads else 0.0,
+            )
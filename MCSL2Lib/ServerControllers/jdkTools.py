@@ -0,0 +1,158 @@
+#     Copyright 2024, MCSL Team, mailto:services@mcsl.com.cn
+#
+#     Part of "MCSL2", a simple and multifunctional Minecraft server launcher.
+#
+#     Licensed under the GNU General Public License, Version 3.0, with our
+#     additional agreements. (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#        https://github.com/MCSLTeam/MCSL2/raw/master/LICENSE
+#
+################################################################################
+"""
+Locating and running the JDK diagnostic tools (jstat, jcmd, jfr) that ship with a server's Java.
+"""
+
+import re
+import subprocess
+from os import path as osp
+from shutil import which
+from threading import Event, Lock, Timer
+from time import monotonic
+from typing import Dict, List, NamedTuple, Optional
+
+from psutil import WINDOWS
+
+from MCSL2Lib.ProgramControllers.settingsController import cfg
+
+if WINDOWS:
+    from ctypes import byref, windll, wintypes
+else:
+    from os import WEXITSTATUS, WIFSIGNALED, WTERMSIG, wait4
+
+# release 文件中的 JAVA_VERSION="17.0.9"，或 java -version 输出的 version "1.8.0_392"
+_VERSION_PATTERN = re.compile(r'(?:JAVA_VERSION=|version )"(\d+)(?:\.(\d+))?')
+_javaVersions: Dict[str, Optional[int]] = {}
+_javaVersionsLock = Lock()
+
+
+class JdkToolResult(NamedTuple):
+    returnCode: int
+    output: str
+    # 工具进程消耗的 CPU 时间(用户态与内核态之和)，计入 CPU 预算
+    cpuTime: float
+
+
+def jdkToolPath(javaPath: str, tool: str) -> Optional[str]:
+    """
+    与服务器所用 java 位于同一 bin 目录的 JDK 工具。
+    javaPath 为 PATH 中的命令时解析符号链接找到真实的安装目录；只安装了 JRE 时返回 None。
+    """
+    java = javaPath if osp.dirname(javaPath) else which(javaPath)
+    if not java:
+        return None
+    binDir = osp.dirname(osp.realpath(java))
+    candidate = osp.join(binDir, f"{tool}.exe" if WINDOWS else tool)
+    return candidate if osp.isfile(candidate) else None
+
+
+def javaMajorVersion(javaPath: str) -> Optional[int]:
+    """
+    Java 的主版本号(1.8 记为 8)，按真实路径缓存。
+    优先读取安装目录中的 release 文件，没有时运行一次 java -version；无法识别时返回 None。
+    """
+    java = javaPath if osp.dirname(javaPath) else which(javaPath)
+    if not java:
+        return None
+    java = osp.realpath(java)
+    with _javaVersionsLock:
+        if java in _javaVersions:
+            return _javaVersions[java]
+    release = osp.join(osp.dirname(osp.dirname(java)), "release")
+    try:
+        with open(release, "r", encoding="utf-8", errors="replace") as f:
+            match = _VERSION_PATTERN.search(f.read())
+    except OSError:
+        match = None
+    if match is None:
+        match = _VERSION_PATTERN.search(runJdkTool(java, ["-version"], timeout=15).output)
+    version = None
+    if match is not None:
+        version = int(match.group(1))
+        if version == 1 and match.group(2):
+            version = int(match.group(2))
+    with _javaVersionsLock:
+        _javaVersions[java] = version
+    return version
+
+
+def _waitCpuTime(process: subprocess.Popen) -> float:
+    """等待进程退出，返回其消耗的 CPU 时间；只统计该进程，不受其他子进程(如服务器)退出的影响"""
+    if WINDOWS:
+        process.wait()
+        # Popen 仍持有进程句柄，退出后依然可以读取，单位为 100 纳秒
+        times = [wintypes.FILETIME() for _ in range(4)]
+        if not windll.kernel32.GetProcessTimes(int(process._handle), *map(byref, times)):
+            return 0.0
+        return sum(t.dwHighDateTime << 32 | t.dwLowDateTime for t in times[2:]) / 1e7
+    _, status, usage = wait4(process.pid, 0)
+    process.returncode = -WTERMSIG(status) if WIFSIGNALED(status) else WEXITSTATUS(status)
+    return usage.ru_utime + usage.ru_stime
+
+
+def runJdkTool(toolPath: str, args: List[str], timeout: float = 30.0) -> JdkToolResult:
+    """运行一次 JDK 工具并计入 CPU 预算；Windows 上不弹出控制台窗口"""
+    start = monotonic()
+    try:
+        process = subprocess.Popen(
+            [toolPath, *args],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            stdin=subprocess.DEVNULL,
+            creationflags=subprocess.CREATE_NO_WINDOW if WINDOWS else 0,
+        )
+    except OSError as e:
+        return JdkToolResult(-1, str(e), 0.0)
+    timedOut = Event()
+
+    def kill():
+        timedOut.set()
+        process.kill()
+
+    timer = Timer(timeout, kill)
+    timer.start()
+    with process.stdout:
+        # 工具退出或超时被结束时读到 EOF
+        output = process.stdout.read().decode("utf-8", errors="replace")
+    timer.cancel()
+    cpuTime = _waitCpuTime(process)
+    returnCode = process.returncode
+    if timedOut.is_set():
+        returnCode, output = -1, f"{osp.basename(toolPath)} timed out after {timeout:.0f}s"
+    JdkToolBudget.charge(cpuTime, start)
+    return JdkToolResult(returnCode, output, cpuTime)
+
+
+class JdkToolBudget:
+    """
+    所有 JDK 工具调用共用的 CPU 预算(占一个核心的百分比)。
+    每个工具都要启动一个 JVM，其消耗的 CPU 时间按预算折算为冷却时间(自调用开始计算)，
+    周期性的采样在冷却结束前不会再启动新的工具进程。
+    """
+
+    _lock = Lock()
+    _nextAllowed = 0.0
+
+    @classmethod
+    def charge(cls, cpuTime: float, start: float):
+        """start 为工具进程启动时的 monotonic() 时间"""
+        budget = cfg.get(cfg.jdkToolCpuBudget) / 100
+        with cls._lock:
+            cls._nextAllowed = max(cls._nextAllowed, start) + cpuTime / budget
+
+    @classmethod
+    def delay(cls) -> float:
+        """距离下一次允许周期性调用还有多少秒"""
+        with cls._lock:
+            return max(0.0, cls._nextAllowed - monotonic())
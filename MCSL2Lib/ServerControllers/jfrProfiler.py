@@ -0,0 +1,417 @@
+#     Copyright 2024, MCSL Team, mailto:services@mcsl.com.cn
+#
+#     Part of "MCSL2", a simple and multifunctional Minecraft server launcher.
+#
+#     Licensed under the GNU General Public License, Version 3.0, with our
+#     additional agreements. (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#        https://github.com/MCSLTeam/MCSL2/raw/master/LICENSE
+#
+################################################################################
+"""
+Time-bounded Java Flight Recorder captures and hot-method summaries of running servers.
+"""
+
+import io
+import json
+import multiprocessing
+import re
+import subprocess
+from glob import glob
+from os import makedirs, path as osp, remove
+from time import monotonic, strftime
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple
+
+from PyQt5.QtCore import QThread, pyqtSignal
+from psutil import WINDOWS
+
+from MCSL2Lib.ServerControllers.jdkTools import jdkToolPath, runJdkTool
+
+# 相对服务器目录
+RECORDING_DIR = "recordings"
+SUMMARY_SUFFIX = ".txt"
+# 机器可读的摘要，用于与上一次录制对比
+DATA_SUFFIX = ".json"
+
+_EVENTS = (
+    "jdk.ExecutionSample",
+    "jdk.ObjectAllocationSample",
+    "jdk.ObjectAllocationInNewTLAB",
+    "jdk.ObjectAllocationOutsideTLAB",
+    "jdk.JavaMonitorEnter",
+    "jdk.ThreadPark",
+)
+# 不属于任何模组或插件的包；调用栈中第一个不在其中的帧决定归属
+_CORE_PREFIXES = (
+    "java.",
+    "javax.",
+    "jdk.",
+    "sun.",
+    "com.sun.",
+    "net.minecraft.",
+    "com.mojang.",
+    "it.unimi.dsi.",
+    "io.netty.",
+    "com.google.",
+    "org.apache.",
+    "org.bukkit.craftbukkit.",
+    "io.papermc.paper.",
+    "net.minecraftforge.",
+    "net.neoforged.",
+    "net.fabricmc.",
+    "org.spongepowered.asm.",
+)
+_JDK_PREFIXES = ("java.", "javax.", "jdk.", "sun.", "com.sun.")
+_CORE_OWNER = "(Minecraft / JDK)"
+_DURATION_PATTERN = re.compile(r"PT(?:([\d.]+)H)?(?:([\d.]+)M)?(?:([\d.]+)S)?")
+_READ_SIZE = 1 << 20
+_TOP = 20
+
+
+def recordingDirectory(serverName: str) -> str:
+    return osp.abspath(osp.join("Servers", serverName, RECORDING_DIR))
+
+
+def listRecordings(directory: str) -> List[str]:
+    """按修改时间从新到旧排列"""
+    return sorted(glob(osp.join(directory, "*.jfr")), key=osp.getmtime, reverse=True)
+
+
+def pruneRecordings(directory: str, budget: int) -> List[str]:
+    """
+    删除旧的录制及其摘要，使总大小不超过 budget 字节。
+    最新的录制始终保留，即使它本身已超出预算。返回被删除的文件。
+    """
+    removed = []
+    total = 0
+    for index, recordingPath in enumerate(listRecordings(directory)):
+        try:
+            total += osp.getsize(recordingPath)
+            if index == 0 or total <= budget:
+                continue
+            remove(recordingPath)
+            removed.append(recordingPath)
+            for suffix in (SUMMARY_SUFFIX, DATA_SUFFIX):
+                if osp.exists(summary := recordingPath + suffix):
+                    remove(summary)
+        except OSError:
+            continue
+    return removed
+
+
+def _seconds(value) -> float:
+    """jfr print --json 中的时长为 ISO 8601 字符串(PT0.0215S)"""
+    if isinstance(value, (int, float)):
+        return value / 1e9
+    if isinstance(value, str) and (match := _DURATION_PATTERN.fullmatch(value)) is not None:
+        hours, minutes, seconds = (float(group or 0) for group in match.groups())
+        return hours * 3600 + minutes * 60 + seconds
+    return 0.0
+
+
+def _formatSize(size: float) -> str:
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.2f} GB"
+
+
+def _frames(values: dict) -> List[Tuple[str, str, int]]:
+    """调用栈，从栈顶开始的 (类名, 方法名, 行号)"""
+    frames = []
+    for frame in (values.get("stackTrace") or {}).get("frames") or ():
+        method = frame.get("method") or {}
+        className = ((method.get("type") or {}).get("name") or "?").replace("/", ".")
+        frames.append((className, method.get("name") or "?", frame.get("lineNumber") or 0))
+    return frames
+
+
+def _ownerOf(frames: List[Tuple[str, str, int]]) -> str:
+    """调用栈中第一个模组或插件的包(前三级)"""
+    for className, _, _ in frames:
+        if not className.startswith(_CORE_PREFIXES):
+            return ".".join(className.split(".")[:-1][:3]) or "(默认包)"
+    return _CORE_OWNER
+
+
+def _site(frames: List[Tuple[str, str, int]]) -> str:
+    """跳过 JDK 自身的帧，例如集合扩容与锁的实现"""
+    for className, methodName, line in frames:
+        if not className.startswith(_JDK_PREFIXES):
+            return f"{className}.{methodName}:{line}"
+    if frames:
+        className, methodName, line = frames[0]
+        return f"{className}.{methodName}:{line}"
+    return "(无调用栈)"
+
+
+def _className(value) -> str:
+    return ((value or {}).get("name") or "?").replace("/", ".")
+
+
+def iterJfrEvents(stream: TextIO) -> Iterator[dict]:
+    """
+    从 jfr print --json 的输出中逐个解码事件，不把整份输出载入内存。
+    输出为 {"recording": {"events": [...]}}，只有事件数组中的对象会被解码。
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    while True:
+        if (index := buffer.find('"events"')) >= 0 and (start := buffer.find("[", index)) >= 0:
+            break
+        if not (chunk := stream.read(_READ_SIZE)):
+            return
+        buffer += chunk
+    position = start + 1
+    eof = False
+    while True:
+        while position < len(buffer) and buffer[position] in " \t\r\n,":
+            position += 1
+        if position < len(buffer):
+            if buffer[position] == "]":
+                return
+            try:
+                event, position = decoder.raw_decode(buffer, position)
+                yield event
+                continue
+            except json.JSONDecodeError:
+                # 对象不完整，读取更多内容后重新解码
+                pass
+        if eof:
+            return
+        if not (chunk := stream.read(_READ_SIZE)):
+            eof = True
+        buffer = buffer[position:] + chunk
+        position = 0
+
+
+def _add(table: Dict[str, list], key: str, *values: float):
+    if (entry := table.get(key)) is None:
+        entry = table[key] = [0.0] * len(values)
+    for i, value in enumerate(values):
+        entry[i] += value
+
+
+def _top(table: Dict[str, list], count: int = _TOP) -> List[list]:
+    return [[key, *values] for key, values in sorted(table.items(), key=lambda i: -i[1][0])][:count]
+
+
+def summarizeRecording(jfrTool: str, recordingPath: str) -> dict:
+    """在子进程中运行 jfr print --json 并统计，返回可写入 JSON 的摘要"""
+    hotMethods: Dict[str, list] = {}
+    cpuByOwner: Dict[str, list] = {}
+    allocationSites: Dict[str, list] = {}
+    allocationClasses: Dict[str, list] = {}
+    allocationByOwner: Dict[str, list] = {}
+    lockSites: Dict[str, list] = {}
+    lockClasses: Dict[str, list] = {}
+    samples = 0
+    process = subprocess.Popen(
+        [jfrTool, "print", "--json", "--events", ",".join(_EVENTS), recordingPath],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        stdin=subprocess.DEVNULL,
+        creationflags=subprocess.CREATE_NO_WINDOW if WINDOWS else 0,
+    )
+    try:
+        stream = io.TextIOWrapper(process.stdout, encoding="utf-8", errors="replace")
+        for event in iterJfrEvents(stream):
+            eventType = event.get("type") or ""
+            values = event.get("values") or {}
+            frames = _frames(values)
+            if eventType == "jdk.ExecutionSample":
+                samples += 1
+                if frames:
+                    className, methodName, _ = frames[0]
+                    _add(hotMethods, f"{className}.{methodName}", 1)
+                _add(cpuByOwner, _ownerOf(frames), 1)
+            elif eventType.startswith("jdk.ObjectAllocation"):
+                size = values.get("weight") or values.get("tlabSize")
+                size = size or values.get("allocationSize") or 0
+                _add(allocationSites, _site(frames), size)
+                _add(allocationClasses, _className(values.get("objectClass")), size)
+                _add(allocationByOwner, _ownerOf(frames), size)
+            elif eventType in ("jdk.JavaMonitorEnter", "jdk.ThreadPark"):
+                seconds = _seconds(values.get("duration"))
+                lock = values.get("monitorClass") or values.get("parkedClass")
+                _add(lockSites, _site(frames), seconds, 1)
+                _add(lockClasses, _className(lock) if lock else "(无对象)", seconds, 1)
+    finally:
+        process.stdout.close()
+        error = process.stderr.read().decode("utf-8", errors="replace").strip()
+        process.wait()
+    if process.returncode and not samples and not allocationSites and not lockSites:
+        raise RuntimeError(error or f"jfr exited with {process.returncode}")
+    return {
+        "recording": osp.basename(recordingPath),
+        "size": osp.getsize(recordingPath),
+        "samples": samples,
+        "hotMethods": _top(hotMethods),
+        "cpuByOwner": {key: value[0] for key, value in cpuByOwner.items()},
+        "allocationSites": _top(allocationSites),
+        "allocationClasses": _top(allocationClasses),
+        "allocationByOwner": {key: value[0] for key, value in allocationByOwner.items()},
+        "lockSites": _top(lockSites),
+        "lockClasses": _top(lockClasses),
+    }
+
+
+def _shareLines(
+    current: Dict[str, float], previous: Optional[Dict[str, float]], describe
+) -> List[str]:
+    """按占比排列各模组或插件，有上一次录制时附上占比的变化"""
+    total = sum(current.values()) or 1
+    previousTotal = (sum(previous.values()) or 1) if previous else 1
+    lines = []
+    for owner, value in sorted(current.items(), key=lambda i: -i[1])[:_TOP]:
+        share = value / total * 100
+        change = ""
+        if previous is not None:
+            delta = share - previous.get(owner, 0.0) / previousTotal * 100
+            change = f"  (较上次 {delta:+.1f}%)"
+        lines.append(f"  {share:>5.1f}%  {describe(value):>12}  {owner}{change}")
+    return lines
+
+
+def formatRecordingSummary(data: dict, previous: Optional[dict] = None) -> str:
+    samples = data["samples"]
+    lines = [f"JFR 录制：{data['recording']} ({_formatSize(data['size'])})"]
+    if previous is not None:
+        lines.append(f"对比的上一次录制：{previous['recording']}")
+    lines.append(f"\nCPU 采样 {samples} 次，热点方法 (栈顶，前 {_TOP} 个)：")
+    for name, count in data["hotMethods"]:
+        lines.append(f"  {count / (samples or 1) * 100:>5.1f}%  {count:>8.0f}  {name}")
+    lines.append("\nCPU 按模组 / 插件的包汇总 (调用栈中第一个非 Minecraft、JDK 的包)：")
+    lines.extend(
+        _shareLines(
+            data["cpuByOwner"],
+            previous and previous["cpuByOwner"],
+            lambda value: f"{value:.0f} 次",
+        )
+    )
+    lines.append(f"\n分配最多的位置 (前 {_TOP} 个)：")
+    for site, size in data["allocationSites"]:
+        lines.append(f"  {_formatSize(size):>10}  {site}")
+    lines.append(f"\n分配最多的类 (前 {_TOP} 个)：")
+    for className, size in data["allocationClasses"]:
+        lines.append(f"  {_formatSize(size):>10}  {className}")
+    lines.append("\n分配按模组 / 插件的包汇总：")
+    lines.extend(
+        _shareLines(
+            data["allocationByOwner"], previous and previous["allocationByOwner"], _formatSize
+        )
+    )
+    lines.append(f"\n锁竞争与等待 (按累计等待时间，前 {_TOP} 个)：")
+    if not data["lockSites"]:
+        lines.append("  无")
+    for site, seconds, count in data["lockSites"]:
+        lines.append(f"  {seconds * 1000:>10.0f} ms  {count:>6.0f} 次  {site}")
+    for className, seconds, count in data["lockClasses"][:5]:
+        lines.append(f"  锁对象 {className}：{seconds * 1000:.0f} ms，{count:.0f} 次")
+    return "\n".join(lines)
+
+
+class JfrProfileThread(QThread):
+    """
+    用 jcmd 在运行中的服务器上开始一次 JFR 录制，到时后停止并写入文件，
+    随后在单独的进程中用 jfr print --json 统计，摘要保存在录制文件旁边并按预算清理旧录制。
+    """
+
+    # 剩余秒数
+    progress = pyqtSignal(int)
+    # 录制文件(失败时为空)，摘要或失败原因
+    resultReady = pyqtSignal(str, str)
+
+    def __init__(
+        self,
+        serverName: str,
+        pid: int,
+        javaPath: str,
+        duration: int,
+        budget: int,
+        parent=None,
+    ):
+        super().__init__(parent)
+        self.serverName = serverName
+        self.pid = pid
+        self.javaPath = javaPath
+        self.duration = duration
+        self.budget = budget
+        self.finishing = False
+        self.cancelled = False
+
+    def finishEarly(self):
+        """提前结束录制，已录制的部分仍会被统计"""
+        self.finishing = True
+
+    def cancel(self):
+        """放弃录制与统计，例如窗口关闭时"""
+        self.cancelled = True
+
+    def run(self):
+        jcmd = jdkToolPath(self.javaPath, "jcmd")
+        jfr = jdkToolPath(self.javaPath, "jfr")
+        if jcmd is None or jfr is None:
+            self.resultReady.emit(
+                "", f"{self.javaPath} 所在目录中没有 jcmd 或 jfr，请使用 JDK 11+ 或 8u262+。"
+            )
+            return
+        directory = recordingDirectory(self.serverName)
+        makedirs(directory, exist_ok=True)
+        pruneRecordings(directory, self.budget)
+        previous = self.previousSummary(directory)
+        stamp = strftime("%Y%m%d-%H%M%S")
+        recordingPath = osp.join(directory, f"profile-{stamp}.jfr")
+        name = f"mcsl2-{stamp}"
+        result = runJdkTool(jcmd, [str(self.pid), "JFR.start", f"name={name}", "settings=profile"])
+        if result.returnCode != 0 or "Started recording" not in result.output:
+            self.resultReady.emit("", f"无法开始录制：{result.output.strip()}")
+            return
+        deadline = monotonic() + self.duration
+        while (remaining := deadline - monotonic()) > 0 and not self.finishing:
+            if self.cancelled:
+                runJdkTool(jcmd, [str(self.pid), "JFR.stop", f"name={name}"])
+                return
+            self.progress.emit(int(remaining) + 1)
+            self.msleep(min(1000, int(remaining * 1000) + 1))
+        # 停止时写入文件；路径相对于服务器进程，且可能含有空格
+        result = runJdkTool(
+            jcmd, [str(self.pid), "JFR.stop", f"name={name}", f'filename="{recordingPath}"']
+        )
+        if result.returnCode != 0 or not osp.exists(recordingPath):
+            self.resultReady.emit("", f"无法保存录制：{result.output.strip()}")
+            return
+        self.progress.emit(0)
+        try:
+            with multiprocessing.get_context("spawn").Pool(1) as pool:
+                asyncResult = pool.apply_async(summarizeRecording, (jfr, recordingPath))
+                while not asyncResult.ready():
+                    if self.cancelled:
+                        return
+                    asyncResult.wait(0.2)
+                data = asyncResult.get()
+            summary = formatRecordingSummary(data, previous)
+            with open(recordingPath + DATA_SUFFIX, "w", encoding="utf-8") as f:
+                f.write(json.dumps(data, ensure_ascii=False))
+            with open(recordingPath + SUMMARY_SUFFIX, "w", encoding="utf-8") as f:
+                f.write(summary)
+        except Exception as e:
+            from MCSL2Lib.utils import MCSL2Logger
+
+            MCSL2Logger.error(msg=f"summarize recording {recordingPath} failed", exc=e)
+            summary = f"录制已保存，但统计失败：{e}"
+        pruneRecordings(directory, self.budget)
+        self.resultReady.emit(recordingPath, summary)
+
+    @staticmethod
+    def previousSummary(directory: str) -> Optional[dict]:
+        for recordingPath in listRecordings(directory):
+            try:
+                with open(recordingPath + DATA_SUFFIX, "r", encoding="utf-8") as f:
+                    return json.loads(f.read())
+            except (OSError, ValueError):
+                continue
+        return None
@@ -0,0 +1,261 @@
+#     Copyright 2024, MCSL Team, mailto:services@mcsl.com.cn
+#
+#     Part of "MCSL2", a simple and multifunctional Minecraft server launcher.
+#
+#     Licensed under the GNU General Public License, Version 3.0, with our
+#     additional agreements. (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#        https://github.com/MCSLTeam/MCSL2/raw/master/LICENSE
+#
+################################################################################
+"""
+JVM heap and GC sampler for running servers, based on the JDK's jstat.
+"""
+
+from math import nan
+from threading import Condition, Lock
+from time import monotonic, time
+from typing import Dict, List, NamedTuple, Optional
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from MCSL2Lib.ProgramControllers.metricsController import MetricFamily, MetricsRegistry
+from MCSL2Lib.ServerControllers.jdkTools import JdkToolBudget, jdkToolPath, runJdkTool
+from MCSL2Lib.ServerControllers.resourceSampler import ResourceHistory
+from MCSL2Lib.utils import MCSL2Logger
+
+
+class JvmSample(NamedTuple):
+    time: float
+    # 各区域占已分配容量的百分比(0 ~ 100)
+    eden: float
+    old: float
+    metaspace: float
+    heapUsed: float
+    heapCommitted: float
+    # 启动以来的累计次数与耗时(秒)
+    youngGC: float
+    youngGCTime: float
+    fullGC: float
+    fullGCTime: float
+    gcTime: float
+    # 距上一次采样期间 GC 耗时占经过时间的百分比
+    gcLoad: float
+
+
+def _percent(used: float, capacity: float) -> float:
+    return used / capacity * 100 if capacity > 0 else nan
+
+
+def parseJstatGc(output: str) -> Optional[Dict[str, float]]:
+    """
+    解析 jstat -gc 的一次输出(表头与一行数值)，容量与用量单位为 KB。
+    各版本的列不同(例如 Java 8 没有 CGC/CGCT)，按表头取值；不适用的列为 "-"。
+    """
+    lines = [line.split() for line in output.splitlines() if line.strip()]
+    for header, values in zip(lines, lines[1:]):
+        if "EU" in header and len(header) == len(values):
+            return {
+                name: (nan if value == "-" else float(value)) for name, value in zip(header, values)
+            }
+    return None
+
+
+class _JvmTarget:
+    def __init__(self, pid: int, jstat: str, interval: float):
+        self.pid = pid
+        self.jstat = jstat
+        self.interval = interval
+        self.due = monotonic()
+        self.failures = 0
+        self.last: Optional[JvmSample] = None
+
+
+class _JvmSamplerThread(QThread):
+    """
+    JVM 采样线程，所有服务器共用。
+    每次取到期最早的服务器运行一次 jstat；工具进程的 CPU 时间计入 JdkToolBudget，
+    预算冷却期间即使已到期也不启动新进程，因此服务器越多，实际间隔越长。
+    """
+
+    sampled = pyqtSignal(str, object)
+    # 服务器名，原因
+    unsupported = pyqtSignal(str, str)
+
+    MAX_FAILURES = 3
+
+    def __init__(self):
+        super().__init__()
+        self.setObjectName("JvmSamplerThread")
+        self.targets: Dict[str, _JvmTarget] = {}
+        self.condition = Condition()
+        self.running = True
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.running and not self.targets:
+                    self.condition.wait()
+                if not self.running:
+                    return
+                name, target = min(self.targets.items(), key=lambda item: item[1].due)
+                wakeAt = max(target.due, monotonic() + JdkToolBudget.delay())
+                if (remaining := wakeAt - monotonic()) > 0:
+                    # 注册、注销或关闭时会被提前唤醒，重新选择
+                    self.condition.wait(remaining)
+                    continue
+                target.due = monotonic() + target.interval
+            self.sample(name, target)
+
+    def sample(self, name: str, target: _JvmTarget):
+        result = runJdkTool(target.jstat, ["-gc", str(target.pid)], timeout=15)
+        values = parseJstatGc(result.output) if result.returnCode == 0 else None
+        if values is None:
+            target.failures += 1
+            # 刚启动的 JVM 可能还没有创建性能数据，连续失败才放弃
+            if target.failures >= self.MAX_FAILURES:
+                with self.condition:
+                    if self.targets.get(name) is target:
+                        del self.targets[name]
+                MCSL2Logger.warning(f"jstat for {name} failed: {result.output.strip()}")
+                self.unsupported.emit(name, result.output.strip())
+            return
+        target.failures = 0
+        sample = self.toSample(values, target.last)
+        target.last = sample
+        JvmSampler.history(name).append(sample)
+        self.sampled.emit(name, sample)
+
+    @staticmethod
+    def toSample(values: Dict[str, float], last: Optional[JvmSample]) -> JvmSample:
+        def get(name: str) -> float:
+            return values.get(name, nan)
+
+        now = time()
+        survivorUsed = get("S0U") + get("S1U")
+        survivorCapacity = get("S0C") + get("S1C")
+        gcTime = get("GCT")
+        gcLoad = nan
+        if last is not None and now > last.time:
+            gcLoad = max(0.0, gcTime - last.gcTime) / (now - last.time) * 100
+        return JvmSample(
+            now,
+            _percent(get("EU"), get("EC")),
+            _percent(get("OU"), get("OC")),
+            _percent(get("MU"), get("MC")),
+            (survivorUsed + get("EU") + get("OU")) * 1024,
+            (survivorCapacity + get("EC") + get("OC")) * 1024,
+            get("YGC"),
+            get("YGCT"),
+            get("FGC"),
+            get("FGCT"),
+            gcTime,
+            gcLoad,
+        )
+
+
+class JvmSampler:
+    """
+    通过服务器所用 Java 自带的 jstat 采样堆占用与 GC 次数、耗时。
+    与 ServerResourceSampler 一样以进程 ID 注册、按服务器名保留历史；
+    只安装了 JRE (没有 jstat) 时注册失败并返回原因。
+    """
+
+    HISTORY_SIZE = 720
+
+    _thread: Optional[_JvmSamplerThread] = None
+    _histories: Dict[str, ResourceHistory] = {}
+    _lock = Lock()
+
+    @classmethod
+    def sampler(cls) -> _JvmSamplerThread:
+        with cls._lock:
+            if cls._thread is None:
+                cls._thread = _JvmSamplerThread()
+                cls._thread.start()
+            return cls._thread
+
+    @classmethod
+    def history(cls, serverName: str) -> ResourceHistory:
+        with cls._lock:
+            if (history := cls._histories.get(serverName)) is None:
+                history = cls._histories[serverName] = ResourceHistory(cls.HISTORY_SIZE, JvmSample)
+            return history
+
+    @classmethod
+    def register(cls, serverName: str, pid: int, javaPath: str, interval: float) -> str:
+        """开始采样；成功时返回空字符串，否则返回原因"""
+        if (jstat := jdkToolPath(javaPath, "jstat")) is None:
+            return f"{javaPath} 所在目录中没有 jstat，请使用 JDK 而不是 JRE。"
+        thread = cls.sampler()
+        with thread.condition:
+            thread.targets[serverName] = _JvmTarget(pid, jstat, interval)
+            thread.condition.notify()
+        return ""
+
+    @classmethod
+    def unregister(cls, serverName: str):
+        with cls._lock:
+            thread = cls._thread
+        if thread is None:
+            return
+        with thread.condition:
+            if thread.targets.pop(serverName, None) is not None:
+                thread.condition.notify()
+
+    @classmethod
+    def runningServers(cls) -> List[str]:
+        with cls._lock:
+            thread = cls._thread
+        if thread is None:
+            return []
+        with thread.condition:
+            return list(thread.targets)
+
+    @classmethod
+    def collectMetrics(cls):
+        heapUsed = MetricFamily(
+            "mcsl2_jvm_heap_used_bytes", "gauge", "Used Java heap.", ("server",)
+        )
+        heapCommitted = MetricFamily(
+            "mcsl2_jvm_heap_committed_bytes", "gauge", "Committed Java heap.", ("server",)
+        )
+        oldGen = MetricFamily(
+            "mcsl2_jvm_old_gen_percent", "gauge", "Old generation occupancy.", ("server",)
+        )
+        gcCount = MetricFamily(
+            "mcsl2_jvm_gc_collections", "counter", "Garbage collections.", ("server", "kind")
+        )
+        gcSeconds = MetricFamily(
+            "mcsl2_jvm_gc_seconds",
+            "counter",
+            "Time spent in garbage collection.",
+            ("server", "kind"),
+        )
+        for serverName in cls.runningServers():
+            if (sample := cls.history(serverName).latest()) is None:
+                continue
+            heapUsed.labels(serverName).set(sample.heapUsed)
+            heapCommitted.labels(serverName).set(sample.heapCommitted)
+            oldGen.labels(serverName).set(sample.old)
+            gcCount.labels(serverName, "young").set(sample.youngGC)
+            gcCount.labels(serverName, "full").set(sample.fullGC)
+            gcSeconds.labels(serverName, "young").set(sample.youngGCTime)
+            gcSeconds.labels(serverName, "full").set(sample.fullGCTime)
+        return heapUsed, heapCommitted, oldGen, gcCount, gcSeconds
+
+    @classmethod
+    def shutDown(cls):
+        with cls._lock:
+            thread, cls._thread = cls._thread, None
+        if thread is None:
+            return
+        with thread.condition:
+            thread.running = False
+            thread.condition.notify()
+        thread.wait()
+
+
+MetricsRegistry.addCollector(JvmSampler.collectMetrics)
@@ -0,0 +1,97 @@
+#     Copyright 2024, MCSL Team, mailto:services@mcsl.com.cn
+#
+#     Part of "MCSL2", a simple and multifunctional Minecraft server launcher.
+#
+#     Licensed under the GNU General Public License, Version 3.0, with our
+#     additional agreements. (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#        https://github.com/MCSLTeam/MCSL2/raw/master/LICENSE
+#
+################################################################################
+"""
+Incremental line framer for process output streams.
+"""
+
+import codecs
+import locale
+from typing import List
+
+from MCSL2Lib.utils import MCSL2Logger
+
+
+class LineFramer:
+    """
+    把进程某一路输出(stdout/stderr)的字节流切分为文本行。
+
+    - 未完成的行留在 bytearray 中，只扫描新到达的部分，超长行分多次到达时不会反复复制；
+    - 同时兼容 LF 与 CRLF 换行；
+    - 单行超过 maxLineBytes 字节时强制断行，避免一行无换行的输出无限占用内存；
+    - 每路输出使用独立的增量解码器，强制断行处被截断的多字节字符(UTF-8、GB18030 等)
+      会留到下一段一起解码，不会变成替换字符。
+    """
+
+    DEFAULT_MAX_LINE_BYTES = 64 * 1024
+
+    def __init__(self, encoding: str, maxLineBytes: int = DEFAULT_MAX_LINE_BYTES):
+        self.buffer = bytearray()
+        self.scanOffset = 0
+        self.maxLineBytes = maxLineBytes
+        try:
+            self.decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+        except LookupError:
+            # "ansi" 只在 Windows 上可用，其余平台退回到系统首选编码
+            fallback = locale.getpreferredencoding(False)
+            MCSL2Logger.warning(f"unknown output encoding {encoding}, fall back to {fallback}")
+            self.decoder = codecs.getincrementaldecoder(fallback)(errors="replace")
+
+    def feed(self, data: bytes) -> List[str]:
+        """追加新读到的数据，返回其中所有完整的行(不含换行符)"""
+        buffer = self.buffer
+        buffer += data
+        lines = []
+        start = 0
+        decode = self.decoder.decode
+        newline = buffer.rfind(b"\n", self.scanOffset)
+        if newline >= 0:
+            block = buffer[:newline]
+            if max(map(len, block.split(b"\n"))) <= self.maxLineBytes:
+                # 常见情况：没有超长行，整块解码后再切分，逐行的工作都在 C 层完成
+                text = decode(block, True)
+                lines = text.split("\n")
+                if "\r" in text:
+                    lines = [line[:-1] if line.endswith("\r") else line for line in lines]
+                start = newline + 1
+                newline = -1
+            else:
+                newline = buffer.find(b"\n", self.scanOffset)
+        while True:
+            limit = start + self.maxLineBytes
+            if newline < 0 or newline > limit:
+                if len(buffer) <= limit:
+                    break
+                # 强制断行；被截断的多字节字符由解码器保留到下一段
+                lines.append(decode(buffer[start:limit]))
+                start = limit
+                continue
+            lineEnd = newline - 1 if newline > start and buffer[newline - 1] == 0x0D else newline
+            lines.append(decode(buffer[start:lineEnd], True))
+            start = newline + 1
+            newline = buffer.find(b"\n", start)
+        if start:
+            del buffer[:start]
+        self.scanOffset = len(buffer)
+        return lines
+
+    def flush(self) -> List[str]:
+        """流结束时取出最后一行未以换行结尾的内容"""
+        if not self.buffer:
+            return []
+        data = self.buffer
+        if data.endswith(b"\r"):
+            data = data[:-1]
+        line = self.decoder.decode(data, True)
+        self.buffer = bytearray()
+        self.scanOffset = 0
+        return [line]
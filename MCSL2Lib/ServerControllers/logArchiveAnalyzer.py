@@ -0,0 +1,198 @@
+#     Copyright 2024, MCSL Team, mailto:services@mcsl.com.cn
+#
+#     Part of "MCSL2", a simple and multifunctional Minecraft server launcher.
+#
+#     Licensed under the GNU General Public License, Version 3.0, with our
+#     additional agreements. (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#        https://github.com/MCSLTeam/MCSL2/raw/master/LICENSE
+#
+################################################################################
+"""
+Offline batch analysis of a server's crash reports, log archives and JVM fatal error logs.
+"""
+
+import multiprocessing
+import zlib
+from datetime import datetime
+from glob import glob
+from os import cpu_count, path as osp
+from time import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from MCSL2Lib.ServerControllers.errorRuleEngine import (
+    SEVERITY_NAMES,
+    ErrorRuleEngine,
+    ErrorSeverity,
+)
+
+# 相对服务器目录
+ARCHIVE_PATTERNS = (
+    "crash-reports/*.txt",
+    "logs/*.log.gz",
+    "logs/*.log",
+    "hs_err_pid*.log",
+)
+
+
+class ArchiveFile(NamedTuple):
+    path: str
+    size: int
+    mtime: float
+
+
+class ArchiveFinding:
+    """某条结果在所有文件中的汇总"""
+
+    __slots__ = ("severity", "message", "count", "files", "first", "last")
+
+    def __init__(self, severity: ErrorSeverity, message: str):
+        self.severity = severity
+        self.message = message
+        self.count = 0
+        self.files = 0
+        self.first: Optional[ArchiveFile] = None
+        self.last: Optional[ArchiveFile] = None
+
+    def add(self, file: ArchiveFile, count: int):
+        self.count += count
+        self.files += 1
+        if self.first is None or file.mtime < self.first.mtime:
+            self.first = file
+        if self.last is None or file.mtime > self.last.mtime:
+            self.last = file
+
+
+def _describeFile(file: ArchiveFile) -> str:
+    modified = datetime.fromtimestamp(file.mtime).strftime("%Y-%m-%d %H:%M")
+    return f"{modified} ({osp.basename(file.path)})"
+
+
+def collectArchiveFiles(serverPath: str) -> List[ArchiveFile]:
+    """按大小从大到小排列，使进程池中的大文件先开始"""
+    files = []
+    for pattern in ARCHIVE_PATTERNS:
+        for filePath in glob(osp.join(serverPath, pattern)):
+            try:
+                files.append(ArchiveFile(filePath, osp.getsize(filePath), osp.getmtime(filePath)))
+            except OSError:
+                continue
+    files.sort(key=lambda f: f.size, reverse=True)
+    return files
+
+
+def analyzeArchiveFile(filePath: str) -> Tuple[str, List[Tuple[str, int, str, int]], str]:
+    """
+    在子进程中分析单个文件。
+    返回 (文件路径, [(规则 ID, 严重程度, 内容, 次数), ...], 错误信息)
+    """
+    try:
+        engine = ErrorRuleEngine.analyzeFile(filePath)
+    except (OSError, EOFError, zlib.error) as e:
+        return filePath, [], str(e)
+    findings = [
+        (finding.rule.id, int(finding.rule.severity), finding.message, finding.count)
+        for finding in engine.results()
+    ]
+    return filePath, findings, ""
+
+
+class LogArchiveAnalyzeThread(QThread):
+    """
+    将服务器的历史日志分给进程池并行分析，合并为按严重程度、出现文件数排序的去重报告。
+    进度按已完成文件的大小计算；取消时直接终止进程池。
+    """
+
+    progress = pyqtSignal(int)
+    resultReady = pyqtSignal(str)
+
+    def __init__(self, serverPath: str, parent=None):
+        super().__init__(parent)
+        self.serverPath = serverPath
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        startTime = time()
+        files = collectArchiveFiles(self.serverPath)
+        if not files:
+            self.resultReady.emit(self.tr("没有找到崩溃报告或历史日志。"))
+            return
+        fileMap = {f.path: f for f in files}
+        totalSize = sum(f.size for f in files) or 1
+        doneSize = 0
+        findings: Dict[Tuple[str, str], ArchiveFinding] = {}
+        failures: List[str] = []
+        processes = min(cpu_count() or 1, len(files))
+        pool = None
+        if processes > 1:
+            # spawn 在各平台行为一致，且不会复制带有 Qt 线程的进程
+            pool = multiprocessing.get_context("spawn").Pool(processes)
+            results = pool.imap_unordered(analyzeArchiveFile, [f.path for f in files])
+        else:
+            results = (analyzeArchiveFile(f.path) for f in files)
+        try:
+            for _ in files:
+                result = None
+                while result is None and not self.cancelled:
+                    try:
+                        result = results.next(0.2) if pool is not None else next(results)
+                    except multiprocessing.TimeoutError:
+                        continue
+                if self.cancelled:
+                    break
+                filePath, fileFindings, error = result
+                file = fileMap[filePath]
+                if error:
+                    failures.append(f"{osp.basename(filePath)}: {error}")
+                for ruleId, severity, message, count in fileFindings:
+                    if (finding := findings.get((ruleId, message))) is None:
+                        finding = findings[(ruleId, message)] = ArchiveFinding(
+                            ErrorSeverity(severity), message
+                        )
+                    finding.add(file, count)
+                doneSize += file.size
+                self.progress.emit(doneSize * 100 // totalSize)
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+        if self.cancelled:
+            self.resultReady.emit(self.tr("已取消分析。"))
+            return
+        self.resultReady.emit(
+            self.report(findings, failures, len(files), totalSize, time() - startTime)
+        )
+
+    def report(
+        self,
+        findings: Dict[Tuple[str, str], ArchiveFinding],
+        failures: List[str],
+        fileCount: int,
+        totalSize: int,
+        elapsed: float,
+    ) -> str:
+        lines = [
+            self.tr(
+                f"已分析 {fileCount} 个文件 ({totalSize / 1048576:.1f} MB)，用时 {elapsed:.1f} 秒。"
+            )
+        ]
+        ranked = sorted(findings.values(), key=lambda f: (-f.severity, -f.files, -f.count))
+        if not ranked:
+            lines.append(self.tr("没有检测到任何 MCSL2 内置错误分析可用解决方案。"))
+        for finding in ranked:
+            lines.append(f"\n[{SEVERITY_NAMES[finding.severity]}] {finding.message}")
+            lines.append(
+                self.tr(f"    共 {finding.count} 次，出现在 {finding.files} 个文件中")
+                + self.tr(f"\n    首次：{_describeFile(finding.first)}")
+                + self.tr(f"\n    最近：{_describeFile(finding.last)}")
+            )
+        if failures:
+            lines.append(self.tr("\n以下文件读取失败：\n") + "\n".join(failures))
+        return "\n".join(lines)
@@ -15,13 +15,28 @@
 Communicate with Minecraft servers.
 """
 
+from collections import deque
 from datetime import datetime
 from os import path as osp
-from typing import Optional
+from time import time
+from typing import Optional, List
 
-from PyQt5.QtCore import QProcess, QObject, pyqtSignal
+from psutil import WINDOWS
+from PyQt5.QtCore import QProcess, QObject, pyqtSignal, QTimer
 
 from MCSL2Lib.ProgramControllers.settingsController import cfg
+from MCSL2Lib.ServerControllers.gcLogAnalyzer import gcLogJVMArgs, prepareGcLog
+from MCSL2Lib.ServerControllers.heapDumpAnalyzer import heapDumpJVMArgs, prepareHeapDumps
+from MCSL2Lib.ServerControllers.lineFramer import LineFramer
+from MCSL2Lib.ServerControllers.serverLifecycle import (
+    DONE_PATTERN,
+    LifecycleEvent,
+    ServerLifecycle,
+    ServerState,
+    StopReason,
+)
+from MCSL2Lib.ServerControllers.serverSupervisor import ServerSupervisor, SupervisionStatus
+from MCSL2Lib.ServerControllers.serverUtils import getServerExtraSetting
 from MCSL2Lib.variables import ServerVariables
 from MCSL2Lib.utils import MCSL2Logger
 
@@ -42,17 +57,45 @@ class ServerConfigConstructor:
 
 
 class _ServerProcessBridge(QObject):
-    """服务器进程操控器"""
+    """
+    服务器进程操控器，同时是该服务器的生命周期状态机：
+    STOPPED -> STARTING -> RUNNING -> STOPPING -> STOPPED / CRASHED。
+    状态只由 QProcess 的信号、启动完毕的输出与关闭超时的计时器推进，界面线程从不等待进程；
+    关闭超时后依次升级为 terminate (SIGTERM) 与 kill (SIGKILL)。
+    """
 
     # 当服务器输出日志时发出的信号(发送一个字符串)
     serverLogOutput = pyqtSignal(str)
 
+    # 批量输出模式下，每帧发出一次的信号(发送该帧内的全部日志行)
+    serverLogOutputBatch = pyqtSignal(list)
+
+    # 连接到后台服务时补齐的历史输出，只需显示，不再分析与归档；本地进程不会发出
+    serverLogBacklog = pyqtSignal(list)
+
     # 当服务器关闭时发出的信号(发送一个整数exit code)
     serverClosed = pyqtSignal(int)
 
     # 当服务器重启时发出的信号
     serverRestarted = pyqtSignal()
 
+    # 状态变化(LifecycleEvent)，同时发布到 ServerLifecycle.events()
+    serverStateChanged = pyqtSignal(object)
+
+    # 需要先同意 EULA(_MinecraftEULA)；本地启动在创建进程前检查，由远程服务器发出
+    eulaRequired = pyqtSignal(object)
+
+    # 后台服务由其他版本的 MCSL2 启动(发送其版本号)；本地进程不会发出
+    versionMismatch = pyqtSignal(str)
+
+    # 连接到后台服务时其记录的在线玩家；本地进程不会发出
+    serverPlayers = pyqtSignal(list)
+
+    # 保留最近的输出行数，供崩溃后分析退出原因
+    OUTPUT_TAIL = 500
+    # 由守护进程运行的服务器关闭窗口后继续运行，本地进程则不能
+    detachable = False
+
     def __init__(self, v, arg):
         """
         初始化一个服务器处理器
@@ -62,23 +105,43 @@ class _ServerProcessBridge(QObject):
         self.javaPath: str = self.config.javaPath
         self.processArgs = arg
         self.workingDirectory: str = str(osp.realpath(f"Servers//{self.config.serverName}"))
-        self.partialData: str = b""
+        self.stdoutFramer: Optional[LineFramer] = None
+        self.stderrFramer: Optional[LineFramer] = None
+        self.batchOutput: bool = cfg.get(cfg.consoleBatchOutput)
+        self.pendingLines: List[str] = []
+        self.outputTail: deque = deque(maxlen=self.OUTPUT_TAIL)
+        self.outputFlushTimer = QTimer(self)
+        self.outputFlushTimer.setSingleShot(True)
+        self.outputFlushTimer.setInterval(max(1, 1000 // cfg.get(cfg.consoleRefreshRate)))
+        self.outputFlushTimer.timeout.connect(self.flushPendingOutput)
         self.handledServer = None
+        self.state = ServerState.STOPPED
+        # 正在关闭时所处的阶段(stop / terminate / kill / halt)，决定退出后的原因
+        self.stopStage = ""
+        self.pendingRestart = False
+        self.stopTimer = QTimer(self)
+        self.stopTimer.setSingleShot(True)
+        self.stopTimer.timeout.connect(self.escalateStop)
         self.serverProcess = self.createServerProcess()
 
     def createServerProcess(self) -> _Server:
         """
         创建了一个服务器进程对象
         """
+        # 旧的进程对象可能正处于自己的 finished 信号中，交给事件循环释放
+        if self.handledServer is not None and self.handledServer.process is not None:
+            self.handledServer.process.deleteLater()
         self.handledServer = _Server()
-        self.handledServer.process = QProcess()
+        self.stdoutFramer = LineFramer(self.config.outputDecoding)
+        self.stderrFramer = LineFramer(self.config.outputDecoding)
+        self.handledServer.process = QProcess(self)
         self.handledServer.process.setProgram(self.javaPath)
         self.handledServer.process.setArguments(self.processArgs)
         self.handledServer.process.setWorkingDirectory(self.workingDirectory)
         self.handledServer.process.readyReadStandardOutput.connect(self.serverLogOutputHandler)
-        self.handledServer.process.finished.connect(
-            lambda: self.serverClosed.emit(self.handledServer.process.exitCode())
-        )
+        self.handledServer.process.readyReadStandardError.connect(self.serverErrorOutputHandler)
+        self.handledServer.process.finished.connect(self.serverFinishedHandler)
+        self.handledServer.process.errorOccurred.connect(self.serverErrorHandler)
         # self.handledServer.process.finished.connect(
         #     lambda: self.serverCrashed(self.handledServer.process.exitCode())
         # )
@@ -89,54 +152,166 @@ class _ServerProcessBridge(QObject):
         When the server outputs change, emit a signal with the updated output.
         """
         newData = self.serverProcess.process.readAllStandardOutput().data()
-        self.partialData += newData  # Append the incoming data to the buffer
-        lines = self.partialData.split(b"\n")  # Split the buffer into lines
-        self.partialData = (
-            lines.pop()
-        )  # The last element might be incomplete, so keep it in the buffer
+        self.outputLines(self.stdoutFramer.feed(newData))
+
+    def serverErrorOutputHandler(self):
+        """
+        服务器的标准错误输出(如 JVM 启动失败、部分插件的报错)同样显示在终端中
+        """
+        newData = self.serverProcess.process.readAllStandardError().data()
+        self.outputLines(self.stderrFramer.feed(newData))
+
+    def outputLines(self, lines: List[str]):
+        if not lines:
+            return
+        self.outputTail.extend(lines)
+        if self.state == ServerState.STARTING and any(DONE_PATTERN.search(ln) for ln in lines):
+            self.setState(ServerState.RUNNING, StopReason.DONE)
+        if self.batchOutput:
+            self.pendingLines.extend(lines)
+            if not self.outputFlushTimer.isActive():
+                self.outputFlushTimer.start()
+            return
 
         for line in lines:
-            newOutput = line.decode(self.config.outputDecoding, errors="replace")
-            self.serverLogOutput.emit(newOutput[:-1])
+            self.serverLogOutput.emit(line)
+
+    def flushPendingOutput(self):
+        """
+        将本帧内积攒的日志行一次性发出
+        """
+        self.outputFlushTimer.stop()
+        if not self.pendingLines:
+            return
+        lines, self.pendingLines = self.pendingLines, []
+        self.serverLogOutputBatch.emit(lines)
+
+    def serverFinishedHandler(self):
+        """
+        进程结束时先发出剩余日志，再发出关闭信号
+        """
+        self.serverLogOutputHandler()
+        self.serverErrorOutputHandler()
+        self.outputLines(self.stdoutFramer.flush() + self.stderrFramer.flush())
+        self.flushPendingOutput()
+        process = self.handledServer.process
+        self.stopTimer.stop()
+        if self.state == ServerState.STOPPING:
+            state, reason = ServerState.STOPPED, self.stopStage
+        elif process.exitStatus() == QProcess.CrashExit or process.exitCode():
+            state, reason = ServerState.CRASHED, StopReason.EXITED
+        else:
+            state, reason = ServerState.STOPPED, StopReason.EXITED
+        self.serverClosed.emit(process.exitCode())
+        self.setState(state, reason, process.exitCode())
+        if self.pendingRestart:
+            self.pendingRestart = False
+            # 此时仍在旧进程的 finished 信号中，等它返回后再创建新进程
+            QTimer.singleShot(0, self.restartAfterExit)
+
+    def restartAfterExit(self):
+        if self.state.alive:
+            return
+        self.startServer()
+        self.serverRestarted.emit()
+
+    def serverErrorHandler(self, error):
+        """无法启动时 QProcess 不会发出 finished，在这里结束状态"""
+        if error == QProcess.FailedToStart and self.state == ServerState.STARTING:
+            self.pendingRestart = False
+            self.setState(
+                ServerState.CRASHED,
+                StopReason.FAILED_TO_START,
+                detail=self.serverProcess.process.errorString(),
+            )
+
+    def setState(
+        self, state: ServerState, reason: str, exitCode: Optional[int] = None, detail: str = ""
+    ):
+        """进入新状态；关闭过程中的升级以 STOPPING -> STOPPING 的事件报告"""
+        previous, self.state = self.state, state
+        event = LifecycleEvent(
+            self.config.serverName, previous, state, reason, exitCode, time(), detail
+        )
+        MCSL2Logger.info(f"server {event.serverName}: {previous.value} -> {state.value} ({reason})")
+        self.serverStateChanged.emit(event)
+        ServerLifecycle.publish(event)
 
     def startServer(self):
         """
         运行服务器\n
         processArgs: 服务器参数,列表形式，形如["-jar","server.jar","nogui","-Xms1G","-Xmx1G"]\n
         """
+        if self.state.alive:
+            return
         self.serverProcess = self.createServerProcess()
+        self.stopStage = ""
+        self.outputTail.clear()
+        self.setState(ServerState.STARTING, StopReason.LAUNCH)
         self.serverProcess.process.start()
 
     def stopServer(self):
         """
-        停止服务器
+        停止服务器：发送 stop，超过 stop_timeout 秒仍未退出则升级为 terminate，再超时则 kill
         """
-        if self.isServerRunning():
-            self.serverProcess.process.write(b"stop\n")
+        if self.state not in (ServerState.STARTING, ServerState.RUNNING):
+            return
+        self.serverProcess.process.write(b"stop\n")
+        self.stopStage = StopReason.STOP
+        self.setState(ServerState.STOPPING, StopReason.STOP)
+        self.stopTimer.start(getServerExtraSetting(self.config, "stop_timeout") * 1000)
+
+    def escalateStop(self):
+        if self.state != ServerState.STOPPING:
+            return
+        # Windows 上 terminate 只会发送 WM_CLOSE，控制台程序不会响应，直接 kill
+        if self.stopStage == StopReason.STOP and not WINDOWS:
+            self.stopStage = StopReason.TERMINATE
+            self.serverProcess.process.terminate()
+            self.stopTimer.start(getServerExtraSetting(self.config, "kill_timeout") * 1000)
+        else:
+            self.stopStage = StopReason.KILL
+            self.serverProcess.process.kill()
+        self.setState(ServerState.STOPPING, self.stopStage)
 
     def restartServer(self):
         """
-        重启服务器
+        重启服务器：正常关闭，退出后再启动；不在界面线程中等待
         """
-        self.serverProcess.process.write(b"stop\n")
-        self.serverProcess.process.waitForFinished()
-        self.serverProcess.process.start()
-        self.serverRestarted.emit()
+        if self.state.alive:
+            self.pendingRestart = True
+            self.stopServer()
+        else:
+            self.startServer()
+            self.serverRestarted.emit()
 
     def haltServer(self):
         """
-        强制停止服务器
+        强制停止服务器，退出后由 finished 信号结束状态
         """
-        if self.isServerRunning():
-            self.serverProcess.process.kill()
-            self.serverProcess.process.waitForFinished()
+        if not self.state.alive:
+            return
+        self.pendingRestart = False
+        self.stopTimer.stop()
+        self.stopStage = StopReason.HALT
+        self.setState(ServerState.STOPPING, StopReason.HALT)
+        self.serverProcess.process.kill()
 
     def sendCommand(self, command: str):
         """
-        用户向服务器发送命令
+        用户向服务器发送命令；手动输入的 stop 同样进入关闭流程
         """
+        if command.strip().lstrip("/") == "stop":
+            self.stopServer()
+            return
         self.serverProcess.process.write(f"{command}\n".encode(self.config.inputEncoding))
 
+    def supervision(self) -> Optional[SupervisionStatus]:
+        return ServerSupervisor.status(self.config.serverName)
+
+    def cancelRestart(self):
+        ServerSupervisor.cancel(self.config.serverName)
+
     def isServerRunning(self):
         if self.serverProcess.process is None:
             return False
@@ -176,6 +351,42 @@ class _MinecraftEULA:
             )
 
 
+def serverJVMArgs(
+    config: ServerVariables, diagnostics: bool = True, gcLogName: Optional[str] = None
+) -> List[str]:
+    """
+    生成开服命令参数，不修改任何文件。
+    gcLogName 为本次启动的 GC 日志文件名(见 prepareGcLog)，为 None 时不添加 GC 日志参数；
+    diagnostics 为 False 时也不添加堆转储参数，用于生成在 MCSL2 之外运行的启动脚本。
+    """
+    jvmArg = [
+        f"-Xms{config.minMem}{config.memUnit}",
+        f"-Xmx{config.maxMem}{config.memUnit}",
+    ]
+    # heap dump and GC logging, before user args so that they can override them
+    if diagnostics and getServerExtraSetting(config, "heap_dump_on_oom"):
+        jvmArg.extend(heapDumpJVMArgs(config.serverName))
+    if diagnostics and gcLogName is not None:
+        jvmArg.extend(gcLogJVMArgs(config.javaPath, gcLogName))
+    # add jvm args
+    if isinstance(config.jvmArg, list):
+        jvmArg.extend(config.jvmArg)
+    else:
+        if config.jvmArg:
+            jvmArg.append(config.jvmArg)
+
+    # adjust to different server type
+    if config.serverType == "forge":
+        pass
+    else:
+        jvmArg.append("-jar")
+        jvmArg.append(f"{config.coreFileName}")
+
+    # add "nogui" arg
+    jvmArg.append("nogui")
+    return jvmArg
+
+
 class ServerLauncher:
     """
     启动服务器的调用部分。
@@ -194,34 +405,30 @@ class ServerLauncher:
         if not (validator := _MinecraftEULA(self.config.serverName)).checkEula():
             return validator
         else:
+            self._prepareDiagnostics()
             self._setJVMArg()
             return self._launch()
 
+    def _prepareDiagnostics(self):
+        """清理旧的堆转储与 GC 日志，并确定本次启动的 GC 日志文件"""
+        self.gcLogName = None
+        if getServerExtraSetting(self.config, "heap_dump_on_oom"):
+            prepareHeapDumps(
+                self.config.serverName,
+                getServerExtraSetting(self.config, "heap_dump_budget") * 1048576,
+            )
+        if getServerExtraSetting(self.config, "gc_logging"):
+            self.gcLogName = prepareGcLog(self.config.serverName, self.config.javaPath)
+
     def _setJVMArg(self):
         """生成开服命令参数"""
-        self.jvmArg = [
-            f"-Xms{self.config.minMem}{self.config.memUnit}",
-            f"-Xmx{self.config.maxMem}{self.config.memUnit}",
-        ]
-        # add jvm args
-        if isinstance(self.config.jvmArg, list):
-            self.jvmArg.extend(self.config.jvmArg)
-        else:
-            if self.config.jvmArg:
-                self.jvmArg.append(self.config.jvmArg)
-
-        # adjust to different server type
-        if self.config.serverType == "forge":
-            pass
-        else:
-            self.jvmArg.append("-jar")
-            self.jvmArg.append(f"{self.config.coreFileName}")
-
-        # add "nogui" arg
-        self.jvmArg.append("nogui")
+        self.jvmArg = serverJVMArgs(self.config, gcLogName=self.gcLogName)
         MCSL2Logger.info(f"生成JVM参数：\n{self.jvmArg}")
 
     def _launch(self) -> _ServerProcessBridge:
         """启动进程"""
-        (bridge := _ServerProcessBridge(self.config, self.jvmArg)).startServer()
+        bridge = _ServerProcessBridge(self.config, self.jvmArg)
+        # 先于窗口订阅状态变化，窗口处理退出时监管者已完成分类
+        ServerSupervisor.register(bridge)
+        bridge.startServer()
         return bridge
@@ -0,0 +1,543 @@
+#     Copyright 2024, MCSL Team, mailto:services@mcsl.com.cn
+#
+#     Part of "MCSL2", a simple and multifunctional Minecraft server launcher.
+#
+#     Licensed under the GNU General Public License, Version 3.0, with our
+#     additional agreements. (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#        https://github.com/MCSLTeam/MCSL2/raw/master/LICENSE
+#
+################################################################################
+"""
+Attaching the GUI to the daemon or to server hosts: a JSON-RPC client and a mirroring bridge.
+"""
+
+from json import loads
+from time import monotonic, time
+from typing import Callable, Dict, List, Optional
+
+from PyQt5.QtCore import QObject, QProcess, QTimer, pyqtSignal
+from PyQt5.QtNetwork import QLocalSocket
+
+from MCSL2Lib import MCSL2VERSION
+from MCSL2Lib.ProgramControllers.daemonController import (
+    EULA_NOT_ACCEPTED,
+    MAX_MESSAGE_BYTES,
+    daemonSocketName,
+    encodeMessage,
+)
+from MCSL2Lib.ProgramControllers.settingsController import cfg
+from MCSL2Lib.ServerControllers.lineFramer import LineFramer
+from MCSL2Lib.ServerControllers.processCreator import ServerLauncher, _MinecraftEULA
+from MCSL2Lib.ServerControllers.serverHost import HostMetadata, hostSocketName, spawnHost
+from MCSL2Lib.ServerControllers.serverLifecycle import LifecycleEvent, ServerState, StopReason
+from MCSL2Lib.ServerControllers.serverSupervisor import (
+    ExitKind,
+    ServerSupervisor,
+    SupervisionState,
+    SupervisionStatus,
+)
+from MCSL2Lib.utils import MCSL2Logger
+from MCSL2Lib.variables import ServerVariables
+
+
+class DaemonClient(QObject):
+    """
+    到守护进程或服务器宿主进程的连接。守护进程的连接整个程序共用一个，宿主进程的连接属于各自的服务器窗口。
+    连接、启动宿主进程与请求都不在界面线程中等待，open() 与 request() 的结果通过回调返回；
+    通知按服务器名分发给各个远程服务器。
+    """
+
+    # 方法名, 参数
+    notified = pyqtSignal(str, dict)
+    disconnected = pyqtSignal()
+
+    # 等待新启动的宿主进程开始监听的时间与重试间隔
+    SPAWN_TIMEOUT = 10000
+    RETRY_INTERVAL = 100
+    # 连接断开或未连接时，等待中的请求收到的响应
+    CONNECTION_CLOSED = {"error": {"code": -32000, "message": "connection closed"}}
+
+    _instance: Optional["DaemonClient"] = None
+
+    def __init__(
+        self,
+        socketName: Optional[str] = None,
+        spawn: Optional[Callable[[], bool]] = None,
+        parent=None,
+    ):
+        super().__init__(parent)
+        self.socketName = socketName or daemonSocketName()
+        # 连接失败时启动宿主进程
+        self.spawn = spawn
+        self.spawnRequested = False
+        self.spawnDeadline: Optional[float] = None
+        self.socket = QLocalSocket(self)
+        self.socket.connected.connect(self.onConnected)
+        self.socket.errorOccurred.connect(self.onConnectError)
+        self.socket.readyRead.connect(self.onReadyRead)
+        self.socket.disconnected.connect(self.onDisconnected)
+        self.retryTimer = QTimer(self)
+        self.retryTimer.setSingleShot(True)
+        self.retryTimer.setInterval(self.RETRY_INTERVAL)
+        self.retryTimer.timeout.connect(self.tryConnect)
+        self.framer = LineFramer("utf-8", MAX_MESSAGE_BYTES)
+        self.nextId = 0
+        self.callbacks: Dict[int, Optional[Callable[[dict], None]]] = {}
+        self.openCallbacks: List[Callable[[bool], None]] = []
+
+    @classmethod
+    def instance(cls) -> Optional["DaemonClient"]:
+        """
+        已连接的客户端；守护进程未运行时返回 None，每次调用都会重试连接。
+        本地套接字的连接在 connectToServer() 中就已成功或失败，不需要等待。
+        """
+        if cls._instance is None:
+            cls._instance = cls()
+        if cls._instance.connected() or cls._instance.tryConnect():
+            return cls._instance
+        return None
+
+    def connected(self) -> bool:
+        return self.socket.state() == QLocalSocket.ConnectedState
+
+    def tryConnect(self) -> bool:
+        """发起连接并返回是否已连接，结果同时由 onConnected / onConnectError 处理"""
+        if self.socket.state() != QLocalSocket.UnconnectedState:
+            return self.connected()
+        self.framer = LineFramer("utf-8", MAX_MESSAGE_BYTES)
+        self.socket.connectToServer(self.socketName)
+        return self.connected()
+
+    def spawnHost(self) -> bool:
+        """启动宿主进程，之后 SPAWN_TIMEOUT 内的连接失败会定时重试"""
+        if self.spawn is None or not self.spawn():
+            return False
+        self.spawnDeadline = monotonic() + self.SPAWN_TIMEOUT / 1000
+        return True
+
+    def open(self, callback: Callable[[bool], None], spawn: bool = False):
+        """连接，无法连接且 spawn 时先启动宿主进程；callback 收到是否连接成功"""
+        if self.connected():
+            callback(True)
+            return
+        self.openCallbacks.append(callback)
+        self.spawnRequested = self.spawnRequested or spawn
+        if self.socket.state() == QLocalSocket.UnconnectedState and not self.retryTimer.isActive():
+            self.tryConnect()
+
+    def onConnected(self):
+        MCSL2Logger.info(f"attached to {self.socketName}")
+        self.finishOpen(True)
+
+    def onConnectError(self, error):
+        # 已连接的套接字出错时由 disconnected 处理
+        if not self.openCallbacks or self.connected():
+            return
+        if self.spawnDeadline is None and self.spawnRequested:
+            self.spawnHost()
+        if self.spawnDeadline is not None and monotonic() < self.spawnDeadline:
+            self.retryTimer.start()
+            return
+        if self.spawnDeadline is not None:
+            MCSL2Logger.warning(f"{self.socketName} did not come up")
+        self.finishOpen(False)
+
+    def finishOpen(self, connected: bool):
+        self.spawnRequested = False
+        self.spawnDeadline = None
+        callbacks, self.openCallbacks = self.openCallbacks, []
+        for callback in callbacks:
+            callback(connected)
+
+    def onDisconnected(self):
+        callbacks, self.callbacks = self.callbacks, {}
+        for callback in callbacks.values():
+            if callback is not None:
+                callback(self.CONNECTION_CLOSED)
+        self.disconnected.emit()
+
+    def release(self):
+        """服务器窗口不再使用该连接；共用的守护进程连接保持，宿主进程的连接断开以便其空闲时退出"""
+        if self is not DaemonClient._instance and self.connected():
+            self.socket.disconnectFromServer()
+
+    def request(
+        self, method: str, params: dict, callback: Optional[Callable[[dict], None]] = None
+    ) -> int:
+        """发送请求，callback 收到完整的响应(含 result 或 error)"""
+        self.nextId += 1
+        if not self.connected():
+            if callback is not None:
+                callback(self.CONNECTION_CLOSED)
+            return self.nextId
+        self.callbacks[self.nextId] = callback
+        self.socket.write(
+            encodeMessage({"jsonrpc": "2.0", "id": self.nextId, "method": method, "params": params})
+        )
+        return self.nextId
+
+    def onReadyRead(self):
+        for line in self.framer.feed(self.socket.readAll().data()):
+            if not line.strip():
+                continue
+            try:
+                message = loads(line)
+            except ValueError:
+                continue
+            if "method" in message:
+                self.notified.emit(message["method"], message.get("params") or {})
+                continue
+            callback = self.callbacks.pop(message.get("id"), None)
+            if callback is not None:
+                callback(message)
+
+
+class _RemoteProcess(QObject):
+    """守护进程中的服务器进程，只提供窗口用到的进程 ID 与启动信号"""
+
+    started = pyqtSignal()
+
+    def __init__(self, pid: Optional[int] = None, parent=None):
+        super().__init__(parent)
+        self.pid = pid or 0
+
+    def processId(self) -> int:
+        return self.pid
+
+    def state(self):
+        return QProcess.Running if self.pid else QProcess.NotRunning
+
+
+class _RemoteServer:
+    def __init__(self, pid: Optional[int] = None):
+        self.process = _RemoteProcess(pid)
+
+
+class _RemoteServerBridge(QObject):
+    """
+    与 _ServerProcessBridge 接口相同，操作转发给守护进程或宿主进程，状态与终端输出来自它们的通知。
+    连接与第一次查询完成前按正在启动显示；关闭窗口时只断开连接，服务器继续运行。
+    """
+
+    serverLogOutput = pyqtSignal(str)
+    serverLogOutputBatch = pyqtSignal(list)
+    serverLogBacklog = pyqtSignal(list)
+    serverClosed = pyqtSignal(int)
+    serverRestarted = pyqtSignal()
+    serverStateChanged = pyqtSignal(object)
+    eulaRequired = pyqtSignal(object)
+    versionMismatch = pyqtSignal(str)
+    serverPlayers = pyqtSignal(list)
+
+    # 关闭窗口时服务器可以继续运行
+    detachable = True
+    # 连接时补齐的历史输出行数
+    BACKLOG = 200
+
+    def __init__(self, client: DaemonClient, v: ServerVariables):
+        super().__init__()
+        self.client = client
+        self.config = v
+        self.state = ServerState.STARTING
+        # 正在连接并查询状态，此期间的 STARTING 通知不再重复发出
+        self.attaching = True
+        # 服务器已在运行时才显示补齐的历史输出
+        self.replayBacklog = False
+        self.serverProcess = _RemoteServer()
+        self.outputTail = []
+        # 自动重启由守护进程或宿主进程中的 ServerSupervisor 负责，这里只保存其最新状态
+        self.supervisionStatus: Optional[SupervisionStatus] = None
+        client.notified.connect(self.onNotified)
+        client.disconnected.connect(self.onDisconnected)
+
+    def attach(self):
+        """连接(必要时启动宿主进程)并订阅，服务器未运行时请求启动"""
+        self.client.open(self.onOpened, spawn=True)
+
+    def onOpened(self, connected: bool):
+        if not connected:
+            self.failStart("无法连接到后台服务")
+            return
+        serverName = self.config.serverName
+        self.client.request("ping", {}, self.onPing)
+        # 先订阅，避免错过启动过程中的状态变化；三个请求一并发出、按顺序处理，
+        # 历史输出因此恰好接在之后的实时输出之前，既不重复也不遗漏
+        self.client.request("subscribe", {"servers": [serverName]})
+        self.client.request("status", {"server": serverName}, self.onStatus)
+        self.client.request(
+            "console", {"server": serverName, "lines": self.BACKLOG}, self.onBacklog
+        )
+
+    def onPing(self, response: dict):
+        """更新 MCSL2 后连接到旧版本启动的后台服务时，协议可能已有变化，提醒用户方便时重启服务器"""
+        version = response.get("result", {}).get("version")
+        if version and version != MCSL2VERSION:
+            MCSL2Logger.warning(
+                f"{self.client.socketName} runs MCSL2 {version}, this is {MCSL2VERSION}"
+            )
+            self.versionMismatch.emit(version)
+
+    def onStatus(self, response: dict):
+        if "error" in response:
+            self.failStart(response["error"]["message"])
+        elif ServerState(response["result"]["state"]).alive:
+            self.replayBacklog = True
+            self.adopt(response["result"])
+        else:
+            self.client.request("start", {"server": self.config.serverName}, self.onStarted)
+
+    def onStarted(self, response: dict):
+        if "error" not in response:
+            self.adopt(response["result"])
+            return
+        # 同意 EULA 后再次启动时会重新连接
+        if response["error"]["code"] == EULA_NOT_ACCEPTED:
+            self.failStart("未同意 Minecraft EULA", ServerState.STOPPED)
+            self.client.release()
+            self.eulaRequired.emit(_MinecraftEULA(self.config.serverName))
+        else:
+            self.failStart(response["error"]["message"])
+            self.client.release()
+
+    def adopt(self, status: dict):
+        """连接完成，按守护进程或宿主进程报告的状态更新"""
+        self.attaching = False
+        state = ServerState(status["state"])
+        if state.alive:
+            self.setPid(status.get("pid"))
+            # 玩家会话由后台服务记录，窗口从其在线列表继续
+            self.serverPlayers.emit(status.get("players", []))
+        if state != self.state:
+            reason = {ServerState.RUNNING: StopReason.DONE, ServerState.STOPPING: StopReason.STOP}
+            self.applyEvent(
+                LifecycleEvent(
+                    self.config.serverName,
+                    self.state,
+                    state,
+                    reason.get(state, StopReason.EXITED),
+                    None,
+                    time(),
+                    status.get("detail", ""),
+                )
+            )
+
+    def setPid(self, pid: Optional[int]):
+        """进程 ID 可能同时由通知与查询结果得到，只发出一次启动信号"""
+        if pid and pid != self.serverProcess.process.pid:
+            self.serverProcess.process.pid = pid
+            self.serverProcess.process.started.emit()
+
+    def failStart(self, detail: str, state: ServerState = ServerState.CRASHED):
+        self.attaching = False
+        self.applyEvent(
+            LifecycleEvent(
+                self.config.serverName,
+                self.state,
+                state,
+                StopReason.FAILED_TO_START,
+                None,
+                time(),
+                detail,
+            )
+        )
+
+    def onBacklog(self, response: dict):
+        """历史输出已由后台服务归档，窗口只显示，不再计入玩家、报错与启动完毕"""
+        if self.replayBacklog and (lines := response.get("result")):
+            self.serverLogBacklog.emit(lines)
+
+    def onNotified(self, method: str, params: dict):
+        if params.get("server") != self.config.serverName:
+            return
+        if method == "console":
+            self.serverLogOutputBatch.emit(params["lines"])
+        elif method == "started":
+            self.setPid(params["pid"])
+        elif method == "supervision":
+            self.supervisionStatus = SupervisionStatus(
+                params["server"],
+                SupervisionState(params["state"]),
+                ExitKind(params["lastExit"]) if params["lastExit"] else None,
+                params["attempt"],
+                params["restarts"],
+                params["budget"],
+                params["restartAt"],
+                params["detail"],
+            )
+            # 与本进程中的监管者共用同一个信号，窗口按服务器名处理
+            ServerSupervisor.signals().statusChanged.emit(self.supervisionStatus)
+        elif method == "state":
+            if self.attaching and params["state"] == ServerState.STARTING.value:
+                return
+            self.applyEvent(
+                LifecycleEvent(
+                    params["server"],
+                    ServerState(params["previous"]),
+                    ServerState(params["state"]),
+                    params["reason"],
+                    params["exitCode"],
+                    params["time"],
+                    params["detail"],
+                ),
+                params.get("pid"),
+            )
+
+    def applyEvent(self, event: LifecycleEvent, pid: Optional[int] = None):
+        self.state = event.state
+        if event.state == ServerState.STARTING:
+            self.serverProcess = _RemoteServer(pid)
+        elif event.state.alive and pid:
+            self.serverProcess.process.pid = pid
+        elif not event.state.alive:
+            self.serverProcess.process.pid = 0
+            if event.previous.alive:
+                self.serverClosed.emit(event.exitCode or 0)
+        self.serverStateChanged.emit(event)
+
+    def onDisconnected(self):
+        if self.state.alive:
+            self.applyEvent(
+                LifecycleEvent(
+                    self.config.serverName,
+                    self.state,
+                    ServerState.STOPPED,
+                    StopReason.EXITED,
+                    None,
+                    time(),
+                    "与后台服务的连接已断开",
+                )
+            )
+
+    def forward(self, method: str, params: Optional[dict] = None):
+        params = dict(params or {}, server=self.config.serverName)
+        if self.client.connected():
+            self.client.request(method, params, self.onResponse)
+            return
+        # 宿主进程已退出时，只有启动服务器才需要重新启动它
+        self.client.open(
+            lambda connected: self.onReconnected(connected, method, params),
+            spawn=method in ("start", "restart"),
+        )
+
+    def onReconnected(self, connected: bool, method: str, params: dict):
+        if not connected:
+            self.failStart("无法连接到后台服务")
+            return
+        # 新的连接需要重新订阅，请求按顺序处理
+        self.client.request("subscribe", {"servers": [self.config.serverName]})
+        self.client.request(method, params, self.onResponse)
+
+    def onResponse(self, response: dict):
+        if "error" not in response:
+            return
+        if response["error"]["code"] == EULA_NOT_ACCEPTED:
+            self.eulaRequired.emit(_MinecraftEULA(self.config.serverName))
+            return
+        MCSL2Logger.warning(
+            f"daemon request for {self.config.serverName} failed: {response['error']['message']}"
+        )
+
+    def startServer(self):
+        if not self.state.alive:
+            self.forward("start")
+
+    def stopServer(self):
+        self.forward("stop")
+
+    def restartServer(self):
+        self.forward("restart")
+
+    def haltServer(self):
+        self.forward("halt")
+
+    def sendCommand(self, command: str):
+        self.forward("command", {"command": command})
+
+    def supervision(self) -> Optional[SupervisionStatus]:
+        return self.supervisionStatus
+
+    def cancelRestart(self):
+        self.forward("cancelRestart")
+
+    def isServerRunning(self):
+        return self.state.alive
+
+    def detach(self):
+        """窗口关闭：不再接收该服务器的通知，服务器继续运行"""
+        for signal, slot in (
+            (self.client.notified, self.onNotified),
+            (self.client.disconnected, self.onDisconnected),
+        ):
+            try:
+                signal.disconnect(slot)
+            except TypeError:
+                pass
+        if self.client.connected():
+            self.client.request("unsubscribe", {"servers": [self.config.serverName]})
+        self.client.release()
+
+
+class RemoteServerLauncher:
+    """
+    代替 ServerLauncher：请求守护进程或宿主进程启动服务器，或连接到已在运行的服务器。
+    立即返回远程服务器，连接、查询与启动的结果之后以状态变化报告，
+    需要同意 EULA 时发出 eulaRequired。
+    """
+
+    def __init__(self, client: DaemonClient, v: ServerVariables):
+        self.client = client
+        self.config = v
+
+    def start(self):
+        bridge = _RemoteServerBridge(self.client, self.config)
+        # 窗口连接状态信号之后再开始，连接失败的状态变化不会丢失
+        QTimer.singleShot(0, bridge.attach)
+        return bridge
+
+
+def hostClient(serverName: str, parent: Optional[QObject] = None) -> DaemonClient:
+    return DaemonClient(hostSocketName(serverName), lambda: spawnHost(serverName), parent)
+
+
+def attachRunningHost(
+    metadata: HostMetadata, callback: Callable[[DaemonClient], None], parent: QObject
+):
+    """连接到上次运行 MCSL2 时留下的宿主进程，其中的服务器仍在运行时以该连接回调"""
+    if metadata.version != MCSL2VERSION:
+        # 仍然连接，以免服务器失去控制台；窗口中会提示版本不一致
+        MCSL2Logger.warning(
+            f"host of server {metadata.server} was started by MCSL2 {metadata.version},"
+            f" this is {MCSL2VERSION}"
+        )
+    client = hostClient(metadata.server, parent)
+
+    def onStatus(response: dict):
+        if "error" not in response and ServerState(response["result"]["state"]).alive:
+            callback(client)
+            return
+        client.release()
+        client.deleteLater()
+
+    def onOpened(connected: bool):
+        if connected:
+            client.request("status", {"server": metadata.server}, onStatus)
+        else:
+            client.deleteLater()
+
+    client.open(onOpened)
+
+
+def createServerLauncher(v: ServerVariables):
+    """
+    守护进程正在运行时，图形界面作为它的客户端启动与控制服务器；已有宿主进程时直接连接；
+    开启"服务器独立运行"时启动新的宿主进程；其余情况以及无法启动宿主进程时由本进程运行。这里只发起连接与启动，不等待宿主进程开始监听。
+    """
+    if (client := DaemonClient.instance()) is not None:
+        return RemoteServerLauncher(client, v)
+    client = hostClient(v.serverName)
+    if client.tryConnect() or (cfg.get(cfg.detachServers) and client.spawnHost()):
+        return RemoteServerLauncher(client, v)
+    return ServerLauncher(v)
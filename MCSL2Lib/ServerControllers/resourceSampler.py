@@ -0,0 +1,284 @@
+#     Copyright 2024, MCSL Team, mailto:services@mcsl.com.cn
+#
+#     Part of "MCSL2", a simple and multifunctional Minecraft server launcher.
+#
+#     Licensed under the GNU General Public License, Version 3.0, with our
+#     additional agreements. (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#        https://github.com/MCSLTeam/MCSL2/raw/master/LICENSE
+#
+################################################################################
+"""
+Shared resource sampler for all running servers, with fixed-size history ring buffers.
+"""
+
+from array import array
+from math import nan
+from threading import Condition, Lock
+from time import monotonic, time
+from typing import Dict, List, NamedTuple, Optional
+
+from psutil import AccessDenied, NoSuchProcess, Process, WINDOWS, ZombieProcess, cpu_count
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from MCSL2Lib.ProgramControllers.metricsController import MetricFamily, MetricsRegistry
+from MCSL2Lib.utils import MCSL2Logger
+
+
+class ResourceSample(NamedTuple):
+    time: float
+    # 占整机 CPU 的百分比(0 ~ 100)
+    cpu: float
+    rss: float
+    # USS 需要遍历整个页表，只每隔 USS_EVERY 次采样一次，其余时间沿用上一次的值
+    uss: float
+    threads: float
+    # 每秒读写字节数
+    readRate: float
+    writeRate: float
+    # 打开的文件描述符(Windows 上为句柄)数
+    openFiles: float
+
+
+class ResourceHistory:
+    """
+    某个服务器的时间序列历史(资源占用、TPS 等)。
+    sampleType 的每个字段一条定长 array("d") 环形缓冲区，写满后覆盖最旧的数据，内存占用固定；
+    采样线程写入、界面线程读取，由锁保证读到的是完整的采样。
+    """
+
+    def __init__(self, capacity: int, sampleType=ResourceSample):
+        self.capacity = capacity
+        self.sampleType = sampleType
+        self.series = {field: array("d", [nan]) * capacity for field in sampleType._fields}
+        self.head = 0
+        self.count = 0
+        self.lock = Lock()
+
+    def append(self, sample: NamedTuple):
+        with self.lock:
+            for field, value in zip(self.sampleType._fields, sample):
+                self.series[field][self.head] = value
+            self.head = (self.head + 1) % self.capacity
+            self.count = min(self.count + 1, self.capacity)
+
+    def latest(self) -> Optional[NamedTuple]:
+        with self.lock:
+            if not self.count:
+                return None
+            index = (self.head - 1) % self.capacity
+            return self.sampleType(*(series[index] for series in self.series.values()))
+
+    def values(self, field: str, count: Optional[int] = None) -> List[float]:
+        """按时间从旧到新返回某字段最近 count 个采样"""
+        with self.lock:
+            count = self.count if count is None else min(count, self.count)
+            start = (self.head - count) % self.capacity
+            data = self.series[field]
+            if start + count <= self.capacity:
+                return data[start : start + count].tolist()
+            return data[start:].tolist() + data[: self.head].tolist()
+
+
+class _SampleTarget:
+    """一个被采样的服务器进程，缓存 psutil.Process 以及上一次的 IO 计数"""
+
+    def __init__(self, pid: int):
+        self.process = Process(pid)
+        self.process.cpu_percent(None)
+        self.uss = nan
+        self.lastIO = None
+        self.lastIOTime = 0.0
+        self.ticks = 0
+
+
+class _ResourceSamplerThread(QThread):
+    """
+    资源采样线程，每个周期在一轮中采样所有正在运行的服务器，
+    结果写入各自的 ResourceHistory 后通过 sampled 信号通知界面。
+    """
+
+    sampled = pyqtSignal(str, object)
+
+    def __init__(self, interval: float, ussEvery: int):
+        super().__init__()
+        self.setObjectName("ServerResourceSamplerThread")
+        self.interval = interval
+        self.ussEvery = ussEvery
+        self.cpuCount = cpu_count() or 1
+        self.targets: Dict[str, _SampleTarget] = {}
+        self.condition = Condition()
+        self.running = True
+
+    def run(self):
+        deadline = monotonic()
+        while True:
+            with self.condition:
+                # 没有服务器在运行时休眠，直到有新的服务器注册
+                while self.running and not self.targets:
+                    self.condition.wait()
+                    deadline = monotonic()
+                if not self.running:
+                    return
+                # 注册新服务器时的唤醒不提前采样
+                deadline = max(deadline + self.interval, monotonic())
+                while self.running and (remaining := deadline - monotonic()) > 0:
+                    self.condition.wait(remaining)
+                if not self.running:
+                    return
+                targets = list(self.targets.items())
+            for name, target in targets:
+                sample = self.sample(name, target)
+                if sample is None:
+                    continue
+                ServerResourceSampler.history(name).append(sample)
+                self.sampled.emit(name, sample)
+
+    def sample(self, name: str, target: _SampleTarget) -> Optional[ResourceSample]:
+        process = target.process
+        now = time()
+        try:
+            with process.oneshot():
+                cpu = process.cpu_percent(None) / self.cpuCount
+                rss = process.memory_info().rss
+                threads = process.num_threads()
+                openFiles = self.optional(process.num_handles if WINDOWS else process.num_fds)
+                io = self.optional(process.io_counters)
+            if target.ticks % self.ussEvery == 0:
+                fullInfo = self.optional(process.memory_full_info)
+                target.uss = nan if fullInfo is None else fullInfo.uss
+        except (NoSuchProcess, ZombieProcess):
+            # 进程已退出，等待窗口注销即可
+            with self.condition:
+                if self.targets.get(name) is target:
+                    del self.targets[name]
+            return None
+        except AccessDenied as e:
+            MCSL2Logger.warning(f"sample resources of {name} failed: {e}")
+            return None
+        target.ticks += 1
+
+        readRate = writeRate = nan
+        if io is not None:
+            if target.lastIO is not None and now > target.lastIOTime:
+                elapsed = now - target.lastIOTime
+                readRate = (io.read_bytes - target.lastIO.read_bytes) / elapsed
+                writeRate = (io.write_bytes - target.lastIO.write_bytes) / elapsed
+            target.lastIO, target.lastIOTime = io, now
+        return ResourceSample(
+            now,
+            cpu,
+            rss,
+            target.uss,
+            threads,
+            readRate,
+            writeRate,
+            nan if openFiles is None else openFiles,
+        )
+
+    @staticmethod
+    def optional(func):
+        """部分平台或权限下无法获取的指标返回 None，不影响其余指标"""
+        try:
+            return func()
+        except (AccessDenied, AttributeError, NotImplementedError):
+            return None
+
+
+class ServerResourceSampler:
+    """
+    所有服务器共用的资源采样服务。
+    服务器启动后以进程 ID 注册，关闭后注销；历史数据在程序运行期间按服务器名保留，
+    界面通过 sampled 信号与 history() 读取，不在界面线程中访问 psutil。
+    """
+
+    INTERVAL = 1.0
+    USS_EVERY = 30
+    HISTORY_SIZE = 3600
+
+    _thread: Optional[_ResourceSamplerThread] = None
+    _histories: Dict[str, ResourceHistory] = {}
+    _lock = Lock()
+
+    @classmethod
+    def sampler(cls) -> _ResourceSamplerThread:
+        """采样线程，首次调用时在界面线程中创建并启动"""
+        with cls._lock:
+            if cls._thread is None:
+                cls._thread = _ResourceSamplerThread(cls.INTERVAL, cls.USS_EVERY)
+                cls._thread.start()
+            return cls._thread
+
+    @classmethod
+    def history(cls, serverName: str) -> ResourceHistory:
+        with cls._lock:
+            if (history := cls._histories.get(serverName)) is None:
+                history = cls._histories[serverName] = ResourceHistory(cls.HISTORY_SIZE)
+            return history
+
+    @classmethod
+    def register(cls, serverName: str, pid: int):
+        """开始采样某个服务器进程；同名服务器重复注册时替换为新的进程"""
+        try:
+            target = _SampleTarget(pid)
+        except (NoSuchProcess, AccessDenied) as e:
+            MCSL2Logger.warning(f"register resource sampler for {serverName} failed: {e}")
+            return
+        thread = cls.sampler()
+        with thread.condition:
+            thread.targets[serverName] = target
+            thread.condition.notify()
+
+    @classmethod
+    def unregister(cls, serverName: str):
+        with cls._lock:
+            thread = cls._thread
+        if thread is None:
+            return
+        with thread.condition:
+            thread.targets.pop(serverName, None)
+
+    @classmethod
+    def runningServers(cls) -> List[str]:
+        with cls._lock:
+            thread = cls._thread
+        if thread is None:
+            return []
+        with thread.condition:
+            return list(thread.targets)
+
+    @classmethod
+    def collectMetrics(cls):
+        """导出时读取各服务器最近一次采样，不额外访问进程"""
+        families = {
+            field: MetricFamily(name, "gauge", documentation, ("server",))
+            for field, name, documentation in (
+                ("cpu", "mcsl2_server_cpu_percent", "CPU usage as a share of the whole machine."),
+                ("rss", "mcsl2_server_rss_bytes", "Resident set size of the server process."),
+                ("uss", "mcsl2_server_uss_bytes", "Unique set size, refreshed periodically."),
+                ("threads", "mcsl2_server_threads", "Threads of the server process."),
+                ("openFiles", "mcsl2_server_open_files", "Open file descriptors or handles."),
+            )
+        }
+        for serverName in cls.runningServers():
+            if (sample := cls.history(serverName).latest()) is None:
+                continue
+            for field, family in families.items():
+                family.labels(serverName).set(getattr(sample, field))
+        return families.values()
+
+    @classmethod
+    def shutDown(cls):
+        with cls._lock:
+            thread, cls._thread = cls._thread, None
+        if thread is None:
+            return
+        with thread.condition:
+            thread.running = False
+            thread.condition.notify()
+        thread.wait()
+
+
+MetricsRegistry.addCollector(ServerResourceSampler.collectMetrics)
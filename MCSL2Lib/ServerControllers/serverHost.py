@@ -0,0 +1,238 @@
+#     Copyright 2024, MCSL Team, mailto:services@mcsl.com.cn
+#
+#     Part of "MCSL2", a simple and multifunctional Minecraft server launcher.
+#
+#     Licensed under the GNU General Public License, Version 3.0, with our
+#     additional agreements. (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#        https://github.com/MCSLTeam/MCSL2/raw/master/LICENSE
+#
+################################################################################
+"""
+Detached server hosts: each server runs under its own process that outlives the launcher.
+"""
+
+import sys
+from hashlib import md5
+from json import dump, load
+from os import getpid, listdir, makedirs, remove, path as osp
+from time import time
+from typing import List, NamedTuple, Optional
+
+from psutil import WINDOWS, pid_exists
+from PyQt5.QtCore import QCoreApplication, QProcess, QTimer
+
+import MCSL2Lib
+from MCSL2Lib import MCSL2VERSION
+from MCSL2Lib.ProgramControllers.daemonController import (
+    UNKNOWN_SERVER,
+    DaemonError,
+    DaemonServer,
+    installShutdownSignals,
+)
+from MCSL2Lib.ProgramControllers.playerSessionController import PlayerSessionIndex
+from MCSL2Lib.ServerControllers.serverLifecycle import LifecycleEvent, ServerLifecycle
+from MCSL2Lib.ServerControllers.serverSupervisor import (
+    ServerSupervisor,
+    SupervisionState,
+    SupervisionStatus,
+)
+from MCSL2Lib.utils import MCSL2Logger
+
+HOSTS_DIR = "MCSL2/Hosts"
+
+
+class HostMetadata(NamedTuple):
+    server: str
+    # 宿主进程与服务器进程的 PID，服务器未运行时 pid 为 None
+    hostPid: int
+    pid: Optional[int]
+    socket: str
+    startedAt: float
+    version: str
+
+
+def hostKey(serverName: str) -> str:
+    """服务器名可能含有空格或非 ASCII 字符，文件名与管道名使用其摘要"""
+    return md5(serverName.encode("utf-8")).hexdigest()[:12]
+
+
+def hostSocketName(serverName: str) -> str:
+    if WINDOWS:
+        installation = md5(osp.abspath(".").encode("utf-8")).hexdigest()[:12]
+        return f"MCSL2Host-{installation}-{hostKey(serverName)}"
+    return osp.abspath(f"{HOSTS_DIR}/{hostKey(serverName)}.sock")
+
+
+def hostMetadataPath(serverName: str) -> str:
+    return f"{HOSTS_DIR}/{hostKey(serverName)}.json"
+
+
+def discoverHosts() -> List[HostMetadata]:
+    """
+    上次运行 MCSL2 时启动、宿主进程仍然存在的服务器。
+    宿主进程已退出的记录会被删除；若服务器进程仍在运行，它的输入输出已无法恢复，只记录日志。
+    """
+    if not osp.isdir(HOSTS_DIR):
+        return []
+    hosts = []
+    for fileName in listdir(HOSTS_DIR):
+        if not fileName.endswith(".json"):
+            continue
+        path = osp.join(HOSTS_DIR, fileName)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                metadata = HostMetadata(**load(f))
+        except (OSError, ValueError, TypeError) as e:
+            MCSL2Logger.warning(f"unreadable server host metadata {path}: {e}")
+            continue
+        if pid_exists(metadata.hostPid):
+            hosts.append(metadata)
+            continue
+        if metadata.pid is not None and pid_exists(metadata.pid):
+            MCSL2Logger.warning(
+                f"host of server {metadata.server} is gone, "
+                f"its process {metadata.pid} is still running without a console"
+            )
+        try:
+            remove(path)
+        except OSError:
+            pass
+    return hosts
+
+
+def spawnHost(serverName: str) -> bool:
+    """在新的会话中启动服务器的宿主进程，它不随 MCSL2 退出"""
+    # 从源码运行时由解释器执行入口脚本，打包后 sys.executable 即为程序本身
+    entry = osp.join(osp.dirname(osp.dirname(osp.abspath(MCSL2Lib.__file__))), "MCSL2.py")
+    arguments = [entry] if osp.exists(entry) else []
+    process = QProcess()
+    process.setProgram(sys.executable)
+    process.setArguments([*arguments, "--host", serverName])
+    process.setWorkingDirectory(osp.abspath("."))
+    process.setStandardInputFile(QProcess.nullDevice())
+    process.setStandardOutputFile(QProcess.nullDevice())
+    process.setStandardErrorFile(QProcess.nullDevice())
+    started, pid = process.startDetached()
+    if not started:
+        MCSL2Logger.warning(f"failed to start host for server {serverName}")
+        return False
+    MCSL2Logger.info(f"started host {pid} for server {serverName}")
+    return True
+
+
+class ServerHost(DaemonServer):
+    """
+    只运行一个服务器的守护进程，由 MCSL2.py --host 服务器名 启动。
+    服务器的标准输入输出由宿主进程持有，MCSL2 关闭或更新后服务器继续运行，
+    重新打开时通过本地套接字连接并补齐终端输出；
+    服务器已停止、没有等待中的自动重启且没有客户端连接时，宿主进程在 IDLE_GRACE 秒后退出。
+    """
+
+    IDLE_GRACE = 30
+
+    def __init__(self, serverName: str, parent=None):
+        super().__init__(parent)
+        self.serverName = serverName
+        self.startedAt = time()
+        for method in ("download", "downloadStatus"):
+            self.methods.pop(method)
+        self.idleTimer = QTimer(self)
+        self.idleTimer.setSingleShot(True)
+        self.idleTimer.setInterval(self.IDLE_GRACE * 1000)
+        self.idleTimer.timeout.connect(self.quitIfIdle)
+
+    def socketName(self) -> str:
+        return hostSocketName(self.serverName)
+
+    def listen(self) -> bool:
+        makedirs(HOSTS_DIR, exist_ok=True)
+        if not super().listen():
+            return False
+        self.writeMetadata()
+        self.idleTimer.start()
+        return True
+
+    def onNewConnection(self):
+        known = len(self.connections)
+        super().onNewConnection()
+        self.idleTimer.stop()
+        for connection in self.connections[known:]:
+            connection.socket.disconnected.connect(self.idleTimer.start)
+
+    def dispatch(self, connection, method: str, params: dict):
+        if params.get("server", self.serverName) != self.serverName:
+            raise DaemonError(UNKNOWN_SERVER, f"this host only runs {self.serverName!r}")
+        return super().dispatch(connection, method, params)
+
+    def listServers(self, connection):
+        return [self.serverStatus(self.serverName)]
+
+    def idle(self) -> bool:
+        if self.connections or ServerLifecycle.state(self.serverName).alive:
+            return False
+        supervision = ServerSupervisor.status(self.serverName)
+        return supervision is None or supervision.state != SupervisionState.BACKOFF
+
+    def quitIfIdle(self):
+        if not self.shuttingDown and self.idle():
+            MCSL2Logger.info(f"host of server {self.serverName} is idle")
+            self.shuttingDown = True
+        super().quitIfIdle()
+
+    def onStateChanged(self, event: LifecycleEvent):
+        super().onStateChanged(event)
+        if event.serverName != self.serverName:
+            return
+        if event.state.alive and (bridge := ServerSupervisor.bridge(self.serverName)):
+            if not bridge.serverProcess.process.processId():
+                bridge.serverProcess.process.started.connect(self.writeMetadata)
+        else:
+            self.idleTimer.start()
+        self.writeMetadata()
+
+    def onSupervisionChanged(self, status: Optional[SupervisionStatus]):
+        super().onSupervisionChanged(status)
+        # 取消等待中的重启后，宿主进程可能已经空闲
+        if status is not None and status.serverName == self.serverName:
+            if status.state != SupervisionState.BACKOFF:
+                self.idleTimer.start()
+
+    def writeMetadata(self):
+        pid = None
+        bridge = ServerSupervisor.bridge(self.serverName)
+        if bridge is not None and bridge.state.alive:
+            pid = bridge.serverProcess.process.processId() or None
+        metadata = HostMetadata(
+            self.serverName, getpid(), pid, self.socketName(), self.startedAt, MCSL2VERSION
+        )
+        try:
+            with open(hostMetadataPath(self.serverName), "w", encoding="utf-8") as f:
+                dump(metadata._asdict(), f, ensure_ascii=False)
+        except OSError as e:
+            MCSL2Logger.warning(f"failed to write host metadata of {self.serverName}: {e}")
+
+    def removeMetadata(self):
+        try:
+            remove(hostMetadataPath(self.serverName))
+        except OSError:
+            pass
+
+
+def runServerHost(argv: List[str]) -> int:
+    """宿主进程入口：MCSL2.py --host 服务器名"""
+    index = argv.index("--host")
+    if index + 1 >= len(argv):
+        return 2
+    app = QCoreApplication(argv)
+    host = ServerHost(argv[index + 1])
+    if not host.listen():
+        return 1
+    # 上一个宿主进程异常退出时遗留的会话
+    PlayerSessionIndex.closeInterrupted([host.serverName])
+    installShutdownSignals(host)
+    code = app.exec_()
+    host.removeMetadata()
+    return code
@@ -0,0 +1,130 @@
+#     Copyright 2024, MCSL Team, mailto:services@mcsl.com.cn
+#
+#     Part of "MCSL2", a simple and multifunctional Minecraft server launcher.
+#
+#     Licensed under the GNU General Public License, Version 3.0, with our
+#     additional agreements. (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#        https://github.com/MCSLTeam/MCSL2/raw/master/LICENSE
+#
+################################################################################
+"""
+Server lifecycle states and the shared stream of state changes.
+"""
+
+import enum
+import re
+from threading import Lock
+from typing import Dict, NamedTuple, Optional
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from MCSL2Lib.ProgramControllers.metricsController import MetricFamily, MetricsRegistry
+
+# 服务器启动完毕：[12:00:02] [Server thread/INFO]: Done (1.0s)! For help, type "help"
+# 只匹配固定的片段，扫描长度与行长成线性关系(旧版的双重先行断言在长行上是平方级的)
+DONE_PATTERN = re.compile(r"Done \([\d.,]+s\)!")
+
+
+class ServerState(enum.Enum):
+    STOPPED = "stopped"
+    STARTING = "starting"
+    RUNNING = "running"
+    STOPPING = "stopping"
+    CRASHED = "crashed"
+
+    @property
+    def alive(self) -> bool:
+        """进程仍在运行(包括正在启动与正在关闭)"""
+        return self in (ServerState.STARTING, ServerState.RUNNING, ServerState.STOPPING)
+
+
+class StopReason:
+    """LifecycleEvent.reason 的取值"""
+
+    # 进入 STARTING / RUNNING
+    LAUNCH = "launch"
+    DONE = "done"
+    # 进入 STOPPING 及关闭过程中的升级(STOPPING -> STOPPING)
+    STOP = "stop"
+    TERMINATE = "terminate"
+    KILL = "kill"
+    HALT = "halt"
+    # 不经 MCSL2 自行退出，或无法启动
+    EXITED = "exited"
+    FAILED_TO_START = "failedToStart"
+
+
+class LifecycleEvent(NamedTuple):
+    serverName: str
+    previous: ServerState
+    state: ServerState
+    reason: str
+    # 进程退出时的退出码，其余为 None
+    exitCode: Optional[int]
+    time: float
+    # 附加说明，例如无法启动的原因
+    detail: str = ""
+
+
+class _LifecycleEventStream(QObject):
+    stateChanged = pyqtSignal(object)
+
+
+class ServerLifecycle:
+    """
+    所有服务器的状态变化汇总成一个事件流，窗口、指标与其他组件订阅 events().stateChanged，
+    也可以用 state() 查询某个服务器当前的状态。状态机本身由各服务器的 _ServerProcessBridge 驱动。
+    """
+
+    _stream: Optional[_LifecycleEventStream] = None
+    _states: Dict[str, ServerState] = {}
+    _escalations: Dict[tuple, int] = {}
+    _lock = Lock()
+
+    @classmethod
+    def events(cls) -> _LifecycleEventStream:
+        with cls._lock:
+            if cls._stream is None:
+                cls._stream = _LifecycleEventStream()
+            return cls._stream
+
+    @classmethod
+    def state(cls, serverName: str) -> ServerState:
+        with cls._lock:
+            return cls._states.get(serverName, ServerState.STOPPED)
+
+    @classmethod
+    def publish(cls, event: LifecycleEvent):
+        with cls._lock:
+            cls._states[event.serverName] = event.state
+            if event.reason in (StopReason.TERMINATE, StopReason.KILL):
+                key = (event.serverName, event.reason)
+                cls._escalations[key] = cls._escalations.get(key, 0) + 1
+        cls.events().stateChanged.emit(event)
+
+    @classmethod
+    def collectMetrics(cls):
+        state = MetricFamily(
+            "mcsl2_server_state", "gauge", "Current lifecycle state.", ("server", "state")
+        )
+        escalations = MetricFamily(
+            "mcsl2_server_stop_escalations",
+            "counter",
+            "Stops that had to terminate or kill the process after a timeout.",
+            ("server", "signal"),
+        )
+        with cls._lock:
+            states = dict(cls._states)
+            counts = dict(cls._escalations)
+        for serverName, current in states.items():
+            for candidate in ServerState:
+                state.labels(serverName, candidate.value).set(int(candidate is current))
+        for (serverName, signal), count in counts.items():
+            escalations.labels(serverName, signal).set(count)
+        return state, escalations
+
+
+MetricsRegistry.addCollector(ServerLifecycle.collectMetrics)
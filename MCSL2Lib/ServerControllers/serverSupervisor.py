@@ -0,0 +1,321 @@
+#     Copyright 2024, MCSL Team, mailto:services@mcsl.com.cn
+#
+#     Part of "MCSL2", a simple and multifunctional Minecraft server launcher.
+#
+#     Licensed under the GNU General Public License, Version 3.0, with our
+#     additional agreements. (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#        https://github.com/MCSLTeam/MCSL2/raw/master/LICENSE
+#
+################################################################################
+"""
+Crash-loop-aware supervision: classifying exits, restarting with backoff, and quarantine.
+"""
+
+import enum
+from collections import deque
+from random import uniform
+from threading import Lock
+from time import time
+from typing import Deque, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+from MCSL2Lib.ProgramControllers.metricsController import MetricFamily, Metrics, MetricsRegistry
+from MCSL2Lib.ProgramControllers.settingsController import cfg
+from MCSL2Lib.ServerControllers.errorRuleEngine import ErrorRuleEngine
+from MCSL2Lib.ServerControllers.serverLifecycle import LifecycleEvent, ServerState, StopReason
+from MCSL2Lib.ServerControllers.serverUtils import getServerExtraSetting
+from MCSL2Lib.utils import MCSL2Logger
+
+# Windows 上进程被外部结束(如任务管理器)时的退出码
+EXTERNAL_KILL_EXIT_CODE = 62097
+
+
+class ExitKind(enum.Enum):
+    # 正常关闭，或由 MCSL2 关闭
+    CLEAN = "clean"
+    # 被外部结束进程，视为用户有意为之
+    EXTERNAL = "external"
+    # 崩溃，重启可能恢复
+    CRASH = "crash"
+    # 无法启动或检测到重启也无法解决的错误(Java 版本、启动参数、核心文件等)
+    MISCONFIGURED = "misconfigured"
+
+
+class SupervisionState(enum.Enum):
+    IDLE = "idle"
+    # 崩溃后等待重启
+    BACKOFF = "backoff"
+    # 重启过于频繁或重启无法解决，停止自动重启直到手动启动或解除隔离
+    QUARANTINED = "quarantined"
+
+
+class SupervisionStatus(NamedTuple):
+    serverName: str
+    state: SupervisionState
+    lastExit: Optional[ExitKind]
+    # 连续自动重启的次数，服务器稳定运行 STABLE_UPTIME 秒后清零
+    attempt: int
+    # 统计窗口内的自动重启次数与上限
+    restarts: int
+    budget: int
+    # 计划重启的时间，仅 BACKOFF 时有值
+    restartAt: Optional[float]
+    # 退出原因或隔离原因
+    detail: str
+
+
+def classifyExit(event: LifecycleEvent, outputTail: Iterable[str]) -> Tuple[ExitKind, str]:
+    """按退出码与最近输出中命中的报错规则对一次退出分类，返回 (类别, 说明)"""
+    if event.reason == StopReason.FAILED_TO_START:
+        return ExitKind.MISCONFIGURED, f"无法启动：{event.detail}"
+    if event.state != ServerState.CRASHED:
+        return ExitKind.CLEAN, ""
+    if event.exitCode == EXTERNAL_KILL_EXIT_CODE:
+        return ExitKind.EXTERNAL, "进程被外部结束"
+    findings = ErrorRuleEngine.analyzeLines(outputTail).results()
+    for finding in findings:
+        if not finding.rule.restartable:
+            return ExitKind.MISCONFIGURED, finding.message
+    detail = f"退出码 {event.exitCode}"
+    if findings:
+        detail += f"，{findings[0].message}"
+    return ExitKind.CRASH, detail
+
+
+def backoffDelay(attempt: int) -> float:
+    """第 attempt 次(从 0 开始)重启前的等待秒数：指数退避，取其一半加上同样范围内的随机抖动"""
+    delay = min(ServerSupervisor.BACKOFF_MAX, ServerSupervisor.BACKOFF_BASE * 2**attempt)
+    return delay / 2 + uniform(0, delay / 2)
+
+
+class _SupervisedServer:
+    """某个服务器的监管记录，只在界面线程中访问"""
+
+    def __init__(self, bridge):
+        self.bridge = bridge
+        self.state = SupervisionState.IDLE
+        self.lastExit: Optional[ExitKind] = None
+        self.detail = ""
+        self.attempt = 0
+        self.restartTimes: Deque[float] = deque()
+        self.restartAt: Optional[float] = None
+        self.startedAt = 0.0
+        # 正在由监管者发起重启，用于区分手动启动
+        self.restarting = False
+        self.exits: Dict[ExitKind, int] = {}
+        self.quarantines = 0
+        self.timer = QTimer()
+        self.timer.setSingleShot(True)
+
+
+class _SupervisorSignals(QObject):
+    # SupervisionStatus
+    statusChanged = pyqtSignal(object)
+
+
+class ServerSupervisor:
+    """
+    持有所有服务器的 _ServerProcessBridge，订阅其状态变化并对退出分类。
+    设置页中开启了崩溃后自动重启时，崩溃的服务器按指数退避加随机抖动的间隔重启；
+    统计窗口内的重启次数超出 restart_budget，或检测到重启也无法解决的错误时隔离该服务器，
+    直到手动启动或解除隔离。
+    """
+
+    BACKOFF_BASE = 5
+    BACKOFF_MAX = 300
+    # 运行超过该秒数后再崩溃，重新从最短的等待开始
+    STABLE_UPTIME = 600
+
+    _servers: Dict[str, _SupervisedServer] = {}
+    _signals: Optional[_SupervisorSignals] = None
+    _lock = Lock()
+
+    @classmethod
+    def signals(cls) -> _SupervisorSignals:
+        if cls._signals is None:
+            cls._signals = _SupervisorSignals()
+        return cls._signals
+
+    @classmethod
+    def register(cls, bridge):
+        """接管新创建的服务器进程；同名服务器此前的记录(及其计划中的重启)被替换"""
+        serverName = bridge.config.serverName
+        cls.unregister(serverName)
+        record = _SupervisedServer(bridge)
+        record.timer.timeout.connect(lambda: cls.restart(serverName))
+        bridge.serverStateChanged.connect(cls.onStateChanged)
+        with cls._lock:
+            cls._servers[serverName] = record
+
+    @classmethod
+    def unregister(cls, serverName: str):
+        """服务器窗口关闭后不再监管，取消计划中的重启"""
+        with cls._lock:
+            record = cls._servers.pop(serverName, None)
+        if record is None:
+            return
+        record.timer.stop()
+        try:
+            record.bridge.serverStateChanged.disconnect(cls.onStateChanged)
+        except TypeError:
+            pass
+
+    @classmethod
+    def bridge(cls, serverName: str):
+        with cls._lock:
+            record = cls._servers.get(serverName)
+        return record.bridge if record is not None else None
+
+    @classmethod
+    def serverNames(cls) -> List[str]:
+        with cls._lock:
+            return list(cls._servers)
+
+    @classmethod
+    def status(cls, serverName: str) -> Optional[SupervisionStatus]:
+        with cls._lock:
+            record = cls._servers.get(serverName)
+        if record is None:
+            return None
+        return SupervisionStatus(
+            serverName,
+            record.state,
+            record.lastExit,
+            record.attempt,
+            len(cls.pruneRestarts(record)),
+            getServerExtraSetting(record.bridge.config, "restart_budget"),
+            record.restartAt,
+            record.detail,
+        )
+
+    @staticmethod
+    def pruneRestarts(record: _SupervisedServer) -> Deque[float]:
+        window = getServerExtraSetting(record.bridge.config, "restart_window") * 60
+        while record.restartTimes and record.restartTimes[0] < time() - window:
+            record.restartTimes.popleft()
+        return record.restartTimes
+
+    @classmethod
+    def setState(cls, serverName: str, record: _SupervisedServer, state: SupervisionState):
+        record.state = state
+        if state != SupervisionState.BACKOFF:
+            record.timer.stop()
+            record.restartAt = None
+        if state == SupervisionState.QUARANTINED:
+            record.quarantines += 1
+            MCSL2Logger.warning(f"server {serverName} quarantined: {record.detail}")
+        cls.signals().statusChanged.emit(cls.status(serverName))
+
+    @classmethod
+    def onStateChanged(cls, event: LifecycleEvent):
+        with cls._lock:
+            record = cls._servers.get(event.serverName)
+        if record is None:
+            return
+        if event.state == ServerState.STARTING:
+            record.startedAt = event.time
+            if not record.restarting:
+                # 手动启动：取消等待中的重启，解除隔离并重新计数
+                record.attempt = 0
+                record.restartTimes.clear()
+                if record.state != SupervisionState.IDLE:
+                    record.detail = ""
+                    cls.setState(event.serverName, record, SupervisionState.IDLE)
+            return
+        if event.state.alive:
+            return
+        kind, record.detail = classifyExit(event, record.bridge.outputTail)
+        record.lastExit = kind
+        record.exits[kind] = record.exits.get(kind, 0) + 1
+        MCSL2Logger.info(f"server {event.serverName} exited: {kind.value} {record.detail}")
+        if kind in (ExitKind.CLEAN, ExitKind.EXTERNAL) or not cfg.get(cfg.restartServerWhenCrashed):
+            cls.setState(event.serverName, record, SupervisionState.IDLE)
+            return
+        if kind == ExitKind.MISCONFIGURED:
+            cls.setState(event.serverName, record, SupervisionState.QUARANTINED)
+            return
+        if event.time - record.startedAt >= cls.STABLE_UPTIME:
+            record.attempt = 0
+        budget = getServerExtraSetting(record.bridge.config, "restart_budget")
+        if len(cls.pruneRestarts(record)) >= budget:
+            window = getServerExtraSetting(record.bridge.config, "restart_window")
+            record.detail = f"{window} 分钟内已自动重启 {budget} 次，{record.detail}"
+            cls.setState(event.serverName, record, SupervisionState.QUARANTINED)
+            return
+        delay = backoffDelay(record.attempt)
+        record.attempt += 1
+        record.restartAt = time() + delay
+        record.timer.start(int(delay * 1000))
+        cls.setState(event.serverName, record, SupervisionState.BACKOFF)
+
+    @classmethod
+    def restart(cls, serverName: str):
+        with cls._lock:
+            record = cls._servers.get(serverName)
+        if record is None or record.state != SupervisionState.BACKOFF:
+            return
+        if record.bridge.state.alive:
+            return
+        record.restartTimes.append(time())
+        Metrics.restarts.labels(serverName).inc()
+        record.restarting = True
+        try:
+            record.bridge.startServer()
+        finally:
+            record.restarting = False
+        # 启动失败时已经进入了新的 BACKOFF 或隔离
+        if record.state == SupervisionState.BACKOFF and record.bridge.state.alive:
+            cls.setState(serverName, record, SupervisionState.IDLE)
+
+    @classmethod
+    def cancel(cls, serverName: str):
+        """取消计划中的重启，或解除隔离(不启动服务器)"""
+        with cls._lock:
+            record = cls._servers.get(serverName)
+        if record is None or record.state == SupervisionState.IDLE:
+            return
+        record.attempt = 0
+        record.restartTimes.clear()
+        cls.setState(serverName, record, SupervisionState.IDLE)
+
+    @classmethod
+    def collectMetrics(cls):
+        state = MetricFamily(
+            "mcsl2_server_supervision_state",
+            "gauge",
+            "Crash supervision state.",
+            ("server", "state"),
+        )
+        exits = MetricFamily(
+            "mcsl2_server_exits", "counter", "Server exits by classification.", ("server", "kind")
+        )
+        quarantines = MetricFamily(
+            "mcsl2_server_quarantines",
+            "counter",
+            "Times automatic restarts were stopped for a server.",
+            ("server",),
+        )
+        restartAt = MetricFamily(
+            "mcsl2_server_restart_scheduled_time_seconds",
+            "gauge",
+            "Unix time of the pending automatic restart.",
+            ("server",),
+        )
+        with cls._lock:
+            records = list(cls._servers.items())
+        for serverName, record in records:
+            for candidate in SupervisionState:
+                state.labels(serverName, candidate.value).set(int(candidate is record.state))
+            for kind, count in record.exits.items():
+                exits.labels(serverName, kind.value).set(count)
+            quarantines.labels(serverName).set(record.quarantines)
+            if record.restartAt is not None:
+                restartAt.labels(serverName).set(record.restartAt)
+        return state, exits, quarantines, restartAt
+
+
+MetricsRegistry.addCollector(ServerSupervisor.collectMetrics)
@@ -0,0 +1,389 @@
+#     Copyright 2024, MCSL Team, mailto:services@mcsl.com.cn
+#
+#     Part of "MCSL2", a simple and multifunctional Minecraft server launcher.
+#
+#     Licensed under the GNU General Public License, Version 3.0, with our
+#     additional agreements. (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#        https://github.com/MCSLTeam/MCSL2/raw/master/LICENSE
+#
+################################################################################
+"""
+TPS/MSPT polling and lag-spike telemetry derived from the server output stream.
+"""
+
+import re
+from bisect import bisect_left
+from collections import deque
+from math import isnan, nan
+from threading import Lock
+from time import monotonic, time
+from typing import Callable, Deque, Dict, List, NamedTuple, Optional, Pattern, Set, Tuple
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+from MCSL2Lib.ProgramControllers.metricsController import MetricFamily, MetricsRegistry
+from MCSL2Lib.ServerControllers.resourceSampler import ResourceHistory
+
+
+class TelemetrySample(NamedTuple):
+    time: float
+    tps: float
+    mspt: float
+
+
+# 处理函数从匹配结果中取出 {"tps": ..., "mspt": ...} 的一部分
+_Handler = Callable[["re.Match"], Dict[str, float]]
+
+
+class TelemetryProbe(NamedTuple):
+    """
+    一条查询指令及其回显的识别规则。
+    lines 中的每一项为 (正则, 处理函数, 是否为最后一行)，匹配到的行不会显示在终端中。
+    """
+
+    command: str
+    lines: List[Tuple[Pattern, Optional[_Handler], bool]]
+
+
+def _number(text: str) -> float:
+    # Paper 在 TPS 超过 20 时会输出 *20.0
+    return float(text.lstrip("*"))
+
+
+_TPS_PROBE = TelemetryProbe(
+    "tps",
+    [
+        (
+            re.compile(r"TPS from last 1m, 5m, 15m: (\*?[\d.]+), (\*?[\d.]+), (\*?[\d.]+)"),
+            lambda m: {"tps": _number(m.group(1))},
+            True,
+        )
+    ],
+)
+_MSPT_PROBE = TelemetryProbe(
+    "mspt",
+    [
+        (re.compile(r"Server tick times \(avg/min/max\) from last 5s, 10s, 1m"), None, False),
+        (
+            re.compile(r"([\d.]+)/[\d.]+/[\d.]+, [\d.]+/[\d.]+/[\d.]+, [\d.]+/[\d.]+/[\d.]+"),
+            lambda m: {"mspt": float(m.group(1))},
+            True,
+        ),
+    ],
+)
+
+
+def _forgeProbe(command: str) -> TelemetryProbe:
+    return TelemetryProbe(
+        command,
+        [
+            (
+                re.compile(r"Overall\s*: Mean tick time: ([\d.]+) ms\. Mean TPS: ([\d.]+)"),
+                lambda m: {"mspt": float(m.group(1)), "tps": float(m.group(2))},
+                True,
+            ),
+            (
+                re.compile(r"Overall: ([\d.]+) TPS \(([\d.]+) ms/tick\)"),
+                lambda m: {"tps": float(m.group(1)), "mspt": float(m.group(2))},
+                True,
+            ),
+            # 各维度的统计先于总计输出
+            (
+                re.compile(r"Mean tick time: [\d.]+ ms|: [\d.]+ TPS \([\d.]+ ms/tick\)"),
+                None,
+                False,
+            ),
+        ],
+    )
+
+
+# 原版 1.20.3+ 的 /tick query
+_TICK_QUERY_PROBE = TelemetryProbe(
+    "tick query",
+    [
+        (re.compile(r"The game is (?:running normally|sprinting|frozen|stepping)"), None, False),
+        (
+            re.compile(r"Target tick rate: ([\d.]+) per second"),
+            lambda m: {"targetTps": float(m.group(1))},
+            False,
+        ),
+        (
+            re.compile(r"Average time per tick: ([\d.]+)ms"),
+            lambda m: {"mspt": float(m.group(1))},
+            False,
+        ),
+        (re.compile(r"Percentiles: P50: "), None, True),
+    ],
+)
+
+# 指令不存在时的回显，一并隐藏并停止再查询该指令
+_UNKNOWN_COMMAND = re.compile(r"Unknown (?:or incomplete )?command|未知或不完整的命令|未知的命令")
+# 原版在 "Unknown or incomplete command" 之后还会输出一行 "tps<--[HERE]"，回显出错的指令
+_UNKNOWN_COMMAND_POSITION = "<--[HERE]"
+# Bukkit 的 "Unknown command" 不回显指令
+_UNKNOWN_COMMAND_NO_ECHO = "Unknown command"
+
+_SPIGOT_TYPES = {"spigot", "bukkit", "craftbukkit", "mohist", "arclight", "catserver", "banner"}
+
+# 指令不被支持时改用的指令，原版 1.20.3+ 均支持 /tick query
+TELEMETRY_FALLBACKS: Dict[str, TelemetryProbe] = {
+    "tps": _TICK_QUERY_PROBE,
+    "forge tps": _TICK_QUERY_PROBE,
+    "neoforge tps": _TICK_QUERY_PROBE,
+}
+
+
+def telemetryProbes(serverType: str) -> List[TelemetryProbe]:
+    """
+    按服务器类型选择查询指令。
+    Paper 系与未记录类型(手动导入的服务器)按 Paper 查询，不支持的指令在回显后被移除或替换。
+    """
+    serverType = serverType.lower()
+    if serverType == "forge":
+        return [_forgeProbe("forge tps")]
+    if serverType == "neoforge":
+        return [_forgeProbe("neoforge tps")]
+    if serverType in ("vanilla", "fabric", "quilt"):
+        return [_TICK_QUERY_PROBE]
+    if serverType in _SPIGOT_TYPES:
+        return [_TPS_PROBE]
+    return [_TPS_PROBE, _MSPT_PROBE]
+
+
+_LAG_PATTERN = re.compile(
+    r"Can't keep up! Is the server overloaded\? Running (\d+)ms or (\d+) ticks behind"
+)
+
+
+class LagHistogram:
+    """
+    "Can't keep up" 事件按落后时长分桶计数。
+    只由该服务器的分析线程写入；界面与导出线程只读取。
+    """
+
+    BUCKETS = (2000, 5000, 10000, 30000, 60000)
+    RECENT_SIZE = 256
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS) + 1)
+        self.total = 0
+        self.sumMs = 0.0
+        self.lastTime = 0.0
+        # 最近的 (时间, 落后毫秒数)，用于与 GC 停顿对照
+        self.recent: Deque[Tuple[float, float]] = deque(maxlen=self.RECENT_SIZE)
+
+    def observe(self, behindMs: float):
+        self.counts[bisect_left(self.BUCKETS, behindMs)] += 1
+        self.total += 1
+        self.sumMs += behindMs
+        self.lastTime = time()
+        self.recent.append((self.lastTime, behindMs))
+
+    def labels(self) -> List[str]:
+        bounds = [f"≤{b // 1000}s" for b in self.BUCKETS]
+        return bounds + [f">{self.BUCKETS[-1] // 1000}s"]
+
+
+class TelemetryParser:
+    """
+    在分析线程中逐行识别查询回显与卡顿事件。
+    expect() 在指令发出前调用；之后匹配到的回显行被吞掉，全部回显到齐或超时后写入一条采样。
+    """
+
+    TIMEOUT = 5.0
+
+    def __init__(self, serverName: str):
+        self.serverName = serverName
+        self.pending: List[TelemetryProbe] = []
+        self.values: Dict[str, float] = {}
+        self.deadline = 0.0
+        self.unsupported: List[str] = []
+        # 上一行是原版的未知指令提示，要由下一行回显的指令确定是否为查询的回显，先隐藏
+        self.holding = False
+        # 先隐藏的上一行并不是查询的回显，需要由调用方补回终端
+        self.released = False
+        # 上一轮查询中收到了不回显指令的未知指令提示的指令
+        self.suspected: Set[str] = set()
+
+    def expect(self, probes: List[TelemetryProbe]):
+        self.finish()
+        self.pending = list(probes)
+        self.deadline = monotonic() + self.TIMEOUT
+
+    def feed(self, text: str) -> Tuple[bool, bool]:
+        """返回 (该行是否应隐藏, 是否产生了新的采样或卡顿记录)"""
+        changed = False
+        if "keep up" in text and (match := _LAG_PATTERN.search(text)) is not None:
+            ServerTelemetry.lagHistogram(self.serverName).observe(float(match.group(1)))
+            changed = True
+        if self.holding:
+            self.holding = False
+            if _UNKNOWN_COMMAND_POSITION in text and (probe := self.echoedProbe(text)) is not None:
+                self.pending.remove(probe)
+                self.unsupported.append(probe.command)
+                if not self.pending:
+                    changed = self.finish() or changed
+                return True, changed
+            self.released = True
+        if not self.pending:
+            return False, changed
+        if monotonic() > self.deadline:
+            return False, self.finish() or changed
+        if (match := _UNKNOWN_COMMAND.search(text)) is not None:
+            if match.group() != _UNKNOWN_COMMAND_NO_ECHO:
+                self.holding = True
+                return True, changed
+            # 没有回显只能按发出的顺序对应，连续两轮都如此才认为不支持该指令，
+            # 以免把同时输入的错误指令的提示当作查询的回显
+            command = self.pending.pop(0).command
+            if command in self.suspected:
+                self.unsupported.append(command)
+            self.suspected.add(command)
+            if not self.pending:
+                changed = self.finish() or changed
+            return True, changed
+        for pattern, handler, final in self.pending[0].lines:
+            if (match := pattern.search(text)) is None:
+                continue
+            if handler is not None:
+                self.values.update(handler(match))
+            if final:
+                self.suspected.discard(self.pending.pop(0).command)
+                if not self.pending:
+                    changed = self.finish() or changed
+            return True, changed
+        return False, changed
+
+    def echoedProbe(self, text: str) -> Optional[TelemetryProbe]:
+        """
+        "<--[HERE]" 之前回显的指令对应的查询。
+        原版只回显出错位置前的 10 个字符，更早的部分以 "..." 省略，因此按指令的结尾比较。
+        """
+        echoed = text[: text.index(_UNKNOWN_COMMAND_POSITION)].rsplit(": ", 1)[-1]
+        for probe in self.pending:
+            if echoed == probe.command:
+                return probe
+            if echoed.startswith("...") and probe.command.endswith(echoed[3:]):
+                return probe
+        return None
+
+    def finish(self) -> bool:
+        """结束本轮查询，写入已取得的数值"""
+        self.pending = []
+        values, self.values = self.values, {}
+        mspt = values.get("mspt", nan)
+        tps = values.get("tps", nan)
+        if isnan(tps) and not isnan(mspt) and "targetTps" in values:
+            tps = min(values["targetTps"], 1000 / mspt) if mspt else values["targetTps"]
+        if isnan(tps) and isnan(mspt):
+            return False
+        ServerTelemetry.history(self.serverName).append(TelemetrySample(time(), tps, mspt))
+        return True
+
+
+class TelemetryPoller(QObject):
+    """
+    按间隔向服务器发送 TPS/MSPT 查询指令。
+    pollRequested 先于指令发出，分析线程据此识别并隐藏回显。
+    """
+
+    pollRequested = pyqtSignal(list)
+
+    def __init__(self, bridge, probes: List[TelemetryProbe], interval: int, parent=None):
+        super().__init__(parent)
+        self.bridge = bridge
+        self.probes = probes
+        self.tried = set()
+        self.timer = QTimer(self)
+        self.timer.setInterval(interval * 1000)
+        self.timer.timeout.connect(self.poll)
+
+    def start(self):
+        self.timer.start()
+
+    def stop(self):
+        self.timer.stop()
+
+    def setInterval(self, interval: int):
+        self.timer.setInterval(interval * 1000)
+
+    def removeProbes(self, commands: List[str]):
+        """移除服务器不支持的指令，有替代指令且未尝试过时改用替代指令"""
+        self.tried.update(commands)
+        probes = []
+        for probe in self.probes:
+            if probe.command not in commands:
+                probes.append(probe)
+            elif (fallback := TELEMETRY_FALLBACKS.get(probe.command)) is not None:
+                if fallback.command not in self.tried and fallback not in probes:
+                    probes.append(fallback)
+        self.probes = probes
+        if not self.probes:
+            self.timer.stop()
+
+    def poll(self):
+        if not self.probes or not self.bridge.isServerRunning():
+            return
+        self.pollRequested.emit(self.probes)
+        for probe in self.probes:
+            self.bridge.sendCommand(probe.command)
+
+
+class ServerTelemetry:
+    """各服务器的 TPS/MSPT 历史与卡顿直方图，在程序运行期间按服务器名保留"""
+
+    HISTORY_SIZE = 720
+
+    _histories: Dict[str, ResourceHistory] = {}
+    _lagHistograms: Dict[str, LagHistogram] = {}
+    _lock = Lock()
+
+    @classmethod
+    def history(cls, serverName: str) -> ResourceHistory:
+        with cls._lock:
+            if (history := cls._histories.get(serverName)) is None:
+                history = ResourceHistory(cls.HISTORY_SIZE, TelemetrySample)
+                cls._histories[serverName] = history
+            return history
+
+    @classmethod
+    def lagHistogram(cls, serverName: str) -> LagHistogram:
+        with cls._lock:
+            if (histogram := cls._lagHistograms.get(serverName)) is None:
+                histogram = cls._lagHistograms[serverName] = LagHistogram()
+            return histogram
+
+    @classmethod
+    def collectMetrics(cls):
+        tps = MetricFamily(
+            "mcsl2_server_tps", "gauge", "Last polled ticks per second.", ("server",)
+        )
+        mspt = MetricFamily(
+            "mcsl2_server_mspt", "gauge", "Last polled milliseconds per tick.", ("server",)
+        )
+        lagSpikes = MetricFamily(
+            "mcsl2_server_lag_spikes", "counter", "Can't keep up warnings.", ("server",)
+        )
+        lagBehind = MetricFamily(
+            "mcsl2_server_lag_behind_milliseconds",
+            "counter",
+            "Total milliseconds reported behind by Can't keep up warnings.",
+            ("server",),
+        )
+        with cls._lock:
+            histories = list(cls._histories.items())
+            histograms = list(cls._lagHistograms.items())
+        for serverName, history in histories:
+            if (sample := history.latest()) is not None:
+                tps.labels(serverName).set(sample.tps)
+                mspt.labels(serverName).set(sample.mspt)
+        for serverName, histogram in histograms:
+            lagSpikes.labels(serverName).set(histogram.total)
+            lagBehind.labels(serverName).set(histogram.sumMs)
+        return tps, mspt, lagSpikes, lagBehind
+
+
+MetricsRegistry.addCollector(ServerTelemetry.collectMetrics)
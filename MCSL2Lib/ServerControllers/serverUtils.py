@@ -15,90 +15,271 @@
 Communicate with Minecraft servers.
 """
 
-from PyQt5.QtCore import QObject, pyqtSignal, QTimer, pyqtSlot, Qt, QThread
-from PyQt5.QtWidgets import QFileDialog
-from psutil import NoSuchProcess, Process, AccessDenied
-from MCSL2Lib.ServerControllers.processCreator import _ServerProcessBridge
+from PyQt5.QtCore import pyqtSignal, Qt, QThread
+from MCSL2Lib.ProgramControllers.settingsController import cfg
+from MCSL2Lib.utils import MCSL2Logger
 from MCSL2Lib.variables import ServerVariables
-from os import path as osp, mkdir
-from qfluentwidgets import InfoBar, InfoBarPosition
+from json import dumps, loads
+from os import path as osp, mkdir, stat
+from threading import Lock
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
 from shutil import make_archive, copytree, rmtree
 
 
-class MinecraftServerResMonitorUtil(QObject):
+def parseServerProperties(filePath: str) -> Dict[str, str]:
+    properties = {}
+    with open(filePath, "r", encoding="utf-8") as serverPropertiesFile:
+        for line in serverPropertiesFile:
+            line = line.strip()
+            if line and not line.startswith("#") and "=" in line:
+                key, value = line.split("=", 1)
+                properties[key.strip()] = value.strip()
+    return properties
+
+
+class ServerPropertiesCache:
     """
-    获取服务器资源占用的线程
+    server.properties 的共享缓存。
+    以服务器名为键，按文件的 (mtime, size) 校验是否过期；内置配置编辑器写入后会主动失效。
     """
 
-    memPercent = pyqtSignal(float)
-    cpuPercent = pyqtSignal(float)
+    _cache: Dict[str, Tuple[Tuple[int, int], Dict[str, str]]] = {}
+    _lock = Lock()
 
-    def __init__(self, serverConfig, bridge: _ServerProcessBridge, parent=None):
-        super().__init__(parent)
-        self.bridge = bridge
-        self.setObjectName("MinecraftServerResMonitorThread")
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.getServerMem)
-        self.timer.timeout.connect(self.getServerCPU)
-        self.timer.start(1000)
-        self.divisionNumList = {"G": 1073741824, "M": 1048576}
-        self.serverConfig: ServerVariables = serverConfig
-
-    def getServerMem(self):
-        divisionNum = self.divisionNumList[self.serverConfig.memUnit]
-        try:
-            if self.bridge.isServerRunning():
-                serverMem = (
-                    Process(self.bridge.handledServer.process.processId()).memory_full_info().uss
-                    / divisionNum
-                )
-                self.memPercent.emit(float("{:.4f}".format(serverMem)))
-            else:
-                self.memPercent.emit(0.0000)
-        except NoSuchProcess:
-            pass
-        except PermissionError:
-            pass
-        except AccessDenied:
-            pass
+    @staticmethod
+    def getPath(serverName: str) -> str:
+        return f"./Servers/{serverName}/server.properties"
 
-    def getServerCPU(self):
+    @classmethod
+    def get(cls, serverName: str) -> Dict[str, str]:
+        """获取服务器的配置，返回的字典为缓存本身，请勿修改"""
+        filePath = cls.getPath(serverName)
         try:
-            if self.bridge.isServerRunning():
-                serverCPU = Process(self.bridge.handledServer.process.processId()).cpu_percent(
-                    interval=0.01
-                )
-                self.cpuPercent.emit(float("{:.4f}".format(serverCPU / 10)))
-            else:
-                self.cpuPercent.emit(0.0000)
-        except NoSuchProcess:
-            pass
-        except PermissionError:
-            pass
-        except AccessDenied:
-            pass
+            fileStat = stat(filePath)
+        except FileNotFoundError:
+            cls.invalidate(serverName)
+            return {"msg": "File not found"}
+        signature = (fileStat.st_mtime_ns, fileStat.st_size)
+        with cls._lock:
+            entry = cls._cache.get(serverName)
+        if entry is not None and entry[0] == signature:
+            return entry[1]
+        try:
+            properties = parseServerProperties(filePath)
+        except FileNotFoundError:
+            return {"msg": "File not found"}
+        with cls._lock:
+            cls._cache[serverName] = (signature, properties)
+        return properties
 
-    @pyqtSlot(int)
-    def onServerClosedHandler(self):
-        self.cpuPercent.emit(0.0)
-        self.memPercent.emit(0.0)
-        self.timer.stop()
+    @classmethod
+    def invalidate(cls, serverName: Optional[str] = None):
+        """使某个服务器(不指定则全部)的缓存失效"""
+        with cls._lock:
+            if serverName is None:
+                cls._cache.clear()
+            else:
+                cls._cache.pop(serverName, None)
 
 
 def readServerProperties(serverConfig: ServerVariables):
-    serverConfig.serverProperties.clear()
+    serverConfig.serverProperties = dict(ServerPropertiesCache.get(serverConfig.serverName))
+
+
+class ServerExtraSetting(NamedTuple):
+    """
+    可在服务器窗口中单独设置的项目，保存在服务器配置的 extra_data 中。
+    default 为布尔值时显示为开关，否则显示为 [minimum, maximum] 范围内的整数。
+    """
+
+    key: str
+    title: str
+    content: str
+    default: Callable[[], Any]
+    minimum: int = 0
+    maximum: int = 0
+    suffix: str = ""
+
+
+SERVER_EXTRA_SETTINGS: List[ServerExtraSetting] = [
+    ServerExtraSetting(
+        key="console_capacity",
+        title="终端保留行数",
+        content="超出的旧日志将压缩保存到磁盘，可在“历史输出”中翻阅。",
+        default=lambda: cfg.get(cfg.consoleCapacity),
+        minimum=cfg.consoleCapacity.range[0],
+        maximum=cfg.consoleCapacity.range[1],
+        suffix=" 行",
+    ),
+    ServerExtraSetting(
+        key="stop_timeout",
+        title="正常关闭超时",
+        content="发送 stop 后等待服务器保存并退出的时间，超时后发送终止信号。",
+        default=lambda: 90,
+        minimum=10,
+        maximum=1800,
+        suffix=" 秒",
+    ),
+    ServerExtraSetting(
+        key="kill_timeout",
+        title="终止信号超时",
+        content="发送终止信号后仍未退出则强制结束进程；Windows 上正常关闭超时后直接强制结束。",
+        default=lambda: 15,
+        minimum=3,
+        maximum=300,
+        suffix=" 秒",
+    ),
+    ServerExtraSetting(
+        key="restart_budget",
+        title="自动重启次数上限",
+        content="崩溃后自动重启(在设置页中开启)在统计窗口内超过该次数时停止重启并隔离服务器，手动启动后解除。",
+        default=lambda: 5,
+        minimum=1,
+        maximum=50,
+        suffix=" 次",
+    ),
+    ServerExtraSetting(
+        key="restart_window",
+        title="自动重启统计窗口",
+        content="统计自动重启次数的时间范围。",
+        default=lambda: 30,
+        minimum=1,
+        maximum=1440,
+        suffix=" 分钟",
+    ),
+    ServerExtraSetting(
+        key="tps_polling",
+        title="定期查询 TPS/MSPT",
+        content="服务器启动完毕后定期发送 tps 等指令，回显不会显示在终端中。",
+        default=lambda: False,
+    ),
+    ServerExtraSetting(
+        key="tps_poll_interval",
+        title="TPS/MSPT 查询间隔",
+        content="每次查询之间的间隔。",
+        default=lambda: 30,
+        minimum=5,
+        maximum=600,
+        suffix=" 秒",
+    ),
+    ServerExtraSetting(
+        key="jvm_sampling",
+        title="采样 JVM 堆与 GC",
+        content="使用 Java 自带的 jstat 定期采样堆占用与 GC 次数、耗时，需要使用 JDK。",
+        default=lambda: False,
+    ),
+    ServerExtraSetting(
+        key="jvm_sample_interval",
+        title="JVM 采样间隔",
+        content="每次采样之间的最短间隔；超出设置页中的 CPU 预算时会自动延长。",
+        default=lambda: 15,
+        minimum=5,
+        maximum=600,
+        suffix=" 秒",
+    ),
+    ServerExtraSetting(
+        key="gc_logging",
+        title="记录 GC 日志",
+        content="在服务器目录的 gclogs 文件夹中记录 GC 日志，统计停顿与分配、晋升速率。",
+        default=lambda: False,
+    ),
+    ServerExtraSetting(
+        key="heap_dump_on_oom",
+        title="内存溢出时生成堆转储",
+        content="在服务器目录的 heapdumps 文件夹中生成 .hprof，崩溃后自动统计占用内存最多的类。",
+        default=lambda: False,
+    ),
+    ServerExtraSetting(
+        key="heap_dump_budget",
+        title="堆转储占用空间上限",
+        content="超出后删除较旧的转储，最新的一份始终保留。",
+        default=lambda: 8192,
+        minimum=1024,
+        maximum=262144,
+        suffix=" MB",
+    ),
+    ServerExtraSetting(
+        key="jfr_duration",
+        title="性能分析录制时长",
+        content="点击“性能分析”后 JFR 录制的时长，可提前结束。",
+        default=lambda: 60,
+        minimum=10,
+        maximum=1800,
+        suffix=" 秒",
+    ),
+    ServerExtraSetting(
+        key="jfr_budget",
+        title="性能分析录制占用空间上限",
+        content="录制保存在服务器目录的 recordings 文件夹中，超出后删除较旧的录制。",
+        default=lambda: 2048,
+        minimum=256,
+        maximum=65536,
+        suffix=" MB",
+    ),
+    ServerExtraSetting(
+        key="hot_threads_interval",
+        title="高占用线程采样间隔",
+        content="查找高占用线程时统计各线程 CPU 占用的窗口，同时也是结果的刷新间隔。",
+        default=lambda: 5,
+        minimum=2,
+        maximum=60,
+        suffix=" 秒",
+    ),
+    ServerExtraSetting(
+        key="tick_profile_duration",
+        title="Tick 分析时长 (1.16 及更早)",
+        content="旧版本使用 /debug 分析的时长；1.17 起使用 /perf，由服务器固定录制 10 秒。",
+        default=lambda: 30,
+        minimum=5,
+        maximum=600,
+        suffix=" 秒",
+    ),
+]
+
+
+def getServerExtraSetting(serverConfig: ServerVariables, key: str):
+    """读取服务器的单独设置，未设置时使用默认值"""
+    if key in serverConfig.extraData:
+        return serverConfig.extraData[key]
+    for setting in SERVER_EXTRA_SETTINGS:
+        if setting.key == key:
+            return setting.default()
+    raise KeyError(key)
+
+
+def saveServerExtraData(
+    serverConfig: ServerVariables, values: Dict[str, Any], removed: Iterable[str] = ()
+) -> bool:
+    """将 values 合并到服务器的 extra_data 并删除 removed 中的键，写入全局配置与单独配置"""
+    removed = list(removed)
+    serverConfig.extraData.update(values)
+    for key in removed:
+        serverConfig.extraData.pop(key, None)
     try:
-        with open(
-            f"./Servers/{serverConfig.serverName}/server.properties", "r", encoding="utf-8"
-        ) as serverPropertiesFile:
-            lines = serverPropertiesFile.readlines()
-            for line in lines:
-                line = line.strip()
-                if line and not line.startswith("#"):
-                    key, value = line.split("=", 1)
-                    serverConfig.serverProperties[key.strip()] = value.strip()
-    except FileNotFoundError:
-        serverConfig.serverProperties.update({"msg": "File not found"})
+        with open(r"MCSL2/MCSL2_ServerList.json", "r", encoding="utf-8") as globalServerListFile:
+            globalServerList = loads(globalServerListFile.read())
+        for singleConfig in globalServerList["MCSLServerList"]:
+            if singleConfig["name"] == serverConfig.serverName:
+                extraData = singleConfig.setdefault("extra_data", {})
+                extraData.update(values)
+                for key in removed:
+                    extraData.pop(key, None)
+                break
+        else:
+            return False
+        with open(r"MCSL2/MCSL2_ServerList.json", "w+", encoding="utf-8") as globalServerListFile:
+            globalServerListFile.write(dumps(globalServerList, indent=4))
+        if not cfg.get(cfg.onlySaveGlobalServerConfig):
+            with open(
+                f"Servers//{serverConfig.serverName}//MCSL2ServerConfig.json",
+                "w+",
+                encoding="utf-8",
+            ) as serverConfigFile:
+                serverConfigFile.write(dumps(singleConfig, indent=4))
+        return True
+    except Exception as e:
+        MCSL2Logger.error(msg=f"save extra data of {serverConfig.serverName} failed", exc=e)
+        return False
 
 
 class MakeArchiveThread(QThread):
@@ -124,6 +305,10 @@ class MakeArchiveThread(QThread):
 
 
 def backupServer(serverName: str, parent):
+    # 界面相关的依赖在使用时导入，后台进程导入本模块时不加载 QtWidgets
+    from PyQt5.QtWidgets import QFileDialog
+    from qfluentwidgets import InfoBar, InfoBarPosition
+
     try:
         s = QFileDialog.getSaveFileName(
             parent,
@@ -161,6 +346,9 @@ def backupServer(serverName: str, parent):
 
 
 def backupSaves(serverConfig: ServerVariables, parent):
+    from PyQt5.QtWidgets import QFileDialog
+    from qfluentwidgets import InfoBar, InfoBarPosition
+
     try:
         readServerProperties(serverConfig)
         levelName = serverConfig.serverProperties.get("level-name")
@@ -0,0 +1,350 @@
+#     Copyright 2024, MCSL Team, mailto:services@mcsl.com.cn
+#
+#     Part of "MCSL2", a simple and multifunctional Minecraft server launcher.
+#
+#     Licensed under the GNU General Public License, Version 3.0, with our
+#     additional agreements. (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#        https://github.com/MCSLTeam/MCSL2/raw/master/LICENSE
+#
+################################################################################
+"""
+Timed /perf and /debug tick profiling runs, and parsing of the reports they leave under debug/.
+"""
+
+import csv
+import io
+import re
+import zipfile
+from glob import glob
+from math import isnan, nan
+from os import path as osp
+from time import time
+from typing import Dict, List, NamedTuple, Tuple
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+# [02] |   |   tick(200/1) - 99.12%/31.76%，1.13 之前没有调用次数
+_SECTION_PATTERN = re.compile(
+    r"^\[(\d+)\] (?:\|   )*(.+?)(?:\((\d+)/(\d+)\))? - ([\d.]+)%/([\d.]+)%\s*$"
+)
+_TIME_SPAN_PATTERN = re.compile(r"^Time span: (\d+) ms")
+_TICK_SPAN_PATTERN = re.compile(r"^Tick span: (\d+) ticks")
+_PROFILE_BEGIN = "--- BEGIN PROFILE DUMP ---"
+_PROFILE_END = "--- END PROFILE DUMP ---"
+
+# 1.17+: Started 10 second performance profiling run (use '/perf stop' to stop early)
+_PERF_STARTED = re.compile(r"Started \d+ second performance profiling")
+_PERF_STOPPED = "Stopped performance profiling after"
+_PERF_SAVED = "Created debug report in"
+_PERF_FAILED = "Failed to create debug report"
+# 1.17+ 为 tick profiling，之前为 debug profiling；1.17 起 /debug 只统计 TPS，不写入报告
+_DEBUG_STARTED = re.compile(r"Started (?:tick|debug) profiling")
+_DEBUG_STOPPED = re.compile(r"Stopped (?:tick|debug) profiling after")
+_ALREADY_RUNNING = re.compile(r"profiler is already (?:started|running)")
+_UNKNOWN_COMMAND = re.compile(r"Unknown (?:or incomplete )?command")
+
+
+class ProfileSection(NamedTuple):
+    name: str
+    # 以 "." 连接的完整路径，用于与另一次分析对比
+    path: str
+    # 占上级区段与占整个 tick 的百分比
+    parentPercent: float
+    totalPercent: float
+    # 调用次数与每 tick 调用次数，旧版本的报告中没有
+    count: float
+    perTick: float
+    children: List["ProfileSection"]
+
+
+class TickProfile(NamedTuple):
+    source: str
+    timeSpanMs: float
+    tickSpan: float
+    sections: List[ProfileSection]
+    # /perf 报告中 metrics 目录下各指标的 (平均值, 最大值)，以 "文件/列名" 为键
+    metrics: Dict[str, Tuple[float, float]]
+
+    @property
+    def tps(self) -> float:
+        return self.tickSpan / self.timeSpanMs * 1000 if self.timeSpanMs else nan
+
+    def flatten(self) -> Dict[str, ProfileSection]:
+        sections: Dict[str, ProfileSection] = {}
+        stack = list(self.sections)
+        while stack:
+            section = stack.pop()
+            sections[section.path] = section
+            stack.extend(section.children)
+        return sections
+
+
+def parseProfileResults(text: str) -> Tuple[float, float, List[ProfileSection]]:
+    """
+    解析 profile-results-*.txt 或 /perf 报告中的 profiling.txt。
+    返回时长(毫秒)、tick 数与区段树。
+    """
+    timeSpan = tickSpan = nan
+    roots: List[ProfileSection] = []
+    # 每一层最近的区段，子区段接在上一层的最后一个区段下
+    parents: List[ProfileSection] = []
+    inDump = False
+    for line in text.splitlines():
+        if not inDump:
+            if (match := _TIME_SPAN_PATTERN.match(line)) is not None:
+                timeSpan = float(match.group(1))
+            elif (match := _TICK_SPAN_PATTERN.match(line)) is not None:
+                tickSpan = float(match.group(1))
+            elif line.startswith(_PROFILE_BEGIN):
+                inDump = True
+            continue
+        if line.startswith(_PROFILE_END):
+            break
+        if (match := _SECTION_PATTERN.match(line)) is None:
+            continue
+        # 缺少上级的行(报告被截断)挂到最深的已知区段下
+        del parents[int(match.group(1)) :]
+        name = match.group(2)
+        path = ".".join([parent.name for parent in parents] + [name])
+        section = ProfileSection(
+            name,
+            path,
+            float(match.group(5)),
+            float(match.group(6)),
+            float(match.group(3)) if match.group(3) else nan,
+            float(match.group(4)) if match.group(4) else nan,
+            [],
+        )
+        (parents[-1].children if parents else roots).append(section)
+        parents.append(section)
+    return timeSpan, tickSpan, roots
+
+
+def parseMetricsCsv(name: str, text: str) -> Dict[str, Tuple[float, float]]:
+    """/perf 报告的 metrics/*.csv：首列为 @tick，其余每列为一个指标，每行一个 tick"""
+    rows = list(csv.reader(io.StringIO(text)))
+    if len(rows) < 2:
+        return {}
+    metrics = {}
+    for column, header in enumerate(rows[0]):
+        if header.startswith("@"):
+            continue
+        values = []
+        for row in rows[1:]:
+            try:
+                values.append(float(row[column]))
+            except (IndexError, ValueError):
+                continue
+        if values:
+            metrics[f"{name}/{header.strip()}"] = (sum(values) / len(values), max(values))
+    return metrics
+
+
+def loadTickProfile(filePath: str) -> TickProfile:
+    """读取 /perf 的 zip 报告或 /debug 的 txt 报告"""
+    metrics: Dict[str, Tuple[float, float]] = {}
+    if not zipfile.is_zipfile(filePath):
+        with open(filePath, "r", encoding="utf-8", errors="replace") as f:
+            timeSpan, tickSpan, sections = parseProfileResults(f.read())
+        return TickProfile(filePath, timeSpan, tickSpan, sections, metrics)
+    timeSpan = tickSpan = nan
+    sections: List[ProfileSection] = []
+    with zipfile.ZipFile(filePath) as archive:
+        # 只看服务器端；单人游戏的报告中另有 client/
+        names = [name for name in archive.namelist() if not name.startswith("client/")]
+        for name in names:
+            if osp.basename(name) == "profiling.txt":
+                text = archive.read(name).decode("utf-8", errors="replace")
+                timeSpan, tickSpan, sections = parseProfileResults(text)
+            elif "/metrics/" in f"/{name}" and name.endswith(".csv"):
+                text = archive.read(name).decode("utf-8", errors="replace")
+                metrics.update(parseMetricsCsv(osp.splitext(osp.basename(name))[0], text))
+    return TickProfile(filePath, timeSpan, tickSpan, sections, metrics)
+
+
+def listTickProfiles(serverName: str) -> List[str]:
+    """服务器 debug 目录中的 /perf 与 /debug 报告，从新到旧"""
+    debugDir = osp.join("Servers", serverName, "debug")
+    reports = glob(osp.join(debugDir, "profiling", "*.zip"))
+    reports += glob(osp.join(debugDir, "profile-results-*.txt"))
+    return sorted(reports, key=osp.getmtime, reverse=True)
+
+
+def diffProfiles(current: TickProfile, baseline: TickProfile) -> Dict[str, float]:
+    """各区段占整个 tick 的百分比相对基准的变化；基准中没有的区段为 NaN"""
+    baselineSections = baseline.flatten()
+    return {
+        path: (
+            section.totalPercent - baselineSections[path].totalPercent
+            if path in baselineSections
+            else nan
+        )
+        for path, section in current.flatten().items()
+    }
+
+
+def formatDelta(delta: float) -> str:
+    return "新增" if isnan(delta) else f"{delta:+.2f}%"
+
+
+class TickProfileRun(QObject):
+    """
+    通过服务器终端运行一次限时的 tick 分析。
+    先发送 perf start (1.17+，固定录制 10 秒，可提前 perf stop)；服务器不认识该指令时
+    改用 debug start，到时后 debug stop。从终端输出判断开始与结束，再到 debug 目录中找到
+    本次写入的报告。
+    """
+
+    # 剩余秒数；0 表示录制已结束，正在等待报告
+    progress = pyqtSignal(int)
+    # 报告路径，失败时为空并附上原因
+    finished = pyqtSignal(str, str)
+
+    PERF_DURATION = 10
+    # 开始录制、写入报告的等待上限(秒)
+    START_TIMEOUT = 15
+    REPORT_TIMEOUT = 30
+
+    def __init__(self, bridge, serverName: str, debugDuration: int, parent=None):
+        super().__init__(parent)
+        self.bridge = bridge
+        self.serverName = serverName
+        self.debugDuration = debugDuration
+        self.mode = "perf"
+        self.state = "starting"
+        self.startTime = 0.0
+        self.deadline = 0.0
+        self.message = ""
+        self.tickTimer = QTimer(self)
+        self.tickTimer.setInterval(1000)
+        self.tickTimer.timeout.connect(self.onTick)
+        self.timeoutTimer = QTimer(self)
+        self.timeoutTimer.setSingleShot(True)
+        self.timeoutTimer.timeout.connect(self.onTimeout)
+        self.reportTimer = QTimer(self)
+        self.reportTimer.setInterval(500)
+        self.reportTimer.timeout.connect(self.findReport)
+
+    def isActive(self) -> bool:
+        return self.state not in ("finished", "cancelled")
+
+    def start(self):
+        self.startTime = time()
+        self.bridge.serverLogOutput.connect(self.feed)
+        self.bridge.serverLogOutputBatch.connect(self.feedLines)
+        self.bridge.serverClosed.connect(self.onServerClosed)
+        self.timeoutTimer.start(self.START_TIMEOUT * 1000)
+        self.bridge.sendCommand("perf start")
+
+    def stopEarly(self):
+        """提前结束录制，已录制的部分仍会写入报告"""
+        if self.state == "recording":
+            self.bridge.sendCommand(f"{self.mode} stop")
+
+    def cancel(self):
+        if not self.isActive():
+            return
+        if self.state == "recording":
+            self.bridge.sendCommand(f"{self.mode} stop")
+        self.finish("cancelled", "", "")
+
+    def feedLines(self, lines: list):
+        for line in lines:
+            self.feed(line)
+
+    def feed(self, line: str):
+        if self.state == "starting":
+            if self.mode == "perf" and _PERF_STARTED.search(line):
+                self.startRecording(self.PERF_DURATION)
+            elif self.mode == "debug" and _DEBUG_STARTED.search(line):
+                self.startRecording(self.debugDuration)
+            elif _ALREADY_RUNNING.search(line):
+                self.finish("finished", "", "已有一次分析正在进行，请先结束它。")
+            elif _UNKNOWN_COMMAND.search(line):
+                if self.mode == "perf":
+                    self.mode = "debug"
+                    self.bridge.sendCommand("debug start")
+                else:
+                    self.finish("finished", "", "服务器不支持 /perf 与 /debug 指令。")
+        elif self.state == "recording":
+            if self.mode == "perf" and _PERF_STOPPED in line:
+                self.waitForReport(line)
+            elif self.mode == "debug" and _DEBUG_STOPPED.search(line):
+                self.waitForReport(line)
+        elif self.state == "stopped" and self.mode == "perf":
+            if _PERF_SAVED in line:
+                self.reportTimer.start()
+                self.findReport()
+            elif _PERF_FAILED in line:
+                self.finish("finished", "", "服务器未能写入分析报告。")
+
+    def startRecording(self, duration: int):
+        self.state = "recording"
+        self.timeoutTimer.stop()
+        self.deadline = time() + duration
+        self.tickTimer.start()
+        self.onTick()
+
+    def onTick(self):
+        remaining = int(self.deadline - time() + 0.999)
+        if remaining > 0:
+            self.progress.emit(remaining)
+        elif self.mode == "debug":
+            self.tickTimer.stop()
+            self.bridge.sendCommand("debug stop")
+        # /perf 由服务器自行结束，超出一段时间仍未结束时视为失败
+        elif remaining < -self.START_TIMEOUT:
+            self.finish("finished", "", "等待服务器结束分析超时。")
+
+    def waitForReport(self, message: str):
+        self.state = "stopped"
+        self.message = message.split("]: ", 1)[-1].strip()
+        self.tickTimer.stop()
+        self.progress.emit(0)
+        self.timeoutTimer.start(self.REPORT_TIMEOUT * 1000)
+        # /perf 的报告在打包完成后才有“Created debug report”消息，之前的 zip 可能不完整
+        if self.mode == "debug":
+            self.reportTimer.start()
+
+    def findReport(self):
+        """本次分析开始之后写入的最新报告"""
+        for report in listTickProfiles(self.serverName):
+            try:
+                if osp.getmtime(report) >= self.startTime - 1:
+                    self.finish("finished", osp.abspath(report), self.message)
+                    return
+            except OSError:
+                continue
+
+    def onTimeout(self):
+        if self.state == "starting":
+            self.finish("finished", "", "服务器没有响应分析指令，请确认服务器已启动完毕。")
+        elif self.mode == "debug":
+            # 1.17 起 /debug 不写入报告，只能给出 TPS
+            self.finish("finished", "", f"服务器没有写入报告，只报告了：{self.message}")
+        else:
+            self.finish("finished", "", "等待服务器写入分析报告超时。")
+
+    def onServerClosed(self, _exitCode: int):
+        self.finish("finished", "", "服务器已关闭。")
+
+    def finish(self, state: str, report: str, message: str):
+        if not self.isActive():
+            return
+        self.state = state
+        for timer in (self.tickTimer, self.timeoutTimer, self.reportTimer):
+            timer.stop()
+        for signal, slot in (
+            (self.bridge.serverLogOutput, self.feed),
+            (self.bridge.serverLogOutputBatch, self.feedLines),
+            (self.bridge.serverClosed, self.onServerClosed),
+        ):
+            try:
+                signal.disconnect(slot)
+            except TypeError:
+                pass
+        if state == "finished":
+            self.finished.emit(report, message)
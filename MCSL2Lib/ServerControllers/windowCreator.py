@@ -19,6 +19,7 @@ from PyQt5.QtCore import (
     pyqtSignal,
     pyqtSlot,
     QTimer,
+    QThread,
 )
 from PyQt5.QtWidgets import (
     QSizePolicy,
@@ -50,6 +51,7 @@ from qfluentwidgets import (
     PushButton,
     SegmentedWidget,
     SimpleCardWidget,
+    BodyLabel,
     StrongBodyLabel,
     SubtitleLabel,
     SwitchButton,
@@ -65,25 +67,75 @@ from qfluentwidgets import (
 )
 from qfluentwidgets.components.widgets.frameless_window import FramelessWindow
 from qfluentwidgets.common.animation import BackgroundAnimationWidget
-from PyQt5.QtGui import QIcon, QCursor, QColor, QPainter, QTextCharFormat, QBrush
+from PyQt5.QtGui import (
+    QIcon,
+    QCursor,
+    QColor,
+    QPainter,
+    QTextCharFormat,
+    QBrush,
+    QTextCursor,
+    QFont,
+)
 from qframelesswindow import TitleBar
 from MCSL2Lib.ProgramControllers.interfaceController import EraseStackedWidget, MySmoothScrollArea
 from MCSL2Lib.Resources.icons import *  # noqa: F401 F403
+from MCSL2Lib.ProgramControllers.metricsController import Metrics
 from MCSL2Lib.ProgramControllers.settingsController import cfg
-from MCSL2Lib.ServerControllers.processCreator import _MinecraftEULA, ServerLauncher
-from MCSL2Lib.ServerControllers.serverErrorHandler import ServerErrorHandler
+from MCSL2Lib.ServerControllers.processCreator import _MinecraftEULA, ServerLauncher, serverJVMArgs
+from MCSL2Lib.ServerControllers.consoleProcessor import (
+    ConsoleLevel,
+    ConsoleStyle,
+    DEFAULT_STYLE,
+    LEVEL_COLORS,
+)
+from MCSL2Lib.ServerControllers.consoleBuffer import ConsoleLine, ConsoleRingBuffer, spillPath
+from MCSL2Lib.ServerControllers.consoleWorker import (
+    ConsoleAnalysis,
+    ConsoleAnalysisWorker,
+    ConsoleEvent,
+)
+from MCSL2Lib.ServerControllers.errorRuleEngine import ErrorAnalyzeThread
+from MCSL2Lib.ServerControllers.gcLogAnalyzer import GcLagMatch, GcLogMonitor
+from MCSL2Lib.ServerControllers.jvmSampler import JvmSample, JvmSampler
+from MCSL2Lib.ServerControllers.resourceSampler import ResourceSample, ServerResourceSampler
+from MCSL2Lib.ServerControllers.serverLifecycle import LifecycleEvent, ServerState, StopReason
+from MCSL2Lib.ServerControllers.serverSupervisor import (
+    EXTERNAL_KILL_EXIT_CODE,
+    ServerSupervisor,
+    SupervisionState,
+    SupervisionStatus,
+)
+from MCSL2Lib.ServerControllers.serverTelemetry import (
+    ServerTelemetry,
+    TelemetryPoller,
+    telemetryProbes,
+)
 from MCSL2Lib.ServerControllers.serverUtils import (
-    MinecraftServerResMonitorUtil,
     readServerProperties,
+    ServerPropertiesCache,
+    getServerExtraSetting,
     backupServer,
     backupSaves,
 )
+from datetime import datetime
+from math import isnan
 from os import path as osp
 import sys
-from re import search
-from typing import Dict
+from time import time
+from typing import Dict, List, Optional, Set, Tuple
 from MCSL2Lib.Widgets.playersControllerMainWidget import playersController
-from MCSL2Lib.utils import MCSL2Logger, openLocalFile
+from MCSL2Lib.Widgets.consoleHistoryWidget import ConsoleHistoryBox
+from MCSL2Lib.Widgets.consoleArchiveWidget import ConsoleArchiveSearchBox
+from MCSL2Lib.Widgets.serverExtraSettingsWidget import ServerExtraSettingsBox
+from MCSL2Lib.Widgets.serverDiagnosticsWidget import ServerDiagnosticsWidget
+from MCSL2Lib.Widgets.resourceHistoryWidget import (
+    ResourceHistoryBox,
+    ResourceHistoryChart,
+    formatBytes,
+)
+from MCSL2Lib.Widgets.playerSessionWidget import PlayerSessionBox
+from MCSL2Lib.utils import openLocalFile
 from MCSL2Lib.variables import GlobalMCSL2Variables, ServerVariables
 
 
@@ -230,6 +282,12 @@ class ServerWindowTitleBar(TitleBar):
 
 class ServerWindow(BackgroundAnimationWidget, FramelessWindow):
     playersControllerBtnEnabled = pyqtSignal(bool)
+    consoleNotice = pyqtSignal(object)
+    resetConsolePlayers = pyqtSignal()
+    resetErrorAnalysis = pyqtSignal()
+
+    # 资源卡片中的迷你曲线显示最近的采样个数(秒)
+    RESOURCE_CHART_SPAN = 120
 
     def __init__(
         self,
@@ -243,11 +301,13 @@ class ServerWindow(BackgroundAnimationWidget, FramelessWindow):
         self.errMsg = ""
         self.configEditorContainerDict: Dict[QWidget] = {}
         self.configEditorDict: Dict[PlainTextEdit] = {}
-        self.playersList = []
+        self.onlinePlayers: Set[str] = set()
         self.playersControllerBtnEnabled.emit(False)
         self.serverConfig = config
         self.serverLauncher = launcher
         self.serverBridge = None
+        # 关闭窗口时先关闭服务器，退出后再关闭窗口
+        self.closeAfterStop = False
         self.monitorWidget = None
         self.manageBtn = manageBtn
         self.manageBtn.setEnabled(False)
@@ -261,6 +321,7 @@ class ServerWindow(BackgroundAnimationWidget, FramelessWindow):
         self.setupEditorPage()
         self.setupScheduleTasksPage()
         self.setupAnalyzePage()
+        self.initConsoleProcessor()
         self.initTexts()
         self.initNavigation()
         self.stackedWidget.setCurrentIndex(0)
@@ -272,7 +333,7 @@ class ServerWindow(BackgroundAnimationWidget, FramelessWindow):
         self.initSafelyQuitController()
 
     def closeEvent(self, a0) -> None:
-        if self.serverBridge.isServerRunning():
+        if self.getRunningStatus() and not self.serverBridge.detachable:
             box = MessageBox(
                 self.tr("是否关闭此窗口？"),
                 self.tr("服务器正在运行，请在退出前先关闭服务器。"),
@@ -289,7 +350,7 @@ class ServerWindow(BackgroundAnimationWidget, FramelessWindow):
                 a0.ignore()
                 return
 
-            self.serverBridge.serverProcess.process.finished.connect(self.close)
+            self.closeAfterStop = True
             self.stopServer(forceNoErrorHandler=True)
             self.exitingMsgBox.show()
             self.quitTimer.start()
@@ -301,6 +362,15 @@ class ServerWindow(BackgroundAnimationWidget, FramelessWindow):
             a0.ignore()
             return
         else:
+            if self.getRunningStatus():
+                # 服务器由后台服务运行，关闭窗口只是断开，服务器继续运行
+                self.unRegisterServerExitStatusHandler()
+                self.stopTelemetryPolling()
+                self.unRegisterResMonitor()
+                self.unRegisterCommandOutput()
+                Metrics.serverUp.labels(self.serverConfig.serverName).set(0)
+            if self.serverBridge is not None and self.serverBridge.detachable:
+                self.serverBridge.detach()
             try:
                 self.monitorWidget.setParent(None)
             except Exception:
@@ -308,6 +378,17 @@ class ServerWindow(BackgroundAnimationWidget, FramelessWindow):
             self.manageBtn.setEnabled(True)
             self.manageBackupBtn.setEnabled(True)
             self.manageBtn.setText("启动")
+            self.consoleWorkerThread.quit()
+            self.consoleWorkerThread.wait()
+            self.consoleBuffer.close()
+            self.diagnosticsWidget.shutDown()
+            # 窗口关闭后不再自动重启
+            self.supervisionTimer.stop()
+            try:
+                ServerSupervisor.signals().statusChanged.disconnect(self.onSupervisionChanged)
+            except TypeError:
+                pass
+            ServerSupervisor.unregister(self.serverConfig.serverName)
 
         super().closeEvent(a0)
 
@@ -316,7 +397,7 @@ class ServerWindow(BackgroundAnimationWidget, FramelessWindow):
             f"cd \"{osp.abspath('Servers' + self.serverConfig.serverName)}\"\n"
             + self.serverConfig.javaPath
             + " "
-            + " ".join(self.serverLauncher.jvmArg)
+            + " ".join(serverJVMArgs(self.serverConfig, diagnostics=False))
         )
         if save:
             return script
@@ -378,7 +459,7 @@ class ServerWindow(BackgroundAnimationWidget, FramelessWindow):
             if isDarkTheme()
             else GlobalMCSL2Variables.lightWarnBtnStyleSheet
         )
-        self.exitingMsgBox.yesButton.clicked.connect(self.serverBridge.serverProcess.process.kill)
+        self.exitingMsgBox.yesButton.clicked.connect(lambda: self.haltServer())
         self.exitingMsgBox.yesButton.setEnabled(False)
         self.exitingMsgBox.hide()
         self.quitTimer = QTimer(self)
@@ -406,7 +487,7 @@ class ServerWindow(BackgroundAnimationWidget, FramelessWindow):
         self.overviewSeparator = VerticalSeparator(self.overviewPage)
         self.overviewSeparator.setMinimumSize(QSize(5, 0))
         self.overviewSeparator.setMaximumSize(QSize(5, 16777215))
-        self.overviewPageLayout.addWidget(self.overviewSeparator, 0, 1, 7, 1)
+        self.overviewPageLayout.addWidget(self.overviewSeparator, 0, 1, 13, 1)
         self.backupServerBtn = PushButton(self.overviewPage)
         self.backupServerBtn.setFixedSize(QSize(160, 32))
         self.overviewPageLayout.addWidget(self.backupServerBtn, 2, 2, 1, 1)
@@ -422,6 +503,29 @@ class ServerWindow(BackgroundAnimationWidget, FramelessWindow):
         self.backupSavesBtn = PushButton(self.overviewPage)
         self.backupSavesBtn.setFixedSize(QSize(160, 32))
         self.overviewPageLayout.addWidget(self.backupSavesBtn, 1, 2, 1, 1)
+        self.extraSettingsBtn = PushButton(self.overviewPage)
+        self.extraSettingsBtn.setFixedSize(QSize(160, 32))
+        self.overviewPageLayout.addWidget(self.extraSettingsBtn, 5, 2, 1, 1)
+        self.searchArchiveBtn = PushButton(self.overviewPage)
+        self.searchArchiveBtn.setFixedSize(QSize(160, 32))
+        self.overviewPageLayout.addWidget(self.searchArchiveBtn, 6, 2, 1, 1)
+        self.resourceHistoryBtn = PushButton(self.overviewPage)
+        self.resourceHistoryBtn.setFixedSize(QSize(160, 32))
+        self.overviewPageLayout.addWidget(self.resourceHistoryBtn, 7, 2, 1, 1)
+        self.playerSessionsBtn = PushButton(self.overviewPage)
+        self.playerSessionsBtn.setFixedSize(QSize(160, 32))
+        self.overviewPageLayout.addWidget(self.playerSessionsBtn, 8, 2, 1, 1)
+        self.diagnosticsWidget = ServerDiagnosticsWidget(self.serverConfig, self.overviewPage)
+        self.overviewPageLayout.addWidget(self.diagnosticsWidget, 9, 2, 3, 1)
+        self.supervisionBtn = PushButton(self.overviewPage)
+        self.supervisionBtn.setFixedSize(QSize(160, 32))
+        self.supervisionBtn.setVisible(False)
+        self.overviewPageLayout.addWidget(self.supervisionBtn, 12, 2, 1, 1)
+        # 等待自动重启时每秒刷新倒计时
+        self.supervisionTimer = QTimer(self)
+        self.supervisionTimer.setInterval(1000)
+        self.supervisionTimer.timeout.connect(self.refreshSupervisionBtn)
+        self.supervisionStatus: Optional[SupervisionStatus] = None
         self.overviewScrollArea = MySmoothScrollArea(self.overviewPage)
         self.overviewScrollArea.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded)
         self.overviewScrollArea.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
@@ -445,7 +549,7 @@ class ServerWindow(BackgroundAnimationWidget, FramelessWindow):
         sizePolicy.setVerticalStretch(0)
         sizePolicy.setHeightForWidth(self.serverResMonitorWidget.sizePolicy().hasHeightForWidth())
         self.serverResMonitorWidget.setSizePolicy(sizePolicy)
-        self.serverResMonitorWidget.setFixedHeight(165)
+        self.serverResMonitorWidget.setFixedHeight(215)
         self.horizontalLayout = QHBoxLayout(self.serverResMonitorWidget)
         self.serverRAMMonitorWidget = QWidget(self.serverResMonitorWidget)
         sizePolicy = QSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
@@ -470,6 +574,9 @@ class ServerWindow(BackgroundAnimationWidget, FramelessWindow):
         self.serverRAMMonitorTitle.setSizePolicy(sizePolicy)
         self.serverRAMMonitorTitle.setAlignment(Qt.AlignCenter)
         self.serverRAMMonitorLayout.addWidget(self.serverRAMMonitorTitle, 0, 0, 1, 3)
+        self.serverRAMHistoryChart = ResourceHistoryChart(self.serverRAMMonitorWidget)
+        self.serverRAMHistoryChart.setFixedHeight(40)
+        self.serverRAMMonitorLayout.addWidget(self.serverRAMHistoryChart, 2, 0, 1, 3)
         self.horizontalLayout.addWidget(self.serverRAMMonitorWidget)
         self.resSeparator = VerticalSeparator(self.serverResMonitorWidget)
         self.horizontalLayout.addWidget(self.resSeparator)
@@ -495,8 +602,16 @@ class ServerWindow(BackgroundAnimationWidget, FramelessWindow):
         self.serverCPUMonitorTitle.setSizePolicy(sizePolicy)
         self.serverCPUMonitorTitle.setAlignment(Qt.AlignCenter)
         self.gridLayout_4.addWidget(self.serverCPUMonitorTitle, 0, 0, 1, 3)
+        self.serverCPUHistoryChart = ResourceHistoryChart(self.serverCPUMonitorWidget)
+        self.serverCPUHistoryChart.setFixedHeight(40)
+        self.gridLayout_4.addWidget(self.serverCPUHistoryChart, 2, 0, 1, 3)
         self.horizontalLayout.addWidget(self.serverCPUMonitorWidget)
         self.verticalLayout_3.addWidget(self.serverResMonitorWidget)
+        self.serverTelemetryLabel = BodyLabel(self.scrollAreaWidgetContents)
+        self.verticalLayout_3.addWidget(self.serverTelemetryLabel)
+        self.serverJvmLabel = BodyLabel(self.scrollAreaWidgetContents)
+        self.serverJvmLabel.setVisible(False)
+        self.verticalLayout_3.addWidget(self.serverJvmLabel)
         self.existPlayersTitle = SubtitleLabel(self.scrollAreaWidgetContents)
         sizePolicy = QSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
         sizePolicy.setHorizontalStretch(0)
@@ -647,7 +762,19 @@ class ServerWindow(BackgroundAnimationWidget, FramelessWindow):
         self.analyzePageLayout = QGridLayout(self.analyzePage)
         self.errTitle = SubtitleLabel(self.analyzePage)
         self.analyzeSeparator = VerticalSeparator(self.analyzePage)
-        self.startAnalyze = PrimaryPushButton(self.analyzePage)
+        self.analyzeBtnWidget = QWidget(self.analyzePage)
+        self.analyzeBtnLayout = QHBoxLayout(self.analyzeBtnWidget)
+        self.analyzeBtnLayout.setContentsMargins(0, 0, 0, 0)
+        self.startAnalyze = PrimaryPushButton(self.analyzeBtnWidget)
+        self.importAnalyzeLogBtn = PushButton(self.analyzeBtnWidget)
+        self.analyzeBtnLayout.addWidget(self.startAnalyze)
+        self.analyzeArchiveBtn = self.diagnosticsWidget.analyzeArchiveBtn
+        self.analyzeBtnLayout.addWidget(self.importAnalyzeLogBtn)
+        self.analyzeBtnLayout.addWidget(self.analyzeArchiveBtn)
+        self.analyzeThread = None
+        self.jvmSampling = False
+        self.jvmSamplingPid = 0
+        self.gcLogMonitoring = False
         self.errTextEdit = PlainTextEdit(self.analyzePage)
         self.resultTextEdit = PlainTextEdit(self.analyzePage)
         self.resultTextEdit.setReadOnly(True)
@@ -657,7 +784,7 @@ class ServerWindow(BackgroundAnimationWidget, FramelessWindow):
 
         self.analyzePageLayout.addWidget(self.errTitle, 2, 0, 1, 1)
         self.analyzePageLayout.addWidget(self.analyzeSeparator, 3, 1, 2, 1)
-        self.analyzePageLayout.addWidget(self.startAnalyze, 4, 0, 1, 1)
+        self.analyzePageLayout.addWidget(self.analyzeBtnWidget, 4, 0, 1, 1)
         self.analyzePageLayout.addWidget(self.errTextEdit, 3, 0, 1, 1)
         self.analyzePageLayout.addWidget(self.resultTextEdit, 3, 2, 1, 1)
         self.analyzePageLayout.addWidget(self.resultTitle, 2, 2, 1, 1)
@@ -708,6 +835,9 @@ class ServerWindow(BackgroundAnimationWidget, FramelessWindow):
         self.killServer = TransparentPushButton(self.quickMenu)
         self.killServer.setMinimumSize(QSize(0, 30))
         self.quickMenuLayout.addWidget(self.killServer)
+        self.consoleHistory = TransparentPushButton(self.quickMenu)
+        self.consoleHistory.setMinimumSize(QSize(0, 30))
+        self.quickMenuLayout.addWidget(self.consoleHistory)
         self.errorHandler = ToggleButton(self.quickMenu)
         self.quickMenuLayout.addWidget(self.errorHandler)
         self.commandPageLayout.addWidget(self.quickMenu, 0, 5, 1, 1)
@@ -723,7 +853,9 @@ class ServerWindow(BackgroundAnimationWidget, FramelessWindow):
         self.saveServer.clicked.connect(lambda: self.sendCommand("save-all"))
         self.exitServer.clicked.connect(self.runQuickMenu_StopServer)
         self.killServer.clicked.connect(self.runQuickMenu_KillServer)
+        self.consoleHistory.clicked.connect(self.showConsoleHistory)
         self.errorHandler.setChecked(False)
+        self.errorHandler.toggled.connect(self.onErrorHandlerToggled)
 
     def initTexts(self):
         self.difficulty.addItems([
@@ -736,10 +868,15 @@ class ServerWindow(BackgroundAnimationWidget, FramelessWindow):
         self.openServerFolder.setText("打开服务器目录")
         self.backupSavesBtn.setText("备份存档")
         self.genRunScriptBtn.setText("生成启动脚本")
+        self.extraSettingsBtn.setText("服务器单独设置")
+        self.searchArchiveBtn.setText("检索历史日志")
+        self.resourceHistoryBtn.setText("资源占用历史")
+        self.playerSessionsBtn.setText("玩家记录")
         self.toggleServerBtn.setText("启动服务器")
         self.serverResMonitorTitle.setText("服务器资源占用")
         self.serverRAMMonitorTitle.setText("RAM：[curr/max]")
         self.serverCPUMonitorTitle.setText("CPU：")
+        self.updateTelemetryView()
         self.existPlayersTitle.setText("在线玩家列表")
         self.quickMenuTitleLabel.setText("快捷菜单：")
         self.difficulty.setText("游戏难度")
@@ -751,12 +888,14 @@ class ServerWindow(BackgroundAnimationWidget, FramelessWindow):
         self.saveServer.setText("保存存档")
         self.exitServer.setText("关闭服务器")
         self.killServer.setText("强制关闭")
+        self.consoleHistory.setText("历史输出")
         self.errorHandler.setText("报错分析")
         self.exportScheduleConfigBtn.setText("导出")
         self.addScheduleTaskBtn.setText("添加计划任务")
         self.importScheduleConfigBtn.setText("导入")
         self.errTitle.setText("含报错的日志：")
         self.startAnalyze.setText("开始分析")
+        self.importAnalyzeLogBtn.setText("导入日志文件")
         self.resultTitle.setText("分析结果：")
         self.copyResultBtn.setText("复制")
         self.switchAnalyzeProviderBtn.setText("当前：使用本地模块分析")
@@ -779,12 +918,35 @@ class ServerWindow(BackgroundAnimationWidget, FramelessWindow):
             lambda: openLocalFile(f"Servers/{self.serverConfig.serverName}")
         )
         self.genRunScriptBtn.clicked.connect(self.genRunScript)
+        self.extraSettingsBtn.clicked.connect(self.showExtraSettings)
+        self.searchArchiveBtn.clicked.connect(
+            lambda: ConsoleArchiveSearchBox(self.serverConfig.serverName, parent=self).exec_()
+        )
+        self.resourceHistoryBtn.clicked.connect(
+            lambda: ResourceHistoryBox(self.serverConfig.serverName, parent=self).exec_()
+        )
+        self.diagnosticsWidget.message.connect(self.colorConsoleText)
+        self.diagnosticsWidget.reportReady.connect(self.resultTextEdit.setPlainText)
+        self.diagnosticsWidget.serverNotRunning.connect(self.showServerNotOpenMsg)
+        self.supervisionBtn.clicked.connect(self.cancelRestart)
+        ServerSupervisor.signals().statusChanged.connect(self.onSupervisionChanged)
+        self.playerSessionsBtn.clicked.connect(
+            lambda: PlayerSessionBox(self.serverConfig.serverName, parent=self).exec_()
+        )
         self.backupServerBtn.clicked.connect(
             lambda: backupServer(serverName=self.serverConfig.serverName, parent=self)
         )
         self.backupSavesBtn.clicked.connect(
             lambda: backupSaves(serverConfig=self.serverConfig, parent=self)
         )
+        self.startAnalyze.clicked.connect(
+            lambda: self.analyzeLog(text=self.errTextEdit.toPlainText())
+        )
+        self.importAnalyzeLogBtn.clicked.connect(self.importAnalyzeLog)
+        self.diagnosticsWidget.archiveAnalyzing.connect(self.onArchiveAnalyzing)
+        self.copyResultBtn.clicked.connect(
+            lambda: QApplication.clipboard().setText(self.resultTextEdit.toPlainText())
+        )
 
     def initNavigation(self):
         self.serverSegmentedWidget.addItem(
@@ -901,36 +1063,41 @@ class ServerWindow(BackgroundAnimationWidget, FramelessWindow):
 
     def startServer(self):
         if self.serverBridge is not None:
-            if not self.serverBridge.isServerRunning():
-                t = self.serverBridge.startServer()
-                if isinstance(t, _MinecraftEULA):
-                    self._showNoAcceptEULAMsg(t)
-                else:
-                    self.registerServerExitStatusHandler()
-                    self.registerResMonitor()
-                    self.registerCommandOutput()
-                    self.registerStartServerComponents()
-                    return
-            else:
-                return
+            # 之后由 STARTING 事件完成注册，服务器自行重启时也是如此
+            self.serverBridge.startServer()
+            return
+        t = self.serverLauncher.start()
+        if isinstance(t, _MinecraftEULA):
+            self.applyServerState(ServerState.STOPPED)
+            self._showNoAcceptEULAMsg(t)
         else:
-            t = self.serverLauncher.start()
-            if isinstance(t, _MinecraftEULA):
-                self._showNoAcceptEULAMsg(t)
-            else:
-                self.serverBridge = t
-                self.registerServerExitStatusHandler()
-                self.registerResMonitor()
-                self.registerCommandOutput()
-                self.registerStartServerComponents()
+            self.serverBridge = t
+            self.diagnosticsWidget.setBridge(t)
+            self.serverBridge.serverStateChanged.connect(self.onServerStateChanged)
+            self.serverBridge.eulaRequired.connect(self._showNoAcceptEULAMsg)
+            self.serverBridge.versionMismatch.connect(self.showVersionMismatchMsg)
+            # 第一次启动时进程在连接之前已经启动，补上 STARTING 的处理
+            self.applyServerState(self.serverBridge.state)
+            self.onServerStarting()
+
+    def showVersionMismatchMsg(self, version: str):
+        self.colorConsoleText(
+            self.tr(
+                f"[MCSL2 | 警告]：该服务器的后台进程由 MCSL2 {version} 启动，与当前版本不同，"
+                "部分功能可能不可用。建议在方便时关闭服务器后重新开启。"
+            )
+        )
+
+    def onServerStarting(self):
+        self.consoleWorker.awaitingDone = True
+        self.registerServerExitStatusHandler()
+        self.registerResMonitor()
+        self.registerCommandOutput()
+        self.registerStartServerComponents()
 
     def stopServer(self, forceNoErrorHandler=False):
         if self.serverBridge is not None:
             self.serverBridge.stopServer()
-            self.killServer.setEnabled(True)
-            self.toggleServerBtn.setEnabled(True)
-            self.exitServer.setEnabled(True)
-            self.unRegisterStartServerComponents()
             if self.errorHandler.isChecked() and not forceNoErrorHandler:
                 self.showErrorHandlerReport()
 
@@ -946,38 +1113,23 @@ class ServerWindow(BackgroundAnimationWidget, FramelessWindow):
                 parent=self,
             )
             self.serverBridge.haltServer()
-            self.killServer.setEnabled(True)
-            self.toggleServerBtn.setEnabled(True)
-            self.exitServer.setEnabled(True)
-            self.unRegisterStartServerComponents()
             if self.errorHandler.isChecked() and not forceNoErrorHandler:
                 self.showErrorHandlerReport()
 
     def registerServerExitStatusHandler(self):
-        self.serverBridge.serverClosed.connect(self.serverExitStatusHandler)
+        self.serverBridge.serverClosed.connect(self.consoleWorker.finishErrorAnalysis)
 
     def unRegisterServerExitStatusHandler(self):
         try:
-            self.serverBridge.serverClosed.disconnect(self.serverExitStatusHandler)
+            self.serverBridge.serverClosed.disconnect(self.consoleWorker.finishErrorAnalysis)
         except (AttributeError, TypeError):
             pass
 
     def registerStartServerComponents(self):
-        self.toggleServerBtn.setText(self.tr("关闭服务器"))
-        self.exitServer.setText(self.tr("关闭服务器"))
-        try:
-            self.toggleServerBtn.clicked.disconnect()
-        except (AttributeError, TypeError):
-            pass
-        try:
-            self.exitServer.clicked.disconnect()
-        except (AttributeError, TypeError):
-            pass
-        self.toggleServerBtn.clicked.connect(self.runQuickMenu_StopServer)
-        self.exitServer.clicked.connect(self.runQuickMenu_StopServer)
-        self.backupSavesBtn.setEnabled(False)
-        self.backupServerBtn.setEnabled(False)
-        self.manageBackupBtn.setEnabled(False)
+        self.diagnosticsWidget.onServerStarting()
+        self.clearPlayers()
+        self.errMsg = ""
+        self.resetErrorAnalysis.emit()
         InfoBar.info(
             title=self.tr("提示"),
             content=self.tr("服务器正在启动，请稍后..."),
@@ -988,9 +1140,8 @@ class ServerWindow(BackgroundAnimationWidget, FramelessWindow):
             parent=self,
         )
 
-    def unRegisterStartServerComponents(self):
-        self.toggleServerBtn.setText(self.tr("开启服务器"))
-        self.exitServer.setText(self.tr("开启服务器"))
+    def applyServerState(self, state: ServerState):
+        """按生命周期状态设置开关按钮与备份按钮，按钮状态只在这里修改"""
         try:
             self.toggleServerBtn.clicked.disconnect()
         except (AttributeError, TypeError):
@@ -999,18 +1150,70 @@ class ServerWindow(BackgroundAnimationWidget, FramelessWindow):
             self.exitServer.clicked.disconnect()
         except (AttributeError, TypeError):
             pass
-        self.toggleServerBtn.clicked.connect(self.startServer)
-        self.exitServer.clicked.connect(self.startServer)
-        self.backupSavesBtn.setEnabled(True)
-        self.backupServerBtn.setEnabled(True)
-        self.manageBackupBtn.setEnabled(True)
+        if state == ServerState.STOPPING:
+            text = self.tr("正在关闭...")
+        elif state.alive:
+            text = self.tr("关闭服务器")
+        else:
+            text = self.tr("开启服务器")
+        if state.alive:
+            self.toggleServerBtn.clicked.connect(self.runQuickMenu_StopServer)
+            self.exitServer.clicked.connect(self.runQuickMenu_StopServer)
+        else:
+            self.toggleServerBtn.clicked.connect(self.startServer)
+            self.exitServer.clicked.connect(self.startServer)
+        self.toggleServerBtn.setText(text)
+        self.exitServer.setText(text)
+        # 关闭过程中只能强制关闭
+        self.toggleServerBtn.setEnabled(state != ServerState.STOPPING)
+        self.exitServer.setEnabled(state != ServerState.STOPPING)
+        self.killServer.setEnabled(True)
+        self.backupSavesBtn.setEnabled(not state.alive)
+        self.backupServerBtn.setEnabled(not state.alive)
+        self.manageBackupBtn.setEnabled(not state.alive)
+
+    def onServerStateChanged(self, event: LifecycleEvent):
+        self.applyServerState(event.state)
+        if event.state == ServerState.STARTING:
+            self.onServerStarting()
+        elif event.state == ServerState.STOPPING:
+            if event.reason == StopReason.TERMINATE:
+                timeout = getServerExtraSetting(self.serverConfig, "stop_timeout")
+                self.colorConsoleText(
+                    self.tr(
+                        f"[MCSL2 | 警告]：服务器未在 {timeout} 秒内关闭，已发送终止信号，"
+                        "仍未退出将强制结束。"
+                    )
+                )
+            elif event.reason == StopReason.KILL:
+                self.colorConsoleText(self.tr("[MCSL2 | 警告]：服务器仍未退出，已强制结束进程。"))
+        elif not event.state.alive:
+            self.consoleWorker.awaitingDone = False
+            self.serverExitStatusHandler(event)
 
     def registerCommandOutput(self):
         try:
-            self.serverBridge.serverLogOutput.disconnect(self.colorConsoleText)
+            self.serverBridge.serverLogOutput.disconnect(self.consoleWorker.processLine)
         except (AttributeError, TypeError):
             pass
-        self.serverBridge.serverLogOutput.connect(self.colorConsoleText)
+        try:
+            self.serverBridge.serverLogOutputBatch.disconnect(self.consoleWorker.processLines)
+        except (AttributeError, TypeError):
+            pass
+        try:
+            self.serverBridge.serverLogBacklog.disconnect(self.consoleWorker.replayLines)
+        except (AttributeError, TypeError):
+            pass
+        try:
+            self.serverBridge.serverPlayers.disconnect(self.consoleWorker.seedPlayers)
+        except (AttributeError, TypeError):
+            pass
+        # 原始输出直接交给分析线程，界面线程只接收分析结果
+        self.serverBridge.serverLogOutput.connect(self.consoleWorker.processLine)
+        self.serverBridge.serverLogOutputBatch.connect(self.consoleWorker.processLines)
+        self.serverBridge.serverLogBacklog.connect(self.consoleWorker.replayLines)
+        self.serverBridge.serverPlayers.connect(self.consoleWorker.seedPlayers)
+        self.consoleWorker.persist = not self.serverBridge.detachable
         self.colorConsoleText("[MCSL2 | 提示]：服务器正在启动，请稍后...")
 
     def unRegisterCommandOutput(self):
@@ -1018,164 +1221,545 @@ class ServerWindow(BackgroundAnimationWidget, FramelessWindow):
             self.serverBridge.serverLogOutput.disconnect()
         except (AttributeError, TypeError):
             pass
+        try:
+            self.serverBridge.serverLogOutputBatch.disconnect()
+        except (AttributeError, TypeError):
+            pass
+        try:
+            self.serverBridge.serverLogBacklog.disconnect()
+        except (AttributeError, TypeError):
+            pass
+        try:
+            self.serverBridge.serverPlayers.disconnect()
+        except (AttributeError, TypeError):
+            pass
 
     def registerResMonitor(self):
-        self.serverMemThread = MinecraftServerResMonitorUtil(
-            serverConfig=self.serverConfig, bridge=self.serverBridge, parent=self
+        process = self.serverBridge.serverProcess.process
+        process.started.connect(self.onServerProcessStarted)
+        if process.processId():
+            self.onServerProcessStarted()
+        ServerResourceSampler.sampler().sampled.connect(self.onResourceSampled)
+
+    def onServerProcessStarted(self):
+        ServerResourceSampler.register(
+            self.serverConfig.serverName, self.serverBridge.serverProcess.process.processId()
         )
-        self.serverMemThread.memPercent.connect(self.setMemView)
-        self.serverMemThread.cpuPercent.connect(self.setCPUView)
+        self.startJvmSampling()
+        self.startGcLogMonitor()
+        Metrics.serverUp.labels(self.serverConfig.serverName).set(1)
+        Metrics.serverStartTime.labels(self.serverConfig.serverName).set(time())
 
     def unRegisterResMonitor(self):
-        self.serverMemThread.onServerClosedHandler()
+        ServerResourceSampler.unregister(self.serverConfig.serverName)
+        self.stopJvmSampling()
+        self.stopGcLogMonitor()
+        self.diagnosticsWidget.stopHotThreads()
         try:
-            self.serverMemThread.memPercent.disconnect(self.setMemView)
+            self.serverBridge.serverProcess.process.started.disconnect(
+                self.onServerProcessStarted
+            )
         except (AttributeError, TypeError):
             pass
         try:
-            self.serverMemThread.cpuPercent.disconnect(self.setCPUView)
-        except (AttributeError, TypeError):
+            ServerResourceSampler.sampler().sampled.disconnect(self.onResourceSampled)
+        except TypeError:
             pass
-        self.serverMemThread.deleteLater()
+        self.setMemView(0.0)
+        self.setCPUView(0.0)
 
-    @pyqtSlot(int)
-    def serverExitStatusHandler(self, exitCode):
-        if exitCode:
-            if exitCode != 62097:
+    def onResourceSampled(self, serverName: str, sample: ResourceSample):
+        if serverName != self.serverConfig.serverName:
+            return
+        divisionNum = 1073741824 if self.serverConfig.memUnit == "G" else 1048576
+        self.setMemView(sample.rss / divisionNum)
+        self.setCPUView(sample.cpu)
+        history = ServerResourceSampler.history(serverName)
+        span = self.RESOURCE_CHART_SPAN
+        maxMem = self.serverConfig.maxMem * divisionNum
+        self.serverRAMHistoryChart.setSeries(
+            [(history.values("rss", span), self.serverRAMMonitorRing.barColor())], span, maxMem
+        )
+        self.serverCPUHistoryChart.setSeries(
+            [(history.values("cpu", span), self.serverCPUMonitorRing.barColor())], span, 100
+        )
+
+    def serverExitStatusHandler(self, event: LifecycleEvent):
+        Metrics.serverUp.labels(self.serverConfig.serverName).set(0)
+        if event.reason == StopReason.FAILED_TO_START:
+            self.colorConsoleText(self.tr(f"[MCSL2 | 错误]：服务器无法启动：{event.detail}"))
+        elif event.reason in (StopReason.HALT, StopReason.TERMINATE, StopReason.KILL):
+            self.colorConsoleText(self.tr("[MCSL2 | 提示]：服务器已被强制结束。"))
+        elif event.state == ServerState.CRASHED:
+            if event.exitCode != EXTERNAL_KILL_EXIT_CODE:
                 self.colorConsoleText(self.tr("[MCSL2 | 提示]：服务器崩溃！"))
-                if cfg.get(cfg.restartServerWhenCrashed):
-                    self.colorConsoleText(self.tr("[MCSL2 | 提示]：正在重新启动服务器..."))
-                    self.startServer()
+                Metrics.crashes.labels(self.serverConfig.serverName).inc()
             else:
                 self.colorConsoleText(self.tr("[MCSL2 | 提示]：服务器可能被强制结束进程。"))
         else:
             self.colorConsoleText(self.tr("[MCSL2 | 提示]：服务器已关闭！"))
 
+        self.diagnosticsWidget.checkHeapDumps()
         self.unRegisterServerExitStatusHandler()
+        self.stopTelemetryPolling()
         self.unRegisterResMonitor()
         self.unRegisterCommandOutput()
+        self.clearPlayers()
+        if self.closeAfterStop:
+            self.close()
+            return
+        # 崩溃后的自动重启由 ServerSupervisor 负责，它先于窗口处理同一个退出事件；
+        # 服务器在守护进程或宿主进程中运行时，其状态由远程服务器转发
+        status = self.serverBridge.supervision()
+        if status is None:
+            return
+        if status.state == SupervisionState.BACKOFF:
+            delay = max(0, round(status.restartAt - time()))
+            self.colorConsoleText(
+                self.tr(
+                    f"[MCSL2 | 提示]：{status.detail}。将在 {delay} 秒后自动重启"
+                    f"(统计窗口内第 {status.restarts + 1}/{status.budget} 次)..."
+                )
+            )
+        elif status.state == SupervisionState.QUARANTINED:
+            self.colorConsoleText(
+                self.tr(
+                    f"[MCSL2 | 错误]：已停止自动重启：{status.detail}。"
+                    "请排查问题后手动启动服务器。"
+                )
+            )
+
+    def cancelRestart(self):
+        if self.serverBridge is not None:
+            self.serverBridge.cancelRestart()
+
+    def onSupervisionChanged(self, status: SupervisionStatus):
+        if status is None or status.serverName != self.serverConfig.serverName:
+            return
+        self.supervisionStatus = status
+        if status.state == SupervisionState.BACKOFF:
+            self.supervisionTimer.start()
+        elif status.state == SupervisionState.QUARANTINED:
+            InfoBar.error(
+                title=self.tr("已停止自动重启"),
+                content=status.detail,
+                orient=Qt.Horizontal,
+                isClosable=True,
+                position=InfoBarPosition.TOP,
+                duration=-1,
+                parent=self,
+            )
+            self.supervisionTimer.stop()
+        else:
+            self.supervisionTimer.stop()
+        self.refreshSupervisionBtn()
+
+    def refreshSupervisionBtn(self):
+        status = self.supervisionStatus
+        if status is None or status.state == SupervisionState.IDLE:
+            self.supervisionBtn.setVisible(False)
+            return
+        if status.state == SupervisionState.BACKOFF:
+            delay = max(0, round(status.restartAt - time()))
+            self.supervisionBtn.setText(self.tr(f"取消重启 ({delay} 秒)"))
+            self.supervisionBtn.setToolTip(self.tr("服务器崩溃后等待自动重启，点击取消。"))
+        else:
+            self.supervisionBtn.setText(self.tr("解除隔离"))
+            self.supervisionBtn.setToolTip(status.detail)
+        self.supervisionBtn.setVisible(True)
 
     @pyqtSlot(float)
     def setMemView(self, mem):
         self.serverRAMMonitorTitle.setText(
             f"RAM：{str(round(mem, 2))}{self.serverConfig.memUnit}/{self.serverConfig.maxMem}{self.serverConfig.memUnit}"  # noqa: E501
         )
-        self.serverRAMMonitorRing.setValue(int(int(mem) / self.serverConfig.maxMem * 100))
+        self.serverRAMMonitorRing.setValue(min(100, int(mem / self.serverConfig.maxMem * 100)))
 
     @pyqtSlot(float)
     def setCPUView(self, cpuPercent):
         self.serverCPUMonitorRing.setValue(int(cpuPercent))
 
-    @pyqtSlot(str)
-    def colorConsoleText(self, serverOutput):
-        readServerProperties(self.serverConfig)
-        fmt = QTextCharFormat()
-        # fmt: off
-        greenText = ["INFO", "Info", "info", "tip", "tips", "hint", "HINT", "提示"]
-        orangeText = ["WARN", "Warning", "warn", "alert", "ALERT", "Alert", "CAUTION", "Caution", "警告"]  # noqa: E501
-        redText = ["ERR", "Err", "Fatal", "FATAL", "Critical", "Danger", "DANGER", "错", "at java", "at net", "at oolloo", "Caused by", "at sun"]  # noqa: E501
-        blueText = ["DEBUG", "Debug", "debug", "调试", "TEST", "Test", "Unknown command", "MCSL2"]
-        color = [QColor(52, 185, 96), QColor(196, 139, 33), QColor(214, 39, 21), QColor(22, 122, 232)]  # noqa: E501
-        for keyword in greenText:
-            if keyword in serverOutput:
-                fmt.setForeground(QBrush(color[0]))
-        for keyword in orangeText:
-            if keyword in serverOutput:
-                fmt.setForeground(QBrush(color[1]))
-        for keyword in redText:
-            if keyword in serverOutput:
-                fmt.setForeground(QBrush(color[2]))
-        for keyword in blueText:
-            if keyword in serverOutput:
-                fmt.setForeground(QBrush(color[3]))
-        self.serverOutput.mergeCurrentCharFormat(fmt)
-        serverOutput = (
-            serverOutput.replace("[38;2;170;170;170m", "")
-            .replace("[38;2;255;170;0m", "")
-            .replace("[38;2;255;255;255m", "")
-            .replace("[0m", "")
-            .replace("[38;2;255;255;85m", "")
-            .replace("[38;2;255;255;0m", "")
-            .replace("[38;2;255;85;85m", "")
-            .replace("[38;2;255;255;255m", "")
-            .replace("[3m", "")
-            .replace("[m[", "[")
-            .replace("[32m", "")
-            .replace("Preparing spawn area", self.tr("准备生成点区域中"))
-            .replace("main/INFO", self.tr("主类/信息"))
-            .replace("main/WARN", self.tr("主类/警告"))
-            .replace("main/ERROR", self.tr("主类/错误"))
-            .replace("main/FATAL", self.tr("主类/致命错误"))
-            .replace("main/DEBUG", self.tr("主类/调试信息"))
-            .replace("INFO", self.tr("信息"))
-            .replace("WARN", self.tr("警告"))
-            .replace("ERROR", self.tr("错误"))
-            .replace("FATAL", self.tr("致命错误"))
-            .replace("DEBUG", self.tr("调试信息"))
-            .replace("Server thread", self.tr("服务器线程"))
-            .replace("Server-Worker", self.tr("服务器工作进程"))
-            .replace("DEBUG", self.tr("调试信息"))
-            .replace("Forge Version Check", self.tr("Forge版本检查"))
-            .replace("ModLauncher running: args", self.tr("ModLauncher运行中: 参数"))
-            .replace("All chunks are saved", self.tr("所有区块已保存"))
-            .replace("Saving the game (this may take a moment!)", self.tr("保存游戏存档中（可能需要一些时间）"))  # noqa: E501
-            .replace("Saved the game", self.tr("已保存游戏存档"))
-            .replace("[33m[", "[")
-            .replace("[", "[")
+    def colorConsoleText(self, serverOutput: str):
+        """
+        MCSL2 自身的提示直接生成终端行，不计入日志行数、不归档，也不参与玩家与报错分析；
+        仍经由分析线程转发，保证与服务器输出的先后顺序一致
+        """
+        self.consoleNotice.emit(self.consoleLine(serverOutput, ConsoleLevel.DEBUG))
+
+    @pyqtSlot(object)
+    def applyConsoleAnalysis(self, result: ConsoleAnalysis):
+        """应用分析线程发回的一批结果：更新玩家与报错记录，再绘制终端"""
+        if result.playersReset:
+            self.onlinePlayers.clear()
+            self.existPlayersListWidget.clear()
+        for playerEvent in result.playerChanges:
+            name = playerEvent.name
+            if playerEvent.isJoin:
+                self.onlinePlayers.add(name)
+                self.existPlayersListWidget.addItem(name)
+            elif name in self.onlinePlayers:
+                self.onlinePlayers.discard(name)
+                for item in self.existPlayersListWidget.findItems(name, Qt.MatchExactly):
+                    self.existPlayersListWidget.takeItem(self.existPlayersListWidget.row(item))
+        if result.playersReset or result.playerChanges:
+            Metrics.onlinePlayers.labels(self.serverConfig.serverName).set(
+                len(self.onlinePlayers)
+            )
+        if result.errors:
+            self.errMsg += result.errors
+        lines = result.lines
+        self.recordConsoleLines(lines)
+        budget = max(
+            1, cfg.get(cfg.consoleMaxLinesPerSecond) // cfg.get(cfg.consoleRefreshRate)
         )
-        if "Disabling terminal, you're running in an unsupported environment." in serverOutput:
+        if (coalesced := len(lines) - budget) > 0:
+            lines = [
+                self.consoleLine(
+                    self.tr(
+                        f"[MCSL2 | 提示]：服务器输出过快，已合并省略 {coalesced} 行日志，完整内容请在“历史输出”中查看。"  # noqa: E501
+                    ),
+                    ConsoleLevel.WARN,
+                )
+            ] + lines[-budget:]
+        self.renderConsoleLines(lines)
+        for event in result.events:
+            if event == ConsoleEvent.DONE:
+                InfoBar.success(
+                    title=self.tr("提示"),
+                    content=self.tr("服务器启动完毕，详情请到快捷终端查看。"),
+                    orient=Qt.Horizontal,
+                    isClosable=False,
+                    position=InfoBarPosition.BOTTOM_RIGHT,
+                    duration=5000,
+                    parent=self,
+                )
+                self.initQuickMenu_Difficulty()
+                self.startTelemetryPolling()
+            elif event == ConsoleEvent.TELEMETRY:
+                self.updateTelemetryView()
+            elif event == ConsoleEvent.ENCODING_ERROR:
+                InfoBar.warning(
+                    title=self.tr("警告"),
+                    content=self.tr("服务器疑似输出非法字符，也有可能是无法被当前编码解析的字符。\n请尝试更换编码。"),
+                    orient=Qt.Horizontal,
+                    isClosable=False,
+                    position=InfoBarPosition.TOP,
+                    duration=2222,
+                    parent=self,
+                )
+
+    def recordConsoleLines(self, lines: List[ConsoleLine]):
+        """写入本次会话的环形缓冲区(归档已由分析线程完成)"""
+        self.consoleBuffer.extend(lines)
+
+    def renderConsoleLines(self, lines: List[ConsoleLine]):
+        """将若干行在一次编辑中追加到终端末尾，文档的块数上限与缓冲区容量一致"""
+        if not lines:
+            return
+        scrollBar = self.serverOutput.verticalScrollBar()
+        atBottom = scrollBar.value() >= scrollBar.maximum()
+        document = self.serverOutput.document()
+        needNewBlock = not document.isEmpty()
+        cursor = QTextCursor(document)
+        cursor.movePosition(QTextCursor.End)
+        cursor.beginEditBlock()
+        for line in lines:
+            if needNewBlock:
+                cursor.insertBlock()
+            for text, style in line.runs:
+                cursor.insertText(text, self.consoleCharFormat(line.level, style))
+            needNewBlock = True
+        cursor.endEditBlock()
+        if atBottom:
+            scrollBar.setValue(scrollBar.maximum())
+
+    @staticmethod
+    def consoleLine(text: str, level: ConsoleLevel) -> ConsoleLine:
+        return ConsoleLine(time(), level, [(text, DEFAULT_STYLE)])
+
+    def initConsoleProcessor(self):
+        self.consoleFormatCache: Dict[Tuple[ConsoleLevel, ConsoleStyle], QTextCharFormat] = {}
+        self.consoleSession = datetime.now().strftime("%Y%m%d-%H%M%S")
+        self.consoleWorker = ConsoleAnalysisWorker(
+            self.serverConfig.serverName, self.consoleSession, self.consoleTranslations()
+        )
+        self.consoleWorkerThread = QThread(self)
+        self.consoleWorkerThread.setObjectName(
+            f"ConsoleAnalysisThread-{self.serverConfig.serverName}"
+        )
+        self.consoleWorker.moveToThread(self.consoleWorkerThread)
+        self.consoleWorkerThread.finished.connect(self.consoleWorker.deleteLater)
+        self.consoleWorker.resultReady.connect(self.applyConsoleAnalysis)
+        self.consoleWorker.telemetryUnsupported.connect(self.onTelemetryUnsupported)
+        self.telemetryPoller = None
+        self.consoleNotice.connect(self.consoleWorker.forwardNotice)
+        self.resetConsolePlayers.connect(self.consoleWorker.resetPlayers)
+        self.resetErrorAnalysis.connect(self.consoleWorker.resetErrorAnalysis)
+        self.consoleWorkerThread.start()
+        self.consoleBuffer = ConsoleRingBuffer(
+            capacity=getServerExtraSetting(self.serverConfig, "console_capacity"),
+            spillPath=spillPath(self.serverConfig.serverName, self.consoleSession),
+        )
+        self.serverOutput.document().setMaximumBlockCount(self.consoleBuffer.capacity)
+
+    def setConsoleCapacity(self, capacity: int):
+        self.consoleBuffer.setCapacity(capacity)
+        self.serverOutput.document().setMaximumBlockCount(capacity)
+
+    def showConsoleHistory(self):
+        ConsoleHistoryBox(self.consoleBuffer, self.consoleCharFormat, parent=self).exec_()
+
+    def showExtraSettings(self):
+        box = ServerExtraSettingsBox(self.serverConfig, parent=self)
+        box.settingsChanged.connect(self.onExtraSettingsChanged)
+        box.exec_()
+
+    def onExtraSettingsChanged(self, values: dict):
+        if "console_capacity" in values:
+            self.setConsoleCapacity(values["console_capacity"])
+        if "tps_polling" in values or "tps_poll_interval" in values:
+            self.stopTelemetryPolling()
+            self.startTelemetryPolling()
+        if "jvm_sampling" in values or "jvm_sample_interval" in values:
+            self.stopJvmSampling()
+            if self.getRunningStatus():
+                self.startJvmSampling()
+
+    def startTelemetryPolling(self):
+        """服务器启动完毕后按单独设置定期查询 TPS/MSPT"""
+        if self.telemetryPoller is not None or not self.getRunningStatus():
             return
-        if "Advanced terminal features are not available in this environment" in serverOutput:
+        if not getServerExtraSetting(self.serverConfig, "tps_polling"):
             return
-        if "Unable to instantiate org.fusesource.jansi.WindowsAnsiOutputStream" in serverOutput:
+        self.telemetryPoller = TelemetryPoller(
+            self.serverBridge,
+            telemetryProbes(self.serverConfig.serverType),
+            getServerExtraSetting(self.serverConfig, "tps_poll_interval"),
+            parent=self,
+        )
+        # 与服务器输出一样经队列送达分析线程，因此总是先于回显到达
+        self.telemetryPoller.pollRequested.connect(self.consoleWorker.expectTelemetry)
+        self.telemetryPoller.start()
+        self.telemetryPoller.poll()
+
+    def stopTelemetryPolling(self):
+        if self.telemetryPoller is None:
             return
-        if "Loading libraries, please wait..." in serverOutput:
-            self.playersList.clear()
-        self.serverOutput.appendPlainText(serverOutput)
-        if search(r"(?=.*Done)(?=.*!)", serverOutput):
-            fmt.setForeground(QBrush(color[3]))
-            self.serverOutput.mergeCurrentCharFormat(fmt)
-            try:
-                ip = self.serverConfig.serverProperties["server-ip"]
-                ip = "127.0.0.1" if ip == "" else ip
-            except KeyError:
-                ip = "127.0.0.1"
-            port = self.serverConfig.serverProperties.get("server-port", 25565)
-            self.serverOutput.appendPlainText(
-                self.tr(f"[MCSL2 | 提示]：服务器启动完毕！\n[MCSL2 | 提示]：如果本机开服，IP 地址为{ip}，端口为{port}。\n[MCSL2 | 提示]：如果外网开服,或使用了内网穿透等服务，连接地址为你的相关服务地址。")  # noqa: E501
+        self.telemetryPoller.stop()
+        self.telemetryPoller.deleteLater()
+        self.telemetryPoller = None
+
+    def onTelemetryUnsupported(self, commands: list):
+        if self.telemetryPoller is None:
+            return
+        self.telemetryPoller.removeProbes(commands)
+        if not self.telemetryPoller.probes:
+            self.colorConsoleText(
+                self.tr("[MCSL2 | 警告]：该服务器不支持查询 TPS/MSPT 的指令，已停止查询。")
             )
-            InfoBar.success(
-                title=self.tr("提示"),
-                content=self.tr(f"服务器启动完毕，详情请到快捷终端查看。"),  # noqa: E501
-                orient=Qt.Horizontal,
-                isClosable=False,
-                position=InfoBarPosition.BOTTOM_RIGHT,
-                duration=5000,
-                parent=self,
+            self.stopTelemetryPolling()
+
+    def startJvmSampling(self):
+        """按单独设置用 jstat 采样堆占用与 GC，结果显示在资源占用下方"""
+        if self.jvmSampling or not getServerExtraSetting(self.serverConfig, "jvm_sampling"):
+            return
+        pid = self.serverBridge.serverProcess.process.processId()
+        # 进程启动信号与注册时的检查可能各触发一次，同一进程只尝试一次
+        if not pid or pid == self.jvmSamplingPid:
+            return
+        self.jvmSamplingPid = pid
+        reason = JvmSampler.register(
+            self.serverConfig.serverName,
+            pid,
+            self.serverConfig.javaPath,
+            getServerExtraSetting(self.serverConfig, "jvm_sample_interval"),
+        )
+        if reason:
+            self.colorConsoleText(self.tr(f"[MCSL2 | 警告]：无法采样 JVM 堆与 GC：{reason}"))
+            return
+        self.jvmSampling = True
+        JvmSampler.sampler().sampled.connect(self.onJvmSampled)
+        JvmSampler.sampler().unsupported.connect(self.onJvmSamplingUnsupported)
+        self.serverJvmLabel.setText(self.tr("堆：等待采样..."))
+        self.serverJvmLabel.setVisible(True)
+
+    def stopJvmSampling(self):
+        self.jvmSamplingPid = 0
+        if not self.jvmSampling:
+            return
+        self.jvmSampling = False
+        JvmSampler.unregister(self.serverConfig.serverName)
+        JvmSampler.sampler().sampled.disconnect(self.onJvmSampled)
+        JvmSampler.sampler().unsupported.disconnect(self.onJvmSamplingUnsupported)
+        self.serverJvmLabel.setVisible(False)
+
+    def onJvmSampled(self, serverName: str, sample: JvmSample):
+        if serverName != self.serverConfig.serverName:
+            return
+
+        def percent(value: float) -> str:
+            return "-" if isnan(value) else f"{value:.0f}%"
+
+        self.serverJvmLabel.setText(
+            self.tr(
+                f"堆：{formatBytes(sample.heapUsed)}/{formatBytes(sample.heapCommitted)}"
+                f"    Eden {percent(sample.eden)}  Old {percent(sample.old)}"
+                f"  Metaspace {percent(sample.metaspace)}"
             )
-            self.initQuickMenu_Difficulty()
-        if "�" in serverOutput:
-            fmt.setForeground(QBrush(color[1]))
-            self.serverOutput.mergeCurrentCharFormat(fmt)
-            self.serverOutput.appendPlainText(
-                self.tr("[MCSL2 | 警告]：服务器疑似输出非法字符，也有可能是无法被当前编码解析的字符。请尝试更换编码。")  # noqa: E501
+            + self.tr(
+                f"\nGC：Young {sample.youngGC:.0f} 次 ({sample.youngGCTime:.1f} 秒)"
+                f"  Full {sample.fullGC:.0f} 次 ({sample.fullGCTime:.1f} 秒)"
+                f"  GC 占用 {percent(sample.gcLoad)}"
+            )
+        )
+
+    def onJvmSamplingUnsupported(self, serverName: str, reason: str):
+        if serverName != self.serverConfig.serverName:
+            return
+        self.colorConsoleText(self.tr(f"[MCSL2 | 警告]：jstat 采样失败，已停止采样：{reason}"))
+        self.stopJvmSampling()
+
+    def startGcLogMonitor(self):
+        """开启了 GC 日志时跟踪本次启动的日志，停顿尖峰与卡顿警告同时发生时在终端中提示"""
+        if self.gcLogMonitoring or not getServerExtraSetting(self.serverConfig, "gc_logging"):
+            return
+        if reason := GcLogMonitor.register(self.serverConfig.serverName):
+            self.colorConsoleText(self.tr(f"[MCSL2 | 警告]：无法统计 GC 日志：{reason}"))
+            return
+        self.gcLogMonitoring = True
+        # 上一次启动的连接在注销时保留，先断开以免重复提示
+        try:
+            GcLogMonitor.monitor().lagAligned.disconnect(self.onGcLagAligned)
+        except TypeError:
+            pass
+        GcLogMonitor.monitor().lagAligned.connect(self.onGcLagAligned)
+
+    def stopGcLogMonitor(self):
+        if not self.gcLogMonitoring:
+            return
+        self.gcLogMonitoring = False
+        # 注销后还会读取一次日志并检查剩余的卡顿警告，因此暂不断开提示
+        GcLogMonitor.unregister(self.serverConfig.serverName)
+
+    def onGcLagAligned(self, serverName: str, match: GcLagMatch):
+        if serverName != self.serverConfig.serverName:
+            return
+        longest = max(match.pauses, key=lambda event: event.pauseMs)
+        self.colorConsoleText(
+            self.tr(
+                f"[MCSL2 | 警告]：卡顿警告 (落后 {match.behindMs:.0f} ms) 之前发生了 "
+                f"{len(match.pauses)} 次较长的 GC 停顿，合计 "
+                f"{sum(event.pauseMs for event in match.pauses):.0f} ms，"
+                f"最长为 {longest.name} ({longest.pauseMs:.0f} ms)。"
+                "可在资源占用历史中查看 GC 统计，据此调整 -Xmx 或 GC 参数。"
             )
+        )
+
+    def updateTelemetryView(self):
+        serverName = self.serverConfig.serverName
+        sample = ServerTelemetry.history(serverName).latest()
+        lagSpikes = ServerTelemetry.lagHistogram(serverName).total
+        if sample is None:
+            tps = mspt = "-"
+        else:
+            tps = "-" if isnan(sample.tps) else f"{sample.tps:.1f}"
+            mspt = "-" if isnan(sample.mspt) else f"{sample.mspt:.1f} ms"
+        self.serverTelemetryLabel.setText(
+            self.tr(f"TPS：{tps}    MSPT：{mspt}    卡顿警告：{lagSpikes} 次")
+        )
+
+    def consoleTranslations(self) -> Dict[str, str]:
+        """终端翻译表，只在语言切换时重新生成"""
+        return {
+            "Preparing spawn area": self.tr("准备生成点区域中"),
+            "main/INFO": self.tr("主类/信息"),
+            "main/WARN": self.tr("主类/警告"),
+            "main/ERROR": self.tr("主类/错误"),
+            "main/FATAL": self.tr("主类/致命错误"),
+            "main/DEBUG": self.tr("主类/调试信息"),
+            "INFO": self.tr("信息"),
+            "WARN": self.tr("警告"),
+            "ERROR": self.tr("错误"),
+            "FATAL": self.tr("致命错误"),
+            "DEBUG": self.tr("调试信息"),
+            "Server thread": self.tr("服务器线程"),
+            "Server-Worker": self.tr("服务器工作进程"),
+            "Forge Version Check": self.tr("Forge版本检查"),
+            "ModLauncher running: args": self.tr("ModLauncher运行中: 参数"),
+            "All chunks are saved": self.tr("所有区块已保存"),
+            "Saving the game (this may take a moment!)": self.tr("保存游戏存档中（可能需要一些时间）"),  # noqa: E501
+            "Saved the game": self.tr("已保存游戏存档"),
+        }
+
+    def changeEvent(self, e):
+        if e.type() == QEvent.LanguageChange:
+            self.consoleWorker.setTranslations(self.consoleTranslations())
+        super().changeEvent(e)
+
+    def consoleCharFormat(
+        self, level: ConsoleLevel, style: ConsoleStyle = DEFAULT_STYLE
+    ) -> QTextCharFormat:
+        """按(级别, ANSI样式)缓存 QTextCharFormat，避免逐行构造"""
+        if (fmt := self.consoleFormatCache.get((level, style))) is None:
+            fmt = QTextCharFormat()
+            if (color := style.foreground or LEVEL_COLORS.get(level)) is not None:
+                fmt.setForeground(QBrush(QColor(*color)))
+            if style.bold:
+                fmt.setFontWeight(QFont.Bold)
+            fmt.setFontItalic(style.italic)
+            fmt.setFontUnderline(style.underline)
+            self.consoleFormatCache[(level, style)] = fmt
+        return fmt
+
+    def onErrorHandlerToggled(self, checked: bool):
+        self.consoleWorker.detectErrors = checked
+
+    def importAnalyzeLog(self):
+        filePath, _ = QFileDialog.getOpenFileName(
+            self,
+            self.tr("选择日志文件"),
+            f"Servers/{self.serverConfig.serverName}/logs",
+            self.tr("日志文件 (*.log *.log.gz *.txt);;所有文件 (*)"),
+        )
+        if filePath:
+            self.analyzeLog(filePath=filePath)
+
+    def analyzeLog(self, text: str = "", filePath: str = ""):
+        """用报错分析规则离线分析粘贴的日志或导入的日志文件"""
+        if self.switchAnalyzeProviderBtn.isChecked():
             InfoBar.warning(
-                title=self.tr("警告"),
-                content=self.tr("服务器疑似输出非法字符，也有可能是无法被当前编码解析的字符。\n请尝试更换编码。"),
+                title=self.tr("提示"),
+                content=self.tr("暂不支持使用 CrashMC 分析，请切换为本地模块。"),
                 orient=Qt.Horizontal,
                 isClosable=False,
                 position=InfoBarPosition.TOP,
                 duration=2222,
                 parent=self,
             )
-        if self.errorHandler.isChecked():
-            self.errMsg += ServerErrorHandler.detect(serverOutput)
-        if (
-            "logged in with entity id" in serverOutput
-            or " left the game" in serverOutput
-        ):
-            self.recordPlayers(serverOutput)
+            return
+        if not text.strip() and not filePath:
+            return
+        if self.analyzeThread is not None and self.analyzeThread.isRunning():
+            return
+        if self.diagnosticsWidget.isAnalyzingArchive():
+            return
+        self.startAnalyze.setEnabled(False)
+        self.importAnalyzeLogBtn.setEnabled(False)
+        self.analyzeArchiveBtn.setEnabled(False)
+        self.resultTextEdit.setPlainText(self.tr("正在分析..."))
+        self.analyzeThread = ErrorAnalyzeThread(text, filePath, self)
+        self.analyzeThread.resultReady.connect(self.onLogAnalyzed)
+        self.analyzeThread.start()
+
+    def onLogAnalyzed(self, report: str):
+        self.resultTextEdit.setPlainText(report)
+        self.startAnalyze.setEnabled(True)
+        self.importAnalyzeLogBtn.setEnabled(True)
+        self.analyzeArchiveBtn.setEnabled(True)
+
+    def onArchiveAnalyzing(self, analyzing: bool):
+        self.startAnalyze.setEnabled(not analyzing)
+        self.importAnalyzeLogBtn.setEnabled(not analyzing)
 
     def showErrorHandlerReport(self):
         if self.errMsg != "":
@@ -1189,51 +1773,12 @@ class ServerWindow(BackgroundAnimationWidget, FramelessWindow):
             w.cancelButton.setParent(None)
             w.exec_()
 
-    def recordPlayers(self, serverOutput: str):
-        if "logged in with entity id" in serverOutput:
-            try:
-                self.playersList.append(str(str(serverOutput).split("INFO]: ")[1].split("[/")[0]))
-                return
-            except Exception:
-                pass
-
-            try:
-                # 若不成功，尝试提取玩家名字
-                # [11:49:05] [Server thread/INFO] [minecraft/PlayerList]: Ares_Connor[/127.0.0.1:63854] logged in with entity id 229 at (7.258252218995321, 65.0, 11.09627995098097)  # noqa: E501
-                # 提取玩家名字
-                name = serverOutput
-                name = name.split("]: ")[1].split("[/")[0]
-                self.playersList.append(name)
-                self.existPlayersListWidget.clear()
-                self.existPlayersListWidget.addItems(self.playersList)
-            except Exception as e:
-                MCSL2Logger.error(
-                    msg=f"extract player name failed\nonRecordPlayers::login {serverOutput}",
-                    exc=e,
-                )
-
-        elif " left the game" in serverOutput:
-            try:
-                # fmt: off
-                self.playersList.pop(self.playersList.index(str(str(serverOutput).split("INFO]: ")[1].split(" left the game")[0])))  # noqa: E501
-                self.existPlayersListWidget.clear()
-                self.existPlayersListWidget.addItems(self.playersList)
-                return
-            except Exception:
-                pass
-
-            try:  # 若不成功，尝试提取玩家名字
-                # [11:53:52] [Server thread/INFO] [minecraft/DedicatedServer]: Ares_Connor left the game  # noqa: E501
-                name = serverOutput
-                name = name.split("]: ")[1].split(" left the game")[0].strip()
-                self.playersList.pop(self.playersList.index(name))
-                self.existPlayersListWidget.clear()
-                self.existPlayersListWidget.addItems(self.playersList)
-            except Exception as e:
-                MCSL2Logger.error(
-                    msg=f"extract player name failed\nonRecordPlayers::logout {serverOutput}",
-                    exc=e,
-                )
+    def clearPlayers(self):
+        """服务器启动或退出时清空在线玩家，避免崩溃后残留"""
+        self.onlinePlayers.clear()
+        self.existPlayersListWidget.clear()
+        self.resetConsolePlayers.emit()
+        Metrics.onlinePlayers.labels(self.serverConfig.serverName).set(0)
 
     # def eventFilter(self, a0: QObject, a1: QEvent) -> bool:
     #     if a0 == self.commandPage and a1.type() == QEvent.KeyPress:
@@ -1304,10 +1849,10 @@ class ServerWindow(BackgroundAnimationWidget, FramelessWindow):
 
     def getKnownServerPlayers(self) -> str:
         players = self.tr("无玩家加入")
-        if len(self.playersList):
+        if self.onlinePlayers:
             players = ""
-            for player in self.playersList:
-                players += f"{player}\n"
+            for row in range(self.existPlayersListWidget.count()):
+                players += f"{self.existPlayersListWidget.item(row).text()}\n"
         else:
             pass
         return players
@@ -1316,6 +1861,7 @@ class ServerWindow(BackgroundAnimationWidget, FramelessWindow):
         """快捷菜单-服务器游戏难度"""
         textDiffiultyList = ["peaceful", "easy", "normal", "hard"]
         if self.getRunningStatus():
+            readServerProperties(self.serverConfig)
             try:
                 self.difficulty.setCurrentIndex(
                     int(self.serverConfig.serverProperties["difficulty"])
@@ -1492,14 +2038,8 @@ class ServerWindow(BackgroundAnimationWidget, FramelessWindow):
 
     def runQuickMenu_StopServer(self):
         if self.getRunningStatus():
-            self.killServer.setEnabled(False)
-            self.toggleServerBtn.setEnabled(False)
-            self.exitServer.setEnabled(False)
             box = MessageBox(self.tr("正常关闭服务器"), self.tr("你确定要关闭服务器吗？"), self)
             box.yesSignal.connect(self.stopServer)
-            box.cancelButton.clicked.connect(lambda: self.killServer.setEnabled(True))
-            box.cancelButton.clicked.connect(lambda: self.toggleServerBtn.setEnabled(True))
-            box.cancelButton.clicked.connect(lambda: self.exitServer.setEnabled(True))
             box.exec_()
         else:
             self.showServerNotOpenMsg()
@@ -1507,9 +2047,6 @@ class ServerWindow(BackgroundAnimationWidget, FramelessWindow):
     def runQuickMenu_KillServer(self):
         """快捷菜单-强制关闭服务器"""
         if self.getRunningStatus():
-            self.killServer.setEnabled(False)
-            self.toggleServerBtn.setEnabled(False)
-            self.exitServer.setEnabled(False)
             w = MessageBox(
                 self.tr("强制关闭服务器"),
                 self.tr("确定要强制关闭服务器吗？\n有可能导致数据丢失！\n请确保存档已经保存！"),
@@ -1573,6 +2110,8 @@ class ServerWindow(BackgroundAnimationWidget, FramelessWindow):
         ) != tmpText:
             with open(self.configEditorTabBar.items[i]._routeKey, "w+", encoding="utf-8") as nf:
                 nf.write(newText)
+            if osp.basename(self.configEditorTabBar.items[i]._routeKey) == "server.properties":
+                ServerPropertiesCache.invalidate(self.serverConfig.serverName)
 
             InfoBar.info(
                 title="提示",
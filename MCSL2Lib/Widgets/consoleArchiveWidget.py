@@ -0,0 +1,193 @@
+#     Copyright 2024, MCSL Team, mailto:services@mcsl.com.cn
+#
+#     Part of "MCSL2", a simple and multifunctional Minecraft server launcher.
+#
+#     Licensed under the GNU General Public License, Version 3.0, with our
+#     additional agreements. (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#        https://github.com/MCSLTeam/MCSL2/raw/master/LICENSE
+#
+################################################################################
+"""
+Console archive search box.
+"""
+
+from datetime import datetime
+from time import perf_counter, time
+from typing import Optional
+
+from PyQt5.QtCore import QSize, Qt, QThread, pyqtSignal
+from PyQt5.QtWidgets import QHBoxLayout, QHeaderView, QTableWidgetItem, QWidget
+from qfluentwidgets import (
+    BodyLabel,
+    ComboBox,
+    LineEdit,
+    MessageBoxBase,
+    PrimaryPushButton,
+    SearchLineEdit,
+    SubtitleLabel,
+    TableWidget,
+)
+
+from MCSL2Lib.ProgramControllers.consoleArchiveController import ConsoleArchive
+from MCSL2Lib.ServerControllers.consoleProcessor import ConsoleLevel
+from MCSL2Lib.utils import readGlobalServerConfig
+
+
+class ConsoleArchiveSearchThread(QThread):
+    resultReady = pyqtSignal(list, float)
+
+    def __init__(self, kwargs: dict, parent=None):
+        super().__init__(parent)
+        self.kwargs = kwargs
+
+    def run(self):
+        start = perf_counter()
+        results = ConsoleArchive.search(**self.kwargs)
+        self.resultReady.emit(results, (perf_counter() - start) * 1000)
+
+
+class ConsoleArchiveSearchBox(MessageBoxBase):
+    """跨会话、跨服务器检索终端归档"""
+
+    LEVEL_FILTERS = [
+        ("全部级别", None),
+        ("信息", [ConsoleLevel.INFO]),
+        ("警告", [ConsoleLevel.WARN]),
+        ("错误", [ConsoleLevel.ERROR]),
+        ("警告及错误", [ConsoleLevel.WARN, ConsoleLevel.ERROR]),
+        ("调试信息", [ConsoleLevel.DEBUG]),
+    ]
+    TIME_FILTERS = [
+        ("全部时间", None),
+        ("最近 1 小时", 3600),
+        ("最近 24 小时", 86400),
+        ("最近 7 天", 7 * 86400),
+        ("最近 30 天", 30 * 86400),
+    ]
+
+    def __init__(self, serverName: Optional[str] = None, parent=None):
+        super().__init__(parent)
+        self.searchThread: Optional[ConsoleArchiveSearchThread] = None
+        self.widget.setMinimumSize(QSize(900, 560))
+        self.titleLabel = SubtitleLabel(self.tr("检索终端归档"), self)
+
+        self.filterWidget = QWidget(self)
+        self.filterLayout = QHBoxLayout(self.filterWidget)
+        self.filterLayout.setContentsMargins(0, 0, 0, 0)
+        self.textEdit = SearchLineEdit(self.filterWidget)
+        self.textEdit.setPlaceholderText(self.tr("搜索内容"))
+        self.serverBox = ComboBox(self.filterWidget)
+        self.serverBox.addItem(self.tr("全部服务器"), userData=None)
+        names = {singleConfig["name"] for singleConfig in readGlobalServerConfig()}
+        names.update(ConsoleArchive.servers())
+        for name in sorted(names):
+            self.serverBox.addItem(name, userData=name)
+        if serverName in names:
+            self.serverBox.setCurrentText(serverName)
+        self.playerEdit = LineEdit(self.filterWidget)
+        self.playerEdit.setPlaceholderText(self.tr("玩家"))
+        self.playerEdit.setClearButtonEnabled(True)
+        self.playerEdit.setFixedWidth(130)
+        self.levelBox = ComboBox(self.filterWidget)
+        for text, levels in self.LEVEL_FILTERS:
+            self.levelBox.addItem(self.tr(text), userData=levels)
+        self.timeBox = ComboBox(self.filterWidget)
+        for text, seconds in self.TIME_FILTERS:
+            self.timeBox.addItem(self.tr(text), userData=seconds)
+        self.searchBtn = PrimaryPushButton(self.tr("检索"), self.filterWidget)
+        self.filterLayout.addWidget(self.textEdit, 1)
+        self.filterLayout.addWidget(self.serverBox)
+        self.filterLayout.addWidget(self.playerEdit)
+        self.filterLayout.addWidget(self.levelBox)
+        self.filterLayout.addWidget(self.timeBox)
+        self.filterLayout.addWidget(self.searchBtn)
+
+        self.resultView = TableWidget(self)
+        self.resultView.setColumnCount(5)
+        self.resultView.setHorizontalHeaderLabels([
+            self.tr("时间"),
+            self.tr("服务器"),
+            self.tr("级别"),
+            self.tr("玩家"),
+            self.tr("内容"),
+        ])
+        self.resultView.verticalHeader().hide()
+        self.resultView.setWordWrap(False)
+        self.resultView.setEditTriggers(self.resultView.NoEditTriggers)
+        self.resultView.setSelectionBehavior(self.resultView.SelectRows)
+        self.resultView.horizontalHeader().setSectionResizeMode(4, QHeaderView.Stretch)
+        self.resultView.setMinimumSize(QSize(860, 400))
+        self.statusLabel = BodyLabel(self)
+
+        self.viewLayout.addWidget(self.titleLabel)
+        self.viewLayout.addWidget(self.filterWidget)
+        self.viewLayout.addWidget(self.resultView)
+        self.viewLayout.addWidget(self.statusLabel)
+        self.yesButton.setText(self.tr("关闭"))
+        self.hideCancelButton()
+
+        self.searchBtn.clicked.connect(self.startSearch)
+        self.textEdit.searchSignal.connect(self.startSearch)
+        self.playerEdit.returnPressed.connect(self.startSearch)
+
+    def startSearch(self, *_):
+        if self.searchThread is not None and self.searchThread.isRunning():
+            return
+        seconds = self.timeBox.currentData()
+        kwargs = {
+            "text": self.textEdit.text().strip(),
+            "server": self.serverBox.currentData(),
+            "player": self.playerEdit.text().strip() or None,
+            "levels": self.levelBox.currentData(),
+            "since": time() - seconds if seconds else None,
+        }
+        self.searchBtn.setEnabled(False)
+        self.statusLabel.setText(self.tr("正在检索..."))
+        self.searchThread = ConsoleArchiveSearchThread(kwargs, self)
+        self.searchThread.resultReady.connect(self.showResults)
+        self.searchThread.start()
+
+    def showResults(self, results: list, elapsed: float):
+        levelNames = {
+            ConsoleLevel.NONE: "",
+            ConsoleLevel.INFO: self.tr("信息"),
+            ConsoleLevel.WARN: self.tr("警告"),
+            ConsoleLevel.ERROR: self.tr("错误"),
+            ConsoleLevel.DEBUG: self.tr("调试"),
+        }
+        self.resultView.setRowCount(len(results))
+        for row, line in enumerate(results):
+            items = [
+                datetime.fromtimestamp(line.time).strftime("%Y-%m-%d %H:%M:%S"),
+                line.server,
+                levelNames.get(line.level, ""),
+                line.player or "",
+                line.text,
+            ]
+            for column, text in enumerate(items):
+                item = QTableWidgetItem(text)
+                if column == 4:
+                    item.setToolTip(text)
+                self.resultView.setItem(row, column, item)
+        self.resultView.resizeColumnsToContents()
+        self.resultView.horizontalHeader().setSectionResizeMode(4, QHeaderView.Stretch)
+        self.resultView.scrollToTop()
+        self.statusLabel.setText(
+            self.tr(f"共找到 {len(results)} 条记录，用时 {elapsed:.1f} 毫秒。")
+            + (self.tr("仅显示最新的结果，请缩小检索范围。") if len(results) >= 500 else "")
+        )
+        self.searchBtn.setEnabled(True)
+
+    def done(self, code):
+        if self.searchThread is not None:
+            self.searchThread.wait()
+        super().done(code)
+
+    def keyPressEvent(self, e):
+        # 回车用于检索，不关闭对话框
+        if e.key() in (Qt.Key_Return, Qt.Key_Enter):
+            return
+        super().keyPressEvent(e)
@@ -0,0 +1,110 @@
+#     Copyright 2024, MCSL Team, mailto:services@mcsl.com.cn
+#
+#     Part of "MCSL2", a simple and multifunctional Minecraft server launcher.
+#
+#     Licensed under the GNU General Public License, Version 3.0, with our
+#     additional agreements. (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#        https://github.com/MCSLTeam/MCSL2/raw/master/LICENSE
+#
+################################################################################
+"""
+Console history viewer, pages through the ring buffer and its spill file.
+"""
+
+from typing import Callable
+
+from PyQt5.QtCore import QSize
+from PyQt5.QtGui import QTextCharFormat, QTextCursor
+from PyQt5.QtWidgets import QFrame, QHBoxLayout, QWidget
+from qfluentwidgets import (
+    BodyLabel,
+    FluentIcon as FIF,
+    MessageBoxBase,
+    PlainTextEdit,
+    PushButton,
+    SubtitleLabel,
+)
+
+from MCSL2Lib.ServerControllers.consoleBuffer import ConsoleRingBuffer
+from MCSL2Lib.ServerControllers.consoleProcessor import ConsoleLevel
+
+
+class ConsoleHistoryBox(MessageBoxBase):
+    """分页查看本次会话的全部终端输出(包括已溢出到磁盘的部分)"""
+
+    PAGE_LINES = 1000
+
+    def __init__(
+        self,
+        buffer: ConsoleRingBuffer,
+        formatter: Callable[[ConsoleLevel], QTextCharFormat],
+        parent=None,
+    ):
+        super().__init__(parent)
+        self.buffer = buffer
+        self.formatter = formatter
+        self.widget.setMinimumSize(QSize(760, 520))
+        self.titleLabel = SubtitleLabel(self.tr("历史输出"), self)
+        self.historyView = PlainTextEdit(self)
+        self.historyView.setReadOnly(True)
+        self.historyView.setFrameShape(QFrame.NoFrame)
+        self.historyView.setLineWrapMode(PlainTextEdit.NoWrap)
+        self.historyView.setMinimumSize(QSize(720, 400))
+
+        self.pagerWidget = QWidget(self)
+        self.pagerLayout = QHBoxLayout(self.pagerWidget)
+        self.pagerLayout.setContentsMargins(0, 0, 0, 0)
+        self.firstPageBtn = PushButton(FIF.UP, self.tr("最早"), self.pagerWidget)
+        self.prevPageBtn = PushButton(FIF.LEFT_ARROW, self.tr("上一页"), self.pagerWidget)
+        self.pageLabel = BodyLabel(self.pagerWidget)
+        self.nextPageBtn = PushButton(FIF.RIGHT_ARROW, self.tr("下一页"), self.pagerWidget)
+        self.lastPageBtn = PushButton(FIF.DOWN, self.tr("最新"), self.pagerWidget)
+        self.pagerLayout.addWidget(self.firstPageBtn)
+        self.pagerLayout.addWidget(self.prevPageBtn)
+        self.pagerLayout.addStretch(1)
+        self.pagerLayout.addWidget(self.pageLabel)
+        self.pagerLayout.addStretch(1)
+        self.pagerLayout.addWidget(self.nextPageBtn)
+        self.pagerLayout.addWidget(self.lastPageBtn)
+
+        self.viewLayout.addWidget(self.titleLabel)
+        self.viewLayout.addWidget(self.historyView)
+        self.viewLayout.addWidget(self.pagerWidget)
+        self.yesButton.setText(self.tr("关闭"))
+        self.hideCancelButton()
+
+        self.firstPageBtn.clicked.connect(lambda: self.showPage(0))
+        self.prevPageBtn.clicked.connect(lambda: self.showPage(self.page - 1))
+        self.nextPageBtn.clicked.connect(lambda: self.showPage(self.page + 1))
+        self.lastPageBtn.clicked.connect(lambda: self.showPage(self.pageCount() - 1))
+
+        self.page = 0
+        self.showPage(self.pageCount() - 1)
+
+    def pageCount(self) -> int:
+        return max(1, -(-self.buffer.totalLines // self.PAGE_LINES))
+
+    def showPage(self, page: int):
+        self.page = max(0, min(page, self.pageCount() - 1))
+        start = self.page * self.PAGE_LINES
+        lines = self.buffer.read(start, self.PAGE_LINES)
+        self.historyView.clear()
+        cursor = QTextCursor(self.historyView.document())
+        cursor.beginEditBlock()
+        for i, line in enumerate(lines):
+            if i:
+                cursor.insertBlock()
+            for text, _ in line.runs:
+                cursor.insertText(text, self.formatter(line.level))
+        cursor.endEditBlock()
+        self.pageLabel.setText(
+            self.tr(f"第 {self.page + 1} / {self.pageCount()} 页")
+            + self.tr(f"（第 {start + 1} - {start + len(lines)} 行，共 {self.buffer.totalLines} 行）")  # noqa: E501
+        )
+        self.prevPageBtn.setEnabled(self.page > 0)
+        self.firstPageBtn.setEnabled(self.page > 0)
+        self.nextPageBtn.setEnabled(self.page < self.pageCount() - 1)
+        self.lastPageBtn.setEnabled(self.page < self.pageCount() - 1)
@@ -0,0 +1,145 @@
+#     Copyright 2024, MCSL Team, mailto:services@mcsl.com.cn
+#
+#     Part of "MCSL2", a simple and multifunctional Minecraft server launcher.
+#
+#     Licensed under the GNU General Public License, Version 3.0, with our
+#     additional agreements. (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#        https://github.com/MCSLTeam/MCSL2/raw/master/LICENSE
+#
+################################################################################
+"""
+Player session history box.
+"""
+
+from datetime import datetime
+from time import time
+from typing import Optional
+
+from PyQt5.QtCore import QSize, Qt, QThread, pyqtSignal
+from PyQt5.QtWidgets import QHeaderView, QTableWidgetItem
+from qfluentwidgets import (
+    BodyLabel,
+    MessageBoxBase,
+    SearchLineEdit,
+    SubtitleLabel,
+    TableWidget,
+)
+
+from MCSL2Lib.ProgramControllers.playerSessionController import PlayerSessionIndex
+
+
+def formatDuration(seconds: float) -> str:
+    minutes = int(seconds // 60)
+    if minutes < 60:
+        return f"{minutes} 分钟"
+    return f"{minutes // 60} 小时 {minutes % 60} 分钟"
+
+
+def formatTime(timestamp: Optional[float]) -> str:
+    if timestamp is None:
+        return "-"
+    return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
+
+
+class PlayerSessionQueryThread(QThread):
+    resultReady = pyqtSignal(list, object, object)
+
+    def __init__(self, serverName: str, player: str, parent=None):
+        super().__init__(parent)
+        self.serverName = serverName
+        self.player = player
+
+    def run(self):
+        stats = PlayerSessionIndex.playerStats(self.serverName, self.player)
+        peak = PlayerSessionIndex.peakConcurrency(self.serverName)
+        recentPeak = PlayerSessionIndex.peakConcurrency(self.serverName, since=time() - 86400)
+        self.resultReady.emit(stats, peak, recentPeak)
+
+
+class PlayerSessionBox(MessageBoxBase):
+    """某个服务器加入过的玩家：在线状态、会话数、累计游戏时长与最后在线时间"""
+
+    def __init__(self, serverName: str, parent=None):
+        super().__init__(parent)
+        self.serverName = serverName
+        self.queryThread: Optional[PlayerSessionQueryThread] = None
+        self.widget.setMinimumSize(QSize(820, 520))
+        self.titleLabel = SubtitleLabel(self.tr(f"玩家记录 - {serverName}"), self)
+        self.searchEdit = SearchLineEdit(self)
+        self.searchEdit.setPlaceholderText(self.tr("搜索玩家"))
+        self.peakLabel = BodyLabel(self)
+
+        self.resultView = TableWidget(self)
+        self.resultView.setColumnCount(7)
+        self.resultView.setHorizontalHeaderLabels([
+            self.tr("玩家"),
+            self.tr("状态"),
+            self.tr("会话数"),
+            self.tr("累计游戏时长"),
+            self.tr("首次加入"),
+            self.tr("最后在线"),
+            self.tr("最近地址"),
+        ])
+        self.resultView.verticalHeader().hide()
+        self.resultView.setWordWrap(False)
+        self.resultView.setEditTriggers(self.resultView.NoEditTriggers)
+        self.resultView.setSelectionBehavior(self.resultView.SelectRows)
+        self.resultView.setMinimumSize(QSize(780, 360))
+
+        self.viewLayout.addWidget(self.titleLabel)
+        self.viewLayout.addWidget(self.searchEdit)
+        self.viewLayout.addWidget(self.peakLabel)
+        self.viewLayout.addWidget(self.resultView)
+        self.yesButton.setText(self.tr("关闭"))
+        self.hideCancelButton()
+
+        self.searchEdit.searchSignal.connect(self.startQuery)
+        self.searchEdit.clearSignal.connect(self.startQuery)
+        self.startQuery()
+
+    def startQuery(self, *_):
+        if self.queryThread is not None and self.queryThread.isRunning():
+            return
+        self.queryThread = PlayerSessionQueryThread(
+            self.serverName, self.searchEdit.text().strip(), self
+        )
+        self.queryThread.resultReady.connect(self.showResults)
+        self.queryThread.start()
+
+    def showResults(self, stats: list, peak, recentPeak):
+        if peak is None:
+            self.peakLabel.setText(self.tr("暂无玩家记录。"))
+        else:
+            self.peakLabel.setText(
+                self.tr(f"历史在线峰值：{peak[0]} 人 ({formatTime(peak[1])})")
+                + self.tr(f"    最近 24 小时：{recentPeak[0] if recentPeak else 0} 人")
+            )
+        self.resultView.setRowCount(len(stats))
+        for row, playerStats in enumerate(stats):
+            items = [
+                playerStats.player,
+                self.tr("在线") if playerStats.online else self.tr("离线"),
+                str(playerStats.sessions),
+                formatDuration(playerStats.playtime),
+                formatTime(playerStats.firstSeen),
+                self.tr("现在") if playerStats.online else formatTime(playerStats.lastSeen),
+                playerStats.lastIP or "-",
+            ]
+            for column, text in enumerate(items):
+                self.resultView.setItem(row, column, QTableWidgetItem(text))
+        self.resultView.resizeColumnsToContents()
+        self.resultView.horizontalHeader().setSectionResizeMode(6, QHeaderView.Stretch)
+
+    def done(self, code):
+        if self.queryThread is not None:
+            self.queryThread.wait()
+        super().done(code)
+
+    def keyPressEvent(self, e):
+        # 回车用于搜索，不关闭对话框
+        if e.key() in (Qt.Key_Return, Qt.Key_Enter):
+            return
+        super().keyPressEvent(e)
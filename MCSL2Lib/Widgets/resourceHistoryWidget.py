@@ -0,0 +1,301 @@
+#     Copyright 2024, MCSL Team, mailto:services@mcsl.com.cn
+#
+#     Part of "MCSL2", a simple and multifunctional Minecraft server launcher.
+#
+#     Licensed under the GNU General Public License, Version 3.0, with our
+#     additional agreements. (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#        https://github.com/MCSLTeam/MCSL2/raw/master/LICENSE
+#
+################################################################################
+"""
+Resource history charts, drawn from the shared sampler's ring buffers.
+"""
+
+from bisect import bisect_left
+from math import isnan
+from time import time
+from typing import List, Optional, Tuple
+
+from PyQt5.QtCore import QPointF, QRectF, QSize, Qt
+from PyQt5.QtGui import QColor, QPainter, QPainterPath, QPen
+from PyQt5.QtWidgets import QGridLayout, QWidget
+from qfluentwidgets import (
+    BodyLabel,
+    ComboBox,
+    MessageBoxBase,
+    StrongBodyLabel,
+    SubtitleLabel,
+    isDarkTheme,
+    themeColor,
+)
+
+from MCSL2Lib.ServerControllers.gcLogAnalyzer import GcLogMonitor
+from MCSL2Lib.ServerControllers.jvmSampler import JvmSampler
+from MCSL2Lib.ServerControllers.resourceSampler import ResourceSample, ServerResourceSampler
+from MCSL2Lib.ServerControllers.serverTelemetry import ServerTelemetry
+
+
+def formatBytes(value: float) -> str:
+    if isnan(value):
+        return "-"
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(value) < 1024:
+            return f"{value:.1f}{unit}"
+        value /= 1024
+    return f"{value:.1f}TB"
+
+
+class ResourceHistoryChart(QWidget):
+    """
+    折线图，按时间从旧到新绘制一条或多条曲线。
+    缺失的采样(NaN)处断开曲线；未指定上限时按可见数据的最大值缩放。
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.series: List[Tuple[List[float], QColor]] = []
+        self.maximum: Optional[float] = None
+        self.capacity = 0
+        self.setMinimumHeight(48)
+
+    def setSeries(
+        self,
+        series: List[Tuple[List[float], QColor]],
+        capacity: int,
+        maximum: Optional[float] = None,
+    ):
+        self.series = series
+        self.capacity = max(2, capacity)
+        self.maximum = maximum
+        self.update()
+
+    def paintEvent(self, e):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        rect = QRectF(self.rect()).adjusted(1, 1, -1, -1)
+        painter.setPen(QPen(QColor(255, 255, 255, 32) if isDarkTheme() else QColor(0, 0, 0, 24)))
+        painter.setBrush(QColor(255, 255, 255, 8) if isDarkTheme() else QColor(0, 0, 0, 6))
+        painter.drawRoundedRect(rect, 4, 4)
+
+        maximum = self.maximum
+        if maximum is None:
+            maximum = max(
+                (v for values, _ in self.series for v in values if not isnan(v)), default=0
+            )
+        if maximum <= 0:
+            return
+        step = rect.width() / (self.capacity - 1)
+        for values, color in self.series:
+            # 最新的采样贴右边缘，历史不足时左侧留空
+            x0 = rect.right() - (len(values) - 1) * step
+            path = QPainterPath()
+            drawing = False
+            for i, value in enumerate(values):
+                if isnan(value):
+                    drawing = False
+                    continue
+                point = QPointF(
+                    x0 + i * step, rect.bottom() - min(value / maximum, 1.0) * rect.height()
+                )
+                if drawing:
+                    path.lineTo(point)
+                else:
+                    path.moveTo(point)
+                    drawing = True
+            painter.setPen(QPen(color, 1.5))
+            painter.setBrush(Qt.NoBrush)
+            painter.drawPath(path)
+
+
+class ResourceHistoryBox(MessageBoxBase):
+    """
+    某个服务器的 CPU、内存、线程、磁盘读写与打开文件数的历史曲线，随采样实时刷新；
+    开启查询时另有 TPS/MSPT 曲线与卡顿警告的分布，开启 JVM 采样时另有堆与 GC 曲线，
+    开启 GC 日志时另有停顿时长的分布与分配、晋升速率。
+    """
+
+    SPANS = [
+        ("最近 5 分钟", 300),
+        ("最近 15 分钟", 900),
+        ("最近 1 小时", 3600),
+    ]
+
+    def __init__(self, serverName: str, parent=None):
+        super().__init__(parent)
+        self.serverName = serverName
+        self.widget.setMinimumSize(QSize(720, 800))
+        self.titleLabel = SubtitleLabel(self.tr(f"资源占用历史 - {serverName}"), self)
+        self.spanBox = ComboBox(self)
+        for text, seconds in self.SPANS:
+            self.spanBox.addItem(self.tr(text), userData=seconds)
+        self.spanBox.setCurrentIndex(0)
+
+        self.chartWidget = QWidget(self)
+        self.chartLayout = QGridLayout(self.chartWidget)
+        self.chartLayout.setContentsMargins(0, 0, 0, 0)
+        self.chartLayout.setColumnStretch(1, 1)
+        self.charts = {}
+        for row, (key, title) in enumerate([
+            ("cpu", self.tr("CPU")),
+            ("memory", self.tr("内存 (RSS / USS)")),
+            ("threads", self.tr("线程数")),
+            ("io", self.tr("磁盘读写 (读 / 写)")),
+            ("openFiles", self.tr("打开的文件")),
+            ("tps", self.tr("TPS")),
+            ("mspt", self.tr("MSPT")),
+            ("heap", self.tr("堆 (Eden / Old / Metaspace)")),
+            ("gc", self.tr("GC 耗时占比")),
+        ]):
+            titleLabel = StrongBodyLabel(title, self.chartWidget)
+            valueLabel = BodyLabel(self.chartWidget)
+            valueLabel.setMinimumWidth(150)
+            chart = ResourceHistoryChart(self.chartWidget)
+            chart.setMinimumSize(QSize(420, 60))
+            self.chartLayout.addWidget(titleLabel, row * 2, 0, 1, 1)
+            self.chartLayout.addWidget(valueLabel, row * 2 + 1, 0, 1, 1, Qt.AlignTop)
+            self.chartLayout.addWidget(chart, row * 2, 1, 2, 1)
+            self.charts[key] = (chart, valueLabel)
+        self.lagLabel = BodyLabel(self.chartWidget)
+        self.lagLabel.setWordWrap(True)
+        self.chartLayout.addWidget(self.lagLabel, self.chartLayout.rowCount(), 0, 1, 2)
+        self.gcPauseLabel = BodyLabel(self.chartWidget)
+        self.gcPauseLabel.setWordWrap(True)
+        self.chartLayout.addWidget(self.gcPauseLabel, self.chartLayout.rowCount(), 0, 1, 2)
+        self.emptyLabel = BodyLabel(self.tr("暂无采样数据，请先开启服务器。"), self)
+
+        self.viewLayout.addWidget(self.titleLabel)
+        self.viewLayout.addWidget(self.spanBox)
+        self.viewLayout.addWidget(self.chartWidget)
+        self.viewLayout.addWidget(self.emptyLabel)
+        self.yesButton.setText(self.tr("关闭"))
+        self.hideCancelButton()
+
+        self.spanBox.currentIndexChanged.connect(self.refresh)
+        ServerResourceSampler.sampler().sampled.connect(self.onSampled)
+        self.refresh()
+
+    def onSampled(self, serverName: str, _: ResourceSample):
+        if serverName == self.serverName:
+            self.refresh()
+
+    def refresh(self, *_):
+        history = ServerResourceSampler.history(self.serverName)
+        span = self.spanBox.currentData()
+        latest = history.latest()
+        self.emptyLabel.setVisible(latest is None)
+        if latest is None:
+            return
+        accent = themeColor()
+        secondary = QColor(255, 140, 0)
+
+        def values(field):
+            return history.values(field, span)
+
+        chart, label = self.charts["cpu"]
+        chart.setSeries([(values("cpu"), accent)], span, 100)
+        label.setText(f"{latest.cpu:.1f}%")
+        chart, label = self.charts["memory"]
+        chart.setSeries([(values("rss"), accent), (values("uss"), secondary)], span)
+        label.setText(f"{formatBytes(latest.rss)} / {formatBytes(latest.uss)}")
+        chart, label = self.charts["threads"]
+        chart.setSeries([(values("threads"), accent)], span)
+        label.setText(f"{latest.threads:.0f}")
+        chart, label = self.charts["io"]
+        chart.setSeries([(values("readRate"), accent), (values("writeRate"), secondary)], span)
+        label.setText(f"{formatBytes(latest.readRate)}/s / {formatBytes(latest.writeRate)}/s")
+        chart, label = self.charts["openFiles"]
+        chart.setSeries([(values("openFiles"), accent)], span)
+        label.setText("-" if isnan(latest.openFiles) else f"{latest.openFiles:.0f}")
+        self.refreshTelemetry(span)
+        self.refreshJvm(span)
+        self.refreshGcLog()
+
+    def refreshJvm(self, span: int):
+        history = JvmSampler.history(self.serverName)
+        times = history.values("time")
+        count = len(times) - bisect_left(times, time() - span)
+        latest = history.latest()
+        accent = themeColor()
+        chart, label = self.charts["heap"]
+        chart.setSeries(
+            [
+                (history.values("eden", count), accent),
+                (history.values("old", count), QColor(255, 140, 0)),
+                (history.values("metaspace", count), QColor(128, 128, 128)),
+            ],
+            count,
+            100,
+        )
+        label.setText(
+            "-"
+            if latest is None
+            else f"{formatBytes(latest.heapUsed)} / {formatBytes(latest.heapCommitted)}"
+        )
+        chart, label = self.charts["gc"]
+        chart.setSeries([(history.values("gcLoad", count), accent)], count)
+        label.setText("-" if latest is None or isnan(latest.gcLoad) else f"{latest.gcLoad:.1f}%")
+
+    def refreshGcLog(self):
+        stats = GcLogMonitor.stats(self.serverName)
+        self.gcPauseLabel.setVisible(stats is not None)
+        if stats is None:
+            return
+        if not stats.total:
+            self.gcPauseLabel.setText(self.tr("GC 停顿：暂无"))
+            return
+        allocation, promotion = stats.rates()
+        buckets = "，".join(
+            f"{bound} {hits} 次" for bound, hits in zip(stats.labels(), stats.counts) if hits
+        )
+        self.gcPauseLabel.setText(
+            self.tr(
+                f"GC 停顿：共 {stats.total} 次 (Young {stats.kinds['young']}，"
+                f"Full {stats.kinds['full']}，其他 {stats.kinds['other']})，"
+                f"累计 {stats.sumMs / 1000:.1f} 秒，P50 ≤{stats.percentile(0.5):.0f} ms，"
+                f"P99 ≤{stats.percentile(0.99):.0f} ms，最长 {stats.maxMs:.0f} ms；{buckets}"
+            )
+            + self.tr(
+                f"\n分配速率 {formatBytes(allocation)}/s，晋升速率 {formatBytes(promotion)}/s；"
+                f"不短于 {stats.SPIKE_MS} ms 的停顿 {stats.spikes} 次，"
+                f"其中 {stats.alignedSpikes} 次发生在卡顿警告之前"
+            )
+        )
+
+    def refreshTelemetry(self, span: int):
+        # TPS/MSPT 按查询间隔采样，按时间而不是个数截取
+        history = ServerTelemetry.history(self.serverName)
+        times = history.values("time")
+        count = len(times) - bisect_left(times, time() - span)
+        latest = history.latest()
+        accent = themeColor()
+        chart, label = self.charts["tps"]
+        chart.setSeries([(history.values("tps", count), accent)], count, 20)
+        label.setText("-" if latest is None or isnan(latest.tps) else f"{latest.tps:.1f}")
+        chart, label = self.charts["mspt"]
+        chart.setSeries([(history.values("mspt", count), accent)], count)
+        label.setText("-" if latest is None or isnan(latest.mspt) else f"{latest.mspt:.1f} ms")
+        histogram = ServerTelemetry.lagHistogram(self.serverName)
+        if not histogram.total:
+            self.lagLabel.setText(self.tr("卡顿警告 (Can't keep up)：无"))
+            return
+        buckets = "，".join(
+            f"{bound} {hits} 次"
+            for bound, hits in zip(histogram.labels(), histogram.counts)
+            if hits
+        )
+        self.lagLabel.setText(
+            self.tr(
+                f"卡顿警告 (Can't keep up)：共 {histogram.total} 次，"
+                f"累计落后 {histogram.sumMs / 1000:.1f} 秒；{buckets}"
+            )
+        )
+
+    def done(self, code):
+        try:
+            ServerResourceSampler.sampler().sampled.disconnect(self.onSampled)
+        except TypeError:
+            pass
+        super().done(code)
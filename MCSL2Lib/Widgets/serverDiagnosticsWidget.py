@@ -0,0 +1,298 @@
+#     Copyright 2024, MCSL Team, mailto:services@mcsl.com.cn
+#
+#     Part of "MCSL2", a simple and multifunctional Minecraft server launcher.
+#
+#     Licensed under the GNU General Public License, Version 3.0, with our
+#     additional agreements. (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#        https://github.com/MCSLTeam/MCSL2/raw/master/LICENSE
+#
+################################################################################
+"""
+Profiling and diagnostics buttons of the server window.
+"""
+
+from os import path as osp
+from time import time
+from typing import Optional
+
+from PyQt5.QtCore import QSize, Qt, pyqtSignal
+from PyQt5.QtWidgets import QVBoxLayout, QWidget
+from qfluentwidgets import InfoBar, InfoBarPosition, PushButton
+
+from MCSL2Lib.ServerControllers.heapDumpAnalyzer import (
+    HeapDumpAnalyzeThread,
+    heapDumpDirectory,
+    listHeapDumps,
+)
+from MCSL2Lib.ServerControllers.hotThreads import HotThreadsThread
+from MCSL2Lib.ServerControllers.jfrProfiler import JfrProfileThread
+from MCSL2Lib.ServerControllers.logArchiveAnalyzer import LogArchiveAnalyzeThread
+from MCSL2Lib.ServerControllers.serverUtils import getServerExtraSetting
+from MCSL2Lib.ServerControllers.tickProfiler import TickProfileRun, listTickProfiles
+from MCSL2Lib.Widgets.tickProfileWidget import TickProfileBox
+
+
+class ServerDiagnosticsWidget(QWidget):
+    """
+    服务器窗口概览页中的性能分析按钮，各项分析的后台任务也由本控件管理。
+    服务器窗口只需通过 setBridge() 传入服务器进程，并把信号接到终端与“错误分析”页。
+    """
+
+    # MCSL2 自身的提示，显示在终端中
+    message = pyqtSignal(str)
+    # 分析结果，显示在“错误分析”页
+    reportReady = pyqtSignal(str)
+    # 需要服务器运行的分析在服务器未运行时被点击
+    serverNotRunning = pyqtSignal()
+    # 历史日志分析开始或结束，服务器窗口据此启用或禁用其他日志分析按钮
+    archiveAnalyzing = pyqtSignal(bool)
+
+    def __init__(self, serverConfig, parent=None):
+        super().__init__(parent)
+        self.serverConfig = serverConfig
+        self.bridge = None
+        self.serverStartTime = 0.0
+        self.archiveAnalyzeThread: Optional[LogArchiveAnalyzeThread] = None
+        self.heapDumpThread: Optional[HeapDumpAnalyzeThread] = None
+        self.profileThread: Optional[JfrProfileThread] = None
+        self.hotThreadsThread: Optional[HotThreadsThread] = None
+        self.tickProfileRun: Optional[TickProfileRun] = None
+        self.diagnosticsLayout = QVBoxLayout(self)
+        self.diagnosticsLayout.setContentsMargins(0, 0, 0, 0)
+        self.profileBtn = self.addButton(self.tr("性能分析 (JFR)"), self.profileServer)
+        self.hotThreadsBtn = self.addButton(self.tr("查找高占用线程"), self.toggleHotThreads)
+        self.tickProfileBtn = self.addButton(self.tr("Tick 分析"), self.tickProfileServer)
+        # 该按钮位于“错误分析”页，由服务器窗口放入其布局
+        self.analyzeArchiveBtn = PushButton(self.tr("分析历史日志"))
+        self.analyzeArchiveBtn.clicked.connect(self.analyzeArchive)
+
+    def addButton(self, text: str, slot) -> PushButton:
+        btn = PushButton(text, self)
+        btn.setFixedSize(QSize(160, 32))
+        btn.clicked.connect(slot)
+        self.diagnosticsLayout.addWidget(btn)
+        return btn
+
+    def setBridge(self, bridge):
+        self.bridge = bridge
+
+    def onServerStarting(self):
+        # 只分析本次运行中生成的堆转储
+        self.serverStartTime = time()
+
+    def isServerRunning(self) -> bool:
+        return self.bridge is not None and self.bridge.isServerRunning()
+
+    def serverPid(self) -> int:
+        return self.bridge.serverProcess.process.processId()
+
+    def showReportInfo(self, title: str, content: str, duration: int = 5000):
+        InfoBar.info(
+            title=title,
+            content=content,
+            orient=Qt.Horizontal,
+            isClosable=True,
+            position=InfoBarPosition.BOTTOM_RIGHT,
+            duration=duration,
+            parent=self.window(),
+        )
+
+    def shutDown(self):
+        """服务器窗口关闭时取消所有后台分析，并等待其线程结束"""
+        if self.archiveAnalyzeThread is not None:
+            self.archiveAnalyzeThread.cancel()
+            self.archiveAnalyzeThread.wait()
+        if self.heapDumpThread is not None:
+            self.heapDumpThread.cancel()
+            self.heapDumpThread.wait()
+        if self.profileThread is not None:
+            self.profileThread.cancel()
+            self.profileThread.wait()
+        self.stopHotThreads()
+        if self.tickProfileRun is not None:
+            self.tickProfileRun.cancel()
+
+    def isAnalyzingArchive(self) -> bool:
+        return self.archiveAnalyzeThread is not None and self.archiveAnalyzeThread.isRunning()
+
+    def analyzeArchive(self):
+        """并行分析服务器目录下的崩溃报告、历史日志与 JVM 崩溃日志；分析中再次点击则取消"""
+        if self.isAnalyzingArchive():
+            self.archiveAnalyzeThread.cancel()
+            self.analyzeArchiveBtn.setEnabled(False)
+            return
+        self.archiveAnalyzing.emit(True)
+        self.analyzeArchiveBtn.setText(self.tr("取消分析"))
+        self.reportReady.emit(self.tr("正在分析历史日志..."))
+        self.archiveAnalyzeThread = LogArchiveAnalyzeThread(
+            f"Servers/{self.serverConfig.serverName}", self
+        )
+        self.archiveAnalyzeThread.progress.connect(
+            lambda percent: self.reportReady.emit(self.tr(f"正在分析历史日志... {percent}%"))
+        )
+        self.archiveAnalyzeThread.resultReady.connect(self.onArchiveAnalyzed)
+        self.archiveAnalyzeThread.start()
+
+    def onArchiveAnalyzed(self, report: str):
+        self.reportReady.emit(report)
+        self.analyzeArchiveBtn.setText(self.tr("分析历史日志"))
+        self.analyzeArchiveBtn.setEnabled(True)
+        self.archiveAnalyzing.emit(False)
+
+    def checkHeapDumps(self):
+        """服务器退出后若生成了新的堆转储，在后台进程中统计占用内存最多的类"""
+        if not getServerExtraSetting(self.serverConfig, "heap_dump_on_oom"):
+            return
+        if self.heapDumpThread is not None and self.heapDumpThread.isRunning():
+            return
+        dumps = [
+            dumpPath
+            for dumpPath in listHeapDumps(heapDumpDirectory(self.serverConfig.serverName))
+            if osp.getmtime(dumpPath) >= self.serverStartTime
+        ]
+        if not dumps:
+            return
+        self.message.emit(
+            self.tr("[MCSL2 | 提示]：检测到内存溢出时生成的堆转储，正在后台分析，请稍后...")
+        )
+        self.heapDumpThread = HeapDumpAnalyzeThread(
+            dumps[0], getServerExtraSetting(self.serverConfig, "heap_dump_budget") * 1048576, self
+        )
+        self.heapDumpThread.resultReady.connect(self.onHeapDumpAnalyzed)
+        self.heapDumpThread.start()
+
+    def onHeapDumpAnalyzed(self, dumpPath: str, summary: str):
+        self.reportReady.emit(summary)
+        self.message.emit(self.tr(f"[MCSL2 | 提示]：堆转储分析完成，摘要已保存至 {dumpPath}.txt"))
+        self.showReportInfo(self.tr("堆转储分析完成"), self.tr("结果已显示在“错误分析”页。"))
+
+    def profileServer(self):
+        """用 JFR 录制一段时间，结束后统计热点方法、分配与锁竞争；录制中再次点击则提前结束"""
+        if self.profileThread is not None and self.profileThread.isRunning():
+            self.profileThread.finishEarly()
+            self.profileBtn.setEnabled(False)
+            return
+        if not self.isServerRunning():
+            self.serverNotRunning.emit()
+            return
+        duration = getServerExtraSetting(self.serverConfig, "jfr_duration")
+        self.profileThread = JfrProfileThread(
+            self.serverConfig.serverName,
+            self.serverPid(),
+            self.serverConfig.javaPath,
+            duration,
+            getServerExtraSetting(self.serverConfig, "jfr_budget") * 1048576,
+            self,
+        )
+        self.profileThread.progress.connect(self.onProfileProgress)
+        self.profileThread.resultReady.connect(self.onProfileFinished)
+        self.profileThread.start()
+        self.message.emit(
+            self.tr(f"[MCSL2 | 提示]：开始 JFR 性能分析，录制 {duration} 秒后自动统计...")
+        )
+
+    def onProfileProgress(self, remaining: int):
+        if remaining:
+            self.profileBtn.setText(self.tr(f"结束录制 ({remaining} 秒)"))
+        else:
+            self.profileBtn.setText(self.tr("正在统计..."))
+            self.profileBtn.setEnabled(False)
+
+    def onProfileFinished(self, recordingPath: str, summary: str):
+        self.profileBtn.setText(self.tr("性能分析 (JFR)"))
+        self.profileBtn.setEnabled(True)
+        if not recordingPath:
+            self.message.emit(self.tr(f"[MCSL2 | 警告]：性能分析失败：{summary}"))
+            return
+        self.reportReady.emit(summary)
+        self.message.emit(
+            self.tr(f"[MCSL2 | 提示]：性能分析完成，摘要已保存至 {recordingPath}.txt")
+        )
+        self.showReportInfo(self.tr("性能分析完成"), self.tr("结果已显示在“错误分析”页。"))
+
+    def toggleHotThreads(self):
+        """每隔几秒报告 CPU 占用最高的 Java 线程及其调用栈，再次点击停止"""
+        if self.hotThreadsThread is not None:
+            self.stopHotThreads()
+            return
+        if not self.isServerRunning():
+            self.serverNotRunning.emit()
+            return
+        interval = getServerExtraSetting(self.serverConfig, "hot_threads_interval")
+        self.hotThreadsThread = HotThreadsThread(
+            self.serverPid(), self.serverConfig.javaPath, interval, self
+        )
+        self.hotThreadsThread.sampled.connect(self.onHotThreadsSampled)
+        self.hotThreadsThread.failed.connect(self.onHotThreadsFailed)
+        self.hotThreadsThread.start()
+        self.hotThreadsBtn.setText(self.tr("停止查找线程"))
+        self.reportReady.emit(self.tr(f"正在采样各线程的 CPU 占用，每 {interval} 秒更新..."))
+        self.showReportInfo(
+            self.tr("开始查找高占用线程"), self.tr("结果会持续更新在“错误分析”页。"), 3000
+        )
+
+    def stopHotThreads(self):
+        """停止查找高占用线程，服务器停止时也由服务器窗口调用"""
+        if self.hotThreadsThread is None:
+            return
+        thread, self.hotThreadsThread = self.hotThreadsThread, None
+        thread.sampled.disconnect(self.onHotThreadsSampled)
+        thread.failed.disconnect(self.onHotThreadsFailed)
+        thread.stop()
+        thread.wait()
+        self.hotThreadsBtn.setText(self.tr("查找高占用线程"))
+        self.hotThreadsBtn.setToolTip("")
+
+    def onHotThreadsSampled(self, report: str, hottest: str, cpu: float):
+        self.reportReady.emit(report)
+        # 按钮宽度固定，线程名只放在提示中
+        self.hotThreadsBtn.setText(self.tr(f"停止 (最高 {cpu:.0f}%)"))
+        self.hotThreadsBtn.setToolTip(hottest)
+
+    def onHotThreadsFailed(self, reason: str):
+        self.stopHotThreads()
+        self.message.emit(self.tr(f"[MCSL2 | 警告]：无法查找高占用线程：{reason}"))
+
+    def tickProfileServer(self):
+        """
+        通过 /perf (旧版本为 /debug) 运行一次限时的 tick 分析，完成后打开报告。
+        录制中再次点击则提前结束；服务器未运行时查看已有的报告。
+        """
+        if self.tickProfileRun is not None and self.tickProfileRun.isActive():
+            self.tickProfileRun.stopEarly()
+            return
+        if not self.isServerRunning():
+            if listTickProfiles(self.serverConfig.serverName):
+                TickProfileBox(self.serverConfig.serverName, parent=self.window()).exec_()
+            else:
+                self.serverNotRunning.emit()
+            return
+        self.tickProfileRun = TickProfileRun(
+            self.bridge,
+            self.serverConfig.serverName,
+            getServerExtraSetting(self.serverConfig, "tick_profile_duration"),
+            self,
+        )
+        self.tickProfileRun.progress.connect(self.onTickProfileProgress)
+        self.tickProfileRun.finished.connect(self.onTickProfileFinished)
+        self.tickProfileRun.start()
+        self.tickProfileBtn.setText(self.tr("正在开始..."))
+
+    def onTickProfileProgress(self, remaining: int):
+        if remaining:
+            self.tickProfileBtn.setText(self.tr(f"结束分析 ({remaining} 秒)"))
+        else:
+            self.tickProfileBtn.setText(self.tr("正在读取报告..."))
+
+    def onTickProfileFinished(self, report: str, message: str):
+        self.tickProfileRun.deleteLater()
+        self.tickProfileRun = None
+        self.tickProfileBtn.setText(self.tr("Tick 分析"))
+        if not report:
+            self.message.emit(self.tr(f"[MCSL2 | 警告]：Tick 分析失败：{message}"))
+            return
+        self.message.emit(self.tr(f"[MCSL2 | 提示]：Tick 分析完成，报告位于 {report}"))
+        TickProfileBox(self.serverConfig.serverName, report, parent=self.window()).exec_()
@@ -0,0 +1,110 @@
+#     Copyright 2024, MCSL Team, mailto:services@mcsl.com.cn
+#
+#     Part of "MCSL2", a simple and multifunctional Minecraft server launcher.
+#
+#     Licensed under the GNU General Public License, Version 3.0, with our
+#     additional agreements. (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#        https://github.com/MCSLTeam/MCSL2/raw/master/LICENSE
+#
+################################################################################
+"""
+Per-server extra settings box.
+"""
+
+from typing import Any, Dict
+
+from PyQt5.QtCore import QSize, Qt, pyqtSignal
+from PyQt5.QtWidgets import QGridLayout, QWidget
+from qfluentwidgets import (
+    BodyLabel,
+    CaptionLabel,
+    MessageBoxBase,
+    SpinBox,
+    SubtitleLabel,
+    SwitchButton,
+)
+
+from MCSL2Lib.ProgramControllers.interfaceController import MySmoothScrollArea
+from MCSL2Lib.ServerControllers.serverUtils import (
+    SERVER_EXTRA_SETTINGS,
+    getServerExtraSetting,
+    saveServerExtraData,
+)
+from MCSL2Lib.variables import ServerVariables
+
+
+class ServerExtraSettingsBox(MessageBoxBase):
+    """按 SERVER_EXTRA_SETTINGS 生成的服务器单独设置对话框"""
+
+    settingsChanged = pyqtSignal(dict)
+
+    def __init__(self, serverConfig: ServerVariables, parent=None):
+        super().__init__(parent)
+        self.serverConfig = serverConfig
+        self.widget.setMinimumSize(QSize(460, 0))
+        self.titleLabel = SubtitleLabel(
+            self.tr(f"服务器“{serverConfig.serverName}”的单独设置"), self
+        )
+        self.viewLayout.addWidget(self.titleLabel)
+
+        self.settingsScrollArea = MySmoothScrollArea(self)
+        self.settingsScrollArea.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded)
+        self.settingsScrollArea.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.settingsScrollArea.setWidgetResizable(True)
+        self.settingsScrollArea.setMinimumHeight(360)
+        self.settingsWidget = QWidget()
+        self.settingsLayout = QGridLayout(self.settingsWidget)
+        self.settingsLayout.setContentsMargins(0, 10, 10, 0)
+        self.editors: Dict[str, QWidget] = {}
+        for row, setting in enumerate(SERVER_EXTRA_SETTINGS):
+            value = getServerExtraSetting(serverConfig, setting.key)
+            title = BodyLabel(self.tr(setting.title), self.settingsWidget)
+            content = CaptionLabel(self.tr(setting.content), self.settingsWidget)
+            content.setWordWrap(True)
+            if isinstance(setting.default(), bool):
+                editor = SwitchButton(self.settingsWidget)
+                editor.setOnText(self.tr("开"))
+                editor.setOffText(self.tr("关"))
+                editor.setChecked(bool(value))
+            else:
+                editor = SpinBox(self.settingsWidget)
+                editor.setRange(setting.minimum, setting.maximum)
+                editor.setSuffix(setting.suffix)
+                editor.setValue(int(value))
+                editor.setMinimumWidth(150)
+            self.editors[setting.key] = editor
+            self.settingsLayout.addWidget(title, row * 2, 0, 1, 1)
+            self.settingsLayout.addWidget(content, row * 2 + 1, 0, 1, 1)
+            self.settingsLayout.addWidget(editor, row * 2, 1, 2, 1, Qt.AlignRight)
+        self.settingsScrollArea.setWidget(self.settingsWidget)
+        self.viewLayout.addWidget(self.settingsScrollArea)
+
+        self.yesButton.setText(self.tr("保存"))
+        self.cancelButton.setText(self.tr("取消"))
+        self.yesButton.clicked.connect(self.saveSettings)
+
+    def values(self) -> Dict[str, Any]:
+        values = {}
+        for key, editor in self.editors.items():
+            if isinstance(editor, SwitchButton):
+                values[key] = editor.isChecked()
+            else:
+                values[key] = editor.value()
+        return values
+
+    def saveSettings(self):
+        # 只保存与默认值不同的项，与默认值相同的项从 extra_data 中删除，之后继续跟随全局设置
+        defaults = {setting.key: setting.default() for setting in SERVER_EXTRA_SETTINGS}
+        values = self.values()
+        changed = {
+            key: value
+            for key, value in values.items()
+            if value != getServerExtraSetting(self.serverConfig, key)
+        }
+        custom = {key: value for key, value in values.items() if value != defaults[key]}
+        removed = [key for key in values if key not in custom]
+        if saveServerExtraData(self.serverConfig, custom, removed):
+            self.settingsChanged.emit(changed)
@@ -0,0 +1,199 @@
+#     Copyright 2024, MCSL Team, mailto:services@mcsl.com.cn
+#
+#     Part of "MCSL2", a simple and multifunctional Minecraft server launcher.
+#
+#     Licensed under the GNU General Public License, Version 3.0, with our
+#     additional agreements. (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#        https://github.com/MCSLTeam/MCSL2/raw/master/LICENSE
+#
+################################################################################
+"""
+Tick profile viewer: a sortable section tree of one /perf or /debug report, diffed against another.
+"""
+
+from datetime import datetime
+from math import isnan
+from os import path as osp
+from typing import Dict, List, Optional
+
+from PyQt5.QtCore import QSize, Qt
+from PyQt5.QtWidgets import QHeaderView, QTableWidgetItem, QTreeWidgetItem
+from qfluentwidgets import (
+    BodyLabel,
+    ComboBox,
+    MessageBoxBase,
+    SubtitleLabel,
+    TableWidget,
+    TreeWidget,
+)
+
+from MCSL2Lib.ServerControllers.tickProfiler import (
+    ProfileSection,
+    TickProfile,
+    diffProfiles,
+    formatDelta,
+    listTickProfiles,
+    loadTickProfile,
+)
+from MCSL2Lib.utils import MCSL2Logger
+
+
+class _SortableItem(QTreeWidgetItem):
+    """数值列按 UserRole 中的数值排序，而不是按显示的文字"""
+
+    def __lt__(self, other):
+        column = self.treeWidget().sortColumn()
+        left, right = self.data(column, Qt.UserRole), other.data(column, Qt.UserRole)
+        if isinstance(left, float) and isinstance(right, float):
+            # 没有数值(NaN)的排在最后
+            return (isnan(left), left) < (isnan(right), right)
+        return super().__lt__(other)
+
+
+def _number(value: float, suffix: str = "", digits: int = 2) -> str:
+    return "-" if isnan(value) else f"{value:.{digits}f}{suffix}"
+
+
+class TickProfileBox(MessageBoxBase):
+    """某个服务器的 /perf 与 /debug 报告：区段树可按任一列排序，并可选择另一次报告作为对比基准"""
+
+    COLUMNS = ("区段", "占上级", "占整个 tick", "每 tick 次数", "较基准")
+
+    def __init__(self, serverName: str, report: Optional[str] = None, parent=None):
+        super().__init__(parent)
+        self.serverName = serverName
+        self.reports = listTickProfiles(serverName)
+        self.profiles: Dict[str, TickProfile] = {}
+        self.widget.setMinimumSize(QSize(860, 600))
+        self.titleLabel = SubtitleLabel(self.tr(f"Tick 分析 - {serverName}"), self)
+        self.reportComboBox = ComboBox(self)
+        self.baselineComboBox = ComboBox(self)
+        self.summaryLabel = BodyLabel(self)
+        self.summaryLabel.setWordWrap(True)
+
+        self.sectionTree = TreeWidget(self)
+        self.sectionTree.setColumnCount(len(self.COLUMNS))
+        self.sectionTree.setHeaderLabels([self.tr(column) for column in self.COLUMNS])
+        self.sectionTree.setSortingEnabled(True)
+        self.sectionTree.setMinimumSize(QSize(820, 320))
+        self.sectionTree.header().setSectionResizeMode(0, QHeaderView.Stretch)
+
+        self.metricsView = TableWidget(self)
+        self.metricsView.setColumnCount(4)
+        self.metricsView.setHorizontalHeaderLabels([
+            self.tr("指标 (/perf)"),
+            self.tr("平均"),
+            self.tr("最大"),
+            self.tr("基准平均"),
+        ])
+        self.metricsView.verticalHeader().hide()
+        self.metricsView.setWordWrap(False)
+        self.metricsView.setEditTriggers(self.metricsView.NoEditTriggers)
+        self.metricsView.setMinimumHeight(140)
+
+        for reportPath in self.reports:
+            self.reportComboBox.addItem(self.describe(reportPath), userData=reportPath)
+        self.baselineComboBox.addItem(self.tr("不对比"), userData=None)
+        for reportPath in self.reports:
+            self.baselineComboBox.addItem(self.describe(reportPath), userData=reportPath)
+        if report is not None and report in self.reports:
+            self.reportComboBox.setCurrentIndex(self.reports.index(report))
+        # 默认与上一次报告对比
+        if (index := self.reportComboBox.currentIndex()) + 1 < len(self.reports):
+            self.baselineComboBox.setCurrentIndex(index + 2)
+
+        self.viewLayout.addWidget(self.titleLabel)
+        self.viewLayout.addWidget(self.reportComboBox)
+        self.viewLayout.addWidget(self.baselineComboBox)
+        self.viewLayout.addWidget(self.summaryLabel)
+        self.viewLayout.addWidget(self.sectionTree)
+        self.viewLayout.addWidget(self.metricsView)
+        self.yesButton.setText(self.tr("关闭"))
+        self.hideCancelButton()
+
+        self.reportComboBox.currentIndexChanged.connect(self.refresh)
+        self.baselineComboBox.currentIndexChanged.connect(self.refresh)
+        self.refresh()
+
+    @staticmethod
+    def describe(reportPath: str) -> str:
+        modified = datetime.fromtimestamp(osp.getmtime(reportPath)).strftime("%Y-%m-%d %H:%M:%S")
+        return f"{modified}  {osp.basename(reportPath)}"
+
+    def load(self, reportPath: Optional[str]) -> Optional[TickProfile]:
+        if reportPath is None:
+            return None
+        if (profile := self.profiles.get(reportPath)) is None:
+            try:
+                profile = self.profiles[reportPath] = loadTickProfile(reportPath)
+            except Exception as e:
+                MCSL2Logger.error(msg=f"load tick profile {reportPath} failed", exc=e)
+                return None
+        return profile
+
+    def refresh(self, *_):
+        self.sectionTree.clear()
+        self.metricsView.setRowCount(0)
+        if (profile := self.load(self.reportComboBox.currentData())) is None:
+            self.summaryLabel.setText(
+                self.tr("无法读取该报告。")
+                if self.reports
+                else self.tr("还没有分析报告，请在服务器运行时点击“Tick 分析”。")
+            )
+            return
+        baseline = self.load(self.baselineComboBox.currentData())
+        if baseline is not None and baseline.source == profile.source:
+            baseline = None
+        deltas = diffProfiles(profile, baseline) if baseline is not None else {}
+        summary = self.tr(
+            f"时长 {_number(profile.timeSpanMs / 1000, ' 秒')}，{_number(profile.tickSpan, '', 0)}"
+            f" tick，平均 TPS {_number(profile.tps)}"
+        )
+        if baseline is not None:
+            summary += self.tr(f"；基准 TPS {_number(baseline.tps)}")
+        if not profile.sections:
+            summary += self.tr("\n报告中没有区段数据。")
+        self.summaryLabel.setText(summary)
+
+        self.sectionTree.setSortingEnabled(False)
+        self.addSections(self.sectionTree.invisibleRootItem(), profile.sections, deltas)
+        self.sectionTree.setSortingEnabled(True)
+        self.sectionTree.sortByColumn(2, Qt.DescendingOrder)
+        # 展开两层，足以看到各维度与 tick 的主要部分
+        self.sectionTree.expandToDepth(1)
+        self.sectionTree.setColumnHidden(4, baseline is None)
+
+        metrics = sorted(profile.metrics.items())
+        self.metricsView.setVisible(bool(metrics))
+        self.metricsView.setColumnHidden(3, baseline is None)
+        self.metricsView.setRowCount(len(metrics))
+        for row, (name, (mean, maximum)) in enumerate(metrics):
+            baselineMean = baseline.metrics.get(name, (float("nan"),))[0] if baseline else None
+            items = [name, _number(mean), _number(maximum)]
+            items.append(_number(baselineMean) if baselineMean is not None else "")
+            for column, text in enumerate(items):
+                self.metricsView.setItem(row, column, QTableWidgetItem(text))
+        self.metricsView.resizeColumnsToContents()
+        self.metricsView.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+
+    def addSections(
+        self, parent: QTreeWidgetItem, sections: List[ProfileSection], deltas: Dict[str, float]
+    ):
+        for section in sections:
+            delta = deltas.get(section.path, float("nan"))
+            item = _SortableItem(parent)
+            item.setText(0, section.name)
+            item.setToolTip(0, section.path)
+            for column, value, text in (
+                (1, section.parentPercent, _number(section.parentPercent, "%")),
+                (2, section.totalPercent, _number(section.totalPercent, "%")),
+                (3, section.perTick, _number(section.perTick, "", 0)),
+                (4, delta, formatDelta(delta) if deltas else ""),
+            ):
+                item.setText(column, text)
+                item.setData(column, Qt.UserRole, value)
+                item.setTextAlignment(column, Qt.AlignRight | Qt.AlignVCenter)
+            self.addSections(item, section.children, deltas)
@@ -19,3 +19,5 @@ VERSION = "2.2.3.6"
 MCSL2VERSION = VERSION
 BUILD_VERSION = "0.3.3.0"
 DEV_VERSION = "Beta Channel 24201"
+# 无界面的守护进程与宿主进程，由 MCSL2.py 在导入其他模块之前设置，不加载 qfluentwidgets
+HEADLESS = False
@@ -18,12 +18,12 @@ import enum
 import functools
 import hashlib
 import inspect
+import sys
 from json import dumps, loads
 from os import makedirs, path as osp
 from types import TracebackType
 from typing import Type, Optional, Iterable, Callable, Dict, List
 
-import aria2p
 import psutil
 from PyQt5.QtCore import QUrl, QThread, QThreadPool
 from PyQt5.QtGui import QDesktopServices
@@ -63,6 +63,10 @@ def initializeMCSL2():
         if not osp.exists(folder):
             makedirs(folder, exist_ok=True)
     del folders
+    # 清理上次异常退出时残留的终端溢出文件
+    from MCSL2Lib.ServerControllers.consoleBuffer import removeStaleSpills
+
+    removeStaleSpills()
 
     if not osp.exists(r"./MCSL2/MCSL2_ServerList.json"):
         with open(r"./MCSL2/MCSL2_ServerList.json", "w+", encoding="utf-8") as serverList:
@@ -173,8 +177,12 @@ def exceptionFilter(
     """
     if isinstance(value, AttributeError) and "MessageBox" in str(value):
         return ExceptionFilterMode.PASS
-    if isinstance(value, aria2p.ClientException) and "Active Download not found for GID" in str(
-        value
+    # aria2p 仅在用到下载时才会被导入
+    aria2p = sys.modules.get("aria2p")
+    if (
+        aria2p is not None
+        and isinstance(value, aria2p.ClientException)
+        and "Active Download not found for GID" in str(value)
     ):
         return ExceptionFilterMode.RAISE
     if isinstance(value, RuntimeError) and "wrapped C/C++ object of type" in str(value):
@@ -48,6 +48,12 @@ from MCSL2Lib.ProgramControllers.aria2ClientController import (
     Aria2BootThread,
 )
 from MCSL2Lib.ProgramControllers.settingsController import cfg
+from MCSL2Lib.ProgramControllers.consoleArchiveController import ConsoleArchive
+from MCSL2Lib.ProgramControllers.metricsController import MetricsExporter
+from MCSL2Lib.ProgramControllers.playerSessionController import PlayerSessionIndex
+from MCSL2Lib.ServerControllers.gcLogAnalyzer import GcLogMonitor
+from MCSL2Lib.ServerControllers.jvmSampler import JvmSampler
+from MCSL2Lib.ServerControllers.resourceSampler import ServerResourceSampler
 from MCSL2Lib.Pages.configurePage import ConfigurePage
 from MCSL2Lib.Pages.consoleCenterPage import ConsoleCenterPage
 from MCSL2Lib.Pages.downloadPage import DownloadPage
@@ -152,6 +158,8 @@ class Window(VerifyFluentWindowBase):
         if cfg.get(cfg.checkUpdateOnStart):
             self.settingsInterface.checkUpdate(parent=self)
         self.startAria2Client()
+        MetricsExporter.applySettings()
+        self.serverManagerInterface.reattachServers()
         self.splashScreen.finish()
         self.update()
         if self.previewFlag:
@@ -216,12 +224,21 @@ class Window(VerifyFluentWindowBase):
             box.exec_()
             a0.ignore()
             return
+        # 其余服务器在各自的宿主进程中继续运行
+        self.consoleCenterInterface.detachServers()
 
         # close thread pool
         QThreadPool.globalInstance().clear()
         QThreadPool.globalInstance().waitForDone()
         QThreadPool.globalInstance().deleteLater()
 
+        ConsoleArchive.shutDown()
+        PlayerSessionIndex.shutDown()
+        ServerResourceSampler.shutDown()
+        JvmSampler.shutDown()
+        GcLogMonitor.shutDown()
+        MetricsExporter.shutDown()
+
         try:
             workingThreads.closeAllThreads()
             if Aria2Controller.shutDown():
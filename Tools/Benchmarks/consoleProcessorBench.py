@@ -0,0 +1,147 @@
+#     Copyright 2024, MCSL Team, mailto:services@mcsl.com.cn
+#
+#     Part of "MCSL2", a simple and multifunctional Minecraft server launcher.
+#
+#     Licensed under the GNU General Public License, Version 3.0, with our
+#     additional agreements. (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#        https://github.com/MCSLTeam/MCSL2/raw/master/LICENSE
+#
+################################################################################
+"""
+Microbenchmark: legacy keyword loops + chained str.replace vs ConsoleLineProcessor.
+
+Usage (from the repository root):
+    python Tools/Benchmarks/consoleProcessorBench.py [lines]
+"""
+
+import sys
+from os import path as osp
+from time import perf_counter
+
+sys.path.insert(0, osp.abspath(osp.join(osp.dirname(__file__), "..", "..")))
+
+from MCSL2Lib.ServerControllers.consoleProcessor import ConsoleLineProcessor  # noqa: E402
+
+SAMPLE_LINES = [
+    "[12:00:01] [Server thread/INFO]: Starting minecraft server version 1.20.4",
+    "[12:00:01] [Server thread/INFO]: Preparing spawn area: 42%",
+    "\x1b[38;2;170;170;170m[12:00:02 \x1b[38;2;255;255;85mWARN\x1b[38;2;170;170;170m]: \x1b[0mCan't keep up! Is the server overloaded? Running 2034ms or 40 ticks behind",  # noqa: E501
+    "[12:00:02] [Server thread/ERROR]: Encountered an unexpected exception",
+    "\tat java.base/java.lang.Thread.run(Thread.java:833)",
+    "Caused by: java.lang.NullPointerException: Cannot invoke \"Object.toString()\"",
+    "[12:00:03] [Server-Worker-3/DEBUG]: Loaded 1234 recipes",
+    "[12:00:04] [main/INFO]: ModLauncher running: args [--launchTarget, forgeserver]",
+    "[12:00:05] [User Authenticator #1/INFO]: UUID of player Steve is 8667ba71-b85a-4004-af54-457a9734eed7",  # noqa: E501
+    "[12:00:05] [Server thread/INFO]: Steve[/127.0.0.1:51234] logged in with entity id 123 at (0.5, 64.0, 0.5)",  # noqa: E501
+    "[12:00:06] [Server thread/INFO]: Saving the game (this may take a moment!)",
+    "[12:00:06] [Server thread/INFO]: Saved the game",
+    "a plain line without any keyword at all, just some chat text",
+]
+
+
+def legacy(serverOutput: str, tr=lambda s: s):
+    """旧版 colorConsoleText 中的着色与替换逻辑(不含 Qt 调用)"""
+    level = 0
+    # fmt: off
+    greenText = ["INFO", "Info", "info", "tip", "tips", "hint", "HINT", "提示"]
+    orangeText = ["WARN", "Warning", "warn", "alert", "ALERT", "Alert", "CAUTION", "Caution", "警告"]  # noqa: E501
+    redText = ["ERR", "Err", "Fatal", "FATAL", "Critical", "Danger", "DANGER", "错", "at java", "at net", "at oolloo", "Caused by", "at sun"]  # noqa: E501
+    blueText = ["DEBUG", "Debug", "debug", "调试", "TEST", "Test", "Unknown command", "MCSL2"]
+    # fmt: on
+    for keyword in greenText:
+        if keyword in serverOutput:
+            level = 1
+    for keyword in orangeText:
+        if keyword in serverOutput:
+            level = 2
+    for keyword in redText:
+        if keyword in serverOutput:
+            level = 3
+    for keyword in blueText:
+        if keyword in serverOutput:
+            level = 4
+    serverOutput = (
+        serverOutput.replace("[38;2;170;170;170m", "")
+        .replace("[38;2;255;170;0m", "")
+        .replace("[38;2;255;255;255m", "")
+        .replace("[0m", "")
+        .replace("[38;2;255;255;85m", "")
+        .replace("[38;2;255;255;0m", "")
+        .replace("[38;2;255;85;85m", "")
+        .replace("[38;2;255;255;255m", "")
+        .replace("[3m", "")
+        .replace("[m\x1b[", "[")
+        .replace("[32m", "")
+        .replace("Preparing spawn area", tr("准备生成点区域中"))
+        .replace("main/INFO", tr("主类/信息"))
+        .replace("main/WARN", tr("主类/警告"))
+        .replace("main/ERROR", tr("主类/错误"))
+        .replace("main/FATAL", tr("主类/致命错误"))
+        .replace("main/DEBUG", tr("主类/调试信息"))
+        .replace("INFO", tr("信息"))
+        .replace("WARN", tr("警告"))
+        .replace("ERROR", tr("错误"))
+        .replace("FATAL", tr("致命错误"))
+        .replace("DEBUG", tr("调试信息"))
+        .replace("Server thread", tr("服务器线程"))
+        .replace("Server-Worker", tr("服务器工作进程"))
+        .replace("DEBUG", tr("调试信息"))
+        .replace("Forge Version Check", tr("Forge版本检查"))
+        .replace("ModLauncher running: args", tr("ModLauncher运行中: 参数"))
+        .replace("All chunks are saved", tr("所有区块已保存"))
+        .replace("Saving the game (this may take a moment!)", tr("保存游戏存档中（可能需要一些时间）"))  # noqa: E501
+        .replace("Saved the game", tr("已保存游戏存档"))
+        .replace("\x1b[33m[", "[")
+        .replace("\x1b[", "[")
+    )
+    if "Disabling terminal, you're running in an unsupported environment." in serverOutput:
+        return None
+    if "Advanced terminal features are not available in this environment" in serverOutput:
+        return None
+    if "Unable to instantiate org.fusesource.jansi.WindowsAnsiOutputStream" in serverOutput:
+        return None
+    return level, serverOutput
+
+
+def _getTr():
+    """旧版每行都会调用约 18 次 self.tr()，有 PyQt5 时使用真实的 tr 计入其开销"""
+    try:
+        from PyQt5.QtCore import QCoreApplication, QObject
+    except ImportError:
+        print("PyQt5 not found, legacy numbers exclude tr() cost (upper bound).")
+        return lambda s: s
+    _app = QCoreApplication.instance() or QCoreApplication([])  # noqa: F841
+    obj = QObject()
+    obj._app = _app
+    return obj.tr
+
+
+def bench(name, func, lines, rounds=3):
+    best = None
+    for _ in range(rounds):
+        start = perf_counter()
+        for line in lines:
+            func(line)
+        elapsed = perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    rate = len(lines) / best
+    print(f"{name:<28}{rate:>14,.0f} lines/s")
+    return rate
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    lines = (SAMPLE_LINES * (total // len(SAMPLE_LINES) + 1))[:total]
+    processor = ConsoleLineProcessor({})
+    tr = _getTr()
+    print(f"{total:,} lines, best of 3")
+    before = bench("legacy (loops + replace)", lambda line: legacy(line, tr), lines)
+    after = bench("ConsoleLineProcessor", processor.process, lines)
+    print(f"speedup: {after / before:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#     Copyright 2024, MCSL Team, mailto:services@mcsl.com.cn
+#
+#     Part of "MCSL2", a simple and multifunctional Minecraft server launcher.
+#
+#     Licensed under the GNU General Public License, Version 3.0, with our
+#     additional agreements. (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#        https://github.com/MCSLTeam/MCSL2/raw/master/LICENSE
+#
+################################################################################
+"""
+Microbenchmark: legacy bytes concat + split framing vs LineFramer.
+
+Usage (from the repository root):
+    python Tools/Benchmarks/lineFramerBench.py [megabytes] [chunkBytes]
+"""
+
+import sys
+from os import path as osp
+from time import perf_counter
+
+sys.path.insert(0, osp.abspath(osp.join(osp.dirname(__file__), "..", "..")))
+
+from MCSL2Lib.ServerControllers.lineFramer import LineFramer  # noqa: E402
+
+
+def legacy(chunks, encoding="utf-8"):
+    """旧版 serverLogOutputHandler 的分行逻辑(不含 Qt 调用)"""
+    partialData = b""
+    output = []
+    for newData in chunks:
+        partialData += newData
+        lines = partialData.split(b"\n")
+        partialData = lines.pop()
+        output.extend(line.decode(encoding, errors="replace")[:-1] for line in lines)
+    return output
+
+
+def framer(chunks, encoding="utf-8", maxLineBytes=LineFramer.DEFAULT_MAX_LINE_BYTES):
+    lineFramer = LineFramer(encoding, maxLineBytes)
+    output = []
+    for newData in chunks:
+        output.extend(lineFramer.feed(newData))
+    output.extend(lineFramer.flush())
+    return output
+
+
+def split(data: bytes, chunkBytes: int):
+    return [data[i : i + chunkBytes] for i in range(0, len(data), chunkBytes)]
+
+
+def bench(name, func, chunks, **kwargs):
+    start = perf_counter()
+    output = func(chunks, **kwargs)
+    elapsed = perf_counter() - start
+    print(f"  {name:<28}{elapsed * 1000:>10.1f} ms  ({len(output)} lines)")
+    return output
+
+
+def main():
+    megabytes = float(sys.argv[1]) if len(sys.argv) > 1 else 4
+    chunkBytes = int(sys.argv[2]) if len(sys.argv) > 2 else 4096
+
+    # 一行数 MB 且没有换行的输出(例如整段 JSON 或模组列表)，按管道读取的粒度到达
+    longLine = ("模组" + "x" * 62) * int(megabytes * 1024 * 1024 / 70)
+    data = (longLine + "\n").encode("utf-8")
+    chunks = split(data, chunkBytes)
+    print(f"single line: {len(data) / 1024 / 1024:.1f} MB in {len(chunks)} chunks")
+    bench("legacy split", legacy, chunks)
+    bench("LineFramer (no cap)", framer, chunks, maxLineBytes=len(data))
+    bench("LineFramer (64 KiB cap)", framer, chunks)
+
+    # 大量普通长度的日志行
+    shortLines = "".join(
+        f"[12:00:{i % 60:02d}] [Server thread/INFO]: 玩家 Steve 执行了指令 /tp {i}\r\n"
+        for i in range(200000)
+    ).encode("utf-8")
+    chunks = split(shortLines, chunkBytes)
+    print(f"short lines: {len(shortLines) / 1024 / 1024:.1f} MB in {len(chunks)} chunks")
+    bench("legacy split", legacy, chunks)
+    output = bench("LineFramer", framer, chunks)
+
+    # 正确性：强制断行切在多字节字符中间时不应出现替换字符，CRLF 的 \r 应被去掉
+    chunks = split("一行很长的中文日志\r\n".encode("utf-8") * 1000, 7)
+    assert not any("�" in line for line in framer(chunks, maxLineBytes=10))
+    assert output[0].endswith("/tp 0")
+    print("forced splits inside multi-byte characters: no replacement characters")
+
+
+if __name__ == "__main__":
+    main()
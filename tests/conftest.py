@@ -0,0 +1,24 @@
+#     Copyright 2024, MCSL Team, mailto:services@mcsl.com.cn
+#
+#     Part of "MCSL2", a simple and multifunctional Minecraft server launcher.
+#
+#     Licensed under the GNU General Public License, Version 3.0, with our
+#     additional agreements. (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#        https://github.com/MCSLTeam/MCSL2/raw/master/LICENSE
+#
+################################################################################
+"""
+Shared setup of the unit tests.
+"""
+
+import os
+import tempfile
+
+
+def pytest_sessionstart(session):
+    # MCSL2 在工作目录下写日志与数据文件，测试在临时目录中运行，不污染仓库；
+    # 测试模块在收集时才导入，此时工作目录已切换
+    os.chdir(tempfile.mkdtemp(prefix="MCSL2Tests-"))
@@ -0,0 +1,109 @@
+#     Copyright 2024, MCSL Team, mailto:services@mcsl.com.cn
+#
+#     Part of "MCSL2", a simple and multifunctional Minecraft server launcher.
+#
+#     Licensed under the GNU General Public License, Version 3.0, with our
+#     additional agreements. (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#        https://github.com/MCSLTeam/MCSL2/raw/master/LICENSE
+#
+################################################################################
+"""
+Tests of the bounded console buffer and its on-disk spill.
+"""
+
+from os import path as osp
+
+from MCSL2Lib.ServerControllers.consoleBuffer import (
+    ConsoleLine,
+    ConsoleRingBuffer,
+    ConsoleSpillFile,
+)
+from MCSL2Lib.ServerControllers.consoleProcessor import DEFAULT_STYLE, ConsoleLevel, ConsoleStyle
+
+
+def makeLine(i: int) -> ConsoleLine:
+    return ConsoleLine(float(i), ConsoleLevel(i % 5), [(f"line {i}", ConsoleStyle((200, 0, 0)))])
+
+
+def texts(lines):
+    return [line.text for line in lines]
+
+
+def testSpillFileReadsAcrossChunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(ConsoleSpillFile, "CHUNK_LINES", 4)
+    spill = ConsoleSpillFile(str(tmp_path / "a" / "session.spill"))
+    for i in range(10):
+        spill.append(makeLine(i))
+    # 两个写满的块在磁盘上，剩余两行还未写出
+    assert len(spill) == 10
+    assert osp.getsize(spill.filePath) > 0
+    assert texts(spill.read(0, 10)) == [f"line {i}" for i in range(10)]
+    assert texts(spill.read(3, 6)) == [f"line {i}" for i in range(3, 9)]
+    assert texts(spill.read(8, 100)) == ["line 8", "line 9"]
+    assert spill.read(10, 5) == []
+
+
+def testSpillFileKeepsLevelButNotStyle(tmp_path):
+    spill = ConsoleSpillFile(str(tmp_path / "session.spill"))
+    spill.append(makeLine(3))
+    spill.flush()
+    (line,) = spill.read(0, 1)
+    assert line == ConsoleLine(3.0, ConsoleLevel.ERROR, [("line 3", DEFAULT_STYLE)])
+
+
+def testSpillFileClose(tmp_path):
+    spill = ConsoleSpillFile(str(tmp_path / "session.spill"))
+    spill.append(makeLine(0))
+    spill.flush()
+    spill.close()
+    assert len(spill) == 0
+    assert not osp.exists(spill.filePath)
+
+
+def testRingBufferWithoutSpillDropsOldest():
+    buffer = ConsoleRingBuffer(3)
+    buffer.extend([makeLine(i) for i in range(5)])
+    assert len(buffer) == 3
+    assert buffer.spilled == 2
+    assert buffer.totalLines == 5
+    # 行号在整个会话内不变，被丢弃的行读不到
+    assert texts(buffer.read(0, 5)) == ["line 2", "line 3", "line 4"]
+    assert texts(buffer.read(3, 1)) == ["line 3"]
+
+
+def testRingBufferReadsAcrossSpillAndMemory(tmp_path, monkeypatch):
+    monkeypatch.setattr(ConsoleSpillFile, "CHUNK_LINES", 2)
+    buffer = ConsoleRingBuffer(3, str(tmp_path / "session.spill"))
+    lines = [makeLine(i) for i in range(8)]
+    buffer.extend(lines)
+    assert buffer.spilled == 5
+    assert buffer.totalLines == 8
+    assert texts(buffer.read(0, 8)) == [f"line {i}" for i in range(8)]
+    assert texts(buffer.read(4, 2)) == ["line 4", "line 5"]
+    # 内存中的行保留样式
+    assert buffer.read(5, 3) == lines[5:]
+    assert texts(buffer.read(-2, 3)) == ["line 0", "line 1", "line 2"]
+
+
+def testRingBufferSetCapacity(tmp_path):
+    buffer = ConsoleRingBuffer(5, str(tmp_path / "session.spill"))
+    buffer.extend([makeLine(i) for i in range(5)])
+    buffer.setCapacity(2)
+    assert (len(buffer), buffer.spilled, buffer.capacity) == (2, 3, 2)
+    assert texts(buffer.read(0, 5)) == [f"line {i}" for i in range(5)]
+    buffer.setCapacity(4)
+    buffer.append(makeLine(5))
+    assert (len(buffer), buffer.spilled) == (3, 3)
+    assert texts(buffer.read(0, 6)) == [f"line {i}" for i in range(6)]
+
+
+def testRingBufferClose(tmp_path):
+    buffer = ConsoleRingBuffer(1, str(tmp_path / "session.spill"))
+    buffer.extend([makeLine(i) for i in range(3)])
+    buffer.spill.flush()
+    buffer.close()
+    assert buffer.totalLines == 0
+    assert not osp.exists(str(tmp_path / "session.spill"))
@@ -0,0 +1,97 @@
+#     Copyright 2024, MCSL Team, mailto:services@mcsl.com.cn
+#
+#     Part of "MCSL2", a simple and multifunctional Minecraft server launcher.
+#
+#     Licensed under the GNU General Public License, Version 3.0, with our
+#     additional agreements. (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#        https://github.com/MCSLTeam/MCSL2/raw/master/LICENSE
+#
+################################################################################
+"""
+Tests of the precompiled console line processor.
+"""
+
+from MCSL2Lib.ServerControllers.consoleProcessor import (
+    DEFAULT_STYLE,
+    ConsoleLevel,
+    ConsoleLineProcessor,
+    ConsoleStyle,
+)
+
+RED = (170, 0, 0)
+
+
+def testClassifyByKeyword():
+    processor = ConsoleLineProcessor()
+    assert processor.classify("hello") == ConsoleLevel.NONE
+    assert processor.classify("[12:00:00] [Server thread/INFO]: Done") == ConsoleLevel.INFO
+    assert processor.classify("[main/WARN]: Ambiguity") == ConsoleLevel.WARN
+    assert processor.classify("\tat java.lang.Thread.run") == ConsoleLevel.ERROR
+    assert processor.classify("Unknown command") == ConsoleLevel.DEBUG
+
+
+def testClassifyTakesHighestLevel():
+    processor = ConsoleLineProcessor()
+    assert processor.classify("[Server thread/INFO]: a WARN inside") == ConsoleLevel.WARN
+    # "ERROR" 被交替匹配整体吞掉，仍应继承其中 "ERR" 的级别
+    assert processor.classify("[Server thread/ERROR]: failed") == ConsoleLevel.ERROR
+
+
+def testSuppressedLines():
+    processor = ConsoleLineProcessor()
+    line = "Disabling terminal, you're running in an unsupported environment."
+    assert processor.classify(line) is None
+    assert processor.process(line) is None
+
+
+def testTranslate():
+    processor = ConsoleLineProcessor({"INFO": "信息", "Server thread": "服务器线程"})
+    assert processor.translate("[Server thread/INFO]: INFO") == "[服务器线程/信息]: 信息"
+    # 长的原文优先，未提供译文的原文保持不变
+    assert processor.translate("[main/INFO]: WARN") == "[main/INFO]: WARN"
+    processor.setTranslations({})
+    assert processor.translate("[Server thread/INFO]") == "[Server thread/INFO]"
+
+
+def testProcessPlainLine():
+    line = ConsoleLineProcessor().process("[Server thread/INFO]: Done")
+    assert line.level == ConsoleLevel.INFO
+    assert line.text == "[Server thread/INFO]: Done"
+    assert line.runs == [(line.text, DEFAULT_STYLE)]
+
+
+def testSplitANSI():
+    processor = ConsoleLineProcessor()
+    assert processor.splitANSI("\x1b[31;1mred\x1b[0m plain") == [
+        ("red", ConsoleStyle(RED, bold=True)),
+        (" plain", DEFAULT_STYLE),
+    ]
+    assert processor.splitANSI("\x1b[38;5;196mx") == [("x", ConsoleStyle((255, 0, 0)))]
+    assert processor.splitANSI("\x1b[38;2;200;100;0mx") == [("x", ConsoleStyle((200, 100, 0)))]
+    # 黑、白、灰交给级别颜色
+    assert processor.splitANSI("\x1b[37mgrey") == [("grey", DEFAULT_STYLE)]
+    assert processor.splitANSI("") == []
+
+
+def testSplitANSIWithoutEscape():
+    processor = ConsoleLineProcessor()
+    # 丢掉 ESC 的序列只在带有复位序列的行中识别
+    assert processor.splitANSI("[31mred[0m") == [("red", ConsoleStyle(RED))]
+    assert processor.splitANSI("[5m is chat") == [("[5m is chat", DEFAULT_STYLE)]
+
+
+def testOtherEscapesAreRemoved():
+    processor = ConsoleLineProcessor()
+    assert processor.splitANSI("\x1b[2Kcleared") == [("cleared", DEFAULT_STYLE)]
+    assert processor.splitANSI("\x1b[31m\x1b[2K\x1b[0m") == []
+
+
+def testProcessColoredLine():
+    processor = ConsoleLineProcessor({"main/WARN": "主线程/警告"})
+    line = processor.process("\x1b[31m[main/WARN]\x1b[0m: x")
+    assert line.level == ConsoleLevel.WARN
+    assert line.text == "[主线程/警告]: x"
+    assert line.runs == [("[主线程/警告]", ConsoleStyle(RED)), (": x", DEFAULT_STYLE)]
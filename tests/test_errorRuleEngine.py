@@ -0,0 +1,184 @@
+#     Copyright 2024, MCSL Team, mailto:services@mcsl.com.cn
+#
+#     Part of "MCSL2", a simple and multifunctional Minecraft server launcher.
+#
+#     Licensed under the GNU General Public License, Version 3.0, with our
+#     additional agreements. (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#        https://github.com/MCSLTeam/MCSL2/raw/master/LICENSE
+#
+################################################################################
+"""
+Tests of the streaming error rule engine.
+"""
+
+import gzip
+
+import pytest
+
+from MCSL2Lib.ServerControllers.errorRuleEngine import (
+    ErrorRuleEngine,
+    ErrorRuleSet,
+    ErrorSeverity,
+)
+
+RULES = {
+    "schema": 1,
+    "version": 1,
+    "tables": {"classVersions": {"61": "Java 17"}},
+    "rules": [
+        {
+            "id": "java.classVersion",
+            "severity": "fatal",
+            "keywords": ["UnsupportedClassVersionError"],
+            "pattern": r"class file version (?P<classVersion>\d+)",
+            "message": "需要 {classVersion|classVersions}",
+            "restartable": False,
+        },
+        {
+            "id": "network.portInUse",
+            "severity": "warning",
+            "keywords": ["FAILED TO BIND TO PORT"],
+            "pattern": "FAILED TO BIND TO PORT",
+            "message": "端口被占用",
+        },
+        {
+            "id": "plugin.enableError",
+            "keywords": ["Error occurred while enabling "],
+            "pattern": r"Error occurred while enabling (?P<plugin>.+?) \(",
+            "message": "插件 {plugin} 启动失败{causes}",
+            "context": 5,
+        },
+    ],
+}
+
+LOG = [
+    "[12:00:00] [Server thread/INFO]: Starting minecraft server",
+    "[12:00:01] [Server thread/ERROR]: Error occurred while enabling Foo v1.0 (Is it up to date?)",
+    "java.lang.IllegalStateException: broken",
+    "\tat foo.Foo.onEnable(Foo.java:10)",
+    "Caused by: java.io.IOException: disk full",
+    "\t... 3 more",
+    "[12:00:02] [Server thread/INFO]: Preparing level",
+    "[12:00:03] [Server thread/WARN]: **** FAILED TO BIND TO PORT!",
+    "[12:00:04] [Server thread/WARN]: **** FAILED TO BIND TO PORT!",
+    "Exception: UnsupportedClassVersionError: class file version 61.0",
+]
+
+
+@pytest.fixture
+def ruleSet():
+    return ErrorRuleSet(RULES)
+
+
+def summary(engine: ErrorRuleEngine):
+    return [(f.rule.id, f.message, f.count, f.firstLine, f.context) for f in engine.results()]
+
+
+def testFeedRecordsFindings(ruleSet):
+    engine = ErrorRuleEngine(ruleSet)
+    assert not engine.feed(LOG[0])
+    assert not engine.feed(LOG[1])
+    assert engine.pending
+    for line in LOG[2:6]:
+        engine.feed(line)
+    # 堆栈之后的普通行结束上下文的收集
+    assert engine.feed(LOG[6])
+    (finding,) = engine.takeNew()
+    assert finding.message == "插件 Foo v1.0 启动失败\n根本原因：java.io.IOException: disk full"
+    assert finding.context == LOG[1:6]
+    assert engine.takeNew() == []
+
+
+def testDuplicateFindingsAreCounted(ruleSet):
+    engine = ErrorRuleEngine(ruleSet)
+    assert engine.feed(LOG[7])
+    assert not engine.feed(LOG[8])
+    (finding,) = engine.results()
+    assert finding.count == 2
+    assert finding.describe() == "[警告] 端口被占用 (共 2 次)"
+
+
+def testResultsAreOrderedBySeverity(ruleSet):
+    engine = ErrorRuleEngine(ruleSet)
+    for line in LOG:
+        engine.feed(line)
+    engine.finish()
+    assert [(f.rule.severity, f.message) for f in engine.results()] == [
+        (ErrorSeverity.FATAL, "需要 Java 17"),
+        (ErrorSeverity.ERROR, "插件 Foo v1.0 启动失败\n根本原因：java.io.IOException: disk full"),
+        (ErrorSeverity.WARNING, "端口被占用"),
+    ]
+
+
+def testContextIsLimited(ruleSet):
+    engine = ErrorRuleEngine(ruleSet)
+    engine.feed(LOG[1])
+    for i in range(10):
+        engine.feed(f"\tat foo.Foo.frame{i}(Foo.java:{i})")
+    assert not engine.pending
+    (finding,) = engine.results()
+    assert len(finding.context) == 6
+
+
+def testFinishFlushesPendingContext(ruleSet):
+    engine = ErrorRuleEngine(ruleSet)
+    engine.feed(LOG[1])
+    assert engine.results() == []
+    assert engine.finish()
+    assert [f.message for f in engine.results()] == ["插件 Foo v1.0 启动失败"]
+
+
+@pytest.mark.parametrize("padding", [0, 1, 500])
+def testFeedBlockAgreesWithFeed(ruleSet, padding):
+    filler = [f"[12:00:00] [Server thread/INFO]: tick {i}" for i in range(padding)]
+    lines = filler + LOG[:6] + filler + LOG[6:] + filler
+    streamed = ErrorRuleEngine(ruleSet)
+    for line in lines:
+        streamed.feed(line)
+    streamed.finish()
+    text = "\r\n".join(lines)
+    for cut in (len(text), len(text) // 3, 1):
+        # 按行边界切分成块，与 analyzeFile 的读取方式相同
+        cut = text.find("\n", cut) + 1 or len(text)
+        blocks = ErrorRuleEngine(ruleSet)
+        blocks.feedBlock(text[:cut])
+        if text[cut:]:
+            blocks.feedBlock(text[cut:])
+        blocks.finish()
+        assert summary(blocks) == summary(streamed)
+        assert blocks.lineCount == streamed.lineCount == len(lines)
+
+
+def testFeedBlockWithoutKeywordsOnlyCounts(ruleSet):
+    engine = ErrorRuleEngine(ruleSet)
+    assert not engine.feedBlock("a\nb\nc")
+    assert not engine.feedBlock("d\ne\n")
+    assert engine.lineCount == 5
+    engine.feed(LOG[7])
+    assert engine.results()[0].firstLine == 6
+
+
+def testAnalyzeFile(tmp_path):
+    path = tmp_path / "latest.log.gz"
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write("\n".join(LOG))
+    # analyzeFile 与 analyzeLines 使用内置规则
+    engine = ErrorRuleEngine.analyzeFile(str(path))
+    assert {f.rule.id for f in engine.results()} >= {"java.classVersion", "network.portInUse"}
+    assert summary(engine) == summary(ErrorRuleEngine.analyzeLines(LOG))
+
+
+def testBuiltinRulesLoad():
+    ruleSet = ErrorRuleSet.default()
+    assert ruleSet.rules
+    engine = ErrorRuleEngine(ruleSet)
+    engine.feed("java.lang.OutOfMemoryError: Java heap space")
+    assert [f.rule.id for f in engine.results()] == ["memory.outOfMemory"]
+
+
+def testUnsupportedSchema():
+    with pytest.raises(ValueError):
+        ErrorRuleSet(dict(RULES, schema=2))
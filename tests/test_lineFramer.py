@@ -0,0 +1,98 @@
+#     Copyright 2024, MCSL Team, mailto:services@mcsl.com.cn
+#
+#     Part of "MCSL2", a simple and multifunctional Minecraft server launcher.
+#
+#     Licensed under the GNU General Public License, Version 3.0, with our
+#     additional agreements. (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#        https://github.com/MCSLTeam/MCSL2/raw/master/LICENSE
+#
+################################################################################
+"""
+Tests of the incremental line framer.
+"""
+
+from MCSL2Lib.ServerControllers.lineFramer import LineFramer
+
+
+def feedAll(framer: LineFramer, chunks) -> list:
+    lines = []
+    for chunk in chunks:
+        lines.extend(framer.feed(chunk))
+    return lines + framer.flush()
+
+
+def testSplitsLfAndCrlf():
+    framer = LineFramer("utf-8")
+    assert framer.feed(b"a\nb\r\nc") == ["a", "b"]
+    assert framer.feed(b"\r\n\n") == ["c", ""]
+    assert framer.flush() == []
+
+
+def testPartialLineWaitsForNewline():
+    framer = LineFramer("utf-8")
+    assert framer.feed(b"Sta") == []
+    assert framer.feed(b"rting") == []
+    assert framer.feed(b" server\n") == ["Starting server"]
+
+
+def testCrSplitFromLf():
+    framer = LineFramer("utf-8")
+    assert framer.feed(b"done\r") == []
+    assert framer.feed(b"\nnext\n") == ["done", "next"]
+
+
+def testFlushReturnsUnterminatedLine():
+    framer = LineFramer("utf-8")
+    framer.feed(b"last\r")
+    assert framer.flush() == ["last"]
+    assert framer.flush() == []
+
+
+def testMultiByteCharactersSplitAcrossChunks():
+    data = "服务器已启动\n玩家加入\n".encode("utf-8")
+    expected = ["服务器已启动", "玩家加入"]
+    for size in range(1, 8):
+        chunks = [data[i : i + size] for i in range(0, len(data), size)]
+        assert feedAll(LineFramer("utf-8"), chunks) == expected
+
+
+def testGB18030():
+    data = "启动完成\n".encode("gb18030")
+    assert feedAll(LineFramer("gb18030"), [data[:3], data[3:]]) == ["启动完成"]
+
+
+def testLongLineIsBrokenAtLimit():
+    framer = LineFramer("utf-8", maxLineBytes=4)
+    assert framer.feed(b"abcdefghij\nxy\n") == ["abcd", "efgh", "ij", "xy"]
+    # 没有换行的输出也不会无限累积
+    assert framer.feed(b"0123456789") == ["0123", "4567"]
+    assert framer.flush() == ["89"]
+
+
+def testForcedBreakKeepsMultiByteCharacter():
+    framer = LineFramer("utf-8", maxLineBytes=4)
+    # "ab" 之后的 "启" 占 3 个字节，在第 4 个字节处被截断
+    lines = framer.feed("ab启动\n".encode("utf-8"))
+    assert "".join(lines) == "ab启动"
+    assert "�" not in "".join(lines)
+
+
+def testInvalidBytesAreReplaced():
+    assert LineFramer("utf-8").feed(b"a\xffb\n") == ["a�b"]
+
+
+def testUnknownEncodingFallsBack():
+    framer = LineFramer("no-such-encoding")
+    assert framer.feed(b"ok\n") == ["ok"]
+
+
+def testMatchesSplitOnArbitraryChunks():
+    text = "".join(f"[12:00:{i % 60:02d}] line {i} 中文\r\n" for i in range(200))
+    data = text.encode("utf-8")
+    expected = text.split("\r\n")[:-1]
+    for size in (1, 7, 64, 4096):
+        chunks = [data[i : i + size] for i in range(0, len(data), size)]
+        assert feedAll(LineFramer("utf-8", maxLineBytes=256), chunks) == expected
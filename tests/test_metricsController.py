@@ -0,0 +1,92 @@
+#     Copyright 2024, MCSL Team, mailto:services@mcsl.com.cn
+#
+#     Part of "MCSL2", a simple and multifunctional Minecraft server launcher.
+#
+#     Licensed under the GNU General Public License, Version 3.0, with our
+#     additional agreements. (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#        https://github.com/MCSLTeam/MCSL2/raw/master/LICENSE
+#
+################################################################################
+"""
+Tests of the metrics registry's Prometheus and OpenMetrics output.
+"""
+
+import pytest
+
+from MCSL2Lib.ProgramControllers.metricsController import MetricFamily, MetricsRegistry
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    # 注册表是全局的，每个测试使用空的注册表
+    monkeypatch.setattr(MetricsRegistry, "_families", {})
+    monkeypatch.setattr(MetricsRegistry, "_collectors", [])
+    return MetricsRegistry
+
+
+def testRenderOpenMetrics(registry):
+    registry.counter("mcsl2_test_restarts", "Restarts.", ("server",)).labels("lobby").inc(2)
+    registry.gauge("mcsl2_test_up", "Up.", ("server",)).labels("lobby").set(1)
+    assert registry.render().splitlines() == [
+        "# HELP mcsl2_test_restarts Restarts.",
+        "# TYPE mcsl2_test_restarts counter",
+        'mcsl2_test_restarts_total{server="lobby"} 2.0',
+        "# HELP mcsl2_test_up Up.",
+        "# TYPE mcsl2_test_up gauge",
+        'mcsl2_test_up{server="lobby"} 1',
+        "# EOF",
+    ]
+
+
+def testRenderPrometheus(registry):
+    registry.counter("mcsl2_test_lines", "Lines.").labels().inc()
+    text = registry.render(openMetrics=False)
+    # 文本格式中计数器的名字带 _total，且没有 EOF 标记
+    assert text == (
+        "# HELP mcsl2_test_lines_total Lines.\n"
+        "# TYPE mcsl2_test_lines_total counter\n"
+        "mcsl2_test_lines_total{} 1.0\n"
+    )
+
+
+def testLabelsAreEscaped(registry):
+    family = registry.gauge("mcsl2_test_gauge", "Gauge.", ("server",))
+    family.labels('a "b"\\\nc').set(0.5)
+    assert r'mcsl2_test_gauge{server="a \"b\"\\\nc"} 0.5' in registry.render()
+
+
+def testNaNAndRemovedValuesAreSkipped(registry):
+    family = registry.gauge("mcsl2_test_gauge", "Gauge.", ("server",))
+    family.labels("a").set(float("nan"))
+    family.labels("b").set(3)
+    family.labels("c").set(4)
+    family.remove("c")
+    samples = [line for line in registry.render().splitlines() if not line.startswith("#")]
+    assert samples == ['mcsl2_test_gauge{server="b"} 3']
+
+
+def testRegisterReturnsExistingFamily(registry):
+    family = registry.gauge("mcsl2_test_gauge", "Gauge.")
+    assert registry.gauge("mcsl2_test_gauge", "Other.") is family
+    assert family.labels() is family.labels()
+
+
+def testCollectors(registry):
+    def collect():
+        family = MetricFamily("mcsl2_test_collected", "gauge", "Collected.", ("server",))
+        family.labels("lobby").set(7)
+        yield family
+
+    def broken():
+        raise RuntimeError("collector failed")
+        yield
+
+    registry.addCollector(broken)
+    registry.addCollector(collect)
+    lines = registry.render().splitlines()
+    # 出错的收集函数不影响其他指标
+    assert 'mcsl2_test_collected{server="lobby"} 7' in lines
+    assert lines[-1] == "# EOF"
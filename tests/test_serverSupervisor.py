@@ -0,0 +1,83 @@
+#     Copyright 2024, MCSL Team, mailto:services@mcsl.com.cn
+#
+#     Part of "MCSL2", a simple and multifunctional Minecraft server launcher.
+#
+#     Licensed under the GNU General Public License, Version 3.0, with our
+#     additional agreements. (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#        https://github.com/MCSLTeam/MCSL2/raw/master/LICENSE
+#
+################################################################################
+"""
+Tests of exit classification and restart backoff of the server supervisor.
+"""
+
+import pytest
+
+from MCSL2Lib.ServerControllers.serverLifecycle import LifecycleEvent, ServerState, StopReason
+from MCSL2Lib.ServerControllers.serverSupervisor import (
+    EXTERNAL_KILL_EXIT_CODE,
+    ExitKind,
+    ServerSupervisor,
+    backoffDelay,
+    classifyExit,
+)
+
+
+def exitEvent(state=ServerState.CRASHED, reason=StopReason.EXITED, exitCode=1, detail=""):
+    return LifecycleEvent("lobby", ServerState.RUNNING, state, reason, exitCode, 0.0, detail)
+
+
+def testCleanExit():
+    stopped = exitEvent(ServerState.STOPPED, StopReason.STOP, 0)
+    assert classifyExit(stopped, []) == (ExitKind.CLEAN, "")
+    # 由 MCSL2 关闭时即使输出中有报错也不算崩溃
+    killed = exitEvent(ServerState.STOPPED, StopReason.KILL, 137)
+    tail = ["java.lang.OutOfMemoryError: Java heap space"]
+    assert classifyExit(killed, tail) == (ExitKind.CLEAN, "")
+
+
+def testFailedToStart():
+    event = exitEvent(ServerState.CRASHED, StopReason.FAILED_TO_START, None, "No such file")
+    assert classifyExit(event, []) == (ExitKind.MISCONFIGURED, "无法启动：No such file")
+
+
+def testExternalKill():
+    kind, _ = classifyExit(exitEvent(exitCode=EXTERNAL_KILL_EXIT_CODE), [])
+    assert kind == ExitKind.EXTERNAL
+
+
+def testCrashWithoutFindings():
+    assert classifyExit(exitEvent(exitCode=3), ["[Server thread/INFO]: Saving"]) == (
+        ExitKind.CRASH,
+        "退出码 3",
+    )
+
+
+def testCrashWithRestartableFinding():
+    kind, detail = classifyExit(exitEvent(), ["java.lang.OutOfMemoryError: Java heap space"])
+    assert kind == ExitKind.CRASH
+    assert detail.startswith("退出码 1，")
+
+
+def testUnrecoverableFindingIsMisconfigured():
+    tail = [
+        "[12:00:00] [Server thread/INFO]: Starting",
+        "Error: Unable to access jarfile server.jar",
+    ]
+    kind, detail = classifyExit(exitEvent(), tail)
+    assert kind == ExitKind.MISCONFIGURED
+    assert detail
+
+
+@pytest.mark.parametrize("attempt", range(12))
+def testBackoffDelayRange(attempt):
+    delay = min(ServerSupervisor.BACKOFF_MAX, ServerSupervisor.BACKOFF_BASE * 2**attempt)
+    for _ in range(50):
+        assert delay / 2 <= backoffDelay(attempt) <= delay
+
+
+def testBackoffDelayIsJittered():
+    assert len({backoffDelay(3) for _ in range(20)}) > 1
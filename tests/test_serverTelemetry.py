@@ -0,0 +1,104 @@
+#     Copyright 2024, MCSL Team, mailto:services@mcsl.com.cn
+#
+#     Part of "MCSL2", a simple and multifunctional Minecraft server launcher.
+#
+#     Licensed under the GNU General Public License, Version 3.0, with our
+#     additional agreements. (the "License");
+#     you may not use this file except in compliance with the License.
+#     You may obtain a copy of the License at
+#
+#        https://github.com/MCSLTeam/MCSL2/raw/master/LICENSE
+#
+################################################################################
+"""
+Tests of matching telemetry probe replies in the server output.
+"""
+
+from MCSL2Lib.ServerControllers.serverTelemetry import (
+    ServerTelemetry,
+    TelemetryParser,
+    telemetryProbes,
+)
+
+
+def log(text: str) -> str:
+    return f"[12:00:00] [Server thread/INFO]: {text}"
+
+
+def feedAll(parser: TelemetryParser, lines):
+    return [parser.feed(log(line))[0] for line in lines]
+
+
+def testProbeReplies():
+    parser = TelemetryParser("lobby")
+    parser.expect(telemetryProbes("paper"))
+    hidden = feedAll(
+        parser,
+        [
+            "TPS from last 1m, 5m, 15m: *20.0, 19.5, 19.9",
+            "Server tick times (avg/min/max) from last 5s, 10s, 1m:",
+            "◴ 12.5/3.1/40.2, 11.0/2.9/45.6, 10.8/2.1/60.3",
+        ],
+    )
+    assert hidden == [True, True, True]
+    assert not parser.pending
+    sample = ServerTelemetry.history("lobby").latest()
+    assert (sample.tps, sample.mspt) == (20.0, 12.5)
+
+
+def testUnknownCommandMatchesEcho():
+    parser = TelemetryParser("vanilla")
+    parser.expect(telemetryProbes("imported"))
+    hidden = feedAll(
+        parser,
+        [
+            "Unknown or incomplete command, see below for error",
+            "tps<--[HERE]",
+            "Unknown or incomplete command, see below for error",
+            "mspt<--[HERE]",
+        ],
+    )
+    assert hidden == [True, True, True, True]
+    assert parser.unsupported == ["tps", "mspt"]
+    # 原版只回显出错位置前的 10 个字符
+    parser = TelemetryParser("neoforge")
+    parser.expect(telemetryProbes("neoforge"))
+    feedAll(
+        parser, ["Unknown or incomplete command, see below for error", "...oforge tps<--[HERE]"]
+    )
+    assert parser.unsupported == ["neoforge tps"]
+
+
+def testUnknownCommandOfOtherCommand():
+    parser = TelemetryParser("typo")
+    parser.expect(telemetryProbes("paper"))
+    hidden = feedAll(
+        parser,
+        [
+            "Unknown or incomplete command, see below for error",
+            "tpz<--[HERE]",
+            "TPS from last 1m, 5m, 15m: 20.0, 20.0, 20.0",
+        ],
+    )
+    # 提示先被隐藏，确定不是查询的回显后由调用方补回
+    assert hidden == [True, False, True]
+    assert parser.released
+    assert parser.unsupported == []
+    assert [probe.command for probe in parser.pending] == ["mspt"]
+
+
+def testUnknownCommandWithoutEcho():
+    parser = TelemetryParser("spigot")
+    for _ in range(2):
+        assert parser.unsupported == []
+        parser.expect(telemetryProbes("imported"))
+        hidden = feedAll(
+            parser,
+            [
+                "TPS from last 1m, 5m, 15m: 20.0, 20.0, 20.0",
+                'Unknown command. Type "/help" for help.',
+            ],
+        )
+        assert hidden == [True, True]
+    # 连续两轮都没有回复才认为不支持
+    assert parser.unsupported == ["mspt"]